@@ -12,7 +12,8 @@ from backend.storage.db import DB_PATH
 config = context.config
 
 if config.config_file_name is not None:
-    fileConfig(config.config_file_name)
+    # Migrations run inside the app (init_db); keep the loggers it already created.
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
 
 target_metadata = None
 
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from alembic import op
+
+revision = "0002_invoice_items_invoice_index"
+down_revision = "0001_initial_schema"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Item lookups and per-invoice item counts filter on invoice_id.
+    op.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_invoice_items_invoice_id
+        ON invoice_items(invoice_id, idx);
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_invoice_items_invoice_id;")
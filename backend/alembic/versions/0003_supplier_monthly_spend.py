@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+from alembic import op
+
+revision = "0003_supplier_monthly_spend"
+down_revision = "0002_invoice_items_invoice_index"
+branch_labels = None
+depends_on = None
+
+# Rollup key of an invoice row; NEW/OLD is substituted per trigger.
+_KEY = "{row}.user_id, COALESCE({row}.supplier, ''), COALESCE(substr({row}.date_iso, 1, 7), '')"
+
+_ITEM_COUNT = "(SELECT COUNT(*) FROM invoice_items WHERE invoice_id = {row}.id)"
+
+
+def _add_invoice(row: str) -> str:
+    return f"""
+        INSERT INTO supplier_monthly_spend(user_id, supplier, month, invoice_count, total_sum, item_count)
+        VALUES({_KEY.format(row=row)}, 1, COALESCE({row}.total_sum, 0), {_ITEM_COUNT.format(row=row)})
+        ON CONFLICT(user_id, supplier, month) DO UPDATE SET
+            invoice_count = invoice_count + 1,
+            total_sum = total_sum + excluded.total_sum,
+            item_count = item_count + excluded.item_count;
+    """
+
+
+def _remove_invoice(row: str) -> str:
+    return f"""
+        UPDATE supplier_monthly_spend SET
+            invoice_count = invoice_count - 1,
+            total_sum = total_sum - COALESCE({row}.total_sum, 0),
+            item_count = item_count - {_ITEM_COUNT.format(row=row)}
+        WHERE (user_id, supplier, month) = ({_KEY.format(row=row)});
+        DELETE FROM supplier_monthly_spend
+        WHERE (user_id, supplier, month) = ({_KEY.format(row=row)}) AND invoice_count <= 0;
+    """
+
+
+def _shift_items(invoice_id: str, delta: int) -> str:
+    return f"""
+        UPDATE supplier_monthly_spend SET item_count = item_count + ({delta})
+        WHERE (user_id, supplier, month) = (
+            SELECT {_KEY.format(row="invoices")} FROM invoices WHERE invoices.id = {invoice_id}
+        );
+    """
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS supplier_monthly_spend(
+            user_id INTEGER NOT NULL,
+            supplier TEXT NOT NULL,
+            month TEXT NOT NULL,
+            invoice_count INTEGER NOT NULL DEFAULT 0,
+            total_sum REAL NOT NULL DEFAULT 0,
+            item_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY(user_id, supplier, month)
+        ) WITHOUT ROWID;
+        """
+    )
+
+    # Triggers run inside the writing transaction, so the rollup commits or rolls back
+    # together with the invoice rows that changed it.
+    op.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_spend_invoice_insert
+        AFTER INSERT ON invoices
+        BEGIN
+            {_add_invoice("NEW")}
+        END;
+        """
+    )
+    # BEFORE so the item count is taken while the invoice's items still exist; item
+    # rows removed afterwards (e.g. by ON DELETE CASCADE) no longer resolve to a key.
+    op.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_spend_invoice_delete
+        BEFORE DELETE ON invoices
+        BEGIN
+            {_remove_invoice("OLD")}
+        END;
+        """
+    )
+    op.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_spend_invoice_update
+        AFTER UPDATE OF user_id, supplier, date_iso, total_sum ON invoices
+        BEGIN
+            {_remove_invoice("OLD")}
+            {_add_invoice("NEW")}
+        END;
+        """
+    )
+    op.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_spend_item_insert
+        AFTER INSERT ON invoice_items
+        BEGIN
+            {_shift_items("NEW.invoice_id", 1)}
+        END;
+        """
+    )
+    op.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_spend_item_delete
+        AFTER DELETE ON invoice_items
+        BEGIN
+            {_shift_items("OLD.invoice_id", -1)}
+        END;
+        """
+    )
+    op.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_spend_item_move
+        AFTER UPDATE OF invoice_id ON invoice_items
+        BEGIN
+            {_shift_items("OLD.invoice_id", -1)}
+            {_shift_items("NEW.invoice_id", 1)}
+        END;
+        """
+    )
+
+    # Backfill from existing invoices.
+    op.execute(
+        """
+        INSERT INTO supplier_monthly_spend(user_id, supplier, month, invoice_count, total_sum, item_count)
+        SELECT
+            user_id,
+            COALESCE(supplier, ''),
+            COALESCE(substr(date_iso, 1, 7), ''),
+            COUNT(*),
+            SUM(COALESCE(total_sum, 0)),
+            SUM((SELECT COUNT(*) FROM invoice_items WHERE invoice_id = invoices.id))
+        FROM invoices
+        GROUP BY 1, 2, 3;
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS trg_spend_item_move;")
+    op.execute("DROP TRIGGER IF EXISTS trg_spend_item_delete;")
+    op.execute("DROP TRIGGER IF EXISTS trg_spend_item_insert;")
+    op.execute("DROP TRIGGER IF EXISTS trg_spend_invoice_update;")
+    op.execute("DROP TRIGGER IF EXISTS trg_spend_invoice_delete;")
+    op.execute("DROP TRIGGER IF EXISTS trg_spend_invoice_insert;")
+    op.execute("DROP TABLE IF EXISTS supplier_monthly_spend;")
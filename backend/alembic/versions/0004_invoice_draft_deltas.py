@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from alembic import op
+
+revision = "0004_invoice_draft_deltas"
+down_revision = "0003_supplier_monthly_spend"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Last delta already folded into invoice_drafts.payload.
+    op.execute("ALTER TABLE invoice_drafts ADD COLUMN delta_seq INTEGER NOT NULL DEFAULT 0;")
+
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS invoice_draft_deltas(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            patch BLOB NOT NULL,
+            created_at TEXT DEFAULT (datetime('now'))
+        );
+        """
+    )
+    op.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_invoice_draft_deltas_user
+        ON invoice_draft_deltas(user_id, id);
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_invoice_draft_deltas_user;")
+    op.execute("DROP TABLE IF EXISTS invoice_draft_deltas;")
+    op.execute("ALTER TABLE invoice_drafts DROP COLUMN delta_seq;")
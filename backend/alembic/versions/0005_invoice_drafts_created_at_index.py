@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from alembic import op
+
+revision = "0005_invoice_drafts_created_at_index"
+down_revision = "0004_invoice_draft_deltas"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Lets the draft sweeper find expired drafts without scanning the table.
+    op.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_invoice_drafts_created_at
+        ON invoice_drafts(created_at);
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_invoice_drafts_created_at;")
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from alembic import op
+
+revision = "0006_multiple_drafts_per_user"
+down_revision = "0005_invoice_drafts_created_at_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Drafts get their own id so a user can keep several; the delta log follows
+    # the draft instead of the user. Delta ids are kept because delta_seq refers to them.
+    op.execute(
+        """
+        CREATE TABLE invoice_drafts_new(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            payload BLOB NOT NULL,
+            created_at TEXT DEFAULT (datetime('now')),
+            delta_seq INTEGER NOT NULL DEFAULT 0
+        );
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO invoice_drafts_new(user_id, payload, created_at, delta_seq)
+        SELECT user_id, payload, created_at, delta_seq FROM invoice_drafts ORDER BY user_id;
+        """
+    )
+    op.execute(
+        """
+        CREATE TABLE invoice_draft_deltas_new(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            draft_id INTEGER NOT NULL,
+            patch BLOB NOT NULL,
+            created_at TEXT DEFAULT (datetime('now'))
+        );
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO invoice_draft_deltas_new(id, draft_id, patch, created_at)
+        SELECT d.id, n.id, d.patch, d.created_at
+        FROM invoice_draft_deltas AS d
+        JOIN invoice_drafts_new AS n ON n.user_id = d.user_id;
+        """
+    )
+    # The draft a user is currently reviewing; the others wait in id order.
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS invoice_draft_active(
+            user_id INTEGER PRIMARY KEY,
+            draft_id INTEGER NOT NULL
+        );
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO invoice_draft_active(user_id, draft_id)
+        SELECT user_id, id FROM invoice_drafts_new;
+        """
+    )
+
+    op.execute("DROP TABLE invoice_draft_deltas;")
+    op.execute("DROP TABLE invoice_drafts;")
+    op.execute("ALTER TABLE invoice_drafts_new RENAME TO invoice_drafts;")
+    op.execute("ALTER TABLE invoice_draft_deltas_new RENAME TO invoice_draft_deltas;")
+    op.execute("CREATE INDEX idx_invoice_drafts_user ON invoice_drafts(user_id, id);")
+    op.execute("CREATE INDEX idx_invoice_drafts_created_at ON invoice_drafts(created_at);")
+    op.execute("CREATE INDEX idx_invoice_draft_deltas_draft ON invoice_draft_deltas(draft_id, id);")
+
+
+def downgrade() -> None:
+    # Only the active draft of each user survives the way back.
+    op.execute(
+        """
+        CREATE TABLE invoice_drafts_old(
+            user_id INTEGER PRIMARY KEY,
+            payload TEXT NOT NULL,
+            created_at TEXT DEFAULT (datetime('now')),
+            delta_seq INTEGER NOT NULL DEFAULT 0
+        );
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO invoice_drafts_old(user_id, payload, created_at, delta_seq)
+        SELECT d.user_id, d.payload, d.created_at, d.delta_seq
+        FROM invoice_drafts AS d
+        JOIN invoice_draft_active AS a ON a.draft_id = d.id;
+        """
+    )
+    op.execute(
+        """
+        CREATE TABLE invoice_draft_deltas_old(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            patch BLOB NOT NULL,
+            created_at TEXT DEFAULT (datetime('now'))
+        );
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO invoice_draft_deltas_old(id, user_id, patch, created_at)
+        SELECT d.id, a.user_id, d.patch, d.created_at
+        FROM invoice_draft_deltas AS d
+        JOIN invoice_draft_active AS a ON a.draft_id = d.draft_id;
+        """
+    )
+
+    op.execute("DROP TABLE invoice_draft_active;")
+    op.execute("DROP TABLE invoice_draft_deltas;")
+    op.execute("DROP TABLE invoice_drafts;")
+    op.execute("ALTER TABLE invoice_drafts_old RENAME TO invoice_drafts;")
+    op.execute("ALTER TABLE invoice_draft_deltas_old RENAME TO invoice_draft_deltas;")
+    op.execute("CREATE INDEX idx_invoice_drafts_created_at ON invoice_drafts(created_at);")
+    op.execute("CREATE INDEX idx_invoice_draft_deltas_user ON invoice_draft_deltas(user_id, id);")
@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+from alembic import op
+
+revision = "0007_invoice_drafts_version"
+down_revision = "0006_multiple_drafts_per_user"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Bumped on every write so that saves can be made conditional on the version read.
+    op.execute("ALTER TABLE invoice_drafts ADD COLUMN version INTEGER NOT NULL DEFAULT 0;")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE invoice_drafts DROP COLUMN version;")
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, List, Optional, Tuple
+
+from alembic import op
+
+revision = "0008_integer_money_columns"
+down_revision = "0007_invoice_drafts_version"
+branch_labels = None
+depends_on = None
+
+# Keep in sync with MONEY_SCALE and QUANTITY_SCALE in backend/storage/mappers.py.
+_MONEY_SCALE = 2
+_QUANTITY_SCALE = 3
+_BATCH_SIZE = 1000
+
+_KEY = "{row}.user_id, COALESCE({row}.supplier, ''), COALESCE(substr({row}.date_iso, 1, 7), '')"
+
+_ITEM_COUNT = "(SELECT COUNT(*) FROM invoice_items WHERE invoice_id = {row}.id)"
+
+
+def _add_invoice(row: str, minor: bool) -> str:
+    if not minor:
+        return f"""
+            INSERT INTO supplier_monthly_spend(user_id, supplier, month, invoice_count, total_sum, item_count)
+            VALUES({_KEY.format(row=row)}, 1, COALESCE({row}.total_sum, 0), {_ITEM_COUNT.format(row=row)})
+            ON CONFLICT(user_id, supplier, month) DO UPDATE SET
+                invoice_count = invoice_count + 1,
+                total_sum = total_sum + excluded.total_sum,
+                item_count = item_count + excluded.item_count;
+        """
+    return f"""
+        INSERT INTO supplier_monthly_spend(
+            user_id, supplier, month, invoice_count, total_sum, total_minor, item_count
+        )
+        VALUES(
+            {_KEY.format(row=row)}, 1, COALESCE({row}.total_sum, 0),
+            COALESCE({row}.total_minor, 0), {_ITEM_COUNT.format(row=row)}
+        )
+        ON CONFLICT(user_id, supplier, month) DO UPDATE SET
+            invoice_count = invoice_count + 1,
+            total_sum = total_sum + excluded.total_sum,
+            total_minor = total_minor + excluded.total_minor,
+            item_count = item_count + excluded.item_count;
+    """
+
+
+def _remove_invoice(row: str, minor: bool) -> str:
+    minor_update = f"total_minor = total_minor - COALESCE({row}.total_minor, 0)," if minor else ""
+    return f"""
+        UPDATE supplier_monthly_spend SET
+            invoice_count = invoice_count - 1,
+            total_sum = total_sum - COALESCE({row}.total_sum, 0),
+            {minor_update}
+            item_count = item_count - {_ITEM_COUNT.format(row=row)}
+        WHERE (user_id, supplier, month) = ({_KEY.format(row=row)});
+        DELETE FROM supplier_monthly_spend
+        WHERE (user_id, supplier, month) = ({_KEY.format(row=row)}) AND invoice_count <= 0;
+    """
+
+
+def _create_invoice_triggers(minor: bool) -> None:
+    for name in ("insert", "delete", "update"):
+        op.execute(f"DROP TRIGGER IF EXISTS trg_spend_invoice_{name};")
+    op.execute(
+        f"""
+        CREATE TRIGGER trg_spend_invoice_insert
+        AFTER INSERT ON invoices
+        BEGIN
+            {_add_invoice("NEW", minor)}
+        END;
+        """
+    )
+    op.execute(
+        f"""
+        CREATE TRIGGER trg_spend_invoice_delete
+        BEFORE DELETE ON invoices
+        BEGIN
+            {_remove_invoice("OLD", minor)}
+        END;
+        """
+    )
+    columns = "user_id, supplier, date_iso, total_sum" + (", total_minor" if minor else "")
+    op.execute(
+        f"""
+        CREATE TRIGGER trg_spend_invoice_update
+        AFTER UPDATE OF {columns} ON invoices
+        BEGIN
+            {_remove_invoice("OLD", minor)}
+            {_add_invoice("NEW", minor)}
+        END;
+        """
+    )
+
+
+def _units(value: Any, scale: int) -> Optional[int]:
+    # Same conversion as the mappers: the float's shortest repr, rounded half up.
+    if value is None:
+        return None
+    return int(Decimal(repr(float(value))).scaleb(scale).to_integral_value(ROUND_HALF_UP))
+
+
+def _backfill(select_sql: str, update_sql: str, scales: Tuple[int, ...]) -> None:
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.exec_driver_sql(select_sql, (last_id, _BATCH_SIZE)).fetchall()
+        if not rows:
+            break
+        updates: List[Tuple[Any, ...]] = [
+            tuple(_units(value, scale) for value, scale in zip(row[1:], scales)) + (row[0],)
+            for row in rows
+        ]
+        connection.exec_driver_sql(update_sql, updates)
+        last_id = rows[-1][0]
+
+
+def upgrade() -> None:
+    # Money is stored in minor units (hundredths) and quantities in thousandths, so
+    # reads and SUM aggregations are exact integer arithmetic. The REAL columns are
+    # still written for older readers. 0014_item_unit_scales later makes the unit
+    # of qty_milli and price_minor per row (qty_scale, price_scale); the names stay.
+    op.execute("ALTER TABLE invoices ADD COLUMN total_minor INTEGER;")
+    op.execute("ALTER TABLE invoice_items ADD COLUMN qty_milli INTEGER;")
+    op.execute("ALTER TABLE invoice_items ADD COLUMN price_minor INTEGER;")
+    op.execute("ALTER TABLE invoice_items ADD COLUMN total_minor INTEGER;")
+    op.execute(
+        "ALTER TABLE supplier_monthly_spend ADD COLUMN total_minor INTEGER NOT NULL DEFAULT 0;"
+    )
+
+    # The update trigger does not fire for total_minor yet, so the rollup is
+    # recomputed once below instead of per row.
+    _backfill(
+        "SELECT id, total_sum FROM invoices WHERE id > ? ORDER BY id LIMIT ?",
+        "UPDATE invoices SET total_minor=? WHERE id=?",
+        (_MONEY_SCALE,),
+    )
+    _backfill(
+        "SELECT id, qty, price, total FROM invoice_items WHERE id > ? ORDER BY id LIMIT ?",
+        "UPDATE invoice_items SET qty_milli=?, price_minor=?, total_minor=? WHERE id=?",
+        (_QUANTITY_SCALE, _MONEY_SCALE, _MONEY_SCALE),
+    )
+    op.execute(
+        """
+        UPDATE supplier_monthly_spend SET total_minor = spend.total_minor
+        FROM (
+            SELECT
+                user_id,
+                COALESCE(supplier, '') AS supplier,
+                COALESCE(substr(date_iso, 1, 7), '') AS month,
+                SUM(COALESCE(total_minor, 0)) AS total_minor
+            FROM invoices
+            GROUP BY 1, 2, 3
+        ) AS spend
+        WHERE spend.user_id = supplier_monthly_spend.user_id
+          AND spend.supplier = supplier_monthly_spend.supplier
+          AND spend.month = supplier_monthly_spend.month;
+        """
+    )
+    _create_invoice_triggers(minor=True)
+
+
+def downgrade() -> None:
+    _create_invoice_triggers(minor=False)
+    op.execute("ALTER TABLE supplier_monthly_spend DROP COLUMN total_minor;")
+    op.execute("ALTER TABLE invoice_items DROP COLUMN total_minor;")
+    op.execute("ALTER TABLE invoice_items DROP COLUMN price_minor;")
+    op.execute("ALTER TABLE invoice_items DROP COLUMN qty_milli;")
+    op.execute("ALTER TABLE invoices DROP COLUMN total_minor;")
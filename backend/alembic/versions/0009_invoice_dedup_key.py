@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import logging
+import re
+from typing import List, Optional, Tuple
+
+from alembic import op
+
+revision = "0009_invoice_dedup_key"
+down_revision = "0008_integer_money_columns"
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+_BATCH_SIZE = 1000
+
+# Keep in sync with invoice_dedup_key in backend/storage/mappers.py.
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def _normalize(value: Optional[str]) -> str:
+    if not value:
+        return ""
+    return _NON_WORD.sub(" ", value.casefold().replace("ё", "е")).strip()
+
+
+def _dedup_key(
+    user_id: int,
+    supplier: Optional[str],
+    doc_number: Optional[str],
+    date_iso: Optional[str],
+    total_minor: Optional[int],
+) -> Optional[str]:
+    number = _normalize(doc_number).replace(" ", "")
+    if not number:
+        return None
+    total = "" if total_minor is None else str(total_minor)
+    return f"{user_id}|{_normalize(supplier)}|{number}|{date_iso or ''}|{total}"
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE invoices ADD COLUMN dedup_key TEXT;")
+
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.exec_driver_sql(
+            """
+            SELECT id, user_id, supplier, doc_number, date_iso, total_minor
+            FROM invoices WHERE id > ? ORDER BY id LIMIT ?
+            """,
+            (last_id, _BATCH_SIZE),
+        ).fetchall()
+        if not rows:
+            break
+        updates: List[Tuple[Optional[str], int]] = [(_dedup_key(*row[1:]), row[0]) for row in rows]
+        connection.exec_driver_sql("UPDATE invoices SET dedup_key=? WHERE id=?", updates)
+        last_id = rows[-1][0]
+
+    # Invoices saved more than once keep the key on the oldest copy only; the
+    # later copies are reported and left for the operator to review.
+    duplicates = connection.exec_driver_sql(
+        """
+        SELECT id, first_id FROM (
+            SELECT id, MIN(id) OVER (PARTITION BY dedup_key) AS first_id
+            FROM invoices WHERE dedup_key IS NOT NULL
+        )
+        WHERE id <> first_id
+        ORDER BY first_id, id
+        """
+    ).fetchall()
+    for invoice_id, first_id in duplicates:
+        logger.warning(f"invoice {invoice_id} duplicates invoice {first_id}")
+    if duplicates:
+        logger.warning(f"{len(duplicates)} duplicate invoices found; they keep no dedup key")
+        connection.exec_driver_sql(
+            "UPDATE invoices SET dedup_key=NULL WHERE id=?",
+            [(invoice_id,) for invoice_id, _ in duplicates],
+        )
+
+    op.execute(
+        """
+        CREATE UNIQUE INDEX idx_invoices_dedup_key
+        ON invoices(dedup_key) WHERE dedup_key IS NOT NULL;
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_invoices_dedup_key;")
+    op.execute("ALTER TABLE invoices DROP COLUMN dedup_key;")
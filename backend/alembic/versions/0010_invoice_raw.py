@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import zlib
+from typing import List, Tuple
+
+from alembic import op
+
+revision = "0010_invoice_raw"
+down_revision = "0009_invoice_dedup_key"
+branch_labels = None
+depends_on = None
+
+_BATCH_SIZE = 500
+
+# Keep in sync with RAW_TEXT_COMPRESSION_LEVEL in backend/storage/mappers.py.
+_COMPRESSION_LEVEL = 6
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE TABLE invoice_raw(
+            invoice_id INTEGER PRIMARY KEY REFERENCES invoices(id) ON DELETE CASCADE,
+            payload BLOB NOT NULL,
+            raw_size INTEGER NOT NULL
+        );
+        """
+    )
+
+    # Move any raw text already stored inline, leaving the column empty.
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.exec_driver_sql(
+            """
+            SELECT id, raw_text FROM invoices
+            WHERE id > ? AND raw_text IS NOT NULL AND raw_text <> ''
+            ORDER BY id LIMIT ?
+            """,
+            (last_id, _BATCH_SIZE),
+        ).fetchall()
+        if not rows:
+            break
+        payloads: List[Tuple[int, bytes, int]] = []
+        for invoice_id, raw_text in rows:
+            encoded = str(raw_text).encode("utf-8")
+            payloads.append((invoice_id, zlib.compress(encoded, _COMPRESSION_LEVEL), len(encoded)))
+        connection.exec_driver_sql(
+            "INSERT OR REPLACE INTO invoice_raw(invoice_id, payload, raw_size) VALUES(?,?,?)",
+            payloads,
+        )
+        connection.exec_driver_sql(
+            "UPDATE invoices SET raw_text='' WHERE id=?",
+            [(invoice_id,) for invoice_id, _, _ in payloads],
+        )
+        last_id = rows[-1][0]
+
+
+def downgrade() -> None:
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.exec_driver_sql(
+            "SELECT invoice_id, payload FROM invoice_raw WHERE invoice_id > ? "
+            "ORDER BY invoice_id LIMIT ?",
+            (last_id, _BATCH_SIZE),
+        ).fetchall()
+        if not rows:
+            break
+        connection.exec_driver_sql(
+            "UPDATE invoices SET raw_text=? WHERE id=?",
+            [
+                (zlib.decompress(payload).decode("utf-8"), invoice_id)
+                for invoice_id, payload in rows
+            ],
+        )
+        last_id = rows[-1][0]
+
+    op.execute("DROP TABLE IF EXISTS invoice_raw;")
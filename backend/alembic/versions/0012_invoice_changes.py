@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+from typing import Dict, Tuple
+
+from alembic import op
+
+revision = "0012_invoice_changes"
+down_revision = "0010_invoice_raw"
+branch_labels = None
+depends_on = None
+
+# Captured tables: (column holding the invoice id, columns of the row image).
+# raw_text and dedup_key of invoices are internal and left out.
+_TABLES: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "invoices": (
+        "id",
+        (
+            "id",
+            "user_id",
+            "supplier",
+            "client",
+            "doc_number",
+            "date",
+            "date_iso",
+            "total_sum",
+            "total_minor",
+            "source_path",
+            "created_at",
+        ),
+    ),
+    "invoice_items": (
+        "invoice_id",
+        (
+            "id",
+            "invoice_id",
+            "idx",
+            "code",
+            "name",
+            "qty",
+            "price",
+            "total",
+            "qty_milli",
+            "price_minor",
+            "total_minor",
+        ),
+    ),
+    "comments": (
+        "invoice_id",
+        ("id", "invoice_id", "user_id", "text", "created_at"),
+    ),
+}
+
+_OPERATIONS = (
+    ("insert", "INSERT", "NEW"),
+    ("update", "UPDATE", "NEW"),
+    ("delete", "DELETE", "OLD"),
+)
+
+
+def _log_change(table: str, operation: str, row: str) -> str:
+    invoice_column, columns = _TABLES[table]
+    if operation == "delete":
+        data = "NULL"
+    else:
+        data = "json_object({})".format(", ".join(f"'{c}', {row}.{c}" for c in columns))
+    return f"""
+        INSERT INTO invoice_changes(table_name, op, row_id, invoice_id, data)
+        VALUES('{table}', '{operation}', {row}.id, {row}.{invoice_column}, {data});
+    """
+
+
+def upgrade() -> None:
+    # AUTOINCREMENT: sequence numbers are never reused, even after purging the log.
+    op.execute(
+        """
+        CREATE TABLE invoice_changes(
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            op TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            invoice_id INTEGER NOT NULL,
+            data TEXT,
+            changed_at TEXT NOT NULL DEFAULT (datetime('now'))
+        );
+        """
+    )
+
+    # Triggers write the log inside the writing transaction, so a change is visible
+    # to consumers exactly when the row change itself commits.
+    for table in _TABLES:
+        for operation, event, row in _OPERATIONS:
+            op.execute(
+                f"""
+                CREATE TRIGGER trg_changes_{table}_{operation}
+                AFTER {event} ON {table}
+                BEGIN
+                    {_log_change(table, operation, row)}
+                END;
+                """
+            )
+
+
+def downgrade() -> None:
+    for table in _TABLES:
+        for operation, _, _ in _OPERATIONS:
+            op.execute(f"DROP TRIGGER IF EXISTS trg_changes_{table}_{operation};")
+    op.execute("DROP TABLE IF EXISTS invoice_changes;")
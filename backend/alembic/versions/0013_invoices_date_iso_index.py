@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from alembic import op
+
+revision = "0013_invoices_date_iso_index"
+down_revision = "0012_invoice_changes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Listings filter and sort on (date_iso, id); archive partitions have the same index.
+    op.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_invoices_date_iso
+        ON invoices(date_iso, id);
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_invoices_date_iso;")
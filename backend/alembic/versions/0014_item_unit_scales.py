@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, List, Optional, Tuple
+
+from alembic import op
+
+revision = "0014_item_unit_scales"
+down_revision = "0013_invoices_date_iso_index"
+branch_labels = None
+depends_on = None
+
+# Keep in sync with MONEY_SCALE, QUANTITY_SCALE and MAX_UNIT_SCALE in
+# backend/storage/mappers.py.
+_MONEY_SCALE = 2
+_QUANTITY_SCALE = 3
+_MAX_UNIT_SCALE = 9
+_BATCH_SIZE = 1000
+# A double holds any decimal of up to 15 significant digits exactly; longer
+# representations are floating point noise (0.30000000000000004).
+_REAL_DIGITS = 15
+
+_ITEM_COLUMNS = (
+    "id",
+    "invoice_id",
+    "idx",
+    "code",
+    "name",
+    "qty",
+    "price",
+    "total",
+    "qty_milli",
+    "price_minor",
+    "total_minor",
+)
+
+
+def _create_item_change_triggers(columns: Tuple[str, ...]) -> None:
+    # Same row image as 0012_invoice_changes, so consumers can read the scales.
+    data = "json_object({})".format(", ".join(f"'{c}', NEW.{c}" for c in columns))
+    for operation, event in (("insert", "INSERT"), ("update", "UPDATE")):
+        op.execute(f"DROP TRIGGER IF EXISTS trg_changes_invoice_items_{operation};")
+        op.execute(
+            f"""
+            CREATE TRIGGER trg_changes_invoice_items_{operation}
+            AFTER {event} ON invoice_items
+            BEGIN
+                INSERT INTO invoice_changes(table_name, op, row_id, invoice_id, data)
+                VALUES('invoice_items', '{operation}', NEW.id, NEW.invoice_id, {data});
+            END;
+            """
+        )
+
+
+def _fine_units(value: Any, default_scale: int) -> Optional[Tuple[int, int]]:
+    """(units, scale) for a REAL value with more digits than default_scale, else None."""
+    if value is None:
+        return None
+    exact = Decimal(repr(float(value)))
+    if len(exact.as_tuple().digits) > _REAL_DIGITS:
+        return None
+    exponent = exact.normalize().as_tuple().exponent
+    if not isinstance(exponent, int) or -exponent <= default_scale:
+        return None
+    scale = min(-exponent, _MAX_UNIT_SCALE)
+    return int(exact.scaleb(scale).to_integral_value(ROUND_HALF_UP)), scale
+
+
+def _backfill() -> None:
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.exec_driver_sql(
+            "SELECT id, qty, price FROM invoice_items WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, _BATCH_SIZE),
+        ).fetchall()
+        if not rows:
+            break
+        quantities: List[Tuple[int, int, int]] = []
+        prices: List[Tuple[int, int, int]] = []
+        for item_id, qty, price in rows:
+            fine_qty = _fine_units(qty, _QUANTITY_SCALE)
+            if fine_qty is not None:
+                quantities.append((*fine_qty, item_id))
+            fine_price = _fine_units(price, _MONEY_SCALE)
+            if fine_price is not None:
+                prices.append((*fine_price, item_id))
+        if quantities:
+            connection.exec_driver_sql(
+                "UPDATE invoice_items SET qty_milli=?, qty_scale=? WHERE id=?", quantities
+            )
+        if prices:
+            connection.exec_driver_sql(
+                "UPDATE invoice_items SET price_minor=?, price_scale=? WHERE id=?", prices
+            )
+        last_id = rows[-1][0]
+
+
+def upgrade() -> None:
+    # Unit prices and quantities keep the digits they were written with: qty_milli
+    # and price_minor hold 10**-scale units with the scale stored per row (NULL
+    # means the default scale of 0008). Line and invoice totals stay in hundredths
+    # so SUM over them remains exact.
+    op.execute("ALTER TABLE invoice_items ADD COLUMN qty_scale INTEGER;")
+    op.execute("ALTER TABLE invoice_items ADD COLUMN price_scale INTEGER;")
+    # Rewritten rows are not changes; the triggers come back with the scales below.
+    for operation in ("insert", "update"):
+        op.execute(f"DROP TRIGGER IF EXISTS trg_changes_invoice_items_{operation};")
+    _backfill()
+    _create_item_change_triggers(_ITEM_COLUMNS + ("qty_scale", "price_scale"))
+
+
+def _rescale(units: Optional[int], scale: Optional[int], default_scale: int) -> Optional[int]:
+    if units is None or scale is None:
+        return units
+    return int(Decimal(units).scaleb(default_scale - scale).to_integral_value(ROUND_HALF_UP))
+
+
+def downgrade() -> None:
+    for operation in ("insert", "update"):
+        op.execute(f"DROP TRIGGER IF EXISTS trg_changes_invoice_items_{operation};")
+    # Back to the default scales; digits beyond them are rounded.
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.exec_driver_sql(
+            """
+            SELECT id, qty_milli, qty_scale, price_minor, price_scale FROM invoice_items
+            WHERE id > ? AND (qty_scale IS NOT NULL OR price_scale IS NOT NULL)
+            ORDER BY id LIMIT ?
+            """,
+            (last_id, _BATCH_SIZE),
+        ).fetchall()
+        if not rows:
+            break
+        connection.exec_driver_sql(
+            "UPDATE invoice_items SET qty_milli=?, price_minor=? WHERE id=?",
+            [
+                (
+                    _rescale(qty_milli, qty_scale, _QUANTITY_SCALE),
+                    _rescale(price_minor, price_scale, _MONEY_SCALE),
+                    item_id,
+                )
+                for item_id, qty_milli, qty_scale, price_minor, price_scale in rows
+            ],
+        )
+        last_id = rows[-1][0]
+    _create_item_change_triggers(_ITEM_COLUMNS)
+    op.execute("ALTER TABLE invoice_items DROP COLUMN price_scale;")
+    op.execute("ALTER TABLE invoice_items DROP COLUMN qty_scale;")
@@ -0,0 +1,471 @@
+"""
+Maintenance commands for the invoice database.
+
+Usage: python -m backend.cli [--db PATH] <command> [options]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import dataclasses
+import json
+import logging
+from datetime import date
+from functools import partial
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from backend.config import (
+    ARCHIVE_DIR,
+    ARTIFACTS_DIR,
+    BACKUP_DIR,
+    BACKUP_KEEP,
+    BACKUP_PAGES_PER_STEP,
+    BACKUP_STEP_SLEEP_MS,
+    DRAFT_SWEEP_BATCH_SIZE,
+    DRAFT_TTL_SECONDS,
+    RETENTION_BATCH_PAUSE_MS,
+    RETENTION_BATCH_SIZE,
+    RETENTION_DAYS,
+    UPLOAD_FOLDER,
+)
+from backend.ocr.engine.util import DOWNLOAD_DIR
+from backend.services.draft_sweeper import DraftSweeper
+from backend.services.invoice_import import (
+    IMPORT_CHUNK_SIZE,
+    IMPORT_CSV_COLUMNS,
+    ImportReport,
+    import_invoices_csv,
+)
+from backend.services.retention import RetentionJob
+from backend.storage.archive import ARCHIVE_BATCH_SIZE, archive_invoices
+from backend.storage.backup import backup_database, list_backups, restore_backup
+from backend.storage.date_backfill import (
+    DATE_BACKFILL_BATCH_SIZE,
+    DATE_BACKFILL_PAUSE_SECONDS,
+    backfill_date_iso,
+)
+from backend.storage.db import DB_PATH
+from backend.storage.db_async import DEFAULT_CHANGES_BATCH_SIZE, AsyncInvoiceStorage
+from backend.storage.drafts_async import (
+    compact_draft_invoices,
+    delete_expired_drafts,
+    fetch_referenced_paths,
+)
+from backend.storage.dump import DUMP_BATCH_SIZE, dump_database, load_dump
+from backend.storage.retention import (
+    enable_incremental_vacuum,
+    incremental_vacuum,
+    prune_invoices,
+)
+
+
+def _storage(args: argparse.Namespace) -> AsyncInvoiceStorage:
+    return AsyncInvoiceStorage(database_path=args.db, archive_dir=args.archive_dir)
+
+
+def _cmd_rebuild_rollup(args: argparse.Namespace) -> int:
+    rows = asyncio.run(_storage(args).rebuild_supplier_spend())
+    print(f"supplier_monthly_spend rebuilt: {rows} rows")
+    return 0
+
+
+def _cmd_compact_drafts(args: argparse.Namespace) -> int:
+    drafts = asyncio.run(compact_draft_invoices(database_path=args.db))
+    print(f"drafts compacted: {drafts}")
+    return 0
+
+
+def _cmd_sweep_drafts(args: argparse.Namespace) -> int:
+    if args.ttl_seconds <= 0:
+        print("draft expiry is disabled (DRAFT_TTL_SECONDS=0)")
+        return 1
+    sweeper = DraftSweeper(
+        delete_expired_func=partial(
+            delete_expired_drafts, batch_size=args.batch_size, database_path=args.db
+        ),
+        fetch_referenced_paths_func=partial(
+            fetch_referenced_paths, database_path=args.db, archive_dir=args.archive_dir
+        ),
+        upload_dirs=[UPLOAD_FOLDER, DOWNLOAD_DIR],
+        logger=logging.getLogger("services.draft_sweeper"),
+        ttl_seconds=args.ttl_seconds,
+    )
+    report = asyncio.run(sweeper.sweep())
+    print(
+        f"drafts swept: {report.drafts_deleted} drafts, {report.deltas_deleted} deltas, "
+        f"{report.files_deleted} files, {report.bytes_reclaimed} bytes reclaimed"
+    )
+    return 0
+
+
+def _cmd_archive_invoices(args: argparse.Namespace) -> int:
+    report = asyncio.run(
+        archive_invoices(
+            args.before,
+            args.archive_dir,
+            batch_size=args.batch_size,
+            database_path=args.db,
+        )
+    )
+    years = ", ".join(str(year) for year in report.years) or "none"
+    print(
+        f"invoices archived: {report.invoices} invoices, {report.items} items, "
+        f"{report.comments} comments; partitions: {years}"
+    )
+    return 0
+
+
+def _cmd_show_raw(args: argparse.Namespace) -> int:
+    raw_text = asyncio.run(_storage(args).fetch_raw_text(args.invoice_id))
+    if raw_text is None:
+        print(f"no raw text stored for invoice {args.invoice_id}")
+        return 1
+    print(raw_text)
+    return 0
+
+
+def _cmd_prune_invoices(args: argparse.Namespace) -> int:
+    if args.enable_incremental_vacuum:
+        if asyncio.run(enable_incremental_vacuum(database_path=args.db)):
+            print("database switched to auto_vacuum=INCREMENTAL")
+        else:
+            print("database already uses auto_vacuum=INCREMENTAL")
+        if args.days <= 0:
+            return 0
+    if args.days <= 0:
+        print("retention is disabled (RETENTION_DAYS=0)")
+        return 1
+    pause_seconds = args.pause_ms / 1000
+    job = RetentionJob(
+        prune_invoices_func=partial(
+            prune_invoices,
+            batch_size=args.batch_size,
+            pause_seconds=pause_seconds,
+            database_path=args.db,
+            archive_dir=args.archive_dir,
+        ),
+        vacuum_func=partial(incremental_vacuum, pause_seconds=pause_seconds, database_path=args.db),
+        fetch_referenced_paths_func=partial(
+            fetch_referenced_paths, database_path=args.db, archive_dir=args.archive_dir
+        ),
+        upload_dirs=[UPLOAD_FOLDER, DOWNLOAD_DIR],
+        artifacts_dir=args.artifacts_dir,
+        logger=logging.getLogger("services.retention"),
+        retention_days=args.days,
+        rebuild_rollup_func=_storage(args).rebuild_supplier_spend,
+    )
+    report = asyncio.run(job.run())
+    print(
+        f"invoices pruned: {report.invoices_deleted} invoices, {report.items_deleted} items, "
+        f"{report.comments_deleted} comments, {report.partitions_deleted} archive partitions; "
+        f"{report.files_deleted} uploads, {report.artifacts_deleted} artifact folders; "
+        f"{report.bytes_reclaimed} bytes reclaimed ({report.database_bytes} from the database)"
+    )
+    return 0
+
+
+def _cmd_backup(args: argparse.Namespace) -> int:
+    reported = -1
+
+    def progress(copied: int, total: int) -> None:
+        nonlocal reported
+        percent = copied * 100 // total if total else 100
+        if percent // 10 > reported // 10:
+            reported = percent
+            print(f"backup progress: {percent}% ({copied}/{total} pages)")
+
+    report = backup_database(
+        args.backup_dir,
+        keep=args.keep,
+        database_path=args.db,
+        pages_per_step=args.pages_per_step,
+        step_sleep=args.step_sleep_ms / 1000,
+        progress=progress,
+        archive_dir=args.archive_dir,
+    )
+    print(
+        f"backup written: {report.path} ({report.pages} pages, {report.database_bytes} bytes, "
+        f"{report.snapshot_bytes} compressed) and {len(report.partitions)} archive partitions "
+        f"in {report.seconds:.2f}s; {report.pruned} old snapshots removed"
+    )
+    return 0
+
+
+def _cmd_restore_backup(args: argparse.Namespace) -> int:
+    snapshot = args.snapshot
+    if snapshot is None:
+        snapshots = list_backups(args.backup_dir, args.db)
+        if not snapshots:
+            print(f"no backups found in {args.backup_dir}")
+            return 1
+        snapshot = snapshots[-1]
+    pages = restore_backup(snapshot, database_path=args.db, archive_dir=args.archive_dir)
+    print(f"restored {args.db} and its archive partitions from {snapshot} ({pages} pages)")
+    return 0
+
+
+def _cmd_changes(args: argparse.Namespace) -> int:
+    async def stream() -> None:
+        async for change in _storage(args).iter_changes(args.after, batch_size=args.batch_size):
+            print(json.dumps(dataclasses.asdict(change), ensure_ascii=False))
+
+    asyncio.run(stream())
+    return 0
+
+
+def _cmd_purge_changes(args: argparse.Namespace) -> int:
+    removed = asyncio.run(_storage(args).purge_changes(args.through))
+    print(f"change log entries purged: {removed}")
+    return 0
+
+
+def _cmd_dump(args: argparse.Namespace) -> int:
+    report = dump_database(
+        args.output,
+        database_path=args.db,
+        progress=lambda invoices: print(f"dump progress: {invoices} invoices"),
+        archive_dir=args.archive_dir,
+    )
+    print(
+        f"dump written: {report.path} ({report.invoices} invoices, {report.items} items, "
+        f"{report.comments} comments, {report.partitions} archive partitions) "
+        f"in {report.seconds:.2f}s"
+    )
+    return 0
+
+
+def _cmd_restore_dump(args: argparse.Namespace) -> int:
+    report = asyncio.run(
+        load_dump(
+            args.dump,
+            database_path=args.db,
+            batch_size=args.batch_size,
+            progress=lambda invoices: print(f"restore progress: {invoices} invoices"),
+            archive_dir=args.archive_dir,
+        )
+    )
+    print(
+        f"dump restored into {args.db}: {report.invoices} invoices, {report.items} items, "
+        f"{report.comments} comments in {report.seconds:.2f}s"
+    )
+    if report.duplicates:
+        print(f"{report.duplicates} duplicate invoices were left without a dedup key")
+    return 0
+
+
+def _column_mapping(value: str) -> Tuple[str, str]:
+    header, separator, column = value.rpartition("=")
+    if not separator or not header or column not in IMPORT_CSV_COLUMNS:
+        raise argparse.ArgumentTypeError(
+            f"expected CSV_HEADER=COLUMN with COLUMN one of {', '.join(IMPORT_CSV_COLUMNS)}"
+        )
+    return header, column
+
+
+def _cmd_import_csv(args: argparse.Namespace) -> int:
+    storage = _storage(args)
+    action = "validated" if args.dry_run else "saved"
+
+    def progress(report: ImportReport) -> None:
+        print(f"import progress: {report.rows} rows, {report.invoices} invoices {action}")
+
+    failed = False
+    for path in args.files:
+        with open(path, encoding="utf-8-sig", newline="") as source:
+            try:
+                report = asyncio.run(
+                    import_invoices_csv(
+                        source,
+                        storage.import_invoices,
+                        args.user_id,
+                        chunk_size=args.chunk_size,
+                        dry_run=args.dry_run,
+                        column_map=dict(args.map),
+                        progress=progress,
+                    )
+                )
+            except ValueError as e:
+                print(f"{path}: {e}")
+                failed = True
+                continue
+        for issue in report.issues:
+            print(f"{path}:{issue.line}: {issue.message}")
+        print(
+            f"{path}: {report.rows} rows, {report.invoices} invoices {action}"
+            f"{'' if args.dry_run else f' ({report.saved} stored, {report.duplicates} duplicates)'}, "
+            f"{report.skipped} skipped"
+        )
+        failed = failed or report.skipped > 0
+    return 1 if failed else 0
+
+
+def _cmd_backfill_dates(args: argparse.Namespace) -> int:
+    report = asyncio.run(
+        backfill_date_iso(
+            batch_size=args.batch_size,
+            pause_seconds=args.pause_ms / 1000,
+            database_path=args.db,
+        )
+    )
+    for invoice_id, raw_date in report.unparsed:
+        print(f"invoice {invoice_id}: unrecognized date {raw_date!r}")
+    for invoice_id in report.duplicates:
+        print(f"invoice {invoice_id}: duplicates another invoice; it keeps no dedup key")
+    print(
+        f"invoice dates backfilled: {report.updated} invoices, "
+        f"{len(report.unparsed)} left without date_iso"
+    )
+    return 0
+
+
+_COMMANDS: Dict[str, Callable[[argparse.Namespace], int]] = {
+    "rebuild-rollup": _cmd_rebuild_rollup,
+    "compact-drafts": _cmd_compact_drafts,
+    "sweep-drafts": _cmd_sweep_drafts,
+    "archive-invoices": _cmd_archive_invoices,
+    "show-raw": _cmd_show_raw,
+    "prune-invoices": _cmd_prune_invoices,
+    "backup": _cmd_backup,
+    "restore-backup": _cmd_restore_backup,
+    "changes": _cmd_changes,
+    "purge-changes": _cmd_purge_changes,
+    "dump": _cmd_dump,
+    "restore-dump": _cmd_restore_dump,
+    "import-csv": _cmd_import_csv,
+    "backfill-dates": _cmd_backfill_dates,
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="invoiceflowbot-admin",
+        description="InvoiceFlowBot database maintenance",
+    )
+    parser.add_argument("--db", default=DB_PATH, help="Path to the SQLite database")
+    parser.add_argument(
+        "--archive-dir", default=ARCHIVE_DIR, help="Directory of the yearly invoice archives"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser(
+        "rebuild-rollup",
+        help="Recompute the per-supplier monthly spend rollup from invoices",
+    )
+    subparsers.add_parser(
+        "compact-drafts",
+        help="Fold pending draft edits from the delta log into the stored drafts",
+    )
+    sweep = subparsers.add_parser(
+        "sweep-drafts",
+        help="Delete drafts idle for longer than the TTL and their orphaned uploads",
+    )
+    sweep.add_argument("--ttl-seconds", type=float, default=DRAFT_TTL_SECONDS)
+    sweep.add_argument("--batch-size", type=int, default=DRAFT_SWEEP_BATCH_SIZE)
+    archive = subparsers.add_parser(
+        "archive-invoices",
+        help="Move invoices dated before a cutoff into per-year archive databases",
+    )
+    archive.add_argument(
+        "--before",
+        type=date.fromisoformat,
+        required=True,
+        help="Archive invoices dated before this day (YYYY-MM-DD)",
+    )
+    archive.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    show_raw = subparsers.add_parser(
+        "show-raw",
+        help="Print the raw OCR text stored for an invoice",
+    )
+    show_raw.add_argument("invoice_id", type=int)
+    prune = subparsers.add_parser(
+        "prune-invoices",
+        help="Delete invoices older than the retention period, their files, and vacuum",
+    )
+    prune.add_argument("--days", type=int, default=RETENTION_DAYS)
+    prune.add_argument("--batch-size", type=int, default=RETENTION_BATCH_SIZE)
+    prune.add_argument("--pause-ms", type=float, default=RETENTION_BATCH_PAUSE_MS)
+    prune.add_argument("--artifacts-dir", default=ARTIFACTS_DIR)
+    prune.add_argument(
+        "--enable-incremental-vacuum",
+        action="store_true",
+        help="First switch the database to auto_vacuum=INCREMENTAL with a full VACUUM; "
+        "stop the bot first",
+    )
+    backup = subparsers.add_parser(
+        "backup",
+        help="Write a compressed online snapshot of the database and drop old ones",
+    )
+    backup.add_argument("--backup-dir", default=BACKUP_DIR)
+    backup.add_argument("--keep", type=int, default=BACKUP_KEEP)
+    backup.add_argument("--pages-per-step", type=int, default=BACKUP_PAGES_PER_STEP)
+    backup.add_argument("--step-sleep-ms", type=float, default=BACKUP_STEP_SLEEP_MS)
+    restore = subparsers.add_parser(
+        "restore-backup",
+        help="Replace the database with a snapshot (the newest one by default); stop the bot first",
+    )
+    restore.add_argument("snapshot", nargs="?", help="Path to a .sqlite.gz snapshot")
+    restore.add_argument("--backup-dir", default=BACKUP_DIR)
+    changes = subparsers.add_parser(
+        "changes",
+        help="Print invoice changes after a sequence number as JSON lines, oldest first",
+    )
+    changes.add_argument("--after", type=int, default=0, help="Last sequence number processed")
+    changes.add_argument("--batch-size", type=int, default=DEFAULT_CHANGES_BATCH_SIZE)
+    purge_changes = subparsers.add_parser(
+        "purge-changes",
+        help="Delete change log entries every consumer has processed",
+    )
+    purge_changes.add_argument(
+        "--through", type=int, required=True, help="Delete entries up to this sequence number"
+    )
+    dump = subparsers.add_parser(
+        "dump",
+        help="Write all invoices with their items and comments to a gzip-compressed NDJSON file",
+    )
+    dump.add_argument("output", help="Path of the .ndjson.gz file to write")
+    restore_dump = subparsers.add_parser(
+        "restore-dump",
+        help="Load an NDJSON dump into an empty database; stop the bot first",
+    )
+    restore_dump.add_argument("dump", help="Path to a .ndjson.gz dump")
+    restore_dump.add_argument("--batch-size", type=int, default=DUMP_BATCH_SIZE)
+    import_csv = subparsers.add_parser(
+        "import-csv",
+        help="Import invoices from CSV files laid out like the /export file",
+    )
+    import_csv.add_argument("files", nargs="+", help="CSV files (UTF-8, ';' or ',' separated)")
+    import_csv.add_argument(
+        "--user-id", type=int, required=True, help="Telegram user the invoices belong to"
+    )
+    import_csv.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    import_csv.add_argument(
+        "--dry-run", action="store_true", help="Validate the files without saving anything"
+    )
+    import_csv.add_argument(
+        "--map",
+        type=_column_mapping,
+        action="append",
+        default=[],
+        metavar="HEADER=COLUMN",
+        help="Read the CSV column HEADER as COLUMN (repeatable), e.g. --map Дата=date",
+    )
+    backfill_dates = subparsers.add_parser(
+        "backfill-dates",
+        help="Parse legacy free-text invoice dates into date_iso and report the unparseable ones",
+    )
+    backfill_dates.add_argument("--batch-size", type=int, default=DATE_BACKFILL_BATCH_SIZE)
+    backfill_dates.add_argument(
+        "--pause-ms", type=float, default=DATE_BACKFILL_PAUSE_SECONDS * 1000
+    )
+
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return _COMMANDS[args.command](args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -21,6 +21,7 @@ class Settings(BaseSettings):
 
     UPLOAD_FOLDER: str = "data/uploads"
     ARTIFACTS_DIR: str = "data/artifacts"
+    ARCHIVE_DIR: str = "data/archive"
 
     LOG_LEVEL: str = "INFO"
     LOG_ROTATE_MB: int = 10
@@ -28,6 +29,31 @@ class Settings(BaseSettings):
     LOG_CONSOLE: str = "0"
     LOG_DIR: Optional[str] = None
 
+    DRAFT_CACHE_SIZE: int = 256
+    DRAFT_CACHE_TTL_SECONDS: float = 900.0
+    DRAFT_WRITE_BEHIND_SECONDS: float = 0.0
+    DRAFT_TTL_SECONDS: float = 7 * 24 * 3600.0
+    DRAFT_SWEEP_INTERVAL_SECONDS: float = 3600.0
+    DRAFT_SWEEP_BATCH_SIZE: int = 500
+
+    INVOICE_CACHE_SIZE: int = 128
+    INVOICE_CACHE_TTL_SECONDS: float = 300.0
+    INVOICE_CACHE_MAX_ROWS: int = 1000
+
+    WRITE_BATCH_WINDOW_MS: float = 5.0
+    WRITE_BATCH_MAX_SIZE: int = 64
+
+    BACKUP_DIR: str = "data/backups"
+    BACKUP_INTERVAL_SECONDS: float = 24 * 3600.0
+    BACKUP_KEEP: int = 7
+    BACKUP_PAGES_PER_STEP: int = 128
+    BACKUP_STEP_SLEEP_MS: float = 10.0
+
+    RETENTION_DAYS: int = 0
+    RETENTION_INTERVAL_SECONDS: float = 24 * 3600.0
+    RETENTION_BATCH_SIZE: int = 200
+    RETENTION_BATCH_PAUSE_MS: float = 50.0
+
     DB_FILENAME: str = Field("data.sqlite", alias="INVOICE_DB_PATH")
     DB_DIR: Path = Field(
         default_factory=lambda: Path(__file__).resolve().parent,
@@ -53,6 +79,7 @@ MINDEE_MODEL_ID: str = settings.MINDEE_MODEL_ID
 
 UPLOAD_FOLDER: str = settings.UPLOAD_FOLDER
 ARTIFACTS_DIR: str = settings.ARTIFACTS_DIR
+ARCHIVE_DIR: str = settings.ARCHIVE_DIR
 
 LOG_LEVEL: str = settings.LOG_LEVEL.upper()
 LOG_ROTATE_MB: int = settings.LOG_ROTATE_MB
@@ -60,6 +87,31 @@ LOG_BACKUPS: int = settings.LOG_BACKUPS
 LOG_CONSOLE: bool = settings.LOG_CONSOLE in ("1", "true", "True")
 LOG_DIR: Optional[str] = settings.LOG_DIR
 
+DRAFT_CACHE_SIZE: int = settings.DRAFT_CACHE_SIZE
+DRAFT_CACHE_TTL_SECONDS: float = settings.DRAFT_CACHE_TTL_SECONDS
+DRAFT_WRITE_BEHIND_SECONDS: float = settings.DRAFT_WRITE_BEHIND_SECONDS
+DRAFT_TTL_SECONDS: float = settings.DRAFT_TTL_SECONDS
+DRAFT_SWEEP_INTERVAL_SECONDS: float = settings.DRAFT_SWEEP_INTERVAL_SECONDS
+DRAFT_SWEEP_BATCH_SIZE: int = settings.DRAFT_SWEEP_BATCH_SIZE
+
+INVOICE_CACHE_SIZE: int = settings.INVOICE_CACHE_SIZE
+INVOICE_CACHE_TTL_SECONDS: float = settings.INVOICE_CACHE_TTL_SECONDS
+INVOICE_CACHE_MAX_ROWS: int = settings.INVOICE_CACHE_MAX_ROWS
+
+WRITE_BATCH_WINDOW_MS: float = settings.WRITE_BATCH_WINDOW_MS
+WRITE_BATCH_MAX_SIZE: int = settings.WRITE_BATCH_MAX_SIZE
+
+BACKUP_DIR: str = settings.BACKUP_DIR
+BACKUP_INTERVAL_SECONDS: float = settings.BACKUP_INTERVAL_SECONDS
+BACKUP_KEEP: int = settings.BACKUP_KEEP
+BACKUP_PAGES_PER_STEP: int = settings.BACKUP_PAGES_PER_STEP
+BACKUP_STEP_SLEEP_MS: float = settings.BACKUP_STEP_SLEEP_MS
+
+RETENTION_DAYS: int = settings.RETENTION_DAYS
+RETENTION_INTERVAL_SECONDS: float = settings.RETENTION_INTERVAL_SECONDS
+RETENTION_BATCH_SIZE: int = settings.RETENTION_BATCH_SIZE
+RETENTION_BATCH_PAUSE_MS: float = settings.RETENTION_BATCH_PAUSE_MS
+
 # Database configuration
 BASE_DIR: Path = settings.DB_DIR
 DB_PATH: str = str(BASE_DIR / settings.DB_FILENAME)
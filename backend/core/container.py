@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import logging
 from datetime import date
+from functools import partial
 from typing import Awaitable, Callable, List, Optional
 
 from backend.config import Settings, get_settings
@@ -9,17 +10,59 @@ from backend.domain.drafts import InvoiceDraft
 from backend.domain.invoices import Invoice
 from backend.ocr.async_client import extract_invoice_async
 from backend.ocr.engine.types import ExtractionResult
-from backend.services.draft_service import DraftService
-from backend.services.invoice_service import InvoiceService
+from backend.ocr.engine.util import DOWNLOAD_DIR
+from backend.services.backup_scheduler import BackupScheduler
+from backend.services.draft_service import (
+    ActivateDraftFunc,
+    AddDraftFunc,
+    DiscardDraftFunc,
+    DraftService,
+    ListDraftsFunc,
+    LoadDraftHistoryFunc,
+    PatchDraftFunc,
+    ReplaceDraftFunc,
+)
+from backend.services.draft_sweeper import DraftSweeper
+from backend.services.invoice_service import (
+    FetchInvoicePageFunc,
+    FetchInvoiceSummaryPageFunc,
+    FetchRawTextFunc,
+    FetchSupplierSpendFunc,
+    InvoiceService,
+    IterInvoicesFunc,
+    StoreInvoiceFunc,
+    SummarizeInvoicesFunc,
+)
+from backend.services.retention import RetentionJob
+from backend.storage.backup import create_backup
 from backend.storage.db_async import (
+    fetch_invoice_page_domain_async,
+    fetch_invoice_summary_page_domain_async,
     fetch_invoices_domain_async,
+    fetch_raw_text_domain_async,
+    fetch_supplier_spend_domain_async,
+    iter_invoices_domain_async,
+    rebuild_supplier_spend_domain_async,
     save_invoice_domain_async,
+    store_invoice_domain_async,
+    summarize_invoices_domain_async,
 )
 from backend.storage.drafts_async import (
+    activate_draft_invoice,
+    add_draft_invoice,
+    append_draft_patches,
     delete_draft_invoice,
+    delete_expired_drafts,
+    discard_draft_invoice,
+    fetch_referenced_paths,
+    list_draft_invoices,
+    load_draft_history,
     load_draft_invoice,
+    replace_draft_invoice,
     save_draft_invoice,
 )
+from backend.storage.retention import incremental_vacuum, prune_invoices
+from backend.storage.write_queue import GroupCommitQueue
 
 
 class AppContainer:
@@ -31,31 +74,113 @@ class AppContainer:
         fetch_invoices_func: Optional[
             Callable[[Optional[date], Optional[date], Optional[str]], Awaitable[List[Invoice]]]
         ] = None,
+        fetch_invoice_page_func: Optional[FetchInvoicePageFunc] = None,
+        iter_invoices_func: Optional[IterInvoicesFunc] = None,
+        fetch_invoice_summary_page_func: Optional[FetchInvoiceSummaryPageFunc] = None,
+        summarize_invoices_func: Optional[SummarizeInvoicesFunc] = None,
+        fetch_supplier_spend_func: Optional[FetchSupplierSpendFunc] = None,
+        fetch_raw_text_func: Optional[FetchRawTextFunc] = None,
+        store_invoice_func: Optional[StoreInvoiceFunc] = None,
         load_draft_func: Optional[Callable[[int], Awaitable[Optional[InvoiceDraft]]]] = None,
         save_draft_func: Optional[Callable[[int, InvoiceDraft], Awaitable[None]]] = None,
         delete_draft_func: Optional[Callable[[int], Awaitable[None]]] = None,
+        patch_draft_func: Optional[PatchDraftFunc] = None,
+        load_draft_history_func: Optional[LoadDraftHistoryFunc] = None,
+        add_draft_func: Optional[AddDraftFunc] = None,
+        list_drafts_func: Optional[ListDraftsFunc] = None,
+        activate_draft_func: Optional[ActivateDraftFunc] = None,
+        replace_draft_func: Optional[ReplaceDraftFunc] = None,
+        discard_draft_func: Optional[DiscardDraftFunc] = None,
         invoice_service: Optional[InvoiceService] = None,
         draft_service: Optional[DraftService] = None,
+        draft_sweeper: Optional[DraftSweeper] = None,
+        backup_scheduler: Optional[BackupScheduler] = None,
+        retention_job: Optional[RetentionJob] = None,
+        write_queue: Optional[GroupCommitQueue] = None,
     ) -> None:
         self.config: Settings = config or get_settings()
 
+        # Saves and draft clears from concurrent users share one transaction per
+        # batching window; WRITE_BATCH_WINDOW_MS=0 writes each one on its own.
+        self.write_queue: Optional[GroupCommitQueue] = write_queue
+        if self.write_queue is None and self.config.WRITE_BATCH_WINDOW_MS > 0:
+            self.write_queue = GroupCommitQueue(
+                logger=logging.getLogger("storage.write_queue"),
+                window_seconds=self.config.WRITE_BATCH_WINDOW_MS / 1000,
+                max_batch=self.config.WRITE_BATCH_MAX_SIZE,
+                archive_dir=self.config.ARCHIVE_DIR,
+            )
+        queue = self.write_queue
+
         self._ocr_extractor: Callable[[str, bool, int], Awaitable[ExtractionResult]] = (
             ocr_extractor or extract_invoice_async
         )
-        self._save_invoice_func: Callable[[Invoice, int], Awaitable[int]] = (
-            save_invoice_func or save_invoice_domain_async
+        self._save_invoice_func: Callable[[Invoice, int], Awaitable[int]] = save_invoice_func or (
+            queue.save_invoice if queue is not None else save_invoice_domain_async
+        )
+        # Duplicates are reported by the default save path; a custom save function
+        # without a matching store function reports every save as new.
+        self._store_invoice_func: Optional[StoreInvoiceFunc] = store_invoice_func or (
+            (queue.store_invoice if queue is not None else store_invoice_domain_async)
+            if save_invoice_func is None
+            else None
         )
         self._fetch_invoices_func: Callable[
             [Optional[date], Optional[date], Optional[str]], Awaitable[List[Invoice]]
         ] = fetch_invoices_func or fetch_invoices_domain_async
+        self._fetch_invoice_page_func: FetchInvoicePageFunc = (
+            fetch_invoice_page_func or fetch_invoice_page_domain_async
+        )
+        self._iter_invoices_func: IterInvoicesFunc = (
+            iter_invoices_func or iter_invoices_domain_async
+        )
+        self._fetch_invoice_summary_page_func: FetchInvoiceSummaryPageFunc = (
+            fetch_invoice_summary_page_func or fetch_invoice_summary_page_domain_async
+        )
+        self._summarize_invoices_func: SummarizeInvoicesFunc = (
+            summarize_invoices_func or summarize_invoices_domain_async
+        )
+        self._fetch_supplier_spend_func: FetchSupplierSpendFunc = (
+            fetch_supplier_spend_func or fetch_supplier_spend_domain_async
+        )
+        self._fetch_raw_text_func: FetchRawTextFunc = (
+            fetch_raw_text_func or fetch_raw_text_domain_async
+        )
         self._load_draft_func: Callable[[int], Awaitable[Optional[InvoiceDraft]]] = (
             load_draft_func or load_draft_invoice
         )
         self._save_draft_func: Callable[[int, InvoiceDraft], Awaitable[None]] = (
             save_draft_func or save_draft_invoice
         )
-        self._delete_draft_func: Callable[[int], Awaitable[None]] = (
-            delete_draft_func or delete_draft_invoice
+        self._delete_draft_func: Callable[[int], Awaitable[None]] = delete_draft_func or (
+            queue.delete_draft if queue is not None else delete_draft_invoice
+        )
+        # The delta log and the draft queue live next to the default draft table; a
+        # custom save function without matching functions falls back to a single
+        # current draft written in full.
+        uses_default_drafts = save_draft_func is None
+        self._patch_draft_func: Optional[PatchDraftFunc] = patch_draft_func or (
+            append_draft_patches if uses_default_drafts else None
+        )
+        self._load_draft_history_func: Optional[LoadDraftHistoryFunc] = load_draft_history_func or (
+            load_draft_history if uses_default_drafts else None
+        )
+        self._add_draft_func: Optional[AddDraftFunc] = add_draft_func or (
+            add_draft_invoice if uses_default_drafts else None
+        )
+        self._list_drafts_func: Optional[ListDraftsFunc] = list_drafts_func or (
+            list_draft_invoices if uses_default_drafts else None
+        )
+        self._activate_draft_func: Optional[ActivateDraftFunc] = activate_draft_func or (
+            activate_draft_invoice if uses_default_drafts else None
+        )
+        self._replace_draft_func: Optional[ReplaceDraftFunc] = replace_draft_func or (
+            replace_draft_invoice if uses_default_drafts else None
+        )
+        self._discard_draft_func: Optional[DiscardDraftFunc] = discard_draft_func or (
+            (queue.discard_draft if queue is not None else discard_draft_invoice)
+            if uses_default_drafts
+            else None
         )
 
         self.invoice_service: InvoiceService = invoice_service or InvoiceService(
@@ -63,6 +188,16 @@ class AppContainer:
             save_invoice_func=self._save_invoice_func,
             fetch_invoices_func=self._fetch_invoices_func,
             logger=logging.getLogger("services.invoice"),
+            fetch_invoice_page_func=self._fetch_invoice_page_func,
+            iter_invoices_func=self._iter_invoices_func,
+            fetch_invoice_summary_page_func=self._fetch_invoice_summary_page_func,
+            summarize_invoices_func=self._summarize_invoices_func,
+            fetch_supplier_spend_func=self._fetch_supplier_spend_func,
+            fetch_raw_text_func=self._fetch_raw_text_func,
+            store_invoice_func=self._store_invoice_func,
+            listing_cache_size=self.config.INVOICE_CACHE_SIZE,
+            listing_cache_ttl_seconds=self.config.INVOICE_CACHE_TTL_SECONDS,
+            listing_cache_max_rows=self.config.INVOICE_CACHE_MAX_ROWS,
         )
 
         self.draft_service: DraftService = draft_service or DraftService(
@@ -70,6 +205,62 @@ class AppContainer:
             save_draft_func=self._save_draft_func,
             delete_draft_func=self._delete_draft_func,
             logger=logging.getLogger("services.draft"),
+            cache_size=self.config.DRAFT_CACHE_SIZE,
+            cache_ttl_seconds=self.config.DRAFT_CACHE_TTL_SECONDS,
+            write_behind_seconds=self.config.DRAFT_WRITE_BEHIND_SECONDS,
+            add_draft_func=self._add_draft_func,
+            list_drafts_func=self._list_drafts_func,
+            activate_draft_func=self._activate_draft_func,
+            replace_draft_func=self._replace_draft_func,
+            discard_draft_func=self._discard_draft_func,
+            patch_draft_func=self._patch_draft_func,
+            load_draft_history_func=self._load_draft_history_func,
+        )
+
+        self.draft_sweeper: DraftSweeper = draft_sweeper or DraftSweeper(
+            delete_expired_func=partial(
+                delete_expired_drafts, batch_size=self.config.DRAFT_SWEEP_BATCH_SIZE
+            ),
+            fetch_referenced_paths_func=partial(
+                fetch_referenced_paths, archive_dir=self.config.ARCHIVE_DIR
+            ),
+            upload_dirs=[self.config.UPLOAD_FOLDER, DOWNLOAD_DIR],
+            logger=logging.getLogger("services.draft_sweeper"),
+            ttl_seconds=self.config.DRAFT_TTL_SECONDS,
+            interval_seconds=self.config.DRAFT_SWEEP_INTERVAL_SECONDS,
+        )
+
+        self.backup_scheduler: BackupScheduler = backup_scheduler or BackupScheduler(
+            create_backup_func=partial(
+                create_backup,
+                self.config.BACKUP_DIR,
+                keep=self.config.BACKUP_KEEP,
+                pages_per_step=self.config.BACKUP_PAGES_PER_STEP,
+                step_sleep=self.config.BACKUP_STEP_SLEEP_MS / 1000,
+                archive_dir=self.config.ARCHIVE_DIR,
+            ),
+            logger=logging.getLogger("services.backup"),
+            interval_seconds=self.config.BACKUP_INTERVAL_SECONDS,
+        )
+
+        pause_seconds = self.config.RETENTION_BATCH_PAUSE_MS / 1000
+        self.retention_job: RetentionJob = retention_job or RetentionJob(
+            prune_invoices_func=partial(
+                prune_invoices,
+                batch_size=self.config.RETENTION_BATCH_SIZE,
+                pause_seconds=pause_seconds,
+                archive_dir=self.config.ARCHIVE_DIR,
+            ),
+            vacuum_func=partial(incremental_vacuum, pause_seconds=pause_seconds),
+            fetch_referenced_paths_func=partial(
+                fetch_referenced_paths, archive_dir=self.config.ARCHIVE_DIR
+            ),
+            upload_dirs=[self.config.UPLOAD_FOLDER, DOWNLOAD_DIR],
+            artifacts_dir=self.config.ARTIFACTS_DIR,
+            logger=logging.getLogger("services.retention"),
+            retention_days=self.config.RETENTION_DAYS,
+            interval_seconds=self.config.RETENTION_INTERVAL_SECONDS,
+            rebuild_rollup_func=rebuild_supplier_spend_domain_async,
         )
 
         self.invoice_service_module: InvoiceService = self.invoice_service
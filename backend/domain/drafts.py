@@ -1,9 +1,24 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, field
-from typing import List
+from dataclasses import dataclass, field, fields
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, List, Optional
 
-from backend.domain.invoices import Invoice
+from backend.domain.invoices import Invoice, InvoiceHeader, InvoiceItem
+
+PATCH_SET_HEADER = "set_header"
+PATCH_SET_ITEM = "set_item"
+PATCH_ADD_COMMENT = "add_comment"
+
+_HEADER_FIELDS = frozenset(f.name for f in fields(InvoiceHeader))
+_ITEM_FIELDS = frozenset(f.name for f in fields(InvoiceItem))
+
+
+class DraftVersionConflict(Exception):
+    """
+    The stored draft changed after it was read, so a conditional write was refused.
+    """
 
 
 @dataclass
@@ -12,6 +27,129 @@ class InvoiceDraft:
     path: str
     raw_text: str = ""
     comments: List[str] = field(default_factory=list)
+    # Filled in by storage: which stored draft this is and the version it was read at.
+    draft_id: Optional[int] = field(default=None, compare=False)
+    version: int = field(default=0, compare=False)
+
+
+@dataclass(frozen=True)
+class DraftPatch:
+    """
+    Single field-level change of a draft.
+
+    item_index is 1-based, matching the numbering shown to users.
+    """
+
+    op: str
+    field: str = ""
+    value: Any = None
+    item_index: Optional[int] = None
+
+    @classmethod
+    def set_header(cls, field_name: str, value: Any) -> DraftPatch:
+        return cls(op=PATCH_SET_HEADER, field=field_name, value=value)
+
+    @classmethod
+    def set_item(cls, item_index: int, field_name: str, value: Any) -> DraftPatch:
+        return cls(op=PATCH_SET_ITEM, field=field_name, value=value, item_index=item_index)
+
+    @classmethod
+    def add_comment(cls, text: str) -> DraftPatch:
+        return cls(op=PATCH_ADD_COMMENT, value=text)
+
+
+@dataclass
+class DraftHistoryEntry:
+    """
+    Recorded draft change with the time it was stored.
+    """
+
+    patch: DraftPatch
+    created_at: Optional[datetime] = None
+
+
+@dataclass
+class DraftSummary:
+    """
+    One line of a user's draft list.
+    """
+
+    draft_id: int
+    active: bool = False
+    supplier_name: Optional[str] = None
+    invoice_number: Optional[str] = None
+    total_amount: Optional[Decimal] = None
+    item_count: int = 0
+    created_at: Optional[datetime] = None
+
+    @classmethod
+    def from_draft(
+        cls,
+        draft_id: int,
+        draft: InvoiceDraft,
+        active: bool = False,
+        created_at: Optional[datetime] = None,
+    ) -> DraftSummary:
+        header = draft.invoice.header
+        return cls(
+            draft_id=draft_id,
+            active=active,
+            supplier_name=header.supplier_name,
+            invoice_number=header.invoice_number,
+            total_amount=header.total_amount,
+            item_count=len(draft.invoice.items),
+            created_at=created_at,
+        )
+
+
+@dataclass
+class ExpiredDrafts:
+    """
+    Drafts removed for inactivity and the upload paths they pointed to.
+    """
+
+    drafts: int = 0
+    deltas: int = 0
+    payload_bytes: int = 0
+    paths: List[str] = field(default_factory=list)
+
+
+def validate_draft_patch(draft: InvoiceDraft, patch: DraftPatch) -> None:
+    """Raise ValueError if the patch does not fit the draft."""
+    if patch.op == PATCH_SET_HEADER:
+        if patch.field not in _HEADER_FIELDS:
+            raise ValueError(f"Unknown header field: {patch.field}")
+    elif patch.op == PATCH_SET_ITEM:
+        if patch.field not in _ITEM_FIELDS:
+            raise ValueError(f"Unknown item field: {patch.field}")
+        if patch.item_index is None or not 1 <= patch.item_index <= len(draft.invoice.items):
+            raise ValueError(f"Item index out of range: {patch.item_index}")
+    elif patch.op != PATCH_ADD_COMMENT:
+        raise ValueError(f"Unknown draft patch: {patch.op}")
+
+
+def apply_draft_patch(draft: InvoiceDraft, patch: DraftPatch) -> None:
+    """Apply a patch to a draft in place; raises ValueError for patches that do not fit it."""
+    validate_draft_patch(draft, patch)
+    if patch.op == PATCH_SET_HEADER:
+        setattr(draft.invoice.header, patch.field, patch.value)
+    elif patch.op == PATCH_SET_ITEM:
+        assert patch.item_index is not None
+        setattr(draft.invoice.items[patch.item_index - 1], patch.field, patch.value)
+    else:
+        draft.comments.append(str(patch.value))
 
 
-__all__ = ["InvoiceDraft"]
+__all__ = [
+    "PATCH_ADD_COMMENT",
+    "PATCH_SET_HEADER",
+    "PATCH_SET_ITEM",
+    "DraftHistoryEntry",
+    "DraftPatch",
+    "DraftSummary",
+    "DraftVersionConflict",
+    "ExpiredDrafts",
+    "InvoiceDraft",
+    "apply_draft_patch",
+    "validate_draft_patch",
+]
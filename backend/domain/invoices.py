@@ -5,7 +5,7 @@ Domain models and value objects describing invoices and their items.
 from dataclasses import dataclass, field
 from datetime import date, datetime
 from decimal import Decimal
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 
 @dataclass
@@ -74,6 +74,8 @@ class Invoice:
     items: List[InvoiceItem] = field(default_factory=list)
     comments: List[InvoiceComment] = field(default_factory=list)
     source: Optional[InvoiceSourceInfo] = None
+    # Raw OCR output; stored compressed in invoice_raw and only loaded on request.
+    raw_text: Optional[str] = field(default=None, repr=False, compare=False)
 
     def total_items(self) -> int:
         return len(self.items)
@@ -82,10 +84,112 @@ class Invoice:
         return len(self.items) > 0
 
 
+@dataclass(frozen=True)
+class InvoiceCursor:
+    """
+    Keyset position of a stored invoice in listings ordered by (date_iso, id).
+    """
+
+    date_iso: str
+    invoice_id: int
+
+
+@dataclass
+class InvoicePage:
+    """
+    One keyset-paginated slice of an invoice listing.
+    """
+
+    invoices: List[Invoice] = field(default_factory=list)
+    first_cursor: Optional[InvoiceCursor] = None
+    last_cursor: Optional[InvoiceCursor] = None
+    has_prev: bool = False
+    has_next: bool = False
+
+
+@dataclass
+class InvoiceSummary:
+    """
+    Lightweight header projection of a stored invoice, without its line items.
+    """
+
+    invoice_id: int
+    supplier_name: Optional[str] = None
+    invoice_number: Optional[str] = None
+    invoice_date: Optional[date] = None
+    total_amount: Optional[Decimal] = None
+    item_count: int = 0
+
+
+@dataclass
+class InvoiceSummaryPage:
+    """
+    One keyset-paginated slice of an invoice summary listing.
+    """
+
+    summaries: List[InvoiceSummary] = field(default_factory=list)
+    first_cursor: Optional[InvoiceCursor] = None
+    last_cursor: Optional[InvoiceCursor] = None
+    has_prev: bool = False
+    has_next: bool = False
+
+
+@dataclass
+class InvoiceTotals:
+    """
+    Aggregates over a set of stored invoices.
+    """
+
+    invoice_count: int = 0
+    item_count: int = 0
+    total_amount: Decimal = Decimal("0")
+
+
+@dataclass
+class SupplierMonthlySpend:
+    """
+    Spend of one user with one supplier in one calendar month (YYYY-MM).
+
+    Empty supplier or month means the stored invoices did not have one.
+    """
+
+    supplier: str
+    month: str
+    invoice_count: int = 0
+    item_count: int = 0
+    total_amount: Decimal = Decimal("0")
+
+
+@dataclass
+class InvoiceChange:
+    """
+    One entry of the invoice change log, in commit order.
+
+    table is "invoices", "invoice_items" or "comments" and row_id the changed
+    row. op is "insert", "update", "delete", or "archive" for invoices moved to
+    the archive; data holds the row after the change and is None for removals.
+    """
+
+    seq: int
+    table: str
+    op: str
+    row_id: int
+    invoice_id: int
+    changed_at: str
+    data: Optional[Dict[str, Any]] = None
+
+
 __all__ = [
     "InvoiceHeader",
     "InvoiceItem",
     "InvoiceComment",
     "InvoiceSourceInfo",
     "Invoice",
+    "InvoiceCursor",
+    "InvoicePage",
+    "InvoiceSummary",
+    "InvoiceSummaryPage",
+    "InvoiceTotals",
+    "InvoiceChange",
+    "SupplierMonthlySpend",
 ]
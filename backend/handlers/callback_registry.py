@@ -24,6 +24,7 @@ HEADER_PREFIX = "hed:"
 ITEMS_PAGE_PREFIX = "items_page"
 ITEM_PICK_PREFIX = "item_pick"
 ITEM_FIELD_PREFIX = "itm_field"
+INVOICES_PAGE_PREFIX = "inv_page"
 
 
 def make_items_page_callback(page: int) -> str:
@@ -36,3 +37,9 @@ def make_item_pick_callback(index: int) -> str:
 
 def make_item_field_callback(index: int, key: str) -> str:
     return f"{ITEM_FIELD_PREFIX}:{index}:{key}"
+
+
+def make_invoices_page_callback(
+    query_id: str, direction: str, date_iso: str, invoice_id: int
+) -> str:
+    return f"{INVOICES_PAGE_PREFIX}:{query_id}:{direction}:{date_iso}:{invoice_id}"
@@ -2,6 +2,7 @@
 Callback handlers for invoice editing.
 """
 
+import copy
 import time
 import uuid
 
@@ -10,6 +11,7 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, ForceReply
 
 from backend.core.container import AppContainer
+from backend.domain.drafts import DraftVersionConflict
 from backend.domain.invoices import InvoiceComment
 from backend.handlers.callback_registry import (
     HEADER_PREFIX,
@@ -21,8 +23,11 @@ from backend.handlers.callback_registry import (
 from backend.handlers.deps import get_draft_service, get_invoice_service
 from backend.handlers.fsm import EditInvoiceState
 from backend.handlers.utils import (
+    DRAFT_KEPT_TEXT,
+    actions_kb,
     format_invoice_header,
     format_money,
+    format_saved_invoice,
     header_kb,
     item_fields_kb,
     items_index_kb,
@@ -276,7 +281,8 @@ def setup(router: Router) -> None:
             await call.answer()
             return
 
-        invoice = draft.invoice
+        # A copy, so the comments added below never leak into the cached draft.
+        invoice = copy.deepcopy(draft.invoice)
         comments = list(draft.comments)
 
         # Auto-comment for sum mismatch
@@ -297,9 +303,25 @@ def setup(router: Router) -> None:
             if auto_text not in comments:
                 invoice.comments.append(InvoiceComment(message=auto_text))
 
-        inv_id = await invoice_service.save_invoice(invoice, user_id=uid)
-        await draft_service.clear_current_draft(uid)
+        await draft_service.flush_draft(uid)
+        inv_id, inserted = await invoice_service.store_invoice(invoice, user_id=uid)
+        saved_text = format_saved_invoice(inv_id, inserted)
+        try:
+            await draft_service.clear_current_draft(uid, expected=draft)
+        except DraftVersionConflict:
+            logger.warning(f"[TG] draft changed during save req={req} uid={uid}")
+            if call.message is not None:
+                await call.message.answer(f"{saved_text}\n{DRAFT_KEPT_TEXT}")
+            await call.answer()
+            return
         if call.message is not None:
-            await call.message.answer(f"Сохранено в БД. ID счета: {inv_id}")
+            await call.message.answer(saved_text)
+            next_draft = await draft_service.get_current_draft(uid)
+            if next_draft is not None:
+                await call.message.answer(
+                    "Следующий черновик из очереди:\n\n"
+                    + format_invoice_header(next_draft.invoice),
+                    reply_markup=actions_kb(),
+                )
         await call.answer()
         logger.info(f"[TG] update done req={req} h=cb_act_save")
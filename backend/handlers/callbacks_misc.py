@@ -56,7 +56,7 @@ def setup(router: Router) -> None:
         if call.message is not None:
             await call.message.answer(
                 "Быстрые действия кнопками ниже.\n"
-                "Команды для продвинутых: /show, /edit, /edititem, /comment, /save, /invoices.",
+                "Команды для продвинутых: /show, /edit, /edititem, /comment, /save, /drafts, /invoices, /stats, /export.",
                 reply_markup=main_kb(),
             )
         await call.answer()
@@ -30,7 +30,7 @@ async def cmd_help(message: Message) -> None:
     logger.info(f"[TG] update start req={req} h=cmd_help")
     await message.answer(
         "Быстрые действия кнопками ниже.\n"
-        "Команды для продвинутых: /show, /edit, /edititem, /comment, /save, /invoices.",
+        "Команды для продвинутых: /show, /edit, /edititem, /comment, /save, /drafts, /invoices, /stats, /export.",
         reply_markup=main_kb(),
     )
     logger.info(f"[TG] update done req={req} h=cmd_help")
@@ -2,26 +2,45 @@
 Command handlers for working with invoice drafts.
 """
 
+import copy
 import re
 import time
 import uuid
 from datetime import date
 from decimal import Decimal
+from typing import List
 
 from aiogram import F, Router
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message
 
 from backend.core.container import AppContainer
+from backend.domain.drafts import DraftPatch, DraftVersionConflict
 from backend.domain.invoices import InvoiceComment
 from backend.handlers.deps import get_draft_service, get_invoice_service
 from backend.handlers.fsm import EditInvoiceState
-from backend.handlers.utils import format_invoice_full, format_invoice_header
+from backend.handlers.utils import (
+    DRAFT_KEPT_TEXT,
+    actions_kb,
+    format_draft_list,
+    format_invoice_full,
+    format_invoice_header,
+    format_saved_invoice,
+)
 from backend.ocr.engine.util import get_logger, set_request_id
 from backend.storage.db import to_iso
 
 logger = get_logger("ocr.engine")
 
+# Draft item fields addressed by the short keys used in commands and callbacks.
+ITEM_FIELD_KEYS = {
+    "name": "description",
+    "code": "sku",
+    "qty": "quantity",
+    "price": "unit_price",
+    "total": "line_total",
+}
+
 
 def _parse_date_str(date_str: str) -> date | None:
     """Parse date string to date object."""
@@ -59,6 +78,41 @@ def setup(router: Router) -> None:
         await message.answer(full_text if len(full_text) < 3900 else format_invoice_header(invoice))
         logger.info(f"[TG] update done req={req} h=cmd_show")
 
+    @router.message(F.text == "/drafts")
+    async def cmd_drafts(message: Message, container: AppContainer) -> None:
+        req = f"tg-{int(time.time())}-{uuid.uuid4().hex[:8]}"
+        set_request_id(req)
+        logger.info(f"[TG] update start req={req} h=cmd_drafts")
+        draft_service = get_draft_service(container)
+        uid = message.from_user.id if message.from_user else 0
+        drafts = await draft_service.list_drafts(uid)
+        await message.answer(format_draft_list(drafts))
+        logger.info(f"[TG] update done req={req} h=cmd_drafts count={len(drafts)}")
+
+    @router.message(F.text.regexp(r"^/draft(\s|$)"))
+    async def cmd_draft(message: Message, container: AppContainer) -> None:
+        req = f"tg-{int(time.time())}-{uuid.uuid4().hex[:8]}"
+        set_request_id(req)
+        logger.info(f"[TG] update start req={req} h=cmd_draft")
+        draft_service = get_draft_service(container)
+        uid = message.from_user.id if message.from_user else 0
+        match = re.match(r"^/draft\s+#?(\d+)\s*$", message.text or "")
+        if match is None:
+            await message.answer("Формат: /draft N (номер из /drafts)")
+            return
+
+        draft = await draft_service.switch_draft(uid, int(match.group(1)))
+        if draft is None:
+            await message.answer("Черновик не найден. Список: /drafts")
+            return
+
+        full_text = format_invoice_full(draft.invoice)
+        await message.answer(
+            full_text if len(full_text) < 3900 else format_invoice_header(draft.invoice),
+            reply_markup=actions_kb(),
+        )
+        logger.info(f"[TG] update done req={req} h=cmd_draft")
+
     @router.message(F.reply_to_message)
     async def on_force_reply(
         message: Message,
@@ -83,8 +137,7 @@ def setup(router: Router) -> None:
             if not text:
                 await message.answer("Пустой комментарий игнорирован.")
             else:
-                draft.comments.append(text)
-                await draft_service.set_current_draft(uid, draft)
+                await draft_service.patch_current_draft(uid, [DraftPatch.add_comment(text)])
                 await message.answer("Комментарий добавлен.")
             await state.clear()
             logger.info(f"[TG] update done req={req} h=on_force_reply_comment")
@@ -105,21 +158,21 @@ def setup(router: Router) -> None:
             if message.text is not None:
                 val = message.text.strip()
 
+            patches: List[DraftPatch] = []
             if kind == "header":
                 k = edit_config.get("key")
-                header = invoice.header
                 if k == "supplier":
-                    header.supplier_name = val
+                    patches.append(DraftPatch.set_header("supplier_name", val))
                 elif k == "client":
-                    header.customer_name = val
+                    patches.append(DraftPatch.set_header("customer_name", val))
                 elif k == "date":
                     parsed_date = _parse_date_str(val)
-                    header.invoice_date = parsed_date
+                    patches.append(DraftPatch.set_header("invoice_date", parsed_date))
                 elif k == "doc_number":
-                    header.invoice_number = val
+                    patches.append(DraftPatch.set_header("invoice_number", val))
                 elif k == "total_sum":
                     try:
-                        header.total_amount = Decimal(str(val.replace(",", ".")))
+                        total_amount = Decimal(str(val.replace(",", ".")))
                         ok = True
                     except (ValueError, TypeError, Exception):
                         ok = False
@@ -128,7 +181,10 @@ def setup(router: Router) -> None:
                         if ok
                         else "Итого обновлено как текст (не число)."
                     )
-                    await draft_service.set_current_draft(uid, draft)
+                    if ok:
+                        await draft_service.patch_current_draft(
+                            uid, [DraftPatch.set_header("total_amount", total_amount)]
+                        )
                     await state.clear()
                     return
                 await message.answer(
@@ -147,34 +203,21 @@ def setup(router: Router) -> None:
                     await state.clear()
                     return
                 key = edit_config.get("key")
-                item = items[idx - 1]
-                if key == "name":
-                    item.description = val
-                elif key == "code":
-                    item.sku = val
-                elif key == "qty":
+                if key in ("name", "code"):
+                    patches.append(DraftPatch.set_item(idx, ITEM_FIELD_KEYS[key], val))
+                elif key in ("qty", "price", "total"):
                     try:
-                        item.quantity = Decimal(str(val.replace(",", ".")))
-                    except (ValueError, TypeError, Exception):
-                        await message.answer("Не число. Повторите.")
-                        return
-                elif key == "price":
-                    try:
-                        item.unit_price = Decimal(str(val.replace(",", ".")))
-                    except (ValueError, TypeError, Exception):
-                        await message.answer("Не число. Повторите.")
-                        return
-                elif key == "total":
-                    try:
-                        item.line_total = Decimal(str(val.replace(",", ".")))
+                        number = Decimal(str(val.replace(",", ".")))
                     except (ValueError, TypeError, Exception):
                         await message.answer("Не число. Повторите.")
                         return
+                    patches.append(DraftPatch.set_item(idx, ITEM_FIELD_KEYS[key], number))
                 await message.answer(
                     'Обновлено. Нажмите кнопку "Сохранить" или введите команду /save чтобы сохранить в БД.'
                 )
 
-            await draft_service.set_current_draft(uid, draft)
+            if patches:
+                await draft_service.patch_current_draft(uid, patches)
             await state.clear()
             logger.info(f"[TG] update done req={req} h=on_force_reply")
             return
@@ -197,8 +240,7 @@ def setup(router: Router) -> None:
             if not text:
                 await message.answer("Формат: /comment ваш текст")
                 return
-        draft.comments.append(text)
-        await draft_service.set_current_draft(uid, draft)
+        await draft_service.patch_current_draft(uid, [DraftPatch.add_comment(text)])
         await message.answer("Комментарий добавлен. /save чтобы сохранить в БД.")
         logger.info(f"[TG] update done req={req} h=cmd_comment")
 
@@ -215,7 +257,8 @@ def setup(router: Router) -> None:
             await message.answer("Нет черновика.")
             return
 
-        invoice = draft.invoice
+        # A copy, so the comments added below never leak into the cached draft.
+        invoice = copy.deepcopy(draft.invoice)
         comments = draft.comments
 
         # Auto-comment for sum mismatch
@@ -242,9 +285,22 @@ def setup(router: Router) -> None:
             if isinstance(comment_text, str):
                 invoice.comments.append(InvoiceComment(message=comment_text))
 
-        inv_id = await invoice_service.save_invoice(invoice, user_id=uid)
-        await draft_service.clear_current_draft(uid)
-        await message.answer(f"Сохранено в БД. ID счета: {inv_id}")
+        await draft_service.flush_draft(uid)
+        inv_id, inserted = await invoice_service.store_invoice(invoice, user_id=uid)
+        saved_text = format_saved_invoice(inv_id, inserted)
+        try:
+            await draft_service.clear_current_draft(uid, expected=draft)
+        except DraftVersionConflict:
+            logger.warning(f"[TG] draft changed during save req={req} uid={uid}")
+            await message.answer(f"{saved_text}\n{DRAFT_KEPT_TEXT}")
+            return
+        await message.answer(saved_text)
+        next_draft = await draft_service.get_current_draft(uid)
+        if next_draft is not None:
+            await message.answer(
+                "Следующий черновик из очереди:\n\n" + format_invoice_header(next_draft.invoice),
+                reply_markup=actions_kb(),
+            )
         logger.info(f"[TG] update done req={req} h=cmd_save")
 
     @router.message(F.text.regexp(r"^/edit(\s|$)"))
@@ -270,27 +326,31 @@ def setup(router: Router) -> None:
             )
             return
 
-        invoice = draft.invoice
+        patches: List[DraftPatch] = []
         for part in re.split(r"[;,]\s*|\s{2,}", args[1].strip()):
             if "=" in part:
                 k, v = part.split("=", 1)
                 k = k.strip().lower()
-                header = invoice.header
                 if k in ("supplier", "поставщик"):
-                    header.supplier_name = v.strip()
+                    patches.append(DraftPatch.set_header("supplier_name", v.strip()))
                 elif k in ("client", "клиент"):
-                    header.customer_name = v.strip()
+                    patches.append(DraftPatch.set_header("customer_name", v.strip()))
                 elif k in ("date", "дата"):
-                    header.invoice_date = _parse_date_str(v.strip())
+                    patches.append(
+                        DraftPatch.set_header("invoice_date", _parse_date_str(v.strip()))
+                    )
                 elif k in ("doc", "number", "номер", "doc_number"):
-                    header.invoice_number = v.strip()
+                    patches.append(DraftPatch.set_header("invoice_number", v.strip()))
                 elif k in ("total", "итого", "sum", "total_sum"):
                     try:
-                        header.total_amount = Decimal(str(v.replace(",", ".")))
-                    except (ValueError, TypeError):
+                        patches.append(
+                            DraftPatch.set_header("total_amount", Decimal(str(v.replace(",", "."))))
+                        )
+                    except (ValueError, TypeError, ArithmeticError):
                         pass
 
-        await draft_service.set_current_draft(uid, draft)
+        if patches:
+            await draft_service.patch_current_draft(uid, patches)
         await message.answer("Ок. Поля обновлены. /show для проверки или /save для сохранения.")
         logger.info(f"[TG] update done req={req} h=cmd_edit_legacy")
 
@@ -328,31 +388,21 @@ def setup(router: Router) -> None:
             await message.answer("Индекс вне диапазона.")
             return
 
-        item = items[idx - 1]
         updates = args[2]
+        patches: List[DraftPatch] = []
         for part in re.split(r"[;,]\s*|\s{2,}", updates.strip()):
             if "=" in part:
                 k, v = part.split("=", 1)
                 k = k.strip().lower()
-                if k == "name":
-                    item.description = v.strip()
-                elif k == "code":
-                    item.sku = v.strip()
-                elif k == "qty":
+                if k in ("name", "code"):
+                    patches.append(DraftPatch.set_item(idx, ITEM_FIELD_KEYS[k], v.strip()))
+                elif k in ("qty", "price", "total"):
                     try:
-                        item.quantity = Decimal(str(v.replace(",", ".")))
-                    except (ValueError, TypeError):
-                        pass
-                elif k == "price":
-                    try:
-                        item.unit_price = Decimal(str(v.replace(",", ".")))
-                    except (ValueError, TypeError):
-                        pass
-                elif k == "total":
-                    try:
-                        item.line_total = Decimal(str(v.replace(",", ".")))
-                    except (ValueError, TypeError):
-                        pass
-        await draft_service.set_current_draft(uid, draft)
+                        number = Decimal(str(v.replace(",", ".")))
+                    except (ValueError, TypeError, ArithmeticError):
+                        continue
+                    patches.append(DraftPatch.set_item(idx, ITEM_FIELD_KEYS[k], number))
+        if patches:
+            await draft_service.patch_current_draft(uid, patches)
         await message.answer("Позиция обновлена. /show для проверки, /save для сохранения.")
         logger.info(f"[TG] update done req={req} h=cmd_edititem_legacy")
@@ -2,24 +2,50 @@
 Command handlers for working with invoices (listing, filtering, etc.).
 """
 
+import hashlib
+import os
+import re
+import tempfile
 import time
 import uuid
 from datetime import date
+from typing import Any, Dict, Optional
 
 from aiogram import F, Router
 from aiogram.fsm.context import FSMContext
-from aiogram.types import CallbackQuery, ForceReply, Message
+from aiogram.types import CallbackQuery, ForceReply, FSInputFile, Message
 
 from backend.core.container import AppContainer
-from backend.handlers.callback_registry import CallbackAction
+from backend.domain.invoices import (
+    InvoiceCursor,
+    InvoiceSummary,
+    InvoiceSummaryPage,
+    SupplierMonthlySpend,
+)
+from backend.handlers.callback_registry import INVOICES_PAGE_PREFIX, CallbackAction
 from backend.handlers.deps import get_invoice_service
 from backend.handlers.fsm import InvoicesPeriodState
-from backend.handlers.utils import format_money
+from backend.handlers.utils import format_money, invoices_page_kb, send_chunked
 from backend.ocr.engine.util import get_logger, set_request_id
+from backend.services.invoice_service import InvoiceService
 from backend.storage.db import to_iso
 
 logger = get_logger("ocr.engine")
 
+# Number of invoices shown per listing page.
+INVOICES_PAGE_SIZE = 15
+
+# FSM data key holding the active listing filter for the next/prev buttons.
+INVOICES_QUERY_KEY = "invoices_query"
+
+# Hex digits of the filter hash carried in the page buttons' callback data.
+_QUERY_ID_LENGTH = 8
+
+STATS_USAGE = "Формат: /stats [YYYY-MM] [YYYY-MM] [supplier=текст]"
+EXPORT_USAGE = "Формат: /export YYYY-MM-DD YYYY-MM-DD [supplier=текст]"
+
+_MONTH_RE = re.compile(r"^\d{4}-\d{2}$")
+
 
 def _parse_date_str(date_str: str) -> date | None:
     """Parse date string to date object."""
@@ -37,7 +63,82 @@ def _parse_date_str(date_str: str) -> date | None:
     return None
 
 
-async def cmd_invoices(message: Message, container: AppContainer) -> None:
+def _query_id(f_str: str, t_str: str, supplier: Optional[str]) -> str:
+    """
+    Short hash of a listing filter.
+
+    Page buttons carry it next to the cursor: the FSM only keeps the filter of
+    the latest listing, so a button of an older message with another filter
+    must not page through it.
+    """
+    digest = hashlib.sha1(f"{f_str}\0{t_str}\0{supplier or ''}".encode()).hexdigest()
+    return digest[:_QUERY_ID_LENGTH]
+
+
+def _format_invoice_line(summary: InvoiceSummary) -> str:
+    invoice_date_str = summary.invoice_date.isoformat() if summary.invoice_date else "—"
+    invoice_total = float(summary.total_amount) if summary.total_amount is not None else 0.0
+    return (
+        f"  {invoice_date_str}  {summary.invoice_number or '—'}  "
+        f"{summary.supplier_name or '—'}  = {format_money(invoice_total)}  "
+        f"(items: {summary.item_count})"
+    )
+
+
+def _format_invoices_page(query: Dict[str, Any], page: InvoiceSummaryPage) -> str:
+    supplier = query.get("supplier")
+    head = f"Счета с {query.get('from')} по {query.get('to')}" + (
+        f" | Поставщик содержит: {supplier}" if supplier else ""
+    )
+    lines = [_format_invoice_line(summary) for summary in page.summaries]
+    return (
+        head
+        + "\n"
+        + "\n".join(lines)
+        + f"\n—\nСчетов: {query.get('invoice_count', 0)}, позиций: {query.get('item_count', 0)}"
+        + f"\nИтого суммарно: {format_money(query.get('total', 0))}"
+    )
+
+
+async def _answer_invoices_first_page(
+    message: Message,
+    state: FSMContext,
+    invoice_service: InvoiceService,
+    f_str: str,
+    t_str: str,
+    supplier: Optional[str],
+) -> None:
+    """Show the first page of a listing and remember its filter for the page buttons."""
+    from_date = _parse_date_str(f_str)
+    to_date = _parse_date_str(t_str)
+
+    page = await invoice_service.list_invoices_summary_page(
+        from_date=from_date,
+        to_date=to_date,
+        supplier=supplier,
+        limit=INVOICES_PAGE_SIZE,
+    )
+    if not page.summaries:
+        await message.answer("Ничего не найдено.")
+        return
+
+    totals = await invoice_service.summarize_invoices(from_date, to_date, supplier)
+    query: Dict[str, Any] = {
+        "id": _query_id(f_str, t_str, supplier),
+        "from": f_str,
+        "to": t_str,
+        "supplier": supplier,
+        "invoice_count": totals.invoice_count,
+        "item_count": totals.item_count,
+        "total": str(totals.total_amount),
+    }
+    await state.update_data({INVOICES_QUERY_KEY: query})
+    await message.answer(
+        _format_invoices_page(query, page), reply_markup=invoices_page_kb(page, query["id"])
+    )
+
+
+async def cmd_invoices(message: Message, container: AppContainer, state: FSMContext) -> None:
     """Handle /invoices command."""
     req = f"tg-{int(time.time())}-{uuid.uuid4().hex[:8]}"
     set_request_id(req)
@@ -55,45 +156,151 @@ async def cmd_invoices(message: Message, container: AppContainer) -> None:
     if len(parts) >= 4 and parts[3].lower().startswith("supplier="):
         supplier = parts[3].split("=", 1)[1]
 
-    from_date = _parse_date_str(f_str)
-    to_date = _parse_date_str(t_str)
+    await _answer_invoices_first_page(message, state, invoice_service, f_str, t_str, supplier)
+    logger.info(f"[TG] update done req={req} h=cmd_invoices")
 
-    invoices = await invoice_service.list_invoices(
-        from_date=from_date, to_date=to_date, supplier=supplier
+
+async def cb_invoices_page(call: CallbackQuery, state: FSMContext, container: AppContainer) -> None:
+    """Handle next/prev buttons of an invoice listing."""
+    req = f"tg-{int(time.time())}-{uuid.uuid4().hex[:8]}"
+    set_request_id(req)
+    logger.info(f"[TG] update start req={req} h=cb_invoices_page")
+    invoice_service = get_invoice_service(container)
+
+    state_data = await state.get_data()
+    query = state_data.get(INVOICES_QUERY_KEY)
+    parts = (call.data or "").split(":", 4)
+    if (
+        not query
+        or len(parts) != 5
+        or parts[1] != query.get("id")
+        or parts[2] not in ("next", "prev")
+        or not parts[4].isdigit()
+    ):
+        # The buttons belong to a listing whose filter is no longer in the FSM,
+        # or the callback data was not made by invoices_page_kb.
+        await call.answer("Список устарел. Повторите /invoices.")
+        return
+
+    _, _, direction, date_iso, invoice_id = parts
+    cursor = InvoiceCursor(date_iso=date_iso, invoice_id=int(invoice_id))
+    page = await invoice_service.list_invoices_summary_page(
+        from_date=_parse_date_str(query.get("from") or ""),
+        to_date=_parse_date_str(query.get("to") or ""),
+        supplier=query.get("supplier"),
+        after=cursor if direction == "next" else None,
+        before=cursor if direction == "prev" else None,
+        limit=INVOICES_PAGE_SIZE,
     )
-    if not invoices:
-        await message.answer("Ничего не найдено.")
+    if not page.summaries:
+        await call.answer("Больше счетов нет.")
         return
 
-    lines = []
-    total = 0.0
-    for invoice in invoices:
-        invoice_date_str = (
-            invoice.header.invoice_date.isoformat() if invoice.header.invoice_date else "—"
-        )
-        invoice_total = (
-            float(invoice.header.total_amount) if invoice.header.total_amount is not None else 0.0
+    text = _format_invoices_page(query, page)
+    if call.message is not None:
+        if isinstance(call.message, Message):
+            await call.message.edit_text(text, reply_markup=invoices_page_kb(page, query["id"]))
+        else:
+            await call.message.answer(text, reply_markup=invoices_page_kb(page, query["id"]))
+    await call.answer()
+    logger.info(f"[TG] update done req={req} h=cb_invoices_page")
+
+
+async def cmd_export(message: Message, container: AppContainer) -> None:
+    """Handle /export command: invoices of a period with their items as a CSV file."""
+    req = f"tg-{int(time.time())}-{uuid.uuid4().hex[:8]}"
+    set_request_id(req)
+    logger.info(f"[TG] update start req={req} h=cmd_export")
+    invoice_service = get_invoice_service(container)
+
+    parts = (message.text or "").split()
+    from_date = _parse_date_str(parts[1]) if len(parts) >= 3 else None
+    to_date = _parse_date_str(parts[2]) if len(parts) >= 3 else None
+    if from_date is None or to_date is None:
+        await message.answer(EXPORT_USAGE)
+        return
+    supplier = None
+    if len(parts) >= 4 and parts[3].lower().startswith("supplier="):
+        supplier = parts[3].split("=", 1)[1] or None
+
+    # The export is spooled to disk and uploaded from there, so large periods
+    # never have to fit in memory.
+    fd, path = tempfile.mkstemp(prefix="invoices_", suffix=".csv")
+    try:
+        with os.fdopen(fd, "wb") as destination:
+            report = await invoice_service.export_invoices_csv(
+                from_date, to_date, destination, supplier=supplier
+            )
+        if not report.invoices:
+            await message.answer("Ничего не найдено.")
+            return
+        await message.answer_document(
+            FSInputFile(path, filename=f"invoices_{from_date}_{to_date}.csv"),
+            caption=f"Счетов: {report.invoices}, строк: {report.rows}",
         )
-        total += invoice_total
-        items_count_val = len(invoice.items)
+    finally:
+        os.remove(path)
+    logger.info(f"[TG] update done req={req} h=cmd_export")
+
+
+def _format_supplier_spend(rows: list[SupplierMonthlySpend]) -> str:
+    lines = ["Расходы по поставщикам:"]
+    current_month: Optional[str] = None
+    invoice_count = 0
+    item_count = 0
+    total = 0.0
+    for row in rows:
+        if row.month != current_month:
+            current_month = row.month
+            lines.append(row.month or "без даты")
         lines.append(
-            f"  {invoice_date_str}  {invoice.header.invoice_number or '—'}  "
-            f"{invoice.header.supplier_name or '—'}  = {format_money(invoice_total)}  "
-            f"(items: {items_count_val})"
+            f"  {row.supplier or '—'}  счетов: {row.invoice_count}, позиций: {row.item_count}"
+            f"  = {format_money(row.total_amount)}"
         )
-    head = f"Счета с {f_str} по {t_str}" + (
-        f" | Поставщик содержит: {supplier}" if supplier else ""
-    )
-    text = head + "\n" + "\n".join(lines[:150]) + f"\n—\nИтого суммарно: {format_money(total)}"
-    await message.answer(
-        text if len(text) < 3900 else (head + "\nСлишком много строк. Уточните фильтр.")
-    )
-    logger.info(f"[TG] update done req={req} h=cmd_invoices")
+        invoice_count += row.invoice_count
+        item_count += row.item_count
+        total += float(row.total_amount)
+    lines.append(f"—\nСчетов: {invoice_count}, позиций: {item_count}")
+    lines.append(f"Итого суммарно: {format_money(total)}")
+    return "\n".join(lines)
+
+
+async def cmd_stats(message: Message, container: AppContainer) -> None:
+    """Handle /stats command: per-supplier monthly spend from the rollup table."""
+    req = f"tg-{int(time.time())}-{uuid.uuid4().hex[:8]}"
+    set_request_id(req)
+    logger.info(f"[TG] update start req={req} h=cmd_stats")
+    invoice_service = get_invoice_service(container)
+
+    months: list[str] = []
+    supplier = None
+    for part in (message.text or "").split()[1:]:
+        if part.lower().startswith("supplier="):
+            supplier = part.split("=", 1)[1] or None
+        elif _MONTH_RE.match(part) and len(months) < 2:
+            months.append(part)
+        else:
+            await message.answer(STATS_USAGE)
+            return
+    from_month = months[0] if months else None
+    to_month = months[1] if len(months) > 1 else from_month
+
+    uid = message.from_user.id if message.from_user else 0
+    rows = await invoice_service.supplier_spend(uid, from_month, to_month, supplier)
+    if not rows:
+        await message.answer("Ничего не найдено.")
+        return
+
+    await send_chunked(message, _format_supplier_spend(rows))
+    logger.info(f"[TG] update done req={req} h=cmd_stats")
 
 
 def setup(router: Router) -> None:
     """Register invoice-related command handlers."""
     router.message.register(cmd_invoices, F.text.regexp(r"^/invoices\s"))
+    router.message.register(cmd_stats, F.text.regexp(r"^/stats(\s|$)"))
+    router.message.register(cmd_export, F.text.regexp(r"^/export(\s|$)"))
+    router.callback_query.register(cb_invoices_page, F.data.startswith(INVOICES_PAGE_PREFIX + ":"))
 
     @router.message(F.reply_to_message)
     async def on_force_reply_invoices(
@@ -151,47 +358,8 @@ def setup(router: Router) -> None:
                     await message.answer("Не указаны даты. Повторите ввод периода.")
                     return
 
-                from_date = _parse_date_str(f_str)
-                to_date = _parse_date_str(t_str)
-
-                invoices = await invoice_service.list_invoices(
-                    from_date=from_date, to_date=to_date, supplier=supplier
-                )
-                if not invoices:
-                    await message.answer("Ничего не найдено.")
-                    return
-
-                lines = []
-                total = 0.0
-                for invoice in invoices:
-                    invoice_date_str = (
-                        invoice.header.invoice_date.isoformat()
-                        if invoice.header.invoice_date
-                        else "—"
-                    )
-                    invoice_total = (
-                        float(invoice.header.total_amount)
-                        if invoice.header.total_amount is not None
-                        else 0.0
-                    )
-                    total += invoice_total
-                    items_count_val = len(invoice.items)
-                    lines.append(
-                        f"  {invoice_date_str}  {invoice.header.invoice_number or '—'}  "
-                        f"{invoice.header.supplier_name or '—'}  = {format_money(invoice_total)}  "
-                        f"(items: {items_count_val})"
-                    )
-                head = f"Счета с {f_str} по {t_str}" + (
-                    f" | Поставщик содержит: {supplier}" if supplier else ""
-                )
-                text = (
-                    head
-                    + "\n"
-                    + "\n".join(lines[:150])
-                    + f"\n—\nИтого суммарно: {format_money(total)}"
-                )
-                await message.answer(
-                    text if len(text) < 3900 else (head + "\nСлишком много строк. Уточните фильтр.")
+                await _answer_invoices_first_page(
+                    message, state, invoice_service, f_str, t_str, supplier
                 )
                 return
 
@@ -90,15 +90,24 @@ async def _process_file_and_create_draft(
         draft = InvoiceDraft(
             invoice=invoice,
             path=file_path,
-            raw_text="",
+            raw_text=invoice.raw_text or "",
             comments=[],
         )
-        await draft_service.set_current_draft(user_id=uid, draft=draft)
+        summary = await draft_service.add_draft(user_id=uid, draft=draft)
     except Exception as e:
         logger.exception(f"[TG] Failed to create draft for file {file_path}: {e}")
         await message.answer("Не удалось сохранить черновик. Повторите попытку позже.")
         return
 
+    if not summary.active:
+        # Another draft is under review; this one waits its turn.
+        await message.answer(
+            f"{format_invoice_header(invoice)}\n\n"
+            f"Черновик #{summary.draft_id} добавлен в очередь. "
+            f"/drafts — список черновиков, /draft {summary.draft_id} — открыть его."
+        )
+        return
+
     full_text = format_invoice_full(invoice)
 
     if len(full_text) <= MAX_MSG:
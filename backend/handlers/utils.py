@@ -4,10 +4,12 @@ from typing import List
 
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, Message
 
-from backend.domain.invoices import Invoice, InvoiceItem
+from backend.domain.drafts import DraftSummary
+from backend.domain.invoices import Invoice, InvoiceItem, InvoicePage, InvoiceSummaryPage
 from backend.handlers.callback_registry import (
     CallbackAction,
     CallbackHeader,
+    make_invoices_page_callback,
     make_item_field_callback,
     make_item_pick_callback,
     make_items_page_callback,
@@ -15,6 +17,18 @@ from backend.handlers.callback_registry import (
 
 MAX_MSG = 4000  # Telegram message limit is 4096 characters
 
+DRAFT_KEPT_TEXT = (
+    "Черновик изменился во время сохранения или уже сохранен, поэтому он не удален. "
+    "Проверьте /drafts."
+)
+
+
+def format_saved_invoice(invoice_id: int, inserted: bool) -> str:
+    """Reply to a save; a duplicate names the invoice that was already stored."""
+    if inserted:
+        return f"Сохранено в БД. ID счета: {invoice_id}"
+    return f"Этот счет уже сохранен в БД, повторно он не записан. ID счета: {invoice_id}"
+
 
 def format_money(x) -> str:
     try:
@@ -85,6 +99,23 @@ def format_invoice_full(invoice: Invoice) -> str:
     return "\n\n".join(parts)
 
 
+def format_draft_list(drafts: List[DraftSummary]) -> str:
+    if not drafts:
+        return "Черновиков нет. Пришлите документ."
+
+    lines = []
+    for summary in drafts:
+        marker = "▶️" if summary.active else "•"
+        total = format_money(summary.total_amount) if summary.total_amount is not None else "—"
+        lines.append(
+            f"{marker} #{summary.draft_id} {summary.supplier_name or '—'} "
+            f"№{summary.invoice_number or '—'}, {total}, позиций: {summary.item_count}"
+        )
+    lines.append("")
+    lines.append("▶️ — текущий черновик. /draft N — перейти к черновику N.")
+    return "\n".join(lines)
+
+
 def fmt_header(p: dict) -> str:
     return (
         f"📑 Документ: {p.get('doc_number') or '—'}\n"
@@ -316,3 +347,30 @@ def item_fields_kb(idx: int) -> InlineKeyboardMarkup:
             ],
         ]
     )
+
+
+def invoices_page_kb(
+    page: InvoicePage | InvoiceSummaryPage, query_id: str
+) -> InlineKeyboardMarkup | None:
+    nav = []
+    if page.has_prev and page.first_cursor is not None:
+        nav.append(
+            InlineKeyboardButton(
+                text="◀️",
+                callback_data=make_invoices_page_callback(
+                    query_id, "prev", page.first_cursor.date_iso, page.first_cursor.invoice_id
+                ),
+            )
+        )
+    if page.has_next and page.last_cursor is not None:
+        nav.append(
+            InlineKeyboardButton(
+                text="▶️",
+                callback_data=make_invoices_page_callback(
+                    query_id, "next", page.last_cursor.date_iso, page.last_cursor.invoice_id
+                ),
+            )
+        )
+    if not nav:
+        return None
+    return InlineKeyboardMarkup(inline_keyboard=[nav])
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import asyncio
+import json
 from pathlib import Path
 from typing import Any, Dict
 
@@ -73,6 +74,9 @@ async def extract_invoice_async(
         pdf_path=pdf_path,
         template_name="mindee",
     )
+    if raw_payload:
+        # Same text format as extract_text_mindee, so it can be parsed again later.
+        result.raw_text = "<<MINDEE_STRUCT>>\n" + json.dumps(raw_payload, ensure_ascii=False)
 
     logger.info(
         "[OCR ASYNC] extract_invoice_async done items=%s total_sum=%s supplier=%r client=%r",
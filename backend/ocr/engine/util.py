@@ -12,6 +12,9 @@ from typing import Any, Optional
 
 from backend import config
 
+# Telegram files are downloaded here before OCR.
+DOWNLOAD_DIR = "temp"
+
 _req_var: ContextVar[str] = ContextVar("req", default="-")
 _configured = False
 
@@ -209,7 +212,7 @@ async def save_file(src: Any, bot: Any) -> Optional[str]:
         Path(orig_name).stem if orig_name else ("photo" if isinstance(src, PhotoSize) else "file")
     )
 
-    os.makedirs("temp", exist_ok=True)
-    local_path = Path("temp") / f"{stem}_{src.file_id[:8]}{ext}"
+    os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+    local_path = Path(DOWNLOAD_DIR) / f"{stem}_{src.file_id[:8]}{ext}"
     await bot.download_file(tg_file.file_path, destination=str(local_path))
     return str(local_path)
@@ -341,5 +341,6 @@ def extract_invoice_mindee(pdf_path: str) -> ExtractionResult:
     text = extract_text_mindee(pdf_path)
     data = parse_text_mindee(text)
     result = build_extraction_result(data, pdf_path)
+    result.raw_text = text
     logger.info(f"[Mindee] extract done items={len(result.items)} total={result.total_sum}")
     return result
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+from backend.storage.backup import BackupReport
+
+DEFAULT_BACKUP_INTERVAL_SECONDS = 24 * 3600.0
+
+CreateBackupFunc = Callable[[], Awaitable[BackupReport]]
+
+
+class BackupScheduler:
+    """
+    Periodic online backups of the database while the bot is running.
+
+    The first snapshot is taken one interval after start, so restarts do not
+    pile up backups. An interval of 0 disables the scheduler.
+    """
+
+    def __init__(
+        self,
+        create_backup_func: CreateBackupFunc,
+        logger: logging.Logger,
+        interval_seconds: float = DEFAULT_BACKUP_INTERVAL_SECONDS,
+    ) -> None:
+        self._create_backup_func = create_backup_func
+        self._logger = logger
+        self._interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task[None]] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._interval_seconds > 0
+
+    async def backup(self) -> BackupReport:
+        report = await self._create_backup_func()
+        self._logger.info(
+            f"[SERVICE] backup written path={report.path} pages={report.pages} "
+            f"bytes={report.snapshot_bytes} partitions={len(report.partitions)} "
+            f"seconds={report.seconds:.2f} pruned={report.pruned}"
+        )
+        return report
+
+    def start(self) -> None:
+        """Take a backup in the background every interval_seconds."""
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval_seconds)
+            try:
+                await self.backup()
+            except Exception:
+                self._logger.exception("[SERVICE] backup failed")
+
+
+__all__ = [
+    "DEFAULT_BACKUP_INTERVAL_SECONDS",
+    "BackupScheduler",
+    "CreateBackupFunc",
+]
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Generic, Hashable, Optional, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+@dataclass
+class CacheStats:
+    """
+    Counters of an in-memory cache since it was created.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+    size: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class LRUCache(Generic[K, V]):
+    """
+    Bounded least-recently-used cache with a per-entry time to live.
+
+    Not thread-safe: it is meant to be owned by a service running on one event loop.
+    A max_size of 0 disables caching; a ttl_seconds of 0 or less keeps entries until
+    they are evicted.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl_seconds: float = 0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_size < 0:
+            raise ValueError("max_size must not be negative")
+        self._max_size = max_size
+        self._ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[K, Tuple[float, V]] = OrderedDict()
+        self._stats = CacheStats()
+
+    @property
+    def enabled(self) -> bool:
+        return self._max_size > 0
+
+    def lookup(self, key: K) -> Tuple[bool, Optional[V]]:
+        """Return (found, value); a stored None is reported as found."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self._stats.misses += 1
+            return False, None
+
+        stored_at, value = entry
+        if self._ttl_seconds > 0 and self._clock() - stored_at >= self._ttl_seconds:
+            del self._entries[key]
+            self._stats.expirations += 1
+            self._stats.misses += 1
+            return False, None
+
+        self._entries.move_to_end(key)
+        self._stats.hits += 1
+        return True, value
+
+    def get(self, key: K) -> Optional[V]:
+        return self.lookup(key)[1]
+
+    def put(self, key: K, value: V) -> None:
+        if not self.enabled:
+            return
+        self._entries[key] = (self._clock(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+            self._stats.evictions += 1
+
+    def invalidate(self, key: K) -> None:
+        if self._entries.pop(key, None) is not None:
+            self._stats.invalidations += 1
+
+    def invalidate_where(self, predicate: Callable[[K], bool]) -> int:
+        """Drop every entry whose key matches predicate and return how many were dropped."""
+        stale = [key for key in self._entries if predicate(key)]
+        for key in stale:
+            del self._entries[key]
+        self._stats.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            hits=self._stats.hits,
+            misses=self._stats.misses,
+            evictions=self._stats.evictions,
+            expirations=self._stats.expirations,
+            invalidations=self._stats.invalidations,
+            size=len(self._entries),
+        )
+
+
+__all__ = [
+    "CacheStats",
+    "LRUCache",
+]
@@ -1,34 +1,442 @@
 from __future__ import annotations
 
+import asyncio
+import copy
 import logging
-from typing import Awaitable, Callable, Optional
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
 
-from backend.domain.drafts import InvoiceDraft
+from backend.domain.drafts import (
+    DraftHistoryEntry,
+    DraftPatch,
+    DraftSummary,
+    DraftVersionConflict,
+    InvoiceDraft,
+    apply_draft_patch,
+    validate_draft_patch,
+)
+from backend.services.cache import CacheStats, LRUCache
+
+DEFAULT_DRAFT_CACHE_SIZE = 256
+DEFAULT_DRAFT_CACHE_TTL_SECONDS = 900.0
+DEFAULT_DRAFT_WRITE_BEHIND_SECONDS = 0.0
+DEFAULT_DRAFT_CONFLICT_RETRIES = 3
+
+PatchDraftFunc = Callable[[int, Sequence[DraftPatch], Optional[InvoiceDraft]], Awaitable[None]]
+ReplaceDraftFunc = Callable[[int, InvoiceDraft], Awaitable[None]]
+DiscardDraftFunc = Callable[[int, InvoiceDraft], Awaitable[bool]]
+LoadDraftHistoryFunc = Callable[[int], Awaitable[List[DraftHistoryEntry]]]
+AddDraftFunc = Callable[[int, InvoiceDraft], Awaitable[DraftSummary]]
+ListDraftsFunc = Callable[[int], Awaitable[List[DraftSummary]]]
+ActivateDraftFunc = Callable[[int, int], Awaitable[bool]]
+
+
+@dataclass
+class _PendingDraftWrite:
+    """Draft changes of one user that have not reached storage yet."""
+
+    draft: InvoiceDraft
+    full: bool = False
+    patches: List[DraftPatch] = field(default_factory=list)
+    coalesced: int = 0
 
 
 class DraftService:
+    """
+    Current-draft access for Telegram users.
+
+    Drafts are kept in a bounded write-through LRU cache so that repeated reads
+    during an editing session do not hit SQLite. The cache assumes this service
+    is the only writer of the drafts table; set cache_size=0 to disable it.
+
+    Field-level edits go through patch_current_draft, which stores only the
+    changed fields when a patch function is configured.
+
+    With write_behind_seconds > 0 writes are buffered per user and coalesced:
+    the first change starts a timer, and everything written until it fires is
+    stored in one go. flush_draft and flush_all write pending changes at once;
+    handlers flush before /save and the bot flushes on shutdown. A crash loses
+    at most write_behind_seconds of edits. The default of 0 stores every write
+    before returning.
+
+    A user may have several drafts: add_draft queues a new one, and the
+    "current" draft is the active one, switched with switch_draft. Without the
+    multi-draft functions every upload replaces the current draft.
+
+    Writes that depend on what was read are conditional on the draft's stored
+    version, so edits from another process (or a second bot instance) are not
+    silently overwritten. On a version conflict patch_current_draft and
+    update_current_draft reload the draft and apply the change again, up to
+    conflict_retries times, before raising DraftVersionConflict. Write-behind
+    flushes are last-writer-wins: a buffered draft that changed in storage
+    meanwhile is stored whole over the other change.
+    """
+
     def __init__(
         self,
         load_draft_func: Callable[[int], Awaitable[Optional[InvoiceDraft]]],
         save_draft_func: Callable[[int, InvoiceDraft], Awaitable[None]],
         delete_draft_func: Callable[[int], Awaitable[None]],
         logger: logging.Logger,
+        cache_size: int = DEFAULT_DRAFT_CACHE_SIZE,
+        cache_ttl_seconds: float = DEFAULT_DRAFT_CACHE_TTL_SECONDS,
+        patch_draft_func: Optional[PatchDraftFunc] = None,
+        load_draft_history_func: Optional[LoadDraftHistoryFunc] = None,
+        write_behind_seconds: float = DEFAULT_DRAFT_WRITE_BEHIND_SECONDS,
+        add_draft_func: Optional[AddDraftFunc] = None,
+        list_drafts_func: Optional[ListDraftsFunc] = None,
+        activate_draft_func: Optional[ActivateDraftFunc] = None,
+        replace_draft_func: Optional[ReplaceDraftFunc] = None,
+        discard_draft_func: Optional[DiscardDraftFunc] = None,
+        conflict_retries: int = DEFAULT_DRAFT_CONFLICT_RETRIES,
     ) -> None:
         self._load_draft_func = load_draft_func
         self._save_draft_func = save_draft_func
         self._delete_draft_func = delete_draft_func
+        self._patch_draft_func = patch_draft_func
+        self._load_draft_history_func = load_draft_history_func
+        self._add_draft_func = add_draft_func
+        self._list_drafts_func = list_drafts_func
+        self._activate_draft_func = activate_draft_func
+        self._replace_draft_func = replace_draft_func
+        self._discard_draft_func = discard_draft_func
+        self._conflict_retries = max(0, conflict_retries)
         self._logger = logger
+        self._cache: LRUCache[int, Optional[InvoiceDraft]] = LRUCache(
+            max_size=cache_size,
+            ttl_seconds=cache_ttl_seconds,
+        )
+        self._write_behind_seconds = max(0.0, write_behind_seconds)
+        self._pending: Dict[int, _PendingDraftWrite] = {}
+        self._flush_timers: Dict[int, asyncio.Task[None]] = {}
+        # Keeps a deferred write from landing after the delete of the same draft.
+        self._write_lock = asyncio.Lock()
+
+    @property
+    def write_behind(self) -> bool:
+        return self._write_behind_seconds > 0
 
     async def get_current_draft(self, user_id: int) -> Optional[InvoiceDraft]:
-        return await self._load_draft_func(user_id)
+        pending = self._pending.get(user_id)
+        if pending is not None:
+            return pending.draft
+
+        found, draft = self._cache.lookup(user_id)
+        if found:
+            return draft
+
+        draft = await self._load_draft_func(user_id)
+        # Absence is cached too: a user without a draft is looked up on every message.
+        self._cache.put(user_id, draft)
+        return draft
 
     async def set_current_draft(self, user_id: int, draft: InvoiceDraft) -> None:
-        await self._save_draft_func(user_id, draft)
+        if self.write_behind:
+            self._buffer_write(user_id, draft, patches=None)
+            self._cache.put(user_id, draft)
+            return
+
+        try:
+            await self._save_draft_func(user_id, draft)
+        except Exception:
+            # The caller may have mutated the cached instance before the failed save.
+            self._cache.invalidate(user_id)
+            raise
+        self._cache.put(user_id, draft)
+
+    async def add_draft(self, user_id: int, draft: InvoiceDraft) -> DraftSummary:
+        """
+        Store a new draft for the user.
+
+        It becomes the current draft only if the user had none; otherwise it is
+        queued behind the existing ones (check the returned summary's active flag).
+        """
+        if self._add_draft_func is None:
+            await self.set_current_draft(user_id, draft)
+            return DraftSummary.from_draft(0, draft, active=True)
+
+        summary = await self._add_draft_func(user_id, draft)
+        if summary.active:
+            self._cache.put(user_id, draft)
+        return summary
+
+    async def list_drafts(self, user_id: int) -> List[DraftSummary]:
+        if self._list_drafts_func is None:
+            raise RuntimeError("list_drafts_func is not configured")
+        # Buffered edits of the current draft would otherwise be missing from the list.
+        await self.flush_draft(user_id)
+        return await self._list_drafts_func(user_id)
+
+    async def switch_draft(self, user_id: int, draft_id: int) -> Optional[InvoiceDraft]:
+        """Make another of the user's drafts current; None if there is no such draft."""
+        if self._activate_draft_func is None:
+            raise RuntimeError("activate_draft_func is not configured")
+        await self.flush_draft(user_id)
+        if not await self._activate_draft_func(user_id, draft_id):
+            return None
+        self._cache.invalidate(user_id)
+        return await self.get_current_draft(user_id)
+
+    async def patch_current_draft(
+        self,
+        user_id: int,
+        patches: Sequence[DraftPatch],
+    ) -> Optional[InvoiceDraft]:
+        """
+        Apply field-level changes to the current draft and persist them.
+
+        Returns the updated draft, or None if the user has no draft. Raises
+        ValueError if a patch does not fit the draft; nothing is changed then.
+        If the stored draft changed in the meantime, the patches are applied
+        again on top of the newer version.
+        """
+
+        def apply(draft: InvoiceDraft) -> None:
+            for patch in patches:
+                validate_draft_patch(draft, patch)
+            for patch in patches:
+                apply_draft_patch(draft, patch)
+
+        return await self._write_with_retry(user_id, apply, patches)
+
+    async def update_current_draft(
+        self,
+        user_id: int,
+        mutate: Callable[[InvoiceDraft], None],
+    ) -> Optional[InvoiceDraft]:
+        """
+        Change the current draft with mutate and store it whole.
+
+        mutate works on a copy that replaces the current draft once stored, and
+        may be called again on a freshly loaded draft if another writer got
+        there first, so it should only depend on its argument. Returns the
+        updated draft, or None if the user has no draft.
+        """
+        return await self._write_with_retry(user_id, mutate, None)
+
+    async def _write_with_retry(
+        self,
+        user_id: int,
+        mutate: Callable[[InvoiceDraft], None],
+        patches: Optional[Sequence[DraftPatch]],
+    ) -> Optional[InvoiceDraft]:
+        attempt = 0
+        while True:
+            current = await self.get_current_draft(user_id)
+            if current is None:
+                return None
+            # The cached and buffered draft is shared with callers; it is only
+            # replaced once the change went through, so a mutate or write that
+            # fails halfway leaves it as it was.
+            draft = copy.deepcopy(current)
+            mutate(draft)
+
+            if self.write_behind:
+                self._buffer_write(user_id, draft, patches=patches)
+                self._cache.put(user_id, draft)
+                return draft
+
+            try:
+                await self._store(user_id, draft, patches)
+            except DraftVersionConflict:
+                # The cached draft is stale; start from storage.
+                self._cache.invalidate(user_id)
+                attempt += 1
+                if attempt > self._conflict_retries:
+                    raise
+                self._logger.info(
+                    f"[SERVICE] draft version conflict uid={user_id} attempt={attempt}"
+                )
+                continue
+            except Exception:
+                self._cache.invalidate(user_id)
+                raise
+            self._cache.put(user_id, draft)
+            return draft
+
+    async def _store(
+        self,
+        user_id: int,
+        draft: InvoiceDraft,
+        patches: Optional[Sequence[DraftPatch]],
+    ) -> None:
+        if patches is not None and self._patch_draft_func is not None:
+            await self._patch_draft_func(user_id, patches, draft)
+        elif self._replace_draft_func is not None:
+            await self._replace_draft_func(user_id, draft)
+        else:
+            await self._save_draft_func(user_id, draft)
+
+    def _buffer_write(
+        self,
+        user_id: int,
+        draft: InvoiceDraft,
+        patches: Optional[Sequence[DraftPatch]],
+    ) -> None:
+        pending = self._pending.get(user_id)
+        if pending is None:
+            pending = _PendingDraftWrite(draft=draft)
+            self._pending[user_id] = pending
+            self._schedule_flush(user_id)
+        else:
+            pending.coalesced += 1
+        pending.draft = draft
+        if patches is None or self._patch_draft_func is None:
+            # A full write supersedes any patches buffered before it.
+            pending.full = True
+            pending.patches.clear()
+        elif not pending.full:
+            pending.patches.extend(patches)
+
+    def _schedule_flush(self, user_id: int) -> None:
+        if user_id not in self._flush_timers:
+            self._flush_timers[user_id] = asyncio.create_task(self._flush_later(user_id))
+
+    async def _flush_later(self, user_id: int) -> None:
+        await asyncio.sleep(self._write_behind_seconds)
+        self._flush_timers.pop(user_id, None)
+        try:
+            await self._flush_user(user_id)
+        except Exception:
+            self._logger.exception(f"[SERVICE] draft write-behind flush failed uid={user_id}")
+
+    def _cancel_flush_timer(self, user_id: int) -> None:
+        timer = self._flush_timers.pop(user_id, None)
+        if timer is not None and timer is not asyncio.current_task():
+            timer.cancel()
+
+    async def _flush_user(self, user_id: int) -> bool:
+        async with self._write_lock:
+            pending = self._pending.pop(user_id, None)
+            if pending is None:
+                return False
+            try:
+                if pending.full:
+                    await self._save_draft_func(user_id, pending.draft)
+                elif self._patch_draft_func is not None and pending.patches:
+                    await self._flush_patches(user_id, pending)
+            except Exception:
+                self._requeue(user_id, pending)
+                raise
+        self._logger.debug(
+            f"[SERVICE] draft flushed uid={user_id} full={pending.full} "
+            f"patches={len(pending.patches)} coalesced={pending.coalesced}"
+        )
+        return True
+
+    async def _flush_patches(self, user_id: int, pending: _PendingDraftWrite) -> None:
+        assert self._patch_draft_func is not None
+        try:
+            # Passing the draft keeps its version current for later conditional writes.
+            await self._patch_draft_func(user_id, pending.patches, pending.draft)
+        except DraftVersionConflict:
+            self._logger.warning(
+                f"[SERVICE] draft changed outside write-behind uid={user_id}, overwriting"
+            )
+            await self._save_draft_func(user_id, pending.draft)
+
+    def _requeue(self, user_id: int, failed: _PendingDraftWrite) -> None:
+        current = self._pending.get(user_id)
+        if current is None:
+            self._pending[user_id] = failed
+        elif failed.full:
+            current.full = True
+            current.patches.clear()
+        elif not current.full:
+            # Buffered after the failed write started, so they go after its patches.
+            current.patches[:0] = failed.patches
+        self._schedule_flush(user_id)
+
+    async def flush_draft(self, user_id: int) -> None:
+        """Store buffered changes of the user's draft now."""
+        self._cancel_flush_timer(user_id)
+        await self._flush_user(user_id)
+
+    async def flush_all(self) -> int:
+        """
+        Store every buffered draft change, e.g. on shutdown.
+
+        Failures are logged and do not stop the remaining users from being
+        flushed. Returns the number of drafts written.
+        """
+        flushed = 0
+        for user_id in list(self._pending):
+            self._cancel_flush_timer(user_id)
+            try:
+                if await self._flush_user(user_id):
+                    flushed += 1
+            except Exception:
+                self._logger.exception(f"[SERVICE] draft flush failed uid={user_id}")
+        for user_id in list(self._flush_timers):
+            # Timers re-armed by failed writes; nobody is left to run them.
+            self._cancel_flush_timer(user_id)
+        return flushed
+
+    def pending_drafts(self) -> int:
+        return len(self._pending)
+
+    async def get_draft_history(self, user_id: int) -> List[DraftHistoryEntry]:
+        if self._load_draft_history_func is None:
+            raise RuntimeError("load_draft_history_func is not configured")
+        return await self._load_draft_history_func(user_id)
+
+    async def clear_current_draft(
+        self,
+        user_id: int,
+        expected: Optional[InvoiceDraft] = None,
+    ) -> None:
+        """
+        Delete the current draft; the next queued draft, if any, becomes current.
+
+        With expected, only that draft is deleted and only if it is unchanged
+        since it was read; DraftVersionConflict is raised otherwise. This keeps
+        a repeated /save from deleting the next draft in the queue.
+        """
+        if (
+            expected is not None
+            and expected.draft_id is not None
+            and self._discard_draft_func is not None
+        ):
+            # Buffered edits belong to expected, so they are stored before the check.
+            await self.flush_draft(user_id)
+            async with self._write_lock:
+                discarded = await self._discard_draft_func(user_id, expected)
+            self._cache.invalidate(user_id)
+            if not discarded:
+                raise DraftVersionConflict(
+                    f"draft {expected.draft_id} changed or was already deleted"
+                )
+            return
+
+        self._cancel_flush_timer(user_id)
+        self._pending.pop(user_id, None)
+        self._cache.invalidate(user_id)
+        if self.write_behind:
+            async with self._write_lock:
+                await self._delete_draft_func(user_id)
+        else:
+            await self._delete_draft_func(user_id)
 
-    async def clear_current_draft(self, user_id: int) -> None:
-        await self._delete_draft_func(user_id)
+    def cache_stats(self) -> CacheStats:
+        stats = self._cache.stats()
+        self._logger.debug(
+            f"[SERVICE] draft cache hits={stats.hits} misses={stats.misses} "
+            f"hit_rate={stats.hit_rate:.2f} size={stats.size} evictions={stats.evictions}"
+        )
+        return stats
 
 
 __all__ = [
+    "DEFAULT_DRAFT_CACHE_SIZE",
+    "DEFAULT_DRAFT_CONFLICT_RETRIES",
+    "DEFAULT_DRAFT_CACHE_TTL_SECONDS",
+    "DEFAULT_DRAFT_WRITE_BEHIND_SECONDS",
+    "ActivateDraftFunc",
+    "AddDraftFunc",
+    "DiscardDraftFunc",
     "DraftService",
+    "ListDraftsFunc",
+    "LoadDraftHistoryFunc",
+    "PatchDraftFunc",
+    "ReplaceDraftFunc",
 ]
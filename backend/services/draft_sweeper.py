@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Iterable, List, Optional, Sequence, Set
+
+from backend.domain.drafts import ExpiredDrafts
+
+DEFAULT_DRAFT_TTL_SECONDS = 7 * 24 * 3600.0
+DEFAULT_DRAFT_SWEEP_INTERVAL_SECONDS = 3600.0
+
+DeleteExpiredDraftsFunc = Callable[[float], Awaitable[ExpiredDrafts]]
+FetchReferencedPathsFunc = Callable[[], Awaitable[Set[str]]]
+
+
+@dataclass
+class DraftSweepReport:
+    drafts_deleted: int = 0
+    deltas_deleted: int = 0
+    files_deleted: int = 0
+    file_bytes: int = 0
+    payload_bytes: int = 0
+
+    @property
+    def rows_deleted(self) -> int:
+        return self.drafts_deleted + self.deltas_deleted
+
+    @property
+    def bytes_reclaimed(self) -> int:
+        return self.file_bytes + self.payload_bytes
+
+
+class DraftSweeper:
+    """
+    Periodic removal of abandoned drafts and the uploads nobody refers to anymore.
+
+    A draft expires when it has not been written for ttl_seconds. Files in
+    upload_dirs are removed when they belonged to an expired draft, or when they
+    are older than ttl_seconds and neither a draft nor a saved invoice uses them.
+    Files outside upload_dirs are never touched.
+    """
+
+    def __init__(
+        self,
+        delete_expired_func: DeleteExpiredDraftsFunc,
+        fetch_referenced_paths_func: FetchReferencedPathsFunc,
+        upload_dirs: Sequence[str],
+        logger: logging.Logger,
+        ttl_seconds: float = DEFAULT_DRAFT_TTL_SECONDS,
+        interval_seconds: float = DEFAULT_DRAFT_SWEEP_INTERVAL_SECONDS,
+    ) -> None:
+        self._delete_expired_func = delete_expired_func
+        self._fetch_referenced_paths_func = fetch_referenced_paths_func
+        self._upload_dirs = [Path(directory).resolve() for directory in upload_dirs]
+        self._logger = logger
+        self._ttl_seconds = ttl_seconds
+        self._interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task[None]] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._ttl_seconds > 0
+
+    async def sweep(self) -> DraftSweepReport:
+        expired = await self._delete_expired_func(self._ttl_seconds)
+        referenced = await self._fetch_referenced_paths_func()
+        report = DraftSweepReport(
+            drafts_deleted=expired.drafts,
+            deltas_deleted=expired.deltas,
+            payload_bytes=expired.payload_bytes,
+        )
+        report.files_deleted, report.file_bytes = await asyncio.to_thread(
+            self._remove_orphans, expired.paths, referenced
+        )
+        self._logger.info(
+            f"[SERVICE] draft sweep drafts={report.drafts_deleted} "
+            f"deltas={report.deltas_deleted} files={report.files_deleted} "
+            f"bytes={report.bytes_reclaimed}"
+        )
+        return report
+
+    def _remove_orphans(
+        self, expired_paths: Iterable[str], referenced: Set[str]
+    ) -> tuple[int, int]:
+        keep = {self._resolve(path) for path in referenced}
+        cutoff = time.time() - self._ttl_seconds
+        candidates: List[Path] = [self._resolve(path) for path in expired_paths]
+        for directory in self._upload_dirs:
+            if not directory.is_dir():
+                continue
+            for entry in os.scandir(directory):
+                if entry.is_file(follow_symlinks=False) and entry.stat().st_mtime < cutoff:
+                    candidates.append(Path(entry.path))
+
+        files = 0
+        reclaimed = 0
+        for path in dict.fromkeys(candidates):
+            if path in keep or not self._in_upload_dirs(path):
+                continue
+            try:
+                size = path.stat().st_size
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                self._logger.warning(f"[SERVICE] draft sweep could not remove {path}: {e}")
+                continue
+            files += 1
+            reclaimed += size
+        return files, reclaimed
+
+    @staticmethod
+    def _resolve(path: str) -> Path:
+        return Path(path).resolve()
+
+    def _in_upload_dirs(self, path: Path) -> bool:
+        return any(path.is_relative_to(directory) for directory in self._upload_dirs)
+
+    def start(self) -> None:
+        """Run sweeps in the background every interval_seconds."""
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sweep()
+            except Exception:
+                self._logger.exception("[SERVICE] draft sweep failed")
+            await asyncio.sleep(self._interval_seconds)
+
+
+__all__ = [
+    "DEFAULT_DRAFT_SWEEP_INTERVAL_SECONDS",
+    "DEFAULT_DRAFT_TTL_SECONDS",
+    "DeleteExpiredDraftsFunc",
+    "DraftSweepReport",
+    "DraftSweeper",
+    "FetchReferencedPathsFunc",
+]
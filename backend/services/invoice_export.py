@@ -0,0 +1,97 @@
+"""
+Streaming CSV export of invoices.
+
+Rows are written one invoice at a time to a binary file object through a
+buffered text wrapper, so memory use does not grow with the size of the
+export; the source iterator (InvoiceService.iter_invoices) loads invoices in
+fixed-size batches.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, AsyncIterator, BinaryIO, List, Optional
+
+from backend.domain.invoices import Invoice, InvoiceItem
+
+EXPORT_CSV_COLUMNS = [
+    "date",
+    "doc_number",
+    "supplier",
+    "client",
+    "invoice_total",
+    "#",
+    "name",
+    "qty",
+    "price",
+    "total",
+]
+
+
+@dataclass
+class ExportReport:
+    invoices: int = 0
+    rows: int = 0
+
+
+def _number(value: Optional[Decimal]) -> str:
+    return "" if value is None else str(value)
+
+
+def _rows(invoice: Invoice) -> List[List[Any]]:
+    header = invoice.header
+    head = [
+        header.invoice_date.isoformat() if header.invoice_date else "",
+        header.invoice_number or "",
+        header.supplier_name or "",
+        header.customer_name or "",
+        _number(header.total_amount),
+    ]
+    items: List[Optional[InvoiceItem]] = list(invoice.items) or [None]
+    rows: List[List[Any]] = []
+    for index, item in enumerate(items, 1):
+        if item is None:
+            rows.append(head + ["", "", "", "", ""])
+            continue
+        rows.append(
+            head
+            + [
+                index,
+                item.description or "",
+                _number(item.quantity),
+                _number(item.unit_price),
+                _number(item.line_total),
+            ]
+        )
+    return rows
+
+
+async def write_invoices_csv(
+    invoices: AsyncIterator[Invoice], destination: BinaryIO
+) -> ExportReport:
+    """
+    Write one CSV row per invoice item (one row for an invoice without items).
+
+    The file is UTF-8 with a BOM and ";" as delimiter, like the per-invoice item
+    export, so Excel opens it directly. destination is left open.
+    """
+    report = ExportReport()
+    text = io.TextIOWrapper(destination, encoding="utf-8-sig", newline="")
+    try:
+        writer = csv.writer(text, delimiter=";")
+        writer.writerow(EXPORT_CSV_COLUMNS)
+        async for invoice in invoices:
+            rows = _rows(invoice)
+            writer.writerows(rows)
+            report.invoices += 1
+            report.rows += len(rows)
+        text.flush()
+    finally:
+        text.detach()
+    return report
+
+
+__all__ = ["EXPORT_CSV_COLUMNS", "ExportReport", "write_invoices_csv"]
@@ -0,0 +1,239 @@
+"""
+Streaming CSV import of invoices.
+
+The expected layout is the one written by invoice_export: one row per invoice
+item, the invoice columns repeated on each of its rows, and consecutive rows
+with the same invoice columns forming one invoice; a "#" (item number) of 1
+starts a new invoice even when the invoice columns repeat. Headers of other
+spreadsheets can be mapped onto these column names. Rows are read one at a
+time, turned into domain Invoice objects and validated; valid invoices are
+saved chunk_size at a time, each chunk in one transaction, and an invoice with
+any invalid row is skipped and reported with its line number.
+"""
+
+from __future__ import annotations
+
+import csv
+import re
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from typing import Awaitable, Callable, Dict, Iterator, List, Mapping, Optional, TextIO, Tuple
+
+from backend.domain.invoices import Invoice, InvoiceHeader, InvoiceItem, InvoiceSourceInfo
+from backend.services.invoice_export import EXPORT_CSV_COLUMNS
+from backend.storage.db import to_iso
+
+IMPORT_CHUNK_SIZE = 1000
+MAX_REPORTED_ISSUES = 100
+
+_INVOICE_COLUMNS = ("date", "doc_number", "supplier", "client", "invoice_total")
+_ITEM_COLUMNS = ("code", "name", "qty", "price", "total")
+IMPORT_CSV_COLUMNS = [*EXPORT_CSV_COLUMNS, "code"]
+
+# Saves a chunk and returns (invoice ID, inserted) pairs; inserted is False for
+# an invoice that was already stored (see AsyncInvoiceStorage.import_invoices).
+SaveInvoicesFunc = Callable[[List[Invoice], int], Awaitable[List[Tuple[int, bool]]]]
+
+
+@dataclass
+class ImportIssue:
+    line: int
+    message: str
+
+
+@dataclass
+class ImportReport:
+    rows: int = 0
+    invoices: int = 0
+    saved: int = 0
+    duplicates: int = 0
+    skipped: int = 0
+    issues: List[ImportIssue] = field(default_factory=list)
+
+    def add_issue(self, line: int, message: str) -> None:
+        if len(self.issues) < MAX_REPORTED_ISSUES:
+            self.issues.append(ImportIssue(line, message))
+
+
+class _InvalidRow(ValueError):
+    def __init__(self, line: int, message: str) -> None:
+        super().__init__(message)
+        self.line = line
+
+
+# Called after every saved (or, in a dry run, validated) chunk.
+ImportProgressFunc = Callable[[ImportReport], None]
+
+
+def _decimal(value: str, column: str) -> Optional[Decimal]:
+    """Parse 1234.5, 1 234,50 or 1,234.50; an empty cell is None."""
+    text = re.sub(r"\s+", "", value)
+    if not text:
+        return None
+    if "," in text and "." in text:
+        if text.rfind(",") > text.rfind("."):
+            text = text.replace(".", "").replace(",", ".")
+        else:
+            text = text.replace(",", "")
+    else:
+        text = text.replace(",", ".")
+    try:
+        number = Decimal(text)
+    except InvalidOperation:
+        raise ValueError(f"{column}: not a number: {value!r}") from None
+    if not number.is_finite():
+        raise ValueError(f"{column}: not a number: {value!r}")
+    return number
+
+
+def _date(value: str) -> Optional[date]:
+    if not value.strip():
+        return None
+    iso = to_iso(value)
+    try:
+        return date.fromisoformat(iso or "")
+    except ValueError:
+        raise ValueError(f"date: unrecognized date: {value!r}") from None
+
+
+def _build_header(cells: Mapping[str, str]) -> InvoiceHeader:
+    return InvoiceHeader(
+        supplier_name=cells["supplier"] or None,
+        customer_name=cells["client"] or None,
+        invoice_number=cells["doc_number"] or None,
+        invoice_date=_date(cells["date"]),
+        total_amount=_decimal(cells["invoice_total"], "invoice_total"),
+    )
+
+
+def _build_item(cells: Mapping[str, str]) -> Optional[InvoiceItem]:
+    if not any(cells[column] for column in _ITEM_COLUMNS):
+        return None
+    return InvoiceItem(
+        description=cells["name"],
+        sku=cells["code"] or None,
+        quantity=_decimal(cells["qty"], "qty") or Decimal("0"),
+        unit_price=_decimal(cells["price"], "price") or Decimal("0"),
+        line_total=_decimal(cells["total"], "total") or Decimal("0"),
+    )
+
+
+def _read_rows(
+    source: TextIO, column_map: Mapping[str, str]
+) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """Yield (line number, cells by import column name) for each data row."""
+    first_line = source.readline()
+    delimiter = ";" if first_line.count(";") >= first_line.count(",") else ","
+    mapping = {key.strip().casefold(): value for key, value in column_map.items()}
+    names = [
+        mapping.get(name.strip().casefold(), name.strip().casefold())
+        for name in next(csv.reader([first_line], delimiter=delimiter), [])
+    ]
+    if not set(names) & set(_INVOICE_COLUMNS):
+        raise ValueError(
+            f"no invoice columns in the CSV header; expected some of {', '.join(_INVOICE_COLUMNS)}"
+        )
+
+    reader = csv.reader(source, delimiter=delimiter)
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        cells = dict.fromkeys(IMPORT_CSV_COLUMNS, "")
+        cells.update((name, cell.strip()) for name, cell in zip(names, row))
+        # +1 for the header line read before the reader was created.
+        yield reader.line_num + 1, cells
+
+
+def _group_invoices(
+    rows: Iterator[Tuple[int, Dict[str, str]]],
+) -> Iterator[List[Tuple[int, Dict[str, str]]]]:
+    """Group consecutive rows with the same invoice columns, restarting at item #1."""
+    group: List[Tuple[int, Dict[str, str]]] = []
+    key: Optional[Tuple[str, ...]] = None
+    for line, cells in rows:
+        row_key = tuple(cells[column] for column in _INVOICE_COLUMNS)
+        if group and (row_key != key or cells["#"] == "1"):
+            yield group
+            group = []
+        key = row_key
+        group.append((line, cells))
+    if group:
+        yield group
+
+
+def _build_invoice(rows: List[Tuple[int, Dict[str, str]]]) -> Invoice:
+    first_line, first_cells = rows[0]
+    try:
+        header = _build_header(first_cells)
+    except ValueError as e:
+        raise _InvalidRow(first_line, str(e)) from None
+    items: List[InvoiceItem] = []
+    for line, cells in rows:
+        try:
+            item = _build_item(cells)
+        except ValueError as e:
+            raise _InvalidRow(line, str(e)) from None
+        if item is not None:
+            items.append(item)
+    if not items and not (header.supplier_name or header.invoice_number):
+        raise _InvalidRow(first_line, "neither supplier, document number nor items")
+    return Invoice(header=header, items=items, source=InvoiceSourceInfo(provider="csv"))
+
+
+async def import_invoices_csv(
+    source: TextIO,
+    save_invoices_func: SaveInvoicesFunc,
+    user_id: int,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    dry_run: bool = False,
+    column_map: Optional[Mapping[str, str]] = None,
+    progress: Optional[ImportProgressFunc] = None,
+) -> ImportReport:
+    """
+    Read invoices from CSV text and save the valid ones for user_id.
+
+    column_map maps CSV header names to import column names (see
+    IMPORT_CSV_COLUMNS); with dry_run nothing is saved. Re-importing a file
+    does not duplicate invoices that have a document number: saving resolves
+    them to the stored copy, and they are counted in duplicates, not saved.
+    """
+    report = ImportReport()
+    chunk: List[Invoice] = []
+
+    async def flush() -> None:
+        if chunk and not dry_run:
+            for _, inserted in await save_invoices_func(list(chunk), user_id):
+                if inserted:
+                    report.saved += 1
+                else:
+                    report.duplicates += 1
+        chunk.clear()
+        if progress is not None:
+            progress(report)
+
+    for rows in _group_invoices(_read_rows(source, column_map or {})):
+        report.rows += len(rows)
+        try:
+            invoice = _build_invoice(rows)
+        except _InvalidRow as e:
+            report.skipped += 1
+            report.add_issue(e.line, str(e))
+            continue
+        report.invoices += 1
+        chunk.append(invoice)
+        if len(chunk) >= chunk_size:
+            await flush()
+    await flush()
+    return report
+
+
+__all__ = [
+    "IMPORT_CHUNK_SIZE",
+    "IMPORT_CSV_COLUMNS",
+    "ImportIssue",
+    "ImportProgressFunc",
+    "ImportReport",
+    "SaveInvoicesFunc",
+    "import_invoices_csv",
+]
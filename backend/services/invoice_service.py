@@ -1,19 +1,66 @@
 from __future__ import annotations
 
+import dataclasses
 import logging
 from datetime import date, datetime
 from decimal import Decimal
-from typing import Awaitable, Callable, List, Optional
+from typing import Any, AsyncIterator, Awaitable, BinaryIO, Callable, List, Optional, Tuple
 
 from backend.domain.invoices import (
     Invoice,
+    InvoiceCursor,
     InvoiceHeader,
     InvoiceItem,
+    InvoicePage,
     InvoiceSourceInfo,
+    InvoiceSummaryPage,
+    InvoiceTotals,
+    SupplierMonthlySpend,
 )
 from backend.ocr.engine.types import ExtractionResult, Item
+from backend.services.cache import CacheStats, LRUCache
+from backend.services.invoice_export import ExportReport, write_invoices_csv
 
 DEFAULT_MAX_OCR_PAGES = 12
+DEFAULT_INVOICES_PAGE_SIZE = 20
+DEFAULT_LISTING_CACHE_TTL_SECONDS = 300.0
+DEFAULT_LISTING_CACHE_MAX_ROWS = 1000
+
+# (query name, from_date, to_date, supplier, *query specific arguments)
+ListingCacheKey = Tuple[Any, ...]
+
+FetchInvoicePageFunc = Callable[
+    [
+        Optional[date],
+        Optional[date],
+        Optional[str],
+        Optional[InvoiceCursor],
+        Optional[InvoiceCursor],
+        int,
+    ],
+    Awaitable[InvoicePage],
+]
+FetchInvoiceSummaryPageFunc = Callable[
+    [
+        Optional[date],
+        Optional[date],
+        Optional[str],
+        Optional[InvoiceCursor],
+        Optional[InvoiceCursor],
+        int,
+    ],
+    Awaitable[InvoiceSummaryPage],
+]
+SummarizeInvoicesFunc = Callable[
+    [Optional[date], Optional[date], Optional[str]], Awaitable[InvoiceTotals]
+]
+FetchSupplierSpendFunc = Callable[
+    [int, Optional[str], Optional[str], Optional[str]], Awaitable[List[SupplierMonthlySpend]]
+]
+FetchRawTextFunc = Callable[[int], Awaitable[Optional[str]]]
+# Saves an invoice and returns (ID, inserted); inserted is False for a duplicate.
+StoreInvoiceFunc = Callable[[Invoice, int], Awaitable[Tuple[int, bool]]]
+IterInvoicesFunc = Callable[[Optional[date], Optional[date], Optional[str]], AsyncIterator[Invoice]]
 
 
 def _parse_date(value: Optional[str]) -> Optional[date]:
@@ -35,6 +82,25 @@ def _parse_date(value: Optional[str]) -> Optional[date]:
     return None
 
 
+def _listing_key_matches(key: ListingCacheKey, invoice: Invoice) -> bool:
+    """Whether a newly saved invoice may belong to the cached listing stored under key."""
+    _, from_date, to_date, supplier = key[:4]
+    invoice_date = invoice.header.invoice_date
+    if invoice_date is None:
+        # Date filters compare date_iso, which is NULL for undated invoices.
+        if from_date is not None or to_date is not None:
+            return False
+    elif (from_date is not None and invoice_date < from_date) or (
+        to_date is not None and invoice_date > to_date
+    ):
+        return False
+    if supplier and "%" not in supplier and "_" not in supplier:
+        # supplier LIKE '%...%' ignores ASCII case only; casefold never misses a match.
+        name = invoice.header.supplier_name or ""
+        return supplier.casefold() in name.casefold()
+    return True
+
+
 def _build_header(result: ExtractionResult) -> InvoiceHeader:
     invoice_date = _parse_date(result.date)
 
@@ -76,6 +142,7 @@ def build_invoice_from_extraction(result: ExtractionResult) -> Invoice:
         items=items,
         comments=[],
         source=source,
+        raw_text=getattr(result, "raw_text", None) or None,
     )
 
     return invoice
@@ -90,11 +157,38 @@ class InvoiceService:
             [Optional[date], Optional[date], Optional[str]], Awaitable[List[Invoice]]
         ],
         logger: logging.Logger,
+        fetch_invoice_page_func: Optional[FetchInvoicePageFunc] = None,
+        iter_invoices_func: Optional[IterInvoicesFunc] = None,
+        fetch_invoice_summary_page_func: Optional[FetchInvoiceSummaryPageFunc] = None,
+        summarize_invoices_func: Optional[SummarizeInvoicesFunc] = None,
+        fetch_supplier_spend_func: Optional[FetchSupplierSpendFunc] = None,
+        fetch_raw_text_func: Optional[FetchRawTextFunc] = None,
+        store_invoice_func: Optional[StoreInvoiceFunc] = None,
+        listing_cache_size: int = 0,
+        listing_cache_ttl_seconds: float = DEFAULT_LISTING_CACHE_TTL_SECONDS,
+        listing_cache_max_rows: int = DEFAULT_LISTING_CACHE_MAX_ROWS,
     ) -> None:
         self._ocr_extractor = ocr_extractor
         self._save_invoice_func = save_invoice_func
         self._fetch_invoices_func = fetch_invoices_func
+        self._fetch_invoice_page_func = fetch_invoice_page_func
+        self._iter_invoices_func = iter_invoices_func
+        self._fetch_invoice_summary_page_func = fetch_invoice_summary_page_func
+        self._summarize_invoices_func = summarize_invoices_func
+        self._fetch_supplier_spend_func = fetch_supplier_spend_func
+        self._fetch_raw_text_func = fetch_raw_text_func
+        self._store_invoice_func = store_invoice_func
         self._logger = logger
+        # Results of list_invoices, list_invoices_summary_page and summarize_invoices.
+        # save_invoice drops the entries whose filter the saved invoice falls into;
+        # the TTL bounds staleness after writes made elsewhere (CLI, retention, archive).
+        self._listing_cache: LRUCache[ListingCacheKey, Any] = LRUCache(
+            max_size=listing_cache_size,
+            ttl_seconds=listing_cache_ttl_seconds,
+        )
+        self._listing_cache_max_rows = listing_cache_max_rows
+        # Bumped by every save so a query that raced with a write is not cached.
+        self._listing_generation = 0
 
     async def process_invoice_file(
         self,
@@ -120,16 +214,37 @@ class InvoiceService:
         return invoice
 
     async def save_invoice(self, invoice: Invoice, user_id: int = 0) -> int:
+        invoice_id, _ = await self.store_invoice(invoice, user_id=user_id)
+        return invoice_id
+
+    async def store_invoice(self, invoice: Invoice, user_id: int = 0) -> Tuple[int, bool]:
+        """
+        Save an invoice and return (ID, inserted).
+
+        inserted is False when storage already held the invoice under its dedup
+        key; the ID is then the stored invoice's. Without store_invoice_func every
+        save counts as inserted.
+        """
         self._logger.info(
             f"[SERVICE] save_invoice supplier={invoice.header.supplier_name!r} total={invoice.header.total_amount!r}"
         )
 
-        invoice_id = await self._save_invoice_func(
-            invoice,
-            user_id,
+        if self._store_invoice_func is not None:
+            invoice_id, inserted = await self._store_invoice_func(invoice, user_id)
+        else:
+            invoice_id, inserted = await self._save_invoice_func(invoice, user_id), True
+        if not inserted:
+            self._logger.info(f"[SERVICE] save_invoice duplicate of id={invoice_id}")
+            return invoice_id, inserted
+
+        self._listing_generation += 1
+        dropped = self._listing_cache.invalidate_where(
+            lambda key: _listing_key_matches(key, invoice)
         )
+        if dropped:
+            self._logger.debug(f"[SERVICE] listing cache invalidated entries={dropped}")
 
-        return invoice_id
+        return invoice_id, inserted
 
     async def list_invoices(
         self,
@@ -141,16 +256,194 @@ class InvoiceService:
             f"[SERVICE] list_invoices from={from_date} to={to_date} supplier={supplier!r}"
         )
 
+        # fetch_invoices ignores a range unless both bounds are given.
+        if from_date is None or to_date is None:
+            from_date = to_date = None
+        key: ListingCacheKey = ("invoices", from_date, to_date, supplier or None)
+        found, cached = self._listing_cache.lookup(key)
+        if found and isinstance(cached, list):
+            return list(cached)
+
+        generation = self._listing_generation
         invoices = await self._fetch_invoices_func(
             from_date,
             to_date,
             supplier,
         )
+        if generation == self._listing_generation and len(invoices) <= self._listing_cache_max_rows:
+            self._listing_cache.put(key, list(invoices))
 
         return invoices
 
+    async def list_invoices_page(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        supplier: Optional[str] = None,
+        after: Optional[InvoiceCursor] = None,
+        before: Optional[InvoiceCursor] = None,
+        limit: int = DEFAULT_INVOICES_PAGE_SIZE,
+    ) -> InvoicePage:
+        if self._fetch_invoice_page_func is None:
+            raise RuntimeError("fetch_invoice_page_func is not configured")
+
+        self._logger.info(
+            f"[SERVICE] list_invoices_page from={from_date} to={to_date} supplier={supplier!r} "
+            f"after={after} before={before} limit={limit}"
+        )
+
+        return await self._fetch_invoice_page_func(
+            from_date,
+            to_date,
+            supplier,
+            after,
+            before,
+            limit,
+        )
+
+    def iter_invoices(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        supplier: Optional[str] = None,
+    ) -> AsyncIterator[Invoice]:
+        if self._iter_invoices_func is None:
+            raise RuntimeError("iter_invoices_func is not configured")
+
+        self._logger.info(
+            f"[SERVICE] iter_invoices from={from_date} to={to_date} supplier={supplier!r}"
+        )
+
+        return self._iter_invoices_func(from_date, to_date, supplier)
+
+    async def export_invoices_csv(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        destination: BinaryIO,
+        supplier: Optional[str] = None,
+    ) -> ExportReport:
+        """Stream the invoices of the range with their items as CSV into destination."""
+        report = await write_invoices_csv(
+            self.iter_invoices(from_date, to_date, supplier), destination
+        )
+        self._logger.info(
+            f"[SERVICE] export_invoices_csv invoices={report.invoices} rows={report.rows}"
+        )
+        return report
+
+    async def list_invoices_summary_page(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        supplier: Optional[str] = None,
+        after: Optional[InvoiceCursor] = None,
+        before: Optional[InvoiceCursor] = None,
+        limit: int = DEFAULT_INVOICES_PAGE_SIZE,
+    ) -> InvoiceSummaryPage:
+        if self._fetch_invoice_summary_page_func is None:
+            raise RuntimeError("fetch_invoice_summary_page_func is not configured")
+
+        self._logger.info(
+            f"[SERVICE] list_invoices_summary_page from={from_date} to={to_date} "
+            f"supplier={supplier!r} after={after} before={before} limit={limit}"
+        )
+
+        key: ListingCacheKey = (
+            "summary_page",
+            from_date,
+            to_date,
+            supplier or None,
+            after,
+            before,
+            limit,
+        )
+        found, cached = self._listing_cache.lookup(key)
+        if found and isinstance(cached, InvoiceSummaryPage):
+            return dataclasses.replace(cached, summaries=list(cached.summaries))
+
+        generation = self._listing_generation
+        page = await self._fetch_invoice_summary_page_func(
+            from_date,
+            to_date,
+            supplier,
+            after,
+            before,
+            limit,
+        )
+        if (
+            generation == self._listing_generation
+            and len(page.summaries) <= self._listing_cache_max_rows
+        ):
+            self._listing_cache.put(key, dataclasses.replace(page, summaries=list(page.summaries)))
+
+        return page
+
+    async def summarize_invoices(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        supplier: Optional[str] = None,
+    ) -> InvoiceTotals:
+        if self._summarize_invoices_func is None:
+            raise RuntimeError("summarize_invoices_func is not configured")
+
+        self._logger.info(
+            f"[SERVICE] summarize_invoices from={from_date} to={to_date} supplier={supplier!r}"
+        )
+
+        key: ListingCacheKey = ("totals", from_date, to_date, supplier or None)
+        found, cached = self._listing_cache.lookup(key)
+        if found and isinstance(cached, InvoiceTotals):
+            return dataclasses.replace(cached)
+
+        generation = self._listing_generation
+        totals = await self._summarize_invoices_func(from_date, to_date, supplier)
+        if generation == self._listing_generation:
+            self._listing_cache.put(key, dataclasses.replace(totals))
+
+        return totals
+
+    async def supplier_spend(
+        self,
+        user_id: int,
+        from_month: Optional[str] = None,
+        to_month: Optional[str] = None,
+        supplier: Optional[str] = None,
+    ) -> List[SupplierMonthlySpend]:
+        if self._fetch_supplier_spend_func is None:
+            raise RuntimeError("fetch_supplier_spend_func is not configured")
+
+        self._logger.info(
+            f"[SERVICE] supplier_spend user={user_id} from={from_month} to={to_month} "
+            f"supplier={supplier!r}"
+        )
+
+        return await self._fetch_supplier_spend_func(user_id, from_month, to_month, supplier)
+
+    async def get_raw_text(self, invoice_id: int) -> Optional[str]:
+        """Load the raw OCR text of a saved invoice, for audits and re-parsing."""
+        if self._fetch_raw_text_func is None:
+            raise RuntimeError("fetch_raw_text_func is not configured")
+
+        self._logger.info(f"[SERVICE] get_raw_text invoice_id={invoice_id}")
+
+        return await self._fetch_raw_text_func(invoice_id)
+
+    def listing_cache_stats(self) -> CacheStats:
+        stats = self._listing_cache.stats()
+        self._logger.debug(
+            f"[SERVICE] listing cache hits={stats.hits} misses={stats.misses} "
+            f"hit_rate={stats.hit_rate:.2f} size={stats.size} "
+            f"invalidations={stats.invalidations}"
+        )
+        return stats
+
 
 __all__ = [
+    "DEFAULT_INVOICES_PAGE_SIZE",
+    "DEFAULT_LISTING_CACHE_MAX_ROWS",
+    "DEFAULT_LISTING_CACHE_TTL_SECONDS",
     "DEFAULT_MAX_OCR_PAGES",
     "InvoiceService",
     "build_invoice_from_extraction",
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import shutil
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Awaitable, Callable, Iterable, Optional, Sequence, Set, Tuple
+
+from backend.storage.retention import PrunedInvoices
+
+DEFAULT_RETENTION_INTERVAL_SECONDS = 24 * 3600.0
+
+PruneInvoicesFunc = Callable[[date], Awaitable[PrunedInvoices]]
+VacuumFunc = Callable[[], Awaitable[int]]
+FetchReferencedPathsFunc = Callable[[], Awaitable[Set[str]]]
+RebuildRollupFunc = Callable[[], Awaitable[int]]
+
+
+@dataclass
+class RetentionReport:
+    invoices_deleted: int = 0
+    items_deleted: int = 0
+    comments_deleted: int = 0
+    partitions_deleted: int = 0
+    files_deleted: int = 0
+    artifacts_deleted: int = 0
+    file_bytes: int = 0
+    database_bytes: int = 0
+
+    @property
+    def bytes_reclaimed(self) -> int:
+        return self.file_bytes + self.database_bytes
+
+
+class RetentionJob:
+    """
+    Periodic deletion of invoices older than retention_days and of their files.
+
+    Besides the database rows, the uploads of the deleted invoices that nothing
+    else refers to and the OCR artifact folders (artifacts_dir/<doc_id>/) not
+    touched within the retention period are removed, then free database pages
+    are released with an incremental VACUUM. retention_days <= 0 disables it.
+    """
+
+    def __init__(
+        self,
+        prune_invoices_func: PruneInvoicesFunc,
+        vacuum_func: VacuumFunc,
+        fetch_referenced_paths_func: FetchReferencedPathsFunc,
+        upload_dirs: Sequence[str],
+        artifacts_dir: str,
+        logger: logging.Logger,
+        retention_days: int = 0,
+        interval_seconds: float = DEFAULT_RETENTION_INTERVAL_SECONDS,
+        rebuild_rollup_func: Optional[RebuildRollupFunc] = None,
+    ) -> None:
+        self._prune_invoices_func = prune_invoices_func
+        self._vacuum_func = vacuum_func
+        self._fetch_referenced_paths_func = fetch_referenced_paths_func
+        self._rebuild_rollup_func = rebuild_rollup_func
+        self._upload_dirs = [Path(directory).resolve() for directory in upload_dirs]
+        self._artifacts_dir = Path(artifacts_dir)
+        self._logger = logger
+        self._retention_days = retention_days
+        self._interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task[None]] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._retention_days > 0
+
+    def cutoff(self, today: Optional[date] = None) -> date:
+        return (today or date.today()) - timedelta(days=self._retention_days)
+
+    async def run(self, today: Optional[date] = None) -> RetentionReport:
+        cutoff = self.cutoff(today)
+        pruned = await self._prune_invoices_func(cutoff)
+        if (pruned.partitions or pruned.archived) and self._rebuild_rollup_func is not None:
+            # Archived invoices still count in the rollup until it is rebuilt.
+            await self._rebuild_rollup_func()
+        referenced = await self._fetch_referenced_paths_func()
+        report = RetentionReport(
+            invoices_deleted=pruned.invoices,
+            items_deleted=pruned.items,
+            comments_deleted=pruned.comments,
+            partitions_deleted=len(pruned.partitions),
+        )
+        report.files_deleted, upload_bytes = await asyncio.to_thread(
+            self._remove_uploads, pruned.paths, referenced
+        )
+        report.artifacts_deleted, artifact_bytes = await asyncio.to_thread(
+            self._remove_artifacts, cutoff
+        )
+        report.file_bytes = upload_bytes + artifact_bytes
+        report.database_bytes = await self._vacuum_func()
+        self._logger.info(
+            f"[SERVICE] retention cutoff={cutoff} invoices={report.invoices_deleted} "
+            f"partitions={report.partitions_deleted} files={report.files_deleted} "
+            f"artifacts={report.artifacts_deleted} bytes={report.bytes_reclaimed}"
+        )
+        return report
+
+    def _remove_uploads(self, paths: Iterable[str], referenced: Set[str]) -> Tuple[int, int]:
+        keep = {Path(path).resolve() for path in referenced}
+        files = 0
+        reclaimed = 0
+        for path in dict.fromkeys(Path(path).resolve() for path in paths):
+            if path in keep or not any(path.is_relative_to(d) for d in self._upload_dirs):
+                continue
+            try:
+                size = path.stat().st_size
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                self._logger.warning(f"[SERVICE] retention could not remove {path}: {e}")
+                continue
+            files += 1
+            reclaimed += size
+        return files, reclaimed
+
+    def _remove_artifacts(self, cutoff: date) -> Tuple[int, int]:
+        """
+        Remove artifact folders whose newest file is older than cutoff.
+
+        Folders are chosen by modification time alone, not by the pruned
+        invoices: a folder is named after the SHA-256 of the upload, which the
+        invoice rows do not record. A folder that changes while it is examined
+        is skipped until the next run.
+        """
+        if not self._artifacts_dir.is_dir():
+            return 0, 0
+        cutoff_ts = time.mktime(cutoff.timetuple())
+        folders = 0
+        reclaimed = 0
+        for entry in os.scandir(self._artifacts_dir):
+            if not entry.is_dir(follow_symlinks=False):
+                continue
+            try:
+                files = [
+                    Path(root, name) for root, _, names in os.walk(entry.path) for name in names
+                ]
+                stats = [path.stat() for path in files]
+                newest = max((stat.st_mtime for stat in stats), default=entry.stat().st_mtime)
+            except OSError as e:
+                self._logger.warning(f"[SERVICE] retention could not examine {entry.path}: {e}")
+                continue
+            if newest >= cutoff_ts:
+                continue
+            try:
+                shutil.rmtree(entry.path)
+            except OSError as e:
+                self._logger.warning(f"[SERVICE] retention could not remove {entry.path}: {e}")
+                continue
+            folders += 1
+            reclaimed += sum(stat.st_size for stat in stats)
+        return folders, reclaimed
+
+    def start(self) -> None:
+        """Run the job in the background every interval_seconds."""
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run()
+            except Exception:
+                self._logger.exception("[SERVICE] retention run failed")
+            await asyncio.sleep(self._interval_seconds)
+
+
+__all__ = [
+    "DEFAULT_RETENTION_INTERVAL_SECONDS",
+    "PruneInvoicesFunc",
+    "RetentionJob",
+    "RetentionReport",
+    "VacuumFunc",
+]
@@ -0,0 +1,329 @@
+"""
+Year-partitioned archive of old invoices.
+
+archive_invoices moves invoices dated before a cutoff, with their items,
+comments and raw OCR text, from the main database into one SQLite file per invoice year
+(ARCHIVE_DIR/invoices-<year>.sqlite). Partitions have the same tables as the
+main database; readers ATTACH the partitions that overlap the requested
+date range and query them next to the main tables.
+
+Invoices are first copied into the partition and then deleted from the main
+database in a second transaction (SQLite in WAL mode does not commit attached
+databases atomically). Copies are idempotent, so an interrupted run is
+finished by running it again. The supplier_monthly_spend rollup keeps the
+archived invoices: rollup rows touched by the delete are restored afterwards,
+and the delete is logged to invoice_changes as "archive" rather than "delete".
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import aiosqlite
+
+from backend.storage import db as storage_db
+
+ARCHIVE_BATCH_SIZE = 500
+
+_PARTITION_PATTERN = re.compile(r"^invoices-(\d{4})\.sqlite$")
+_ARCHIVED_TABLES = ("invoices", "invoice_items", "comments", "invoice_raw")
+_ARCHIVED_INDEXES = ("idx_invoice_items_invoice_id",)
+_KEY_LOOKUP_CHUNK = 500
+
+
+@dataclass
+class ArchiveReport:
+    """
+    Rows moved by archive_invoices and the partitions they went to.
+    """
+
+    invoices: int = 0
+    items: int = 0
+    comments: int = 0
+    years: List[int] = field(default_factory=list)
+
+
+def partition_path(archive_dir: str, year: int) -> str:
+    return str(Path(archive_dir) / f"invoices-{year:04d}.sqlite")
+
+
+def read_only_uri(path: str) -> str:
+    """
+    Return a SQLite URI that opens path read-only.
+
+    The path is percent-encoded, so "#", "?" and "%" in directory names are
+    not read as URI syntax.
+    """
+    return Path(path).resolve().as_uri() + "?mode=ro"
+
+
+def list_partitions(archive_dir: Optional[str]) -> List[Tuple[int, str]]:
+    """Return (year, path) of the existing partitions, oldest first."""
+    if not archive_dir or not os.path.isdir(archive_dir):
+        return []
+    partitions: List[Tuple[int, str]] = []
+    for entry in os.scandir(archive_dir):
+        match = _PARTITION_PATTERN.match(entry.name)
+        if match and entry.is_file():
+            partitions.append((int(match.group(1)), entry.path))
+    return sorted(partitions)
+
+
+def partitions_for_range(
+    archive_dir: Optional[str],
+    from_date: Optional[date],
+    to_date: Optional[date],
+) -> List[Tuple[int, str]]:
+    """
+    Return the partitions that may hold invoices of the range.
+
+    Like fetch_invoices, an open range (a missing date) covers every partition.
+    """
+    partitions = list_partitions(archive_dir)
+    if from_date is None or to_date is None:
+        return partitions
+    return [(year, path) for year, path in partitions if from_date.year <= year <= to_date.year]
+
+
+def partition_schema(year: int) -> str:
+    """Schema name under which attached_partition attaches the partition of a year."""
+    return f"archive_{year:04d}"
+
+
+@asynccontextmanager
+async def attached_partition(
+    connection: aiosqlite.Connection, year: int, path: str
+) -> AsyncIterator[str]:
+    """Attach a partition for the duration of the block and yield its schema name."""
+    schema = partition_schema(year)
+    await connection.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
+    try:
+        yield schema
+    finally:
+        await connection.execute(f"DETACH DATABASE {schema}")
+
+
+async def _columns(connection: aiosqlite.Connection, schema: str, table: str) -> Dict[str, str]:
+    cursor = await connection.execute(f"PRAGMA {schema}.table_info({table})")
+    return {row[1]: row[2] for row in await cursor.fetchall()}
+
+
+async def _prepare_partition(connection: aiosqlite.Connection, schema: str) -> None:
+    """Create the archived tables in a partition, or add columns added since."""
+    names = _ARCHIVED_TABLES + _ARCHIVED_INDEXES
+    cursor = await connection.execute(
+        f"SELECT name, sql FROM main.sqlite_master WHERE name IN ({','.join('?' * len(names))})",
+        names,
+    )
+    definitions = {row[0]: row[1] for row in await cursor.fetchall()}
+    for table in _ARCHIVED_TABLES:
+        existing = await _columns(connection, schema, table)
+        if not existing:
+            await connection.execute(_in_schema(definitions[table], schema))
+            continue
+        for column, column_type in (await _columns(connection, "main", table)).items():
+            if column not in existing:
+                await connection.execute(
+                    f"ALTER TABLE {schema}.{table} ADD COLUMN {column} {column_type}"
+                )
+    for index in _ARCHIVED_INDEXES:
+        if index in definitions:
+            await connection.execute(
+                _in_schema(definitions[index], schema).replace(
+                    "CREATE INDEX", "CREATE INDEX IF NOT EXISTS", 1
+                )
+            )
+    await connection.execute(
+        f"CREATE INDEX IF NOT EXISTS {schema}.idx_invoices_date_iso ON invoices(date_iso, id)"
+    )
+    # Saves look up dedup keys in the partition of the invoice's year (see
+    # find_archived_duplicates); unlike in the main database the index is not unique.
+    await connection.execute(
+        f"CREATE INDEX IF NOT EXISTS {schema}.idx_invoices_dedup_key "
+        "ON invoices(dedup_key) WHERE dedup_key IS NOT NULL"
+    )
+
+
+def _in_schema(definition: str, schema: str) -> str:
+    """Rewrite "CREATE TABLE name" / "CREATE INDEX name" to create it in schema."""
+    return re.sub(r"^(CREATE\s+(?:TABLE|INDEX)\s+)", rf"\g<1>{schema}.", definition.strip())
+
+
+async def _move_batch(
+    connection: aiosqlite.Connection,
+    schema: str,
+    invoice_ids: Sequence[int],
+    report: ArchiveReport,
+) -> None:
+    placeholders = ",".join("?" * len(invoice_ids))
+    key_columns = {
+        "invoices": "id",
+        "invoice_items": "invoice_id",
+        "comments": "invoice_id",
+        "invoice_raw": "invoice_id",
+    }
+
+    await connection.execute("BEGIN IMMEDIATE")
+    for table in _ARCHIVED_TABLES:
+        columns = ", ".join(await _columns(connection, "main", table))
+        await connection.execute(
+            f"INSERT OR IGNORE INTO {schema}.{table}({columns}) "
+            f"SELECT {columns} FROM main.{table} WHERE {key_columns[table]} IN ({placeholders})",
+            invoice_ids,
+        )
+    await connection.commit()
+
+    await connection.execute("BEGIN IMMEDIATE")
+    # Deleting fires the rollup triggers; archived invoices still count as spend.
+    await connection.execute(
+        f"""
+        CREATE TEMP TABLE archived_spend AS
+        SELECT * FROM main.supplier_monthly_spend
+        WHERE (user_id, supplier, month) IN (
+            SELECT user_id, COALESCE(supplier, ''), COALESCE(substr(date_iso, 1, 7), '')
+            FROM main.invoices WHERE id IN ({placeholders})
+        )
+        """,
+        invoice_ids,
+    )
+    cursor = await connection.execute("SELECT COALESCE(MAX(seq), 0) FROM main.invoice_changes")
+    row = await cursor.fetchone()
+    last_seq = int(row[0]) if row is not None else 0
+    await connection.execute(
+        f"DELETE FROM main.invoice_raw WHERE invoice_id IN ({placeholders})", invoice_ids
+    )
+    cursor = await connection.execute(
+        f"DELETE FROM main.comments WHERE invoice_id IN ({placeholders})", invoice_ids
+    )
+    report.comments += max(cursor.rowcount, 0)
+    cursor = await connection.execute(
+        f"DELETE FROM main.invoice_items WHERE invoice_id IN ({placeholders})", invoice_ids
+    )
+    report.items += max(cursor.rowcount, 0)
+    cursor = await connection.execute(
+        f"DELETE FROM main.invoices WHERE id IN ({placeholders})", invoice_ids
+    )
+    report.invoices += max(cursor.rowcount, 0)
+    # The invoices still exist in a partition; tell change log consumers apart from deletes.
+    await connection.execute(
+        "UPDATE main.invoice_changes SET op = 'archive' WHERE seq > ? AND op = 'delete'",
+        (last_seq,),
+    )
+    await connection.execute(
+        "INSERT OR REPLACE INTO main.supplier_monthly_spend SELECT * FROM temp.archived_spend"
+    )
+    await connection.execute("DROP TABLE temp.archived_spend")
+    await connection.commit()
+
+
+async def archive_invoices(
+    before: date,
+    archive_dir: str,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    database_path: Optional[str] = None,
+) -> ArchiveReport:
+    """
+    Move invoices dated before the cutoff into their year partitions.
+
+    Invoices without a parsed date stay in the main database. Each batch of
+    batch_size invoices is moved in its own pair of transactions.
+    """
+    report = ArchiveReport()
+    os.makedirs(archive_dir, exist_ok=True)
+    connection = await aiosqlite.connect(database_path or storage_db.DB_PATH)
+    try:
+        cursor = await connection.execute(
+            "SELECT DISTINCT substr(date_iso, 1, 4) FROM invoices WHERE date_iso < ? ORDER BY 1",
+            (before.isoformat(),),
+        )
+        years = [int(row[0]) for row in await cursor.fetchall() if str(row[0]).isdigit()]
+        for year in years:
+            async with attached_partition(
+                connection, year, partition_path(archive_dir, year)
+            ) as schema:
+                await _prepare_partition(connection, schema)
+                while True:
+                    cursor = await connection.execute(
+                        """
+                        SELECT id FROM main.invoices
+                        WHERE substr(date_iso, 1, 4) = ? AND date_iso < ?
+                        ORDER BY id LIMIT ?
+                        """,
+                        (f"{year:04d}", before.isoformat(), batch_size),
+                    )
+                    invoice_ids = [int(row[0]) for row in await cursor.fetchall()]
+                    if not invoice_ids:
+                        break
+                    await _move_batch(connection, schema, invoice_ids, report)
+            report.years.append(year)
+        return report
+    finally:
+        await connection.close()
+
+
+async def fetch_archived_paths(
+    connection: aiosqlite.Connection, archive_dir: Optional[str]
+) -> Set[str]:
+    """Return the source paths of archived invoices."""
+    paths: Set[str] = set()
+    for year, path in list_partitions(archive_dir):
+        async with attached_partition(connection, year, path) as schema:
+            cursor = await connection.execute(
+                f"SELECT DISTINCT source_path FROM {schema}.invoices WHERE source_path IS NOT NULL"
+            )
+            paths.update(str(row[0]) for row in await cursor.fetchall())
+    return paths
+
+
+async def find_archived_duplicates(
+    archive_dir: Optional[str], keys: Iterable[Tuple[str, Optional[str]]]
+) -> Dict[str, int]:
+    """
+    Map the (dedup_key, date_iso) pairs already stored in a partition to the archived IDs.
+
+    Only the partition of each date's year can hold a duplicate, since the key
+    contains the date. Partitions are opened read-only on their own connection,
+    so this can run while the caller's write transaction is open.
+    """
+    partitions = dict(list_partitions(archive_dir))
+    keys_by_year: Dict[int, List[str]] = {}
+    for key, date_iso in keys:
+        prefix = date_iso[:4] if date_iso else ""
+        if prefix.isdigit() and int(prefix) in partitions:
+            keys_by_year.setdefault(int(prefix), []).append(key)
+    found: Dict[str, int] = {}
+    for year, year_keys in keys_by_year.items():
+        connection = await aiosqlite.connect(read_only_uri(partitions[year]), uri=True)
+        try:
+            for start in range(0, len(year_keys), _KEY_LOOKUP_CHUNK):
+                chunk = year_keys[start : start + _KEY_LOOKUP_CHUNK]
+                cursor = await connection.execute(
+                    f"SELECT dedup_key, id FROM invoices "
+                    f"WHERE dedup_key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+                found.update((str(row[0]), int(row[1])) for row in await cursor.fetchall())
+        finally:
+            await connection.close()
+    return found
+
+
+__all__ = [
+    "ARCHIVE_BATCH_SIZE",
+    "ArchiveReport",
+    "archive_invoices",
+    "attached_partition",
+    "fetch_archived_paths",
+    "find_archived_duplicates",
+    "list_partitions",
+    "partition_path",
+    "partition_schema",
+    "partitions_for_range",
+    "read_only_uri",
+]
@@ -0,0 +1,327 @@
+"""
+Online backups of the invoice database.
+
+create_backup copies the live database with the sqlite3 backup API a few pages
+at a time, sleeping between steps so the bot's own writes are only ever
+blocked for one short step. The copy is written to a temporary file, compressed
+to BACKUP_DIR/<db name>-<UTC timestamp>.sqlite.gz and the oldest snapshots
+beyond the retention count are removed. A write from another connection while
+the copy is running makes SQLite restart it from the first page; after
+BACKUP_MAX_RESTARTS restarts the rest is copied in a single step (in WAL mode
+that still does not block writers, it only holds back checkpoints).
+
+Archive partitions (ARCHIVE_DIR/invoices-<year>.sqlite) are snapshotted with
+the same timestamp into <snapshot>.archive/invoices-<year>.sqlite.gz. The main
+database is copied first: archive_invoices copies invoices into a partition
+before deleting them from the main database, so an invoice moved while the
+backup runs is in both copies rather than in neither. The main snapshot file
+is written last and marks a complete backup.
+
+restore_backup loads a snapshot and its partitions back; the bot must be
+stopped while it runs.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from backend.storage import db as storage_db
+from backend.storage.archive import list_partitions
+
+BACKUP_PAGES_PER_STEP = 128
+BACKUP_STEP_SLEEP_SECONDS = 0.01
+BACKUP_KEEP = 7
+BACKUP_MAX_RESTARTS = 3
+
+_SUFFIX = ".sqlite.gz"
+_ARCHIVE_SUFFIX = ".archive"
+
+# Called after every step with (pages copied, total pages).
+BackupProgressFunc = Callable[[int, int], None]
+
+
+@dataclass
+class BackupReport:
+    """
+    One written snapshot: its path, size and how long the copy took.
+    """
+
+    path: str
+    pages: int
+    database_bytes: int
+    snapshot_bytes: int
+    seconds: float
+    pruned: int = 0
+    partitions: List[str] = field(default_factory=list)
+
+
+def _database_stem(database_path: str) -> str:
+    return Path(database_path).name.split(".", 1)[0] or "data"
+
+
+def archive_snapshot_dir(snapshot_path: str) -> str:
+    """Directory holding the archive partition snapshots taken with a snapshot."""
+    return snapshot_path[: -len(_SUFFIX)] + _ARCHIVE_SUFFIX
+
+
+def list_backups(backup_dir: str, database_path: Optional[str] = None) -> List[str]:
+    """Return the snapshots of a database in backup_dir, oldest first."""
+    directory = Path(backup_dir)
+    if not directory.is_dir():
+        return []
+    stem = _database_stem(database_path or storage_db.DB_PATH)
+    return sorted(str(path) for path in directory.glob(f"{stem}-*{_SUFFIX}"))
+
+
+def prune_backups(backup_dir: str, keep: int, database_path: Optional[str] = None) -> List[str]:
+    """Delete all but the newest keep snapshots and return the removed paths."""
+    snapshots = list_backups(backup_dir, database_path)
+    removed = snapshots[: max(len(snapshots) - max(keep, 1), 0)]
+    for path in removed:
+        os.remove(path)
+        shutil.rmtree(archive_snapshot_dir(path), ignore_errors=True)
+    return removed
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def _copy_pages(
+    source: sqlite3.Connection,
+    target_path: str,
+    pages_per_step: int,
+    step_sleep: float,
+    progress: Optional[BackupProgressFunc],
+) -> int:
+    copied = 0
+    restarts = 0
+
+    def on_step(status: int, remaining: int, total: int) -> None:
+        nonlocal copied, restarts
+        if total - remaining < copied:
+            restarts += 1
+            if restarts > BACKUP_MAX_RESTARTS:
+                raise _TooManyRestarts()
+        copied = total - remaining
+        if progress is not None:
+            progress(copied, total)
+        if remaining and step_sleep > 0:
+            # The source is not locked between steps; let writers through.
+            time.sleep(step_sleep)
+
+    target = sqlite3.connect(target_path)
+    try:
+        try:
+            source.backup(target, pages=pages_per_step, progress=on_step)
+        except _TooManyRestarts:
+            copied = 0
+            source.backup(target, pages=-1, progress=on_step)
+    finally:
+        target.close()
+    return copied
+
+
+def _compress(source_path: str, snapshot_path: str) -> None:
+    partial_path = snapshot_path + ".partial"
+    with open(source_path, "rb") as source, gzip.open(partial_path, "wb", compresslevel=6) as out:
+        shutil.copyfileobj(source, out, 1024 * 1024)
+    os.replace(partial_path, snapshot_path)
+
+
+def _snapshot_partitions(
+    archive_dir: Optional[str],
+    target_dir: str,
+    pages_per_step: int,
+    step_sleep: float,
+) -> List[str]:
+    """Copy and compress every archive partition into target_dir; return the snapshots."""
+    partitions = list_partitions(archive_dir)
+    if not partitions:
+        return []
+    partial_dir = target_dir + ".partial"
+    shutil.rmtree(partial_dir, ignore_errors=True)
+    os.makedirs(partial_dir)
+    try:
+        for _, path in partitions:
+            copy_path = os.path.join(partial_dir, os.path.basename(path))
+            source = sqlite3.connect(path)
+            try:
+                _copy_pages(source, copy_path, pages_per_step, step_sleep, None)
+            finally:
+                source.close()
+            _compress(copy_path, copy_path + ".gz")
+            os.remove(copy_path)
+        os.replace(partial_dir, target_dir)
+    finally:
+        shutil.rmtree(partial_dir, ignore_errors=True)
+    return [os.path.join(target_dir, os.path.basename(path) + ".gz") for _, path in partitions]
+
+
+def backup_database(
+    backup_dir: str,
+    keep: int = BACKUP_KEEP,
+    database_path: Optional[str] = None,
+    pages_per_step: int = BACKUP_PAGES_PER_STEP,
+    step_sleep: float = BACKUP_STEP_SLEEP_SECONDS,
+    progress: Optional[BackupProgressFunc] = None,
+    archive_dir: Optional[str] = None,
+) -> BackupReport:
+    """
+    Write a compressed snapshot of the database and its archive partitions and
+    apply the retention count.
+
+    Blocks the calling thread; async code should use create_backup.
+    """
+    database_path = database_path or storage_db.DB_PATH
+    os.makedirs(backup_dir, exist_ok=True)
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S-%f")
+    snapshot_path = os.path.join(
+        backup_dir, f"{_database_stem(database_path)}-{timestamp}{_SUFFIX}"
+    )
+
+    started = time.perf_counter()
+    handle, copy_path = tempfile.mkstemp(suffix=".sqlite", dir=backup_dir)
+    os.close(handle)
+    try:
+        source = sqlite3.connect(database_path)
+        try:
+            pages = _copy_pages(source, copy_path, pages_per_step, step_sleep, progress)
+        finally:
+            source.close()
+        database_bytes = os.path.getsize(copy_path)
+        partitions = _snapshot_partitions(
+            archive_dir, archive_snapshot_dir(snapshot_path), pages_per_step, step_sleep
+        )
+        _compress(copy_path, snapshot_path)
+    finally:
+        os.remove(copy_path)
+    seconds = time.perf_counter() - started
+
+    pruned = prune_backups(backup_dir, keep, database_path)
+    return BackupReport(
+        path=snapshot_path,
+        pages=pages,
+        database_bytes=database_bytes,
+        snapshot_bytes=os.path.getsize(snapshot_path),
+        seconds=seconds,
+        pruned=len(pruned),
+        partitions=partitions,
+    )
+
+
+async def create_backup(
+    backup_dir: str,
+    keep: int = BACKUP_KEEP,
+    database_path: Optional[str] = None,
+    pages_per_step: int = BACKUP_PAGES_PER_STEP,
+    step_sleep: float = BACKUP_STEP_SLEEP_SECONDS,
+    progress: Optional[BackupProgressFunc] = None,
+    archive_dir: Optional[str] = None,
+) -> BackupReport:
+    """Run backup_database in a worker thread."""
+    return await asyncio.to_thread(
+        backup_database,
+        backup_dir,
+        keep,
+        database_path,
+        pages_per_step,
+        step_sleep,
+        progress,
+        archive_dir,
+    )
+
+
+def _unpack(snapshot_path: str, directory: str) -> str:
+    """Decompress a snapshot next to its target and check it; return the copy."""
+    handle, copy_path = tempfile.mkstemp(suffix=".sqlite", dir=directory)
+    try:
+        with os.fdopen(handle, "wb") as out, gzip.open(snapshot_path, "rb") as source:
+            shutil.copyfileobj(source, out, 1024 * 1024)
+        snapshot = sqlite3.connect(copy_path)
+        try:
+            status = snapshot.execute("PRAGMA integrity_check").fetchone()
+        finally:
+            snapshot.close()
+        if status is None or status[0] != "ok":
+            raise ValueError(f"snapshot {snapshot_path} failed the integrity check")
+    except BaseException:
+        os.remove(copy_path)
+        raise
+    return copy_path
+
+
+def _load(copy_path: str, database_path: str) -> int:
+    snapshot = sqlite3.connect(copy_path)
+    try:
+        pages = int(snapshot.execute("PRAGMA page_count").fetchone()[0])
+        target = sqlite3.connect(database_path)
+        try:
+            snapshot.backup(target)
+        finally:
+            target.close()
+    finally:
+        snapshot.close()
+    return pages
+
+
+def restore_backup(
+    snapshot_path: str,
+    database_path: Optional[str] = None,
+    archive_dir: Optional[str] = None,
+) -> int:
+    """
+    Replace the contents of the database with a snapshot and return its page count.
+
+    With archive_dir, the archive partitions taken with the snapshot replace
+    the partitions of the same years. Every file is checked with PRAGMA
+    integrity_check before anything is overwritten. Run this only while the
+    bot is stopped.
+    """
+    database_path = database_path or storage_db.DB_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(database_path)), exist_ok=True)
+    targets: List[Tuple[str, str]] = [(snapshot_path, database_path)]
+    partitions_dir = archive_snapshot_dir(snapshot_path)
+    if archive_dir and os.path.isdir(partitions_dir):
+        os.makedirs(archive_dir, exist_ok=True)
+        for path in sorted(Path(partitions_dir).glob("invoices-*.sqlite.gz")):
+            targets.append((str(path), os.path.join(archive_dir, path.name[: -len(".gz")])))
+
+    copies: List[Tuple[str, str]] = []
+    try:
+        for source_path, target_path in targets:
+            directory = os.path.dirname(os.path.abspath(target_path))
+            copies.append((_unpack(source_path, directory), target_path))
+        pages = _load(*copies[0])
+        for copy_path, target_path in copies[1:]:
+            _load(copy_path, target_path)
+        return pages
+    finally:
+        for copy_path, _ in copies:
+            os.remove(copy_path)
+
+
+__all__ = [
+    "BACKUP_KEEP",
+    "BACKUP_MAX_RESTARTS",
+    "BACKUP_PAGES_PER_STEP",
+    "BACKUP_STEP_SLEEP_SECONDS",
+    "BackupProgressFunc",
+    "BackupReport",
+    "archive_snapshot_dir",
+    "backup_database",
+    "create_backup",
+    "list_backups",
+    "prune_backups",
+    "restore_backup",
+]
@@ -0,0 +1,132 @@
+"""
+Backfill of invoices.date_iso from the free-text invoices.date column.
+
+Invoices saved by old versions of the bot may carry only the date as the OCR
+returned it. backfill_date_iso parses those with to_iso, batch_size invoices
+per short write transaction with a pause in between, and fills date_iso so
+listings can filter and sort on date_iso alone. Dates that cannot be parsed
+into a real calendar day are left alone and reported.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiosqlite
+
+from backend.storage import db as storage_db
+from backend.storage.mappers import invoice_dedup_key
+
+DATE_BACKFILL_BATCH_SIZE = 500
+DATE_BACKFILL_PAUSE_SECONDS = 0.05
+
+# The dedup key includes date_iso, so it is recomputed together with it. A key
+# that another invoice already holds is cleared, as migration 0009 did for the
+# duplicates it found.
+_UPDATE_SQL = """
+    UPDATE invoices
+    SET date_iso = :date_iso,
+        dedup_key = (
+            SELECT :dedup_key WHERE NOT EXISTS (
+                SELECT 1 FROM invoices WHERE dedup_key = :dedup_key AND id <> :id
+            )
+        )
+    WHERE id = :id AND date_iso IS NULL
+"""
+
+
+@dataclass
+class DateBackfillReport:
+    """
+    Invoices whose date_iso was filled, and (id, date) of those left undated.
+    """
+
+    updated: int = 0
+    unparsed: List[Tuple[int, str]] = field(default_factory=list)
+    duplicates: List[int] = field(default_factory=list)
+
+
+def parse_legacy_date(value: Optional[str]) -> Optional[str]:
+    """Return value as YYYY-MM-DD, or None unless it names a real calendar day."""
+    iso = storage_db.to_iso(value)
+    if iso is None:
+        return None
+    try:
+        return date.fromisoformat(iso).isoformat()
+    except ValueError:
+        return None
+
+
+async def backfill_date_iso(
+    batch_size: int = DATE_BACKFILL_BATCH_SIZE,
+    pause_seconds: float = DATE_BACKFILL_PAUSE_SECONDS,
+    database_path: Optional[str] = None,
+) -> DateBackfillReport:
+    """
+    Fill date_iso of invoices that have a date string but no date_iso.
+
+    Updating date_iso fires the rollup and change log triggers like any other
+    edit, so supplier_monthly_spend moves the invoices to their month. Running
+    it again only revisits the invoices whose date could not be parsed.
+    """
+    report = DateBackfillReport()
+    connection = await aiosqlite.connect(database_path or storage_db.DB_PATH)
+    try:
+        last_id = 0
+        while True:
+            await connection.execute("BEGIN IMMEDIATE")
+            cursor = await connection.execute(
+                """
+                SELECT id, date, user_id, supplier, doc_number, total_minor
+                FROM invoices
+                WHERE id > ? AND date_iso IS NULL AND COALESCE(date, '') <> ''
+                ORDER BY id
+                LIMIT ?
+                """,
+                (last_id, batch_size),
+            )
+            rows = list(await cursor.fetchall())
+            updates: List[Dict[str, Any]] = []
+            for invoice_id, raw_date, user_id, supplier, doc_number, total_minor in rows:
+                date_iso = parse_legacy_date(raw_date)
+                if date_iso is None:
+                    report.unparsed.append((int(invoice_id), str(raw_date)))
+                    continue
+                dedup_key = invoice_dedup_key(user_id, supplier, doc_number, date_iso, total_minor)
+                updates.append({"id": invoice_id, "date_iso": date_iso, "dedup_key": dedup_key})
+            for update in updates:
+                await connection.execute(_UPDATE_SQL, update)
+            keyed = [update["id"] for update in updates if update["dedup_key"] is not None]
+            if keyed:
+                placeholders = ",".join("?" * len(keyed))
+                cursor = await connection.execute(
+                    f"""
+                    SELECT id FROM invoices
+                    WHERE id IN ({placeholders}) AND dedup_key IS NULL
+                    ORDER BY id
+                    """,
+                    keyed,
+                )
+                report.duplicates.extend(int(row[0]) for row in await cursor.fetchall())
+            await connection.commit()
+            report.updated += len(updates)
+            if len(rows) < batch_size:
+                break
+            last_id = int(rows[-1][0])
+            if pause_seconds > 0:
+                await asyncio.sleep(pause_seconds)
+    finally:
+        await connection.close()
+    return report
+
+
+__all__ = [
+    "DATE_BACKFILL_BATCH_SIZE",
+    "DATE_BACKFILL_PAUSE_SECONDS",
+    "DateBackfillReport",
+    "backfill_date_iso",
+    "parse_legacy_date",
+]
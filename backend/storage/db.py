@@ -1,30 +1,59 @@
 """
 Synchronous database utilities and Alembic-based schema initialization.
 
-This module exposes DB_PATH and init_db used by the rest of the application.
+This module exposes DB_PATH and init_db used by the rest of the application,
+and SyncInvoiceStorage behind the blocking save_invoice_domain and
+fetch_invoices_domain helpers.
 """
 
 from __future__ import annotations
 
+import logging
 import re
 import sqlite3
+import threading
+from contextlib import contextmanager
 from datetime import date
+from decimal import Decimal
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
 
 from alembic import command
 from alembic.config import Config
 
 from backend import config
 from backend.domain.invoices import Invoice
+from backend.storage import archive as storage_archive
 from backend.storage.mappers import (
+    MONEY_SCALE,
+    QUANTITY_SCALE,
     db_row_to_invoice,
+    invoice_dedup_key,
     invoice_item_to_db_row,
     invoice_to_db_row,
+    raw_text_to_db_row,
+    to_units,
+    unit_scale,
+)
+from backend.storage.sql import (
+    INSERT_COMMENT_SQL,
+    INSERT_INVOICE_RAW_SQL,
+    INSERT_INVOICE_SQL,
+    INSERT_ITEM_SQL,
+    SELECT_INVOICE_ID_BY_DEDUP_KEY_SQL,
+    comment_rows,
+    fetch_invoices_query,
+    merge_fetched_invoices,
+    select_invoice_items_sql,
 )
 
 DB_PATH: str = config.DB_PATH
 
+logger = logging.getLogger("storage.invoices")
+
+# Idle sqlite3 connections kept by the sync storage API.
+SYNC_POOL_SIZE = 4
+
 
 def _get_alembic_config() -> Config:
     """
@@ -138,6 +167,16 @@ def to_iso(d: Optional[str]) -> Optional[str]:
     return None
 
 
+def _number_to_units(value: Any, scale: int) -> Optional[int]:
+    if value is None:
+        return None
+    return to_units(Decimal(str(value)), scale)
+
+
+def _number_scale(value: Any, default: int) -> int:
+    return unit_scale(Decimal(str(value)), default)
+
+
 def save_invoice(
     user_id: int,
     parsed: Dict[str, Any],
@@ -148,38 +187,57 @@ def save_invoice(
     con = _conn()
     cur = con.cursor()
     iso = to_iso(parsed.get("date"))
+    total_minor = _number_to_units(parsed.get("total_sum"), MONEY_SCALE)
+    dedup_key = invoice_dedup_key(
+        user_id, parsed.get("supplier"), parsed.get("doc_number"), iso, total_minor
+    )
     cur.execute(
-        """
-        INSERT INTO invoices(user_id, supplier, client, doc_number, date, date_iso, total_sum, raw_text, source_path)
-        VALUES(?,?,?,?,?,?,?,?,?)
-    """,
-        (
-            user_id,
-            parsed.get("supplier"),
-            parsed.get("client"),
-            parsed.get("doc_number"),
-            parsed.get("date"),
-            iso,
-            parsed.get("total_sum"),
-            raw_text or "",
-            source_path,
-        ),
+        INSERT_INVOICE_SQL,
+        {
+            "user_id": user_id,
+            "supplier": parsed.get("supplier"),
+            "client": parsed.get("client"),
+            "doc_number": parsed.get("doc_number"),
+            "date": parsed.get("date"),
+            "date_iso": iso,
+            "total_sum": parsed.get("total_sum"),
+            "total_minor": total_minor,
+            "raw_text": "",
+            "source_path": source_path,
+            "dedup_key": dedup_key,
+        },
     )
+    if cur.rowcount == 0:
+        # Same dedup key as a stored invoice: keep the stored one, as insert_invoice does.
+        existing = con.execute(SELECT_INVOICE_ID_BY_DEDUP_KEY_SQL, (dedup_key,)).fetchone()
+        con.close()
+        logger.warning(f"[STORAGE] duplicate invoice not saved again, existing id={existing[0]}")
+        return int(existing[0])
     invoice_id = cur.lastrowid
+    if raw_text and invoice_id is not None:
+        cur.execute(INSERT_INVOICE_RAW_SQL, raw_text_to_db_row(invoice_id, raw_text))
     for i, it in enumerate(parsed.get("items") or [], 1):
+        qty, price = it.get("qty") or 0, it.get("price") or 0
+        qty_scale = _number_scale(qty, QUANTITY_SCALE)
+        price_scale = _number_scale(price, MONEY_SCALE)
         cur.execute(
             """
-            INSERT INTO invoice_items(invoice_id, idx, code, name, qty, price, total)
-            VALUES(?,?,?,?,?,?,?)
+            INSERT INTO invoice_items(invoice_id, idx, code, name, qty, price, total, qty_milli, price_minor, total_minor, qty_scale, price_scale)
+            VALUES(?,?,?,?,?,?,?,?,?,?,?,?)
         """,
             (
                 invoice_id,
                 i,
                 it.get("code") or "",
                 it.get("name") or "",
-                float(it.get("qty") or 0),
-                float(it.get("price") or 0),
+                float(qty),
+                float(price),
                 float(it.get("total") or 0),
+                _number_to_units(qty, qty_scale),
+                _number_to_units(price, price_scale),
+                _number_to_units(it.get("total") or 0, MONEY_SCALE),
+                qty_scale,
+                price_scale,
             ),
         )
     for text in comments or []:
@@ -207,57 +265,233 @@ _invoice_item_to_db_row = invoice_item_to_db_row
 _rowset_to_invoice = db_row_to_invoice
 
 
-def _run_async(coro) -> Any:
+class _ConnectionPool:
     """
-    Helper to run async coroutine from sync context.
-    Handles both cases: when event loop is running and when it's not.
+    Reusable sqlite3 connections for the sync storage API.
+
+    A connection is lent to one caller at a time, so the pool can be shared by
+    threads; at most max_idle connections are kept open between calls.
     """
-    import asyncio
-    import threading
-    from typing import cast
 
+    def __init__(self, database_path: str, max_idle: int = SYNC_POOL_SIZE) -> None:
+        self.database_path = database_path
+        self._max_idle = max_idle
+        self._idle: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    def _open(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.database_path, check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            connection = self._idle.pop() if self._idle else None
+        if connection is None:
+            connection = self._open()
+        try:
+            yield connection
+        except BaseException:
+            connection.rollback()
+            raise
+        finally:
+            with self._lock:
+                keep = len(self._idle) < self._max_idle
+                if keep:
+                    self._idle.append(connection)
+            if not keep:
+                connection.close()
+
+    def idle(self) -> int:
+        with self._lock:
+            return len(self._idle)
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+
+@contextmanager
+def _attached_partition(connection: sqlite3.Connection, year: int, path: str) -> Iterator[str]:
+    """Blocking counterpart of archive.attached_partition."""
+    schema = storage_archive.partition_schema(year)
+    connection.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
     try:
-        asyncio.get_running_loop()
-    except RuntimeError:
-        return cast(Any, asyncio.run(coro))
-    else:
-        # Event loop is running, run in a new thread with a new event loop
-        # This is needed when sync functions are called from async context (e.g., in tests)
-        result: Any = None
-        exception: Exception | None = None
-
-        def run_in_thread() -> None:
-            nonlocal result, exception
-            try:
-                new_loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(new_loop)
-                result = new_loop.run_until_complete(coro)
-                new_loop.close()
-            except Exception as e:
-                exception = e
-
-        thread = threading.Thread(target=run_in_thread)
-        thread.start()
-        thread.join()
-
-        if exception:
-            raise exception
-        return cast(Any, result)
+        yield schema
+    finally:
+        connection.execute(f"DETACH DATABASE {schema}")
 
 
-def save_invoice_domain(invoice: Invoice, user_id: int = 0) -> int:
+def _fetch_invoice_rows(
+    connection: sqlite3.Connection,
+    schema: str,
+    from_date: Optional[date],
+    to_date: Optional[date],
+    supplier: Optional[str],
+) -> List[Tuple[Mapping[str, Any], Invoice]]:
+    """Run the fetch_invoices query on one schema; returns header rows with their invoices."""
+    query, parameters = fetch_invoices_query(from_date, to_date, supplier, schema=schema)
+    items_sql = select_invoice_items_sql(schema)
+    rows: List[Tuple[Mapping[str, Any], Invoice]] = []
+    for header_row in connection.execute(query, parameters).fetchall():
+        item_rows = connection.execute(items_sql, (header_row["id"],)).fetchall()
+        header = dict(header_row)
+        rows.append((header, db_row_to_invoice(header, [dict(row) for row in item_rows])))
+    return rows
+
+
+class SyncInvoiceStorage:
     """
-    Persist a domain Invoice into the database and return the created invoice ID.
+    Blocking counterpart of AsyncInvoiceStorage for scripts and legacy callers.
 
-    This is a thin wrapper over AsyncInvoiceStorage.save_invoice for backward compatibility.
-    All SQL logic is in the async layer.
+    Runs the same SQL (backend.storage.sql) and mappers on pooled sqlite3
+    connections, so a call costs one query round-trip instead of a new event
+    loop, thread and connection. With archive_dir it reads the archive
+    partitions like AsyncInvoiceStorage does.
     """
-    from typing import cast
 
-    from backend.storage.db_async import AsyncInvoiceStorage
+    def __init__(
+        self,
+        database_path: str,
+        archive_dir: Optional[str] = None,
+        pool_size: int = SYNC_POOL_SIZE,
+    ) -> None:
+        self._pool = _ConnectionPool(database_path, max_idle=pool_size)
+        self._archive_dir = archive_dir
+
+    @property
+    def database_path(self) -> str:
+        return self._pool.database_path
+
+    def _find_archived(
+        self, connection: sqlite3.Connection, db_row: Mapping[str, Any]
+    ) -> Optional[int]:
+        """ID of an archived copy of the invoice; only the partition of its year can hold one."""
+        dedup_key, date_iso = db_row["dedup_key"], db_row["date_iso"]
+        prefix = date_iso[:4] if date_iso else ""
+        if dedup_key is None or not prefix.isdigit():
+            return None
+        for year, path in storage_archive.list_partitions(self._archive_dir):
+            if year != int(prefix):
+                continue
+            with _attached_partition(connection, year, path) as schema:
+                row = connection.execute(
+                    f"SELECT id FROM {schema}.invoices WHERE dedup_key=?", (dedup_key,)
+                ).fetchone()
+            if row is not None:
+                logger.warning(f"[STORAGE] duplicate invoice not saved again, archived id={row[0]}")
+                return int(row[0])
+        return None
+
+    def save_invoice(self, invoice: Invoice, user_id: int = 0) -> int:
+        """
+        Insert invoice, items, and comments in a single transaction.
+
+        Like AsyncInvoiceStorage.save_invoice, a duplicate, also one in an
+        archive partition, returns the stored ID.
+        """
+        invoice_id, _ = self.store_invoice(invoice, user_id)
+        return invoice_id
+
+    def store_invoice(self, invoice: Invoice, user_id: int = 0) -> Tuple[int, bool]:
+        """Like save_invoice, but return (ID, inserted) as AsyncInvoiceStorage.store_invoice."""
+        with self._pool.connection() as connection:
+            db_row = invoice_to_db_row(invoice, user_id=user_id)
+            # Partitions are attached before the write transaction starts.
+            archived_id = self._find_archived(connection, db_row)
+            if archived_id is not None:
+                return archived_id, False
+            existing = connection.execute(
+                SELECT_INVOICE_ID_BY_DEDUP_KEY_SQL, (db_row["dedup_key"],)
+            ).fetchone()
+            if existing is None:
+                cursor = connection.execute(INSERT_INVOICE_SQL, db_row)
+                if cursor.rowcount == 0:
+                    existing = connection.execute(
+                        SELECT_INVOICE_ID_BY_DEDUP_KEY_SQL, (db_row["dedup_key"],)
+                    ).fetchone()
+            if existing is not None:
+                connection.rollback()
+                logger.warning(
+                    f"[STORAGE] duplicate invoice not saved again, existing id={existing[0]}"
+                )
+                return int(existing[0]), False
+            invoice_id = cursor.lastrowid
+            if invoice_id is None:
+                connection.rollback()
+                return 0, False
+            if invoice.items:
+                connection.executemany(
+                    INSERT_ITEM_SQL,
+                    [
+                        invoice_item_to_db_row(invoice_id, item, index)
+                        for index, item in enumerate(invoice.items, 1)
+                    ],
+                )
+            if invoice.comments:
+                connection.executemany(
+                    INSERT_COMMENT_SQL, comment_rows(invoice_id, invoice, user_id)
+                )
+            if invoice.raw_text:
+                connection.execute(
+                    INSERT_INVOICE_RAW_SQL, raw_text_to_db_row(invoice_id, invoice.raw_text)
+                )
+            connection.commit()
+            return int(invoice_id), True
+
+    def fetch_invoices(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        supplier: Optional[str] = None,
+    ) -> List[Invoice]:
+        """
+        Fetch invoices matching the date range and optional supplier filter.
+
+        Archive partitions overlapping the range are attached one at a time and
+        their invoices are merged into the result in the same order.
+        """
+        with self._pool.connection() as connection:
+            rows = _fetch_invoice_rows(connection, "main", from_date, to_date, supplier)
+            partitions = storage_archive.partitions_for_range(self._archive_dir, from_date, to_date)
+            if not partitions:
+                return [invoice for _, invoice in rows]
+            for year, path in partitions:
+                with _attached_partition(connection, year, path) as schema:
+                    rows.extend(
+                        _fetch_invoice_rows(connection, schema, from_date, to_date, supplier)
+                    )
+            return merge_fetched_invoices(rows, from_date, to_date)
+
+    def close(self) -> None:
+        self._pool.close()
+
+
+_sync_storage: Optional[SyncInvoiceStorage] = None
+_sync_storage_lock = threading.Lock()
+
 
-    storage = AsyncInvoiceStorage(database_path=DB_PATH)
-    return cast(int, _run_async(storage.save_invoice(invoice, user_id=user_id)))
+def _get_sync_storage() -> SyncInvoiceStorage:
+    """Return the shared sync storage for the current DB_PATH."""
+    global _sync_storage
+    with _sync_storage_lock:
+        if _sync_storage is None or _sync_storage.database_path != DB_PATH:
+            if _sync_storage is not None:
+                _sync_storage.close()
+            _sync_storage = SyncInvoiceStorage(DB_PATH, archive_dir=config.ARCHIVE_DIR)
+        return _sync_storage
+
+
+def save_invoice_domain(invoice: Invoice, user_id: int = 0) -> int:
+    """
+    Persist a domain Invoice into the database and return the created invoice ID.
+
+    Blocks the calling thread; async code should use save_invoice_domain_async.
+    """
+    return _get_sync_storage().save_invoice(invoice, user_id=user_id)
 
 
 def fetch_invoices_domain(
@@ -268,15 +502,8 @@ def fetch_invoices_domain(
     """
     Fetch invoices from the database and return them as domain Invoice entities.
 
-    This is a thin wrapper over AsyncInvoiceStorage.fetch_invoices for backward compatibility.
-    All SQL logic is in the async layer.
+    Blocks the calling thread; async code should use fetch_invoices_domain_async.
     """
-    from typing import cast
-
-    from backend.storage.db_async import AsyncInvoiceStorage
-
-    storage = AsyncInvoiceStorage(database_path=DB_PATH)
-    return cast(
-        List[Invoice],
-        _run_async(storage.fetch_invoices(from_date=from_date, to_date=to_date, supplier=supplier)),
+    return _get_sync_storage().fetch_invoices(
+        from_date=from_date, to_date=to_date, supplier=supplier
     )
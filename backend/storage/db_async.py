@@ -1,18 +1,369 @@
 from __future__ import annotations
 
+import logging
 from datetime import date
-from typing import Any, List, Optional, Tuple
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+)
 
 import aiosqlite
 
-from backend.domain.invoices import Invoice
+from backend.config import ARCHIVE_DIR
+from backend.domain.invoices import (
+    Invoice,
+    InvoiceChange,
+    InvoiceCursor,
+    InvoicePage,
+    InvoiceSummaryPage,
+    InvoiceTotals,
+    SupplierMonthlySpend,
+)
+from backend.storage.archive import (
+    attached_partition,
+    find_archived_duplicates,
+    list_partitions,
+    partition_schema,
+    partitions_for_range,
+)
 from backend.storage.db import DB_PATH
 from backend.storage.mappers import (
+    db_payload_to_raw_text,
     db_row_to_invoice,
+    db_row_to_invoice_change,
+    db_row_to_invoice_summary,
+    db_row_to_invoice_totals,
+    db_row_to_supplier_spend,
     invoice_item_to_db_row,
     invoice_to_db_row,
+    raw_text_to_db_row,
+)
+from backend.storage.sql import (
+    DELETE_INVOICE_CHANGES_SQL,
+    HEADER_COLUMNS,
+    INSERT_COMMENT_SQL,
+    INSERT_INVOICE_RAW_SQL,
+    INSERT_INVOICE_SQL,
+    INSERT_ITEM_SQL,
+    SELECT_INVOICE_CHANGES_SQL,
+    SELECT_INVOICE_ID_BY_DEDUP_KEY_SQL,
+    comment_rows,
+    fetch_invoices_query,
+    merge_fetched_invoices,
+    select_invoice_items_sql,
+    select_invoice_raw_sql,
+)
+
+logger = logging.getLogger("storage.invoices")
+
+
+async def _find_duplicate(cursor: aiosqlite.Cursor, dedup_key: str) -> Optional[int]:
+    await cursor.execute(SELECT_INVOICE_ID_BY_DEDUP_KEY_SQL, (dedup_key,))
+    row = await cursor.fetchone()
+    if row is None:
+        return None
+    logger.warning(f"[STORAGE] duplicate invoice not saved again, existing id={row[0]}")
+    return int(row[0])
+
+
+async def archived_duplicates(
+    invoices: Iterable[Invoice], user_id: int, archive_dir: Optional[str]
+) -> Dict[str, int]:
+    """
+    Dedup keys of the invoices that an archive partition already holds, with the archived IDs.
+
+    Pass the result to insert_invoice, so that an invoice moved out of the main
+    database is not saved a second time. Call it before opening the write
+    transaction.
+    """
+    if not archive_dir:
+        return {}
+    keys = []
+    for invoice in invoices:
+        db_row = invoice_to_db_row(invoice, user_id=user_id)
+        if db_row["dedup_key"] is not None:
+            keys.append((db_row["dedup_key"], db_row["date_iso"]))
+    return await find_archived_duplicates(archive_dir, keys) if keys else {}
+
+
+async def insert_invoice(
+    cursor: aiosqlite.Cursor,
+    invoice: Invoice,
+    user_id: int,
+    archived: Optional[Mapping[str, int]] = None,
+) -> Tuple[int, bool]:
+    """
+    Insert one invoice with its items and comments using the given cursor.
+
+    Items and comments are written with executemany so that each invoice costs a
+    constant number of round-trips to the aiosqlite worker thread. The caller owns
+    the transaction. An invoice already stored under the same dedup key, in the
+    main database or in archived (see archived_duplicates), is not inserted
+    again. Returns the invoice ID and whether it was inserted; for a duplicate
+    that is the ID of the stored copy and False. Raw OCR text goes compressed
+    into invoice_raw.
+    """
+    db_row = invoice_to_db_row(invoice, user_id=user_id)
+    dedup_key = db_row["dedup_key"]
+    if dedup_key is not None:
+        if archived and dedup_key in archived:
+            logger.warning(
+                f"[STORAGE] duplicate invoice not saved again, archived id={archived[dedup_key]}"
+            )
+            return archived[dedup_key], False
+        existing_id = await _find_duplicate(cursor, dedup_key)
+        if existing_id is not None:
+            return existing_id, False
+
+    await cursor.execute(INSERT_INVOICE_SQL, db_row)
+    if cursor.rowcount == 0:
+        # Another connection stored the same invoice after the lookup above.
+        return await _find_duplicate(cursor, dedup_key) or 0, False
+
+    invoice_id = cursor.lastrowid
+    if invoice_id is None:
+        return 0, False
+
+    if invoice.items:
+        await cursor.executemany(
+            INSERT_ITEM_SQL,
+            [
+                invoice_item_to_db_row(invoice_id, item, index)
+                for index, item in enumerate(invoice.items, 1)
+            ],
+        )
+
+    if invoice.comments:
+        await cursor.executemany(INSERT_COMMENT_SQL, comment_rows(invoice_id, invoice, user_id))
+
+    if invoice.raw_text:
+        await cursor.execute(
+            INSERT_INVOICE_RAW_SQL, raw_text_to_db_row(invoice_id, invoice.raw_text)
+        )
+
+    return int(invoice_id), True
+
+
+DEFAULT_PAGE_SIZE = 20
+DEFAULT_ITER_BATCH_SIZE = 200
+DEFAULT_CHANGES_BATCH_SIZE = 500
+
+# Listings are ordered by (date_iso, id) along idx_invoices_date_iso; invoices
+# without a date sort first, and their cursors carry an empty date_iso.
+_LISTING_SORT_KEY = "COALESCE(date_iso, '')"
+
+# Item counts come from the (invoice_id, idx) index, so items are never read.
+_ITEM_COUNT_SQL = (
+    "(SELECT COUNT(*) FROM {schema}.invoice_items AS items WHERE items.invoice_id = invoices.id)"
 )
 
+# Listing columns may name other tables through a {schema} placeholder, filled
+# with main or an attached archive partition.
+_SUMMARY_COLUMNS = (
+    f"id, date_iso, doc_number, supplier, total_sum, total_minor, {_ITEM_COUNT_SQL} AS item_count"
+)
+
+
+def _listing_filter(
+    from_date: Optional[date],
+    to_date: Optional[date],
+    supplier: Optional[str],
+    schema: str = "main",
+) -> Tuple[List[str], List[Any]]:
+    """Build WHERE clauses and parameters shared by the paginated listing queries."""
+    clauses: List[str] = []
+    parameters: List[Any] = []
+    if from_date:
+        clauses.append("date_iso >= ?")
+        parameters.append(from_date.isoformat())
+    if to_date:
+        clauses.append("date_iso <= ?")
+        parameters.append(to_date.isoformat())
+    if supplier:
+        clauses.append("supplier LIKE ?")
+        parameters.append(f"%{supplier}%")
+    if schema != "main":
+        # An interrupted archive run may leave an invoice in both databases.
+        clauses.append(
+            "NOT EXISTS (SELECT 1 FROM main.invoices AS current WHERE current.id = invoices.id)"
+        )
+    return clauses, parameters
+
+
+async def _listing_schemas(
+    connection: aiosqlite.Connection,
+    archive_dir: Optional[str],
+    from_date: Optional[date],
+    to_date: Optional[date],
+) -> AsyncIterator[str]:
+    """
+    Yield "main", then each archive partition overlapping the range.
+
+    A partition stays attached until the caller asks for the next schema, so at
+    most one is attached at a time; iterate to the end.
+    """
+    yield "main"
+    for year, path in partitions_for_range(archive_dir, from_date, to_date):
+        async with attached_partition(connection, year, path) as schema:
+            yield schema
+
+
+# One listing row and the schema it was read from.
+_ListingRow = Tuple[str, Dict[str, Any]]
+
+
+async def _fetch_keyset_rows(
+    connection: aiosqlite.Connection,
+    columns: str,
+    archive_dir: Optional[str],
+    from_date: Optional[date],
+    to_date: Optional[date],
+    supplier: Optional[str],
+    after: Optional[InvoiceCursor],
+    before: Optional[InvoiceCursor],
+    limit: int,
+) -> Tuple[List[_ListingRow], bool, bool]:
+    """
+    Fetch one page of invoice rows after or before a cursor.
+
+    Returns the rows in ascending (date_iso, id) order plus has_prev/has_next flags.
+    One extra row is requested to find out whether the listing continues. The
+    main database and every archive partition overlapping the range are read
+    with the same keyset query and the results are merged; invoice IDs are kept
+    when invoices are archived, so cursors stay valid across databases.
+    """
+    if after is not None and before is not None:
+        raise ValueError("Pass either 'after' or 'before', not both")
+    if limit < 1:
+        raise ValueError("limit must be positive")
+
+    # Undated invoices sort first (SQLite orders NULL before any value). Each
+    # cursor position is a sequence of (date_iso, id) index ranges read in listing
+    # order, so no step needs an OR that would defeat the index.
+    order = "ASC"
+    ranges: List[Tuple[str, List[Any]]] = [("", [])]
+    if after is not None:
+        if after.date_iso:
+            ranges = [("(date_iso, id) > (?, ?)", [after.date_iso, after.invoice_id])]
+        else:
+            ranges = [
+                ("date_iso IS NULL AND id > ?", [after.invoice_id]),
+                ("date_iso IS NOT NULL", []),
+            ]
+    elif before is not None:
+        order = "DESC"
+        if before.date_iso:
+            ranges = [
+                ("(date_iso, id) < (?, ?)", [before.date_iso, before.invoice_id]),
+                ("date_iso IS NULL", []),
+            ]
+        else:
+            ranges = [("date_iso IS NULL AND id < ?", [before.invoice_id])]
+
+    found: List[_ListingRow] = []
+    async for schema in _listing_schemas(connection, archive_dir, from_date, to_date):
+        clauses, parameters = _listing_filter(from_date, to_date, supplier, schema)
+        rows: List[Dict[str, Any]] = []
+        for clause, values in ranges:
+            where_clauses = [*clauses, clause] if clause else clauses
+            where = f"WHERE {' AND '.join(where_clauses)} " if where_clauses else ""
+            query = (
+                f"SELECT {columns.format(schema=schema)}, {_LISTING_SORT_KEY} AS sort_key "
+                f"FROM {schema}.invoices AS invoices "
+                f"{where}"
+                f"ORDER BY date_iso {order}, id {order} LIMIT ?"
+            )
+            cursor = await connection.execute(query, [*parameters, *values, limit + 1 - len(rows)])
+            rows.extend(dict(row) for row in await cursor.fetchall())
+            if len(rows) > limit:
+                break
+        found.extend((schema, row) for row in rows)
+
+    found.sort(key=lambda pair: (pair[1]["sort_key"], pair[1]["id"]), reverse=order == "DESC")
+    has_more = len(found) > limit
+    found = found[:limit]
+
+    if before is not None:
+        found.reverse()
+        return found, has_more, True
+    return found, after is not None, has_more
+
+
+def _row_cursor(row: _ListingRow) -> InvoiceCursor:
+    return InvoiceCursor(date_iso=row[1]["sort_key"], invoice_id=int(row[1]["id"]))
+
+
+async def _load_items(
+    connection: aiosqlite.Connection, schema: str, invoice_ids: List[int]
+) -> Dict[int, List[Dict[str, Any]]]:
+    placeholders = ",".join("?" for _ in invoice_ids)
+    items_cursor = await connection.execute(
+        f"SELECT * FROM {schema}.invoice_items "
+        f"WHERE invoice_id IN ({placeholders}) ORDER BY invoice_id ASC, idx ASC",
+        invoice_ids,
+    )
+    items_by_invoice: Dict[int, List[Dict[str, Any]]] = {}
+    for item_row in await items_cursor.fetchall():
+        items_by_invoice.setdefault(int(item_row["invoice_id"]), []).append(dict(item_row))
+    return items_by_invoice
+
+
+async def _hydrate_invoices(
+    connection: aiosqlite.Connection,
+    header_rows: List[_ListingRow],
+    archive_dir: Optional[str],
+) -> List[Invoice]:
+    """
+    Load items for a batch of header rows with one query per database and build
+    domain invoices; partitions holding some of the rows are attached again.
+    """
+    if not header_rows:
+        return []
+
+    ids_by_schema: Dict[str, List[int]] = {}
+    for schema, row in header_rows:
+        ids_by_schema.setdefault(schema, []).append(int(row["id"]))
+
+    items_by_invoice: Dict[int, List[Dict[str, Any]]] = {}
+    if "main" in ids_by_schema:
+        items_by_invoice.update(await _load_items(connection, "main", ids_by_schema["main"]))
+    for year, path in list_partitions(archive_dir):
+        if partition_schema(year) not in ids_by_schema:
+            continue
+        async with attached_partition(connection, year, path) as schema:
+            items_by_invoice.update(await _load_items(connection, schema, ids_by_schema[schema]))
+
+    return [
+        db_row_to_invoice(row, items_by_invoice.get(int(row["id"]), [])) for _, row in header_rows
+    ]
+
+
+async def _fetch_invoice_rows(
+    connection: aiosqlite.Connection,
+    schema: str,
+    from_date: Optional[date],
+    to_date: Optional[date],
+    supplier: Optional[str],
+) -> List[Tuple[Dict[str, Any], Invoice]]:
+    """Run the fetch_invoices query on one schema; returns header rows with their invoices."""
+    query, parameters = fetch_invoices_query(from_date, to_date, supplier, schema=schema)
+    header_cursor = await connection.execute(query, parameters)
+    items_sql = select_invoice_items_sql(schema)
+
+    rows: List[Tuple[Dict[str, Any], Invoice]] = []
+    for header_row in await header_cursor.fetchall():
+        items_cursor = await connection.execute(items_sql, (header_row["id"],))
+        item_dicts = [dict(item_row) for item_row in await items_cursor.fetchall()]
+        header_dict = dict(header_row)
+        rows.append((header_dict, db_row_to_invoice(header_dict, item_dicts)))
+    return rows
+
 
 class AsyncInvoiceStorage:
     """
@@ -21,9 +372,15 @@ class AsyncInvoiceStorage:
     This is the single source of truth for all SQL operations on invoices.
     """
 
-    def __init__(self, database_path: str) -> None:
-        """Initialize storage with the SQLite database path."""
+    def __init__(self, database_path: str, archive_dir: Optional[str] = None) -> None:
+        """
+        Initialize storage with the SQLite database path.
+
+        With archive_dir, the listings, totals and rebuild_supplier_spend also read
+        the year partitions written by backend.storage.archive.
+        """
         self._database_path = database_path
+        self._archive_dir = archive_dir
 
     async def _get_connection(self) -> aiosqlite.Connection:
         """Open an aiosqlite connection with dict-like row access."""
@@ -33,48 +390,52 @@ class AsyncInvoiceStorage:
 
     async def save_invoice(self, invoice: Invoice, user_id: int = 0) -> int:
         """Insert invoice, items, and comments in a single transaction."""
+        invoice_id, _ = await self.store_invoice(invoice, user_id)
+        return invoice_id
+
+    async def store_invoice(self, invoice: Invoice, user_id: int = 0) -> Tuple[int, bool]:
+        """
+        Like save_invoice, but return (ID, inserted).
+
+        inserted is False when the invoice was already stored (see import_invoices).
+        """
+        archived = await archived_duplicates([invoice], user_id, self._archive_dir)
         connection = await self._get_connection()
         try:
             cursor = await connection.cursor()
-            db_row = invoice_to_db_row(invoice, user_id=user_id)
-
-            await cursor.execute(
-                """
-                INSERT INTO invoices(user_id, supplier, client, doc_number, date, date_iso, total_sum, raw_text, source_path)
-                VALUES(:user_id, :supplier, :client, :doc_number, :date, :date_iso, :total_sum, :raw_text, :source_path)
-                """,
-                db_row,
-            )
+            saved = await insert_invoice(cursor, invoice, user_id, archived)
+            await connection.commit()
+            return saved
+        finally:
+            await connection.close()
 
-            invoice_id = cursor.lastrowid
-            if invoice_id is None:
-                await connection.close()
-                return 0
+    async def save_invoices(self, invoices: Iterable[Invoice], user_id: int = 0) -> List[int]:
+        """
+        Insert many invoices in a single transaction and return their IDs in order.
 
-            for index, item in enumerate(invoice.items, 1):
-                item_row = invoice_item_to_db_row(int(invoice_id), item, index)
-                await cursor.execute(
-                    """
-                    INSERT INTO invoice_items(invoice_id, idx, code, name, qty, price, total)
-                    VALUES(:invoice_id, :idx, :code, :name, :qty, :price, :total)
-                    """,
-                    item_row,
-                )
+        Intended for imports and backfills: either every invoice is persisted or none is.
+        """
+        return [invoice_id for invoice_id, _ in await self.import_invoices(invoices, user_id)]
 
-            for comment in invoice.comments:
-                comment_user_id = user_id
-                if comment.author:
-                    try:
-                        comment_user_id = int(comment.author)
-                    except (ValueError, TypeError):
-                        pass
-                await cursor.execute(
-                    "INSERT INTO comments(invoice_id, user_id, text) VALUES(?,?,?)",
-                    (invoice_id, comment_user_id, comment.message),
-                )
+    async def import_invoices(
+        self, invoices: Iterable[Invoice], user_id: int = 0
+    ) -> List[Tuple[int, bool]]:
+        """
+        Like save_invoices, but return (ID, inserted) pairs.
 
+        inserted is False for an invoice resolved to an already stored copy
+        through its dedup key, including a copy saved earlier in the same call.
+        """
+        invoices = list(invoices)
+        archived = await archived_duplicates(invoices, user_id, self._archive_dir)
+        connection = await self._get_connection()
+        try:
+            cursor = await connection.cursor()
+            saved: List[Tuple[int, bool]] = []
+            for invoice in invoices:
+                saved.append(await insert_invoice(cursor, invoice, user_id, archived))
             await connection.commit()
-            return int(invoice_id or 0)
+            return saved
         finally:
             await connection.close()
 
@@ -84,71 +445,352 @@ class AsyncInvoiceStorage:
         to_date: Optional[date],
         supplier: Optional[str] = None,
     ) -> List[Invoice]:
-        """Fetch invoices matching the date range and optional supplier filter."""
+        """
+        Fetch invoices matching the date range and optional supplier filter.
+
+        Archive partitions overlapping the range are attached one at a time and
+        their invoices are merged into the result in the same order.
+        """
         connection = await self._get_connection()
         try:
-            from_iso = from_date.isoformat() if from_date else None
-            to_iso = to_date.isoformat() if to_date else None
-
-            if from_iso and to_iso:
-                if supplier:
-                    query = (
-                        "SELECT id, date, date_iso, doc_number, supplier, client, total_sum, source_path "
-                        "FROM invoices "
-                        "WHERE COALESCE(date_iso, date) IS NOT NULL "
-                        "AND date_iso BETWEEN ? AND ? AND supplier LIKE ? "
-                        "ORDER BY COALESCE(date_iso, date) ASC, id ASC"
-                    )
-                    parameters: Tuple[Any, ...] = (from_iso, to_iso, f"%{supplier}%")
-                else:
-                    query = (
-                        "SELECT id, date, date_iso, doc_number, supplier, client, total_sum, source_path "
-                        "FROM invoices "
-                        "WHERE COALESCE(date_iso, date) IS NOT NULL "
-                        "AND date_iso BETWEEN ? AND ? "
-                        "ORDER BY COALESCE(date_iso, date) ASC, id ASC"
-                    )
-                    parameters = (from_iso, to_iso)
-            else:
-                if supplier:
-                    query = (
-                        "SELECT id, date, date_iso, doc_number, supplier, client, total_sum, source_path "
-                        "FROM invoices "
-                        "WHERE supplier LIKE ? "
-                        "ORDER BY created_at ASC, id ASC"
+            rows = await _fetch_invoice_rows(connection, "main", from_date, to_date, supplier)
+            partitions = partitions_for_range(self._archive_dir, from_date, to_date)
+            if not partitions:
+                return [invoice for _, invoice in rows]
+
+            for year, path in partitions:
+                async with attached_partition(connection, year, path) as schema:
+                    rows.extend(
+                        await _fetch_invoice_rows(connection, schema, from_date, to_date, supplier)
                     )
-                    parameters = (f"%{supplier}%",)
-                else:
-                    query = (
-                        "SELECT id, date, date_iso, doc_number, supplier, client, total_sum, source_path "
-                        "FROM invoices "
-                        "ORDER BY created_at ASC, id ASC"
+            return merge_fetched_invoices(rows, from_date, to_date)
+        finally:
+            await connection.close()
+
+    async def fetch_raw_text(self, invoice_id: int) -> Optional[str]:
+        """
+        Return the raw OCR text stored for an invoice, or None if there is none.
+
+        Listings never read invoice_raw; this is the only query that loads and
+        decompresses it. Archive partitions are searched when the invoice is no
+        longer in the main database.
+        """
+        connection = await self._get_connection()
+        try:
+            cursor = await connection.execute(select_invoice_raw_sql(), (invoice_id,))
+            row = await cursor.fetchone()
+            for year, path in list_partitions(self._archive_dir):
+                if row is not None:
+                    break
+                async with attached_partition(connection, year, path) as schema:
+                    cursor = await connection.execute(select_invoice_raw_sql(schema), (invoice_id,))
+                    row = await cursor.fetchone()
+            return db_payload_to_raw_text(row["payload"]) if row is not None else None
+        finally:
+            await connection.close()
+
+    async def fetch_invoice_page(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        supplier: Optional[str] = None,
+        after: Optional[InvoiceCursor] = None,
+        before: Optional[InvoiceCursor] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+    ) -> InvoicePage:
+        """
+        Fetch one page of invoices ordered by (date_iso, id).
+
+        Pass the last cursor of a page as ``after`` to get the next page, or the first
+        cursor as ``before`` to get the previous one. Only the page is loaded into memory.
+        """
+        connection = await self._get_connection()
+        try:
+            header_rows, has_prev, has_next = await _fetch_keyset_rows(
+                connection,
+                HEADER_COLUMNS,
+                self._archive_dir,
+                from_date,
+                to_date,
+                supplier,
+                after,
+                before,
+                limit,
+            )
+            invoices = await _hydrate_invoices(connection, header_rows, self._archive_dir)
+            return InvoicePage(
+                invoices=invoices,
+                first_cursor=_row_cursor(header_rows[0]) if header_rows else None,
+                last_cursor=_row_cursor(header_rows[-1]) if header_rows else None,
+                has_prev=has_prev,
+                has_next=has_next,
+            )
+        finally:
+            await connection.close()
+
+    async def iter_invoices(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        supplier: Optional[str] = None,
+        batch_size: int = DEFAULT_ITER_BATCH_SIZE,
+    ) -> AsyncIterator[Invoice]:
+        """
+        Stream invoices ordered by (date_iso, id), loading ``batch_size`` at a time.
+
+        Memory use depends on the batch size only, not on the size of the range.
+        """
+        connection = await self._get_connection()
+        try:
+            after: Optional[InvoiceCursor] = None
+            while True:
+                header_rows, _, has_next = await _fetch_keyset_rows(
+                    connection,
+                    HEADER_COLUMNS,
+                    self._archive_dir,
+                    from_date,
+                    to_date,
+                    supplier,
+                    after,
+                    None,
+                    batch_size,
+                )
+                for invoice in await _hydrate_invoices(connection, header_rows, self._archive_dir):
+                    yield invoice
+                if not has_next or not header_rows:
+                    break
+                after = _row_cursor(header_rows[-1])
+        finally:
+            await connection.close()
+
+    async def fetch_invoice_summary_page(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        supplier: Optional[str] = None,
+        after: Optional[InvoiceCursor] = None,
+        before: Optional[InvoiceCursor] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+    ) -> InvoiceSummaryPage:
+        """
+        Fetch one page of invoice header summaries ordered by (date_iso, id).
+
+        Works like fetch_invoice_page but never loads line items: the item count
+        is computed by SQLite.
+        """
+        connection = await self._get_connection()
+        try:
+            rows, has_prev, has_next = await _fetch_keyset_rows(
+                connection,
+                _SUMMARY_COLUMNS,
+                self._archive_dir,
+                from_date,
+                to_date,
+                supplier,
+                after,
+                before,
+                limit,
+            )
+            return InvoiceSummaryPage(
+                summaries=[db_row_to_invoice_summary(row) for _, row in rows],
+                first_cursor=_row_cursor(rows[0]) if rows else None,
+                last_cursor=_row_cursor(rows[-1]) if rows else None,
+                has_prev=has_prev,
+                has_next=has_next,
+            )
+        finally:
+            await connection.close()
+
+    async def summarize_invoices(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        supplier: Optional[str] = None,
+    ) -> InvoiceTotals:
+        """
+        Count invoices and items and sum invoice totals for a filter.
+
+        One aggregate query per database: the main one and each archive
+        partition overlapping the range.
+        """
+        connection = await self._get_connection()
+        try:
+            totals: Dict[str, Any] = {"invoice_count": 0, "item_count": 0, "total_minor": None}
+            async for schema in _listing_schemas(connection, self._archive_dir, from_date, to_date):
+                clauses, parameters = _listing_filter(from_date, to_date, supplier, schema)
+                where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+                cursor = await connection.execute(
+                    "SELECT COUNT(*), SUM(total_minor), "
+                    f"SUM({_ITEM_COUNT_SQL.format(schema=schema)}) "
+                    f"FROM {schema}.invoices AS invoices{where}",
+                    parameters,
+                )
+                row = await cursor.fetchone()
+                if row is None:
+                    continue
+                invoice_count, total_minor, item_count = row
+                totals["invoice_count"] += invoice_count or 0
+                totals["item_count"] += item_count or 0
+                if total_minor is not None:
+                    totals["total_minor"] = (totals["total_minor"] or 0) + total_minor
+            return db_row_to_invoice_totals(totals)
+        finally:
+            await connection.close()
+
+    async def fetch_supplier_spend(
+        self,
+        user_id: int,
+        from_month: Optional[str] = None,
+        to_month: Optional[str] = None,
+        supplier: Optional[str] = None,
+    ) -> List[SupplierMonthlySpend]:
+        """
+        Read per-supplier monthly spend for a user from the rollup table.
+
+        Months are inclusive YYYY-MM bounds. The query never touches invoices or
+        invoice_items, so its cost depends on the number of supplier/month pairs
+        rather than on the invoice history.
+        """
+        clauses = ["user_id = ?"]
+        parameters: List[Any] = [user_id]
+        if from_month:
+            clauses.append("month >= ?")
+            parameters.append(from_month)
+        if to_month:
+            clauses.append("month <= ?")
+            parameters.append(to_month)
+        if supplier:
+            clauses.append("supplier LIKE ?")
+            parameters.append(f"%{supplier}%")
+
+        connection = await self._get_connection()
+        try:
+            cursor = await connection.execute(
+                "SELECT supplier, month, invoice_count, total_sum, total_minor, item_count "
+                f"FROM supplier_monthly_spend WHERE {' AND '.join(clauses)} "
+                "ORDER BY month, supplier",
+                parameters,
+            )
+            rows = await cursor.fetchall()
+            return [db_row_to_supplier_spend(dict(row)) for row in rows]
+        finally:
+            await connection.close()
+
+    async def rebuild_supplier_spend(self) -> int:
+        """
+        Recompute the supplier monthly spend rollup from invoices.
+
+        Archived invoices are included. Runs in one transaction so readers never
+        observe a partially rebuilt table. Returns the number of rollup rows written.
+        """
+        connection = await self._get_connection()
+        try:
+            archived: List[Tuple[Any, ...]] = []
+            for year, path in list_partitions(self._archive_dir):
+                async with attached_partition(connection, year, path) as schema:
+                    cursor = await connection.execute(_spend_aggregate_sql(schema))
+                    archived.extend(tuple(row) for row in await cursor.fetchall())
+
+            await connection.execute("DELETE FROM supplier_monthly_spend")
+            cursor = await connection.execute(
+                f"""
+                INSERT INTO supplier_monthly_spend(
+                    user_id, supplier, month, invoice_count, total_sum, total_minor, item_count
+                )
+                {_spend_aggregate_sql("main")}
+                """
+            )
+            rebuilt = cursor.rowcount
+            if archived:
+                await connection.executemany(
+                    """
+                    INSERT INTO supplier_monthly_spend(
+                        user_id, supplier, month, invoice_count, total_sum, total_minor, item_count
                     )
-                    parameters = ()
-
-            header_cursor = await connection.execute(query, parameters)
-            header_rows = await header_cursor.fetchall()
-
-            invoices: List[Invoice] = []
-            for header_row in header_rows:
-                invoice_id = header_row["id"]
-                items_cursor = await connection.execute(
-                    "SELECT code, name, qty, price, total "
-                    "FROM invoice_items "
-                    "WHERE invoice_id=? ORDER BY idx ASC",
-                    (invoice_id,),
+                    VALUES(?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(user_id, supplier, month) DO UPDATE SET
+                        invoice_count = invoice_count + excluded.invoice_count,
+                        total_sum = total_sum + excluded.total_sum,
+                        total_minor = total_minor + excluded.total_minor,
+                        item_count = item_count + excluded.item_count
+                    """,
+                    archived,
                 )
-                item_rows = await items_cursor.fetchall()
+                cursor = await connection.execute("SELECT COUNT(*) FROM supplier_monthly_spend")
+                count_row = await cursor.fetchone()
+                rebuilt = int(count_row[0]) if count_row is not None else rebuilt
+            await connection.commit()
+            return rebuilt
+        finally:
+            await connection.close()
 
-                header_dict = dict(header_row)
-                item_dicts = [dict(item_row) for item_row in item_rows]
-                invoice = db_row_to_invoice(header_dict, item_dicts)
-                invoices.append(invoice)
+    async def fetch_changes(
+        self, after_seq: int = 0, limit: int = DEFAULT_CHANGES_BATCH_SIZE
+    ) -> List[InvoiceChange]:
+        """
+        Return up to limit change log entries with a sequence number above after_seq.
 
-            return invoices
+        Writers are serialized and log their changes in the writing transaction,
+        so once an entry is visible no entry with a lower seq can appear later:
+        a consumer only has to remember the last seq it processed.
+        """
+        connection = await self._get_connection()
+        try:
+            cursor = await connection.execute(SELECT_INVOICE_CHANGES_SQL, (after_seq, limit))
+            rows = await cursor.fetchall()
+            return [db_row_to_invoice_change(dict(row)) for row in rows]
         finally:
             await connection.close()
 
+    async def iter_changes(
+        self, after_seq: int = 0, batch_size: int = DEFAULT_CHANGES_BATCH_SIZE
+    ) -> AsyncIterator[InvoiceChange]:
+        """Stream the change log after after_seq, batch_size entries at a time, until caught up."""
+        connection = await self._get_connection()
+        try:
+            while True:
+                cursor = await connection.execute(
+                    SELECT_INVOICE_CHANGES_SQL, (after_seq, batch_size)
+                )
+                rows = list(await cursor.fetchall())
+                for row in rows:
+                    change = db_row_to_invoice_change(dict(row))
+                    after_seq = change.seq
+                    yield change
+                if len(rows) < batch_size:
+                    break
+        finally:
+            await connection.close()
+
+    async def purge_changes(self, through_seq: int) -> int:
+        """Delete change log entries up to and including through_seq once every consumer has them."""
+        connection = await self._get_connection()
+        try:
+            cursor = await connection.execute(DELETE_INVOICE_CHANGES_SQL, (through_seq,))
+            await connection.commit()
+            return max(cursor.rowcount, 0)
+        finally:
+            await connection.close()
+
+
+def _spend_aggregate_sql(schema: str) -> str:
+    """Rollup rows of the invoices in one schema, in supplier_monthly_spend column order."""
+    return f"""
+        SELECT
+            user_id,
+            COALESCE(supplier, ''),
+            COALESCE(substr(date_iso, 1, 7), ''),
+            COUNT(*),
+            SUM(COALESCE(total_sum, 0)),
+            SUM(COALESCE(total_minor, 0)),
+            SUM(
+                (SELECT COUNT(*) FROM {schema}.invoice_items AS items
+                 WHERE items.invoice_id = invoices.id)
+            )
+        FROM {schema}.invoices AS invoices
+        GROUP BY 1, 2, 3
+    """
+
 
 _default_storage: AsyncInvoiceStorage | None = None
 _default_storage_path: str | None = None
@@ -159,7 +801,7 @@ def _get_default_storage() -> AsyncInvoiceStorage:
     global _default_storage, _default_storage_path
     current_path = DB_PATH
     if _default_storage is None or _default_storage_path != current_path:
-        _default_storage = AsyncInvoiceStorage(database_path=current_path)
+        _default_storage = AsyncInvoiceStorage(database_path=current_path, archive_dir=ARCHIVE_DIR)
         _default_storage_path = current_path
     return _default_storage
 
@@ -170,6 +812,18 @@ async def save_invoice_domain_async(invoice: Invoice, user_id: int = 0) -> int:
     return await storage.save_invoice(invoice, user_id=user_id)
 
 
+async def store_invoice_domain_async(invoice: Invoice, user_id: int = 0) -> Tuple[int, bool]:
+    """Save an invoice with the default storage; returns (ID, inserted)."""
+    storage = _get_default_storage()
+    return await storage.store_invoice(invoice, user_id=user_id)
+
+
+async def save_invoices_domain_async(invoices: Iterable[Invoice], user_id: int = 0) -> List[int]:
+    """Save many invoices in one transaction using the default storage."""
+    storage = _get_default_storage()
+    return await storage.save_invoices(invoices, user_id=user_id)
+
+
 async def fetch_invoices_domain_async(
     from_date: Optional[date],
     to_date: Optional[date],
@@ -180,8 +834,116 @@ async def fetch_invoices_domain_async(
     return await storage.fetch_invoices(from_date=from_date, to_date=to_date, supplier=supplier)
 
 
+async def fetch_raw_text_domain_async(invoice_id: int) -> Optional[str]:
+    """Load the raw OCR text of an invoice using the default storage."""
+    storage = _get_default_storage()
+    return await storage.fetch_raw_text(invoice_id)
+
+
+async def fetch_invoice_page_domain_async(
+    from_date: Optional[date],
+    to_date: Optional[date],
+    supplier: Optional[str] = None,
+    after: Optional[InvoiceCursor] = None,
+    before: Optional[InvoiceCursor] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> InvoicePage:
+    """Fetch one keyset page of invoices using the default storage."""
+    storage = _get_default_storage()
+    return await storage.fetch_invoice_page(
+        from_date=from_date,
+        to_date=to_date,
+        supplier=supplier,
+        after=after,
+        before=before,
+        limit=limit,
+    )
+
+
+def iter_invoices_domain_async(
+    from_date: Optional[date],
+    to_date: Optional[date],
+    supplier: Optional[str] = None,
+) -> AsyncIterator[Invoice]:
+    """Stream invoices in keyset order using the default storage."""
+    storage = _get_default_storage()
+    return storage.iter_invoices(from_date=from_date, to_date=to_date, supplier=supplier)
+
+
+async def fetch_invoice_summary_page_domain_async(
+    from_date: Optional[date],
+    to_date: Optional[date],
+    supplier: Optional[str] = None,
+    after: Optional[InvoiceCursor] = None,
+    before: Optional[InvoiceCursor] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> InvoiceSummaryPage:
+    """Fetch one keyset page of invoice summaries using the default storage."""
+    storage = _get_default_storage()
+    return await storage.fetch_invoice_summary_page(
+        from_date=from_date,
+        to_date=to_date,
+        supplier=supplier,
+        after=after,
+        before=before,
+        limit=limit,
+    )
+
+
+async def summarize_invoices_domain_async(
+    from_date: Optional[date],
+    to_date: Optional[date],
+    supplier: Optional[str] = None,
+) -> InvoiceTotals:
+    """Aggregate invoices for a filter using the default storage."""
+    storage = _get_default_storage()
+    return await storage.summarize_invoices(from_date=from_date, to_date=to_date, supplier=supplier)
+
+
+async def fetch_supplier_spend_domain_async(
+    user_id: int,
+    from_month: Optional[str] = None,
+    to_month: Optional[str] = None,
+    supplier: Optional[str] = None,
+) -> List[SupplierMonthlySpend]:
+    """Read the supplier monthly spend rollup using the default storage."""
+    storage = _get_default_storage()
+    return await storage.fetch_supplier_spend(
+        user_id=user_id,
+        from_month=from_month,
+        to_month=to_month,
+        supplier=supplier,
+    )
+
+
+async def rebuild_supplier_spend_domain_async() -> int:
+    """Recompute the supplier monthly spend rollup using the default storage."""
+    storage = _get_default_storage()
+    return await storage.rebuild_supplier_spend()
+
+
+def iter_changes_domain_async(
+    after_seq: int = 0, batch_size: int = DEFAULT_CHANGES_BATCH_SIZE
+) -> AsyncIterator[InvoiceChange]:
+    """Stream the invoice change log using the default storage."""
+    storage = _get_default_storage()
+    return storage.iter_changes(after_seq=after_seq, batch_size=batch_size)
+
+
 __all__ = [
     "AsyncInvoiceStorage",
+    "archived_duplicates",
+    "insert_invoice",
     "save_invoice_domain_async",
+    "save_invoices_domain_async",
+    "store_invoice_domain_async",
     "fetch_invoices_domain_async",
+    "fetch_raw_text_domain_async",
+    "fetch_invoice_page_domain_async",
+    "iter_invoices_domain_async",
+    "fetch_invoice_summary_page_domain_async",
+    "summarize_invoices_domain_async",
+    "fetch_supplier_spend_domain_async",
+    "rebuild_supplier_spend_domain_async",
+    "iter_changes_domain_async",
 ]
@@ -0,0 +1,349 @@
+"""
+Serialization of invoice drafts stored in invoice_drafts.payload.
+
+Drafts are written as msgpack arrays with positional fields:
+
+    [version, invoice, path, raw_text, comments]
+    invoice = [header, items, comments, source]
+
+Decimals are stored as [coefficient, exponent] integer pairs so they round-trip
+exactly (including trailing zeros) and dates as proleptic ordinals. Payloads
+written before the binary format are JSON text and are still readable; they are
+rewritten in the new format the next time the draft is saved.
+
+Draft patches for the delta log use the same value encoding:
+
+    [version, op, item_index, field, value]
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import msgpack
+
+from backend.domain.drafts import DraftPatch, InvoiceDraft
+from backend.domain.invoices import (
+    Invoice,
+    InvoiceComment,
+    InvoiceHeader,
+    InvoiceItem,
+    InvoiceSourceInfo,
+)
+
+DRAFT_FORMAT_VERSION = 1
+
+_DATE_FIELDS = frozenset({"invoice_date", "due_date"})
+_DECIMAL_FIELDS = frozenset(
+    {"subtotal", "tax_amount", "total_amount", "quantity", "unit_price", "line_total"}
+)
+
+# msgpack integers are limited to 64 bits; larger coefficients fall back to text.
+_MAX_COEFFICIENT = 2**63 - 1
+
+
+def _encode_decimal(value: Optional[Decimal]) -> Any:
+    if value is None:
+        return None
+    sign, digits, exponent = value.as_tuple()
+    if not isinstance(exponent, int):
+        # NaN and infinities have no scaled-integer form.
+        return str(value)
+    coefficient = 0
+    for digit in digits:
+        coefficient = coefficient * 10 + digit
+    if coefficient > _MAX_COEFFICIENT:
+        return str(value)
+    return [-coefficient if sign else coefficient, exponent]
+
+
+def _decode_decimal(value: Any) -> Optional[Decimal]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return Decimal(value)
+    coefficient, exponent = value
+    return Decimal(coefficient).scaleb(exponent)
+
+
+def _encode_date(value: Optional[date]) -> Optional[int]:
+    return value.toordinal() if value is not None else None
+
+
+def _decode_date(value: Optional[int]) -> Optional[date]:
+    return date.fromordinal(value) if value is not None else None
+
+
+def _encode_item(item: InvoiceItem) -> List[Any]:
+    return [
+        item.description,
+        item.sku,
+        _encode_decimal(item.quantity),
+        _encode_decimal(item.unit_price),
+        _encode_decimal(item.line_total),
+        item.currency,
+    ]
+
+
+def _decode_item(row: Sequence[Any]) -> InvoiceItem:
+    description, sku, quantity, unit_price, line_total, currency = row
+    return InvoiceItem(
+        description=description,
+        sku=sku,
+        quantity=_decode_decimal(quantity) or Decimal("0"),
+        unit_price=_decode_decimal(unit_price) or Decimal("0"),
+        line_total=_decode_decimal(line_total) or Decimal("0"),
+        currency=currency,
+    )
+
+
+def _encode_header(header: InvoiceHeader) -> List[Any]:
+    return [
+        header.supplier_name,
+        header.supplier_tax_id,
+        header.customer_name,
+        header.customer_tax_id,
+        header.invoice_number,
+        _encode_date(header.invoice_date),
+        _encode_date(header.due_date),
+        header.currency,
+        _encode_decimal(header.subtotal),
+        _encode_decimal(header.tax_amount),
+        _encode_decimal(header.total_amount),
+    ]
+
+
+def _decode_header(row: Sequence[Any]) -> InvoiceHeader:
+    (
+        supplier_name,
+        supplier_tax_id,
+        customer_name,
+        customer_tax_id,
+        invoice_number,
+        invoice_date,
+        due_date,
+        currency,
+        subtotal,
+        tax_amount,
+        total_amount,
+    ) = row
+    return InvoiceHeader(
+        supplier_name=supplier_name,
+        supplier_tax_id=supplier_tax_id,
+        customer_name=customer_name,
+        customer_tax_id=customer_tax_id,
+        invoice_number=invoice_number,
+        invoice_date=_decode_date(invoice_date),
+        due_date=_decode_date(due_date),
+        currency=currency,
+        subtotal=_decode_decimal(subtotal),
+        tax_amount=_decode_decimal(tax_amount),
+        total_amount=_decode_decimal(total_amount),
+    )
+
+
+def _encode_comment(comment: InvoiceComment) -> List[Any]:
+    created_at = comment.created_at.isoformat() if comment.created_at is not None else None
+    return [comment.message, comment.author, created_at]
+
+
+def _decode_comment(row: Sequence[Any]) -> InvoiceComment:
+    message, author, created_at = row
+    return InvoiceComment(
+        message=message,
+        author=author,
+        created_at=datetime.fromisoformat(created_at) if created_at is not None else None,
+    )
+
+
+def _encode_source(source: Optional[InvoiceSourceInfo]) -> Optional[List[Any]]:
+    if source is None:
+        return None
+    return [source.file_path, source.file_sha256, source.provider, source.raw_payload_path]
+
+
+def _decode_source(row: Optional[Sequence[Any]]) -> Optional[InvoiceSourceInfo]:
+    if row is None:
+        return None
+    file_path, file_sha256, provider, raw_payload_path = row
+    return InvoiceSourceInfo(
+        file_path=file_path,
+        file_sha256=file_sha256,
+        provider=provider,
+        raw_payload_path=raw_payload_path,
+    )
+
+
+def encode_draft(draft: InvoiceDraft) -> bytes:
+    """Serialize a draft into the current binary format."""
+    invoice = draft.invoice
+    packed = msgpack.packb(
+        [
+            DRAFT_FORMAT_VERSION,
+            [
+                _encode_header(invoice.header),
+                [_encode_item(item) for item in invoice.items],
+                [_encode_comment(comment) for comment in invoice.comments],
+                _encode_source(invoice.source),
+            ],
+            draft.path,
+            draft.raw_text,
+            list(draft.comments),
+        ],
+        use_bin_type=True,
+    )
+    return bytes(packed)
+
+
+def _decode_binary(payload: bytes) -> Optional[InvoiceDraft]:
+    try:
+        raw = msgpack.unpackb(payload, raw=False, use_list=False)
+    except (ValueError, msgpack.UnpackException):
+        return None
+    if not isinstance(raw, tuple) or not raw or raw[0] != DRAFT_FORMAT_VERSION:
+        return None
+
+    try:
+        _, invoice_row, path, raw_text, comments = raw
+        header_row, item_rows, comment_rows, source_row = invoice_row
+        invoice = Invoice(
+            header=_decode_header(header_row),
+            items=[_decode_item(row) for row in item_rows],
+            comments=[_decode_comment(row) for row in comment_rows],
+            source=_decode_source(source_row),
+            raw_text=raw_text or None,
+        )
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+    return InvoiceDraft(
+        invoice=invoice,
+        path=path or "",
+        raw_text=raw_text or "",
+        comments=[str(comment) for comment in comments],
+    )
+
+
+def encode_patch(patch: DraftPatch) -> bytes:
+    """Serialize a draft patch for the delta log."""
+    value = patch.value
+    if patch.field in _DATE_FIELDS:
+        value = _encode_date(value)
+    elif patch.field in _DECIMAL_FIELDS:
+        value = _encode_decimal(value)
+    packed = msgpack.packb(
+        [DRAFT_FORMAT_VERSION, patch.op, patch.item_index, patch.field, value],
+        use_bin_type=True,
+    )
+    return bytes(packed)
+
+
+def decode_patch(payload: bytes) -> Optional[DraftPatch]:
+    """Deserialize a delta log entry; returns None if it cannot be read."""
+    try:
+        raw = msgpack.unpackb(payload, raw=False, use_list=False)
+        version, op, item_index, field_name, value = raw
+        if version != DRAFT_FORMAT_VERSION:
+            return None
+        if field_name in _DATE_FIELDS:
+            value = _decode_date(value)
+        elif field_name in _DECIMAL_FIELDS:
+            value = _decode_decimal(value)
+    except (TypeError, ValueError, OverflowError, msgpack.UnpackException):
+        return None
+    return DraftPatch(op=op, field=field_name, value=value, item_index=item_index)
+
+
+def _decode_legacy_json(payload_str: str) -> Optional[InvoiceDraft]:
+    """Read the JSON payload format with {"__type__": ...} value markers."""
+    try:
+        raw = json.loads(payload_str)
+    except json.JSONDecodeError:
+        return None
+
+    if not isinstance(raw, dict):
+        return None
+
+    def restore_value(value: Any) -> Any:
+        if isinstance(value, dict) and "__type__" in value and "value" in value:
+            type_marker = value["__type__"]
+            data = value["value"]
+            if type_marker == "datetime":
+                return datetime.fromisoformat(data)
+            if type_marker == "date":
+                return date.fromisoformat(data)
+            if type_marker == "decimal":
+                return Decimal(data)
+        if isinstance(value, list):
+            return [restore_value(item) for item in value]
+        if isinstance(value, dict):
+            return {k: restore_value(v) for k, v in value.items()}
+        return value
+
+    invoice_payload = raw.get("invoice")
+    if not isinstance(invoice_payload, dict):
+        return None
+
+    restored_invoice_dict: Dict[str, Any] = restore_value(invoice_payload)
+
+    # Reconstruct nested dataclass objects
+    header_dict = restored_invoice_dict.get("header")
+    if isinstance(header_dict, dict):
+        restored_invoice_dict["header"] = InvoiceHeader(**header_dict)
+
+    items_list = restored_invoice_dict.get("items")
+    if isinstance(items_list, list):
+        restored_invoice_dict["items"] = [
+            InvoiceItem(**item) if isinstance(item, dict) else item for item in items_list
+        ]
+
+    comments_list = restored_invoice_dict.get("comments")
+    if isinstance(comments_list, list):
+        restored_invoice_dict["comments"] = [
+            InvoiceComment(**comment) if isinstance(comment, dict) else comment
+            for comment in comments_list
+        ]
+
+    source_dict = restored_invoice_dict.get("source")
+    if isinstance(source_dict, dict):
+        restored_invoice_dict["source"] = InvoiceSourceInfo(**source_dict)
+    elif source_dict is None:
+        restored_invoice_dict["source"] = None
+
+    invoice = Invoice(**restored_invoice_dict)
+
+    path = str(raw.get("path") or "")
+    raw_text = str(raw.get("raw_text") or "")
+    invoice.raw_text = raw_text or None
+    comments_raw = raw.get("comments") or []
+
+    if not isinstance(comments_raw, list):
+        comments = [str(comments_raw)]
+    else:
+        comments = [str(c) for c in comments_raw]
+
+    return InvoiceDraft(
+        invoice=invoice,
+        path=path,
+        raw_text=raw_text,
+        comments=comments,
+    )
+
+
+def decode_draft(payload: Union[bytes, str]) -> Optional[InvoiceDraft]:
+    """Deserialize a stored payload; returns None if it cannot be read."""
+    if isinstance(payload, str):
+        return _decode_legacy_json(payload)
+    return _decode_binary(payload)
+
+
+__all__ = [
+    "DRAFT_FORMAT_VERSION",
+    "decode_draft",
+    "decode_patch",
+    "encode_draft",
+    "encode_patch",
+]
@@ -1,183 +1,546 @@
 from __future__ import annotations
 
-import json
-from datetime import date, datetime
-from decimal import Decimal
-from typing import Any, Dict, Optional
+from datetime import datetime
+from typing import Iterable, List, Optional, Sequence, Set
 
 import aiosqlite
 
-from backend.domain.drafts import InvoiceDraft
-from backend.domain.invoices import (
-    Invoice,
-    InvoiceComment,
-    InvoiceHeader,
-    InvoiceItem,
-    InvoiceSourceInfo,
+from backend.domain.drafts import (
+    DraftHistoryEntry,
+    DraftPatch,
+    DraftSummary,
+    DraftVersionConflict,
+    ExpiredDrafts,
+    InvoiceDraft,
+    apply_draft_patch,
 )
+from backend.storage.archive import fetch_archived_paths
 from backend.storage.db import DB_PATH
+from backend.storage.draft_codec import decode_draft, decode_patch, encode_draft, encode_patch
 
+# Pending deltas after which a read folds them into the stored payload.
+DRAFT_COMPACT_THRESHOLD = 16
+DRAFT_SWEEP_BATCH_SIZE = 500
 
-async def _connect() -> aiosqlite.Connection:
-    connection = await aiosqlite.connect(DB_PATH)
+# A user may keep several drafts. The functions taking only a user_id work on
+# the active one (see invoice_draft_active); when it is deleted, the oldest
+# remaining draft of the user becomes active, so drafts are reviewed in order.
+#
+# invoice_drafts.version is bumped by every save and every appended patch. The
+# draft_id and version of a loaded draft let replace_draft_invoice,
+# append_draft_patches and discard_draft_invoice refuse to write over changes
+# made since the draft was read (DraftVersionConflict).
+
+
+async def _connect(database_path: Optional[str] = None) -> aiosqlite.Connection:
+    connection = await aiosqlite.connect(database_path or DB_PATH)
     connection.row_factory = aiosqlite.Row
     return connection
 
 
-def _draft_to_payload(draft: InvoiceDraft) -> str:
-    def convert_value(value: Any) -> Any:
-        if isinstance(value, datetime):
-            return {"__type__": "datetime", "value": value.isoformat()}
-        if isinstance(value, date):
-            return {"__type__": "date", "value": value.isoformat()}
-        if isinstance(value, Decimal):
-            return {"__type__": "decimal", "value": str(value)}
-        if isinstance(value, list):
-            return [convert_value(item) for item in value]
-        if isinstance(value, dict):
-            return {str(k): convert_value(v) for k, v in value.items()}
-        # Handle dataclass objects
-        if hasattr(value, "__dict__"):
-            return convert_value(value.__dict__)
-        return value
-
-    invoice_dict = draft.invoice.__dict__
-    payload: Dict[str, Any] = {
-        "invoice": convert_value(invoice_dict),
-        "path": draft.path,
-        "raw_text": draft.raw_text,
-        "comments": list(draft.comments),
-    }
-    return json.dumps(payload, ensure_ascii=False)
-
-
-def _payload_to_draft(payload_str: str) -> Optional[InvoiceDraft]:
-    try:
-        raw = json.loads(payload_str)
-    except json.JSONDecodeError:
-        return None
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
 
-    if not isinstance(raw, dict):
-        return None
 
-    def restore_value(value: Any) -> Any:
-        if isinstance(value, dict) and "__type__" in value and "value" in value:
-            type_marker = value["__type__"]
-            data = value["value"]
-            if type_marker == "datetime":
-                return datetime.fromisoformat(data)
-            if type_marker == "date":
-                return date.fromisoformat(data)
-            if type_marker == "decimal":
-                return Decimal(data)
-        if isinstance(value, list):
-            return [restore_value(item) for item in value]
-        if isinstance(value, dict):
-            return {k: restore_value(v) for k, v in value.items()}
-        return value
-
-    invoice_payload = raw.get("invoice")
-    if not isinstance(invoice_payload, dict):
-        return None
+async def _active_draft_id(connection: aiosqlite.Connection, user_id: int) -> Optional[int]:
+    cursor = await connection.execute(
+        "SELECT draft_id FROM invoice_draft_active WHERE user_id=?",
+        (user_id,),
+    )
+    row = await cursor.fetchone()
+    return int(row["draft_id"]) if row is not None else None
+
+
+async def _insert_draft(connection: aiosqlite.Connection, user_id: int, payload: bytes) -> int:
+    cursor = await connection.execute(
+        "INSERT INTO invoice_drafts(user_id, payload, created_at) VALUES(?, ?, datetime('now'))",
+        (user_id, payload),
+    )
+    draft_id = cursor.lastrowid
+    assert draft_id is not None
+    # Only becomes active if the user had no draft; otherwise it waits in the queue.
+    await connection.execute(
+        "INSERT OR IGNORE INTO invoice_draft_active(user_id, draft_id) VALUES(?, ?)",
+        (user_id, draft_id),
+    )
+    return draft_id
 
-    restored_invoice_dict = restore_value(invoice_payload)
-    if not isinstance(restored_invoice_dict, dict):
-        return None
 
-    # Reconstruct nested dataclass objects
-    header_dict = restored_invoice_dict.get("header")
-    if isinstance(header_dict, dict):
-        restored_invoice_dict["header"] = InvoiceHeader(**header_dict)
-
-    items_list = restored_invoice_dict.get("items")
-    if isinstance(items_list, list):
-        restored_invoice_dict["items"] = [
-            InvoiceItem(**item) if isinstance(item, dict) else item for item in items_list
-        ]
-
-    comments_list = restored_invoice_dict.get("comments")
-    if isinstance(comments_list, list):
-        restored_invoice_dict["comments"] = [
-            InvoiceComment(**comment) if isinstance(comment, dict) else comment
-            for comment in comments_list
-        ]
-
-    source_dict = restored_invoice_dict.get("source")
-    if isinstance(source_dict, dict):
-        restored_invoice_dict["source"] = InvoiceSourceInfo(**source_dict)
-    elif source_dict is None:
-        restored_invoice_dict["source"] = None
-
-    invoice = Invoice(**restored_invoice_dict)
-
-    path = str(raw.get("path") or "")
-    raw_text = str(raw.get("raw_text") or "")
-    comments_raw = raw.get("comments") or []
-
-    if not isinstance(comments_raw, list):
-        comments = [str(comments_raw)]
-    else:
-        comments = [str(c) for c in comments_raw]
-
-    return InvoiceDraft(
-        invoice=invoice,
-        path=path,
-        raw_text=raw_text,
-        comments=comments,
+async def _delete_drafts(
+    connection: aiosqlite.Connection,
+    draft_ids: Sequence[int],
+    user_ids: Iterable[int],
+) -> int:
+    """Delete drafts with their deltas and move the active pointer of the users on."""
+    params = [(draft_id,) for draft_id in draft_ids]
+    cursor = await connection.executemany(
+        "DELETE FROM invoice_draft_deltas WHERE draft_id=?",
+        params,
+    )
+    deltas = max(cursor.rowcount, 0)
+    await connection.executemany("DELETE FROM invoice_drafts WHERE id=?", params)
+    await connection.executemany("DELETE FROM invoice_draft_active WHERE draft_id=?", params)
+    await connection.executemany(
+        """
+        INSERT OR IGNORE INTO invoice_draft_active(user_id, draft_id)
+        SELECT user_id, MIN(id) FROM invoice_drafts WHERE user_id=? GROUP BY user_id
+        """,
+        [(user_id,) for user_id in set(user_ids)],
+    )
+    return deltas
+
+
+async def _rewrite_draft(
+    connection: aiosqlite.Connection,
+    draft_id: int,
+    payload: bytes,
+    expected_version: Optional[int],
+) -> Optional[int]:
+    """Store a full payload; returns the new version, or None if the version moved on."""
+    cursor = await connection.execute(
+        """
+        UPDATE invoice_drafts
+        SET payload=?, created_at=datetime('now'), delta_seq=0, version=version + 1
+        WHERE id=? AND (? IS NULL OR version=?)
+        RETURNING version
+        """,
+        (payload, draft_id, expected_version, expected_version),
+    )
+    row = await cursor.fetchone()
+    await cursor.close()
+    if row is None:
+        return None
+    # A full write starts a new draft, so its delta log starts over as well.
+    await connection.execute(
+        "DELETE FROM invoice_draft_deltas WHERE draft_id=?",
+        (draft_id,),
     )
+    return int(row["version"])
 
 
 async def save_draft_invoice(user_id: int, draft: InvoiceDraft) -> None:
-    payload = _draft_to_payload(draft)
+    """Replace the active draft of the user, or start one if there is none."""
+    payload = encode_draft(draft)
     connection = await _connect()
     try:
-        await connection.execute(
+        draft_id = await _active_draft_id(connection, user_id)
+        if draft_id is None:
+            draft_id = await _insert_draft(connection, user_id, payload)
+            version = 0
+        else:
+            version = await _rewrite_draft(connection, draft_id, payload, None) or 0
+        await connection.commit()
+    finally:
+        await connection.close()
+    draft.draft_id, draft.version = draft_id, version
+
+
+async def replace_draft_invoice(user_id: int, draft: InvoiceDraft) -> None:
+    """
+    Store draft over the stored draft it was loaded from.
+
+    Raises DraftVersionConflict if that draft was written or deleted since.
+    """
+    if draft.draft_id is None:
+        raise DraftVersionConflict("draft was not loaded from storage")
+    connection = await _connect()
+    try:
+        version = None
+        if await _active_draft_id(connection, user_id) == draft.draft_id:
+            version = await _rewrite_draft(
+                connection, draft.draft_id, encode_draft(draft), draft.version
+            )
+        if version is None:
+            await connection.rollback()
+            raise DraftVersionConflict(
+                f"draft {draft.draft_id} is no longer at version {draft.version}"
+            )
+        await connection.commit()
+    finally:
+        await connection.close()
+    draft.version = version
+
+
+async def add_draft_invoice(user_id: int, draft: InvoiceDraft) -> DraftSummary:
+    """Store a new draft next to the user's existing ones."""
+    connection = await _connect()
+    try:
+        draft_id = await _insert_draft(connection, user_id, encode_draft(draft))
+        active = await _active_draft_id(connection, user_id) == draft_id
+        await connection.commit()
+    finally:
+        await connection.close()
+    draft.draft_id, draft.version = draft_id, 0
+    return DraftSummary.from_draft(draft_id, draft, active=active)
+
+
+async def append_draft_patches(
+    user_id: int,
+    patches: Sequence[DraftPatch],
+    base: Optional[InvoiceDraft] = None,
+) -> None:
+    """
+    Record field-level changes of the active draft in its append-only delta log.
+
+    base is the draft the patches were computed against. If given and loaded
+    from storage, the patches are only recorded if that draft is still active
+    and unchanged (DraftVersionConflict otherwise), and its version is updated.
+    """
+    if not patches:
+        return
+    connection = await _connect()
+    try:
+        draft_id = await _active_draft_id(connection, user_id)
+        expected_version = None
+        if base is not None and base.draft_id is not None:
+            if draft_id != base.draft_id:
+                raise DraftVersionConflict(f"draft {base.draft_id} is no longer active")
+            expected_version = base.version
+        if draft_id is None:
+            return
+        # created_at is the draft's last activity as far as expiry is concerned.
+        cursor = await connection.execute(
             """
-            INSERT INTO invoice_drafts(user_id, payload, created_at)
-            VALUES(?, ?, datetime('now'))
-            ON CONFLICT(user_id) DO UPDATE SET
-                payload=excluded.payload,
-                created_at=excluded.created_at
+            UPDATE invoice_drafts SET created_at=datetime('now'), version=version + 1
+            WHERE id=? AND (? IS NULL OR version=?)
+            RETURNING version
             """,
-            (user_id, payload),
+            (draft_id, expected_version, expected_version),
+        )
+        row = await cursor.fetchone()
+        await cursor.close()
+        if row is None:
+            await connection.rollback()
+            raise DraftVersionConflict(
+                f"draft {draft_id} is no longer at version {expected_version}"
+            )
+        await connection.executemany(
+            "INSERT INTO invoice_draft_deltas(draft_id, patch) VALUES(?, ?)",
+            [(draft_id, encode_patch(patch)) for patch in patches],
         )
         await connection.commit()
     finally:
         await connection.close()
+    if base is not None and base.draft_id == draft_id:
+        base.version = int(row["version"])
+
+
+async def _load_and_fold(
+    connection: aiosqlite.Connection,
+    draft_id: int,
+    compact_threshold: int,
+) -> Optional[InvoiceDraft]:
+    cursor = await connection.execute(
+        "SELECT payload, delta_seq, version FROM invoice_drafts WHERE id=?",
+        (draft_id,),
+    )
+    row = await cursor.fetchone()
+    if row is None:
+        return None
+    payload = row["payload"]
+    if not isinstance(payload, (bytes, str)):
+        return None
+    draft = decode_draft(payload)
+    if draft is None:
+        return None
+    draft.draft_id, draft.version = draft_id, int(row["version"])
+
+    delta_seq = int(row["delta_seq"])
+    cursor = await connection.execute(
+        "SELECT id, patch FROM invoice_draft_deltas WHERE draft_id=? AND id>? ORDER BY id",
+        (draft_id, delta_seq),
+    )
+    pending = list(await cursor.fetchall())
+    for delta in pending:
+        patch = decode_patch(delta["patch"])
+        if patch is None:
+            continue
+        try:
+            apply_draft_patch(draft, patch)
+        except ValueError:
+            continue
+
+    if pending and len(pending) >= compact_threshold:
+        # Guarded by the version read above: every save and appended patch bumps it,
+        # so a fold of a draft written in the meantime is skipped. delta_seq alone
+        # is not enough, as a full save resets it to 0.
+        await connection.execute(
+            """
+            UPDATE invoice_drafts SET payload=?, delta_seq=?
+            WHERE id=? AND delta_seq=? AND version=?
+            """,
+            (encode_draft(draft), int(pending[-1]["id"]), draft_id, delta_seq, draft.version),
+        )
+        await connection.commit()
+    return draft
 
 
 async def load_draft_invoice(user_id: int) -> Optional[InvoiceDraft]:
     connection = await _connect()
     try:
+        draft_id = await _active_draft_id(connection, user_id)
+        if draft_id is None:
+            return None
+        return await _load_and_fold(connection, draft_id, DRAFT_COMPACT_THRESHOLD)
+    finally:
+        await connection.close()
+
+
+async def list_draft_invoices(user_id: int) -> List[DraftSummary]:
+    """Return all drafts of the user in review order."""
+    connection = await _connect()
+    try:
+        active_id = await _active_draft_id(connection, user_id)
         cursor = await connection.execute(
-            "SELECT payload FROM invoice_drafts WHERE user_id=?",
+            "SELECT id, created_at FROM invoice_drafts WHERE user_id=? ORDER BY id",
             (user_id,),
         )
-        row = await cursor.fetchone()
-        if row is None:
-            return None
-        payload_str = row["payload"]
-        if not isinstance(payload_str, str):
-            return None
-        return _payload_to_draft(payload_str)
+        rows = list(await cursor.fetchall())
+        summaries: List[DraftSummary] = []
+        for row in rows:
+            draft_id = int(row["id"])
+            draft = await _load_and_fold(connection, draft_id, DRAFT_COMPACT_THRESHOLD)
+            if draft is None:
+                continue
+            summaries.append(
+                DraftSummary.from_draft(
+                    draft_id,
+                    draft,
+                    active=draft_id == active_id,
+                    created_at=_parse_timestamp(row["created_at"]),
+                )
+            )
+        return summaries
     finally:
         await connection.close()
 
 
-async def delete_draft_invoice(user_id: int) -> None:
+async def activate_draft_invoice(user_id: int, draft_id: int) -> bool:
+    """Make one of the user's drafts the active one; False if it is not theirs."""
     connection = await _connect()
     try:
-        await connection.execute(
-            "DELETE FROM invoice_drafts WHERE user_id=?",
+        cursor = await connection.execute(
+            """
+            INSERT INTO invoice_draft_active(user_id, draft_id)
+            SELECT user_id, id FROM invoice_drafts WHERE id=? AND user_id=?
+            ON CONFLICT(user_id) DO UPDATE SET draft_id=excluded.draft_id
+            """,
+            (draft_id, user_id),
+        )
+        await connection.commit()
+        return cursor.rowcount > 0
+    finally:
+        await connection.close()
+
+
+async def load_draft_history(user_id: int) -> List[DraftHistoryEntry]:
+    """Return every recorded change of the user's active draft, oldest first."""
+    connection = await _connect()
+    try:
+        cursor = await connection.execute(
+            """
+            SELECT d.patch, d.created_at
+            FROM invoice_draft_deltas AS d
+            JOIN invoice_draft_active AS a ON a.draft_id = d.draft_id
+            WHERE a.user_id=?
+            ORDER BY d.id
+            """,
             (user_id,),
         )
+        rows = await cursor.fetchall()
+    finally:
+        await connection.close()
+
+    history: List[DraftHistoryEntry] = []
+    for row in rows:
+        patch = decode_patch(row["patch"])
+        if patch is None:
+            continue
+        history.append(
+            DraftHistoryEntry(patch=patch, created_at=_parse_timestamp(row["created_at"]))
+        )
+    return history
+
+
+async def compact_draft_invoices(database_path: Optional[str] = None) -> int:
+    """
+    Fold pending deltas of every draft into its stored payload.
+
+    The delta rows are kept as the draft's edit history until the draft is
+    replaced or deleted. Returns the number of compacted drafts.
+    """
+    connection = await _connect(database_path)
+    try:
+        cursor = await connection.execute(
+            """
+            SELECT DISTINCT d.draft_id
+            FROM invoice_draft_deltas AS d
+            JOIN invoice_drafts AS draft ON draft.id = d.draft_id
+            WHERE d.id > draft.delta_seq
+            """
+        )
+        draft_ids = [int(row["draft_id"]) for row in await cursor.fetchall()]
+        for draft_id in draft_ids:
+            await _load_and_fold(connection, draft_id, compact_threshold=1)
+        return len(draft_ids)
+    finally:
+        await connection.close()
+
+
+async def delete_expired_drafts(
+    ttl_seconds: float,
+    batch_size: int = DRAFT_SWEEP_BATCH_SIZE,
+    database_path: Optional[str] = None,
+) -> ExpiredDrafts:
+    """
+    Delete drafts untouched for longer than ttl_seconds, batch_size rows per transaction.
+
+    Returns the number of removed rows and the upload paths of the deleted drafts.
+    """
+    expired = ExpiredDrafts()
+    connection = await _connect(database_path)
+    try:
+        cursor = await connection.execute(
+            "SELECT datetime('now', ?)",
+            (f"-{int(ttl_seconds)} seconds",),
+        )
+        cutoff_row = await cursor.fetchone()
+        cutoff = cutoff_row[0] if cutoff_row is not None else None
+        while True:
+            # Selecting and deleting in one write transaction keeps a draft that is
+            # saved again in the meantime from being swept.
+            await connection.execute("BEGIN IMMEDIATE")
+            cursor = await connection.execute(
+                """
+                SELECT id, user_id, payload FROM invoice_drafts
+                WHERE created_at < ?
+                ORDER BY created_at
+                LIMIT ?
+                """,
+                (cutoff, batch_size),
+            )
+            rows = list(await cursor.fetchall())
+            if not rows:
+                await connection.commit()
+                break
+
+            for row in rows:
+                payload = row["payload"]
+                if not isinstance(payload, (bytes, str)):
+                    continue
+                expired.payload_bytes += len(payload)
+                draft = decode_draft(payload)
+                if draft is not None and draft.path:
+                    expired.paths.append(draft.path)
+
+            expired.deltas += await _delete_drafts(
+                connection,
+                [int(row["id"]) for row in rows],
+                [int(row["user_id"]) for row in rows],
+            )
+            expired.drafts += len(rows)
+            await connection.commit()
+            if len(rows) < batch_size:
+                break
+        return expired
+    finally:
+        await connection.close()
+
+
+async def fetch_referenced_paths(
+    database_path: Optional[str] = None, archive_dir: Optional[str] = None
+) -> Set[str]:
+    """Return upload paths still used by a draft or a saved (or archived) invoice."""
+    connection = await _connect(database_path)
+    try:
+        cursor = await connection.execute(
+            "SELECT DISTINCT source_path FROM invoices WHERE source_path IS NOT NULL"
+        )
+        paths = {str(row["source_path"]) for row in await cursor.fetchall()}
+        paths.update(await fetch_archived_paths(connection, archive_dir))
+        cursor = await connection.execute("SELECT payload FROM invoice_drafts")
+        for row in await cursor.fetchall():
+            payload = row["payload"]
+            if not isinstance(payload, (bytes, str)):
+                continue
+            draft = decode_draft(payload)
+            if draft is not None:
+                paths.add(draft.path)
+    finally:
+        await connection.close()
+    paths.discard("")
+    return paths
+
+
+async def delete_active_draft(connection: aiosqlite.Connection, user_id: int) -> None:
+    """Delete the user's active draft on connection; the caller owns the transaction."""
+    draft_id = await _active_draft_id(connection, user_id)
+    if draft_id is not None:
+        await _delete_drafts(connection, [draft_id], [user_id])
+
+
+async def delete_draft_invoice(user_id: int) -> None:
+    """Delete the active draft; the next queued draft of the user becomes active."""
+    connection = await _connect()
+    try:
+        await delete_active_draft(connection, user_id)
         await connection.commit()
     finally:
         await connection.close()
 
 
+async def discard_unchanged_draft(
+    connection: aiosqlite.Connection,
+    user_id: int,
+    draft: InvoiceDraft,
+) -> bool:
+    """discard_draft_invoice on connection; the caller owns the (write) transaction."""
+    if draft.draft_id is None:
+        return False
+    cursor = await connection.execute(
+        "SELECT 1 FROM invoice_drafts WHERE id=? AND user_id=? AND version=?",
+        (draft.draft_id, user_id, draft.version),
+    )
+    if await cursor.fetchone() is None:
+        return False
+    await _delete_drafts(connection, [draft.draft_id], [user_id])
+    return True
+
+
+async def discard_draft_invoice(user_id: int, draft: InvoiceDraft) -> bool:
+    """
+    Delete the stored draft that draft was loaded from, if it is still unchanged.
+
+    Returns False, deleting nothing, if it was written or deleted since.
+    """
+    if draft.draft_id is None:
+        return False
+    connection = await _connect()
+    try:
+        await connection.execute("BEGIN IMMEDIATE")
+        discarded = await discard_unchanged_draft(connection, user_id, draft)
+        await connection.commit()
+        return discarded
+    finally:
+        await connection.close()
+
+
 __all__ = [
-    "save_draft_invoice",
-    "load_draft_invoice",
+    "DRAFT_COMPACT_THRESHOLD",
+    "DRAFT_SWEEP_BATCH_SIZE",
+    "activate_draft_invoice",
+    "add_draft_invoice",
+    "append_draft_patches",
+    "compact_draft_invoices",
+    "delete_active_draft",
     "delete_draft_invoice",
+    "discard_draft_invoice",
+    "discard_unchanged_draft",
+    "delete_expired_drafts",
+    "fetch_referenced_paths",
+    "list_draft_invoices",
+    "load_draft_history",
+    "load_draft_invoice",
+    "replace_draft_invoice",
+    "save_draft_invoice",
 ]
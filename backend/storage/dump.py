@@ -0,0 +1,376 @@
+"""
+Full-database dump to gzip-compressed NDJSON, and bulk restore.
+
+dump_database writes one JSON object per invoice with its items, comments and
+raw OCR text nested in it, ordered by invoice ID. Invoices and their child rows
+are read by cursors ordered by invoice ID and merged while they are stepped, so
+memory use does not depend on the size of the database; all cursors share one
+read transaction and see the same snapshot. The first line is a header naming
+the columns of every table.
+
+Invoices moved to the archive partitions (ARCHIVE_DIR/invoices-<year>.sqlite)
+are dumped too: each partition is read through its own connection and cursors
+in the same way, and the streams are merged by invoice ID. The main database's
+snapshot is taken first, so an invoice archived while the dump runs is seen in
+both places and written once, never missed.
+
+restore_dump loads a dump into a migrated, empty database: rows are inserted
+with executemany in transactions of batch_size invoices while the secondary
+indexes and triggers of the invoice tables are dropped, and both are recreated
+when the load finishes. The supplier_monthly_spend rollup is not maintained
+during the load and has to be rebuilt afterwards; the change log does not
+record restored rows.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import heapq
+import itertools
+import json
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from backend.storage import db as storage_db
+from backend.storage.archive import list_partitions, read_only_uri
+from backend.storage.db_async import AsyncInvoiceStorage
+from backend.storage.mappers import db_payload_to_raw_text, raw_text_to_db_row
+
+DUMP_BATCH_SIZE = 5000
+DUMP_FORMAT = "invoiceflowbot-invoices"
+DUMP_VERSION = 1
+
+# Child tables nested into each invoice object: table -> key in the object.
+_CHILD_TABLES = {"invoice_items": "items", "comments": "comments"}
+_CHILD_ORDER = {"invoice_items": "invoice_id, idx, id", "comments": "invoice_id, id"}
+# invoices.raw_text is always empty; the text lives in invoice_raw.
+_SKIPPED_COLUMNS = {"invoices": {"raw_text"}}
+_LOADED_TABLES = ("invoices", "invoice_items", "comments", "invoice_raw")
+
+# Called with the number of invoices written or restored so far.
+DumpProgressFunc = Callable[[int], None]
+
+
+@dataclass
+class DumpReport:
+    """
+    Rows written by dump_database or loaded by restore_dump.
+    """
+
+    path: str
+    invoices: int = 0
+    items: int = 0
+    comments: int = 0
+    partitions: int = 0
+    duplicates: int = 0
+    seconds: float = 0.0
+
+
+def _columns(connection: sqlite3.Connection, table: str) -> List[str]:
+    skipped = _SKIPPED_COLUMNS.get(table, set())
+    return [
+        str(row[1])
+        for row in connection.execute(f"PRAGMA table_info({table})")
+        if row[1] not in skipped
+    ]
+
+
+class _ChildRows:
+    """Rows of a table ordered by invoice_id, handed out one invoice at a time."""
+
+    def __init__(self, cursor: sqlite3.Cursor) -> None:
+        names = [column[0] for column in cursor.description]
+        rows = (dict(zip(names, row)) for row in cursor)
+        self._groups = itertools.groupby(rows, key=lambda row: row["invoice_id"])
+        self._pending = next(self._groups, None)
+
+    def take(self, invoice_id: int) -> List[Dict[str, Any]]:
+        # Rows of invoices that no longer exist are skipped.
+        while self._pending is not None and self._pending[0] < invoice_id:
+            self._pending = next(self._groups, None)
+        if self._pending is None or self._pending[0] != invoice_id:
+            return []
+        # Materialize the group before groupby moves past it.
+        rows = list(self._pending[1])
+        self._pending = next(self._groups, None)
+        return rows
+
+
+def _invoice_records(
+    connection: sqlite3.Connection, columns: Dict[str, List[str]]
+) -> Iterator[Dict[str, Any]]:
+    """
+    Open the cursors of one database and return its invoices in ID order.
+
+    The cursors are started here, so the read snapshot is taken before this
+    returns. Columns missing from the database (older partitions) are None.
+    """
+    available = {table: set(_columns(connection, table)) for table in columns}
+    selected = {table: [c for c in columns[table] if c in available[table]] for table in columns}
+    children = {
+        table: _ChildRows(
+            connection.execute(
+                f"SELECT {', '.join(selected[table])} FROM {table} ORDER BY {_CHILD_ORDER[table]}"
+            )
+        )
+        for table in _CHILD_TABLES
+    }
+    raw = _ChildRows(
+        connection.execute("SELECT invoice_id, payload FROM invoice_raw ORDER BY invoice_id")
+    )
+    invoices = connection.execute(
+        f"SELECT {', '.join(selected['invoices'])} FROM invoices ORDER BY id"
+    )
+
+    def records() -> Iterator[Dict[str, Any]]:
+        for row in invoices:
+            record: Dict[str, Any] = dict.fromkeys(columns["invoices"])
+            record.update(zip(selected["invoices"], row))
+            invoice_id = record["id"]
+            for table, key in _CHILD_TABLES.items():
+                record[key] = [
+                    {column: child.get(column) for column in columns[table]}
+                    for child in children[table].take(invoice_id)
+                ]
+            raw_rows = raw.take(invoice_id)
+            record["raw_text"] = (
+                db_payload_to_raw_text(raw_rows[0]["payload"]) if raw_rows else None
+            )
+            yield record
+
+    return records()
+
+
+def dump_database(
+    output_path: str,
+    database_path: Optional[str] = None,
+    progress: Optional[DumpProgressFunc] = None,
+    progress_every: int = DUMP_BATCH_SIZE,
+    archive_dir: Optional[str] = None,
+) -> DumpReport:
+    """
+    Write every invoice with its items, comments and raw text to output_path.
+
+    Invoices in the archive partitions of archive_dir are included. Blocks the
+    calling thread; async code should use create_dump.
+    """
+    started = time.perf_counter()
+    report = DumpReport(path=output_path)
+    connections = [sqlite3.connect(database_path or storage_db.DB_PATH, isolation_level=None)]
+    partial_path = output_path + ".partial"
+    try:
+        main = connections[0]
+        columns = {table: _columns(main, table) for table in ("invoices", *_CHILD_TABLES)}
+        main.execute("BEGIN")
+        streams = [_invoice_records(main, columns)]
+        for _, path in list_partitions(archive_dir):
+            connection = sqlite3.connect(read_only_uri(path), uri=True, isolation_level=None)
+            connections.append(connection)
+            connection.execute("BEGIN")
+            streams.append(_invoice_records(connection, columns))
+        report.partitions = len(streams) - 1
+
+        with gzip.open(partial_path, "wt", encoding="utf-8", compresslevel=6) as out:
+            header = {"format": DUMP_FORMAT, "version": DUMP_VERSION, "columns": columns}
+            out.write(json.dumps(header) + "\n")
+            last_id = None
+            # heapq.merge keeps the main database's copy of an invoice archived mid-dump.
+            for record in heapq.merge(*streams, key=lambda record: record["id"]):
+                if record["id"] == last_id:
+                    continue
+                last_id = record["id"]
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                report.invoices += 1
+                report.items += len(record["items"])
+                report.comments += len(record["comments"])
+                if progress is not None and report.invoices % progress_every == 0:
+                    progress(report.invoices)
+        for connection in connections:
+            connection.execute("COMMIT")
+        os.replace(partial_path, output_path)
+    finally:
+        for connection in connections:
+            connection.close()
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+
+    if progress is not None:
+        progress(report.invoices)
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def _read_dump(path: str) -> Iterator[Dict[str, Any]]:
+    with gzip.open(path, "rt", encoding="utf-8") as source:
+        for line in source:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _drop_schema_objects(connection: sqlite3.Connection) -> List[str]:
+    """Drop the secondary indexes and triggers of the loaded tables and return their SQL."""
+    placeholders = ",".join("?" * len(_LOADED_TABLES))
+    objects: List[Tuple[str, str, str]] = connection.execute(
+        f"""
+        SELECT type, name, sql FROM sqlite_master
+        WHERE type IN ('index', 'trigger') AND sql IS NOT NULL
+          AND tbl_name IN ({placeholders})
+        ORDER BY type, name
+        """,
+        _LOADED_TABLES,
+    ).fetchall()
+    for kind, name, _ in objects:
+        connection.execute(f"DROP {kind.upper()} {name}")
+    return [sql for _, _, sql in objects]
+
+
+def _clear_duplicate_keys(connection: sqlite3.Connection) -> int:
+    """
+    Leave all but the first invoice of a dedup key without a key, as migration 0009 did.
+
+    Older versions could save an archived invoice again, and a dump holds both
+    copies; the unique index on dedup_key could not be recreated otherwise.
+    """
+    cursor = connection.execute(
+        """
+        UPDATE invoices SET dedup_key = NULL
+        WHERE id IN (
+            SELECT invoices.id FROM invoices
+            JOIN (
+                SELECT dedup_key, MIN(id) AS first_id FROM invoices
+                WHERE dedup_key IS NOT NULL
+                GROUP BY dedup_key HAVING COUNT(*) > 1
+            ) AS shared USING (dedup_key)
+            WHERE invoices.id <> shared.first_id
+        )
+        """
+    )
+    return max(cursor.rowcount, 0)
+
+
+def _insert_sql(table: str, columns: Sequence[str]) -> str:
+    return f"INSERT INTO {table}({', '.join(columns)}) VALUES({', '.join('?' * len(columns))})"
+
+
+def restore_dump(
+    dump_path: str,
+    database_path: Optional[str] = None,
+    batch_size: int = DUMP_BATCH_SIZE,
+    progress: Optional[DumpProgressFunc] = None,
+) -> DumpReport:
+    """
+    Load a dump written by dump_database into an empty, migrated database.
+
+    Invoice IDs are kept. Rebuild the supplier_monthly_spend rollup afterwards
+    (load_dump does). Run this only while the bot is stopped.
+    """
+    started = time.perf_counter()
+    report = DumpReport(path=dump_path)
+    records = _read_dump(dump_path)
+    header = next(records, None)
+    if header is None or header.get("format") != DUMP_FORMAT:
+        raise ValueError(f"{dump_path} is not an invoice dump")
+    if int(header.get("version", 0)) > DUMP_VERSION:
+        raise ValueError(f"{dump_path} was written by a newer version (v{header['version']})")
+
+    connection = sqlite3.connect(database_path or storage_db.DB_PATH, isolation_level=None)
+    try:
+        if connection.execute("SELECT 1 FROM invoices LIMIT 1").fetchone() is not None:
+            raise ValueError("restore_dump needs a database without invoices")
+
+        # Columns present both in the dump and in this schema, in schema order.
+        columns = {
+            table: [c for c in _columns(connection, table) if c in header["columns"][table]]
+            for table in ("invoices", *_CHILD_TABLES)
+        }
+        # The text goes to invoice_raw; the legacy column is left empty like the writers do.
+        invoice_sql = _insert_sql("invoices", [*columns["invoices"], "raw_text"])
+        child_sql = {table: _insert_sql(table, columns[table]) for table in _CHILD_TABLES}
+        raw_sql = "INSERT INTO invoice_raw(invoice_id, payload, raw_size) VALUES(?,?,?)"
+
+        connection.execute("BEGIN IMMEDIATE")
+        dropped = _drop_schema_objects(connection)
+        connection.execute("COMMIT")
+        try:
+            for batch in iter(lambda: list(itertools.islice(records, batch_size)), []):
+                invoice_rows = []
+                child_rows: Dict[str, List[Tuple[Any, ...]]] = {t: [] for t in _CHILD_TABLES}
+                raw_rows = []
+                for record in batch:
+                    invoice_rows.append((*(record.get(c) for c in columns["invoices"]), ""))
+                    for table, key in _CHILD_TABLES.items():
+                        child_rows[table].extend(
+                            tuple(row.get(c) for c in columns[table]) for row in record[key]
+                        )
+                    if record.get("raw_text"):
+                        raw_rows.append(raw_text_to_db_row(record["id"], record["raw_text"]))
+
+                connection.execute("BEGIN IMMEDIATE")
+                connection.executemany(invoice_sql, invoice_rows)
+                for table in _CHILD_TABLES:
+                    connection.executemany(child_sql[table], child_rows[table])
+                connection.executemany(raw_sql, raw_rows)
+                connection.execute("COMMIT")
+
+                report.invoices += len(invoice_rows)
+                report.items += len(child_rows["invoice_items"])
+                report.comments += len(child_rows["comments"])
+                if progress is not None:
+                    progress(report.invoices)
+        finally:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            # Indexes are rebuilt in one pass over the loaded rows.
+            connection.execute("BEGIN IMMEDIATE")
+            report.duplicates = _clear_duplicate_keys(connection)
+            for sql in dropped:
+                connection.execute(sql)
+            connection.execute("COMMIT")
+    finally:
+        connection.close()
+
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+async def create_dump(
+    output_path: str,
+    database_path: Optional[str] = None,
+    progress: Optional[DumpProgressFunc] = None,
+    archive_dir: Optional[str] = None,
+) -> DumpReport:
+    """Run dump_database in a worker thread."""
+    return await asyncio.to_thread(
+        dump_database, output_path, database_path, progress, archive_dir=archive_dir
+    )
+
+
+async def load_dump(
+    dump_path: str,
+    database_path: Optional[str] = None,
+    batch_size: int = DUMP_BATCH_SIZE,
+    progress: Optional[DumpProgressFunc] = None,
+    archive_dir: Optional[str] = None,
+) -> DumpReport:
+    """Run restore_dump in a worker thread, then rebuild the supplier spend rollup."""
+    database_path = database_path or storage_db.DB_PATH
+    report = await asyncio.to_thread(restore_dump, dump_path, database_path, batch_size, progress)
+    await AsyncInvoiceStorage(database_path, archive_dir=archive_dir).rebuild_supplier_spend()
+    return report
+
+
+__all__ = [
+    "DUMP_BATCH_SIZE",
+    "DUMP_FORMAT",
+    "DUMP_VERSION",
+    "DumpProgressFunc",
+    "DumpReport",
+    "create_dump",
+    "dump_database",
+    "load_dump",
+    "restore_dump",
+]
@@ -1,16 +1,114 @@
 from __future__ import annotations
 
+import json
+import re
+import zlib
 from datetime import date
-from decimal import Decimal
-from typing import Any, Dict, List
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Dict, List, Optional, Tuple
 
 from backend.domain.invoices import (
     Invoice,
+    InvoiceChange,
     InvoiceHeader,
     InvoiceItem,
     InvoiceSourceInfo,
+    InvoiceSummary,
+    InvoiceTotals,
+    SupplierMonthlySpend,
 )
 
+# Money columns hold integer minor units (hundredths), quantities thousandths,
+# so SQL sums are exact. Unit prices and quantities may carry more digits: their
+# rows store the scale next to the units (price_scale, qty_scale), at least the
+# default scale and at most MAX_UNIT_SCALE. The REAL columns are only read for
+# rows without an integer value.
+MONEY_SCALE = 2
+QUANTITY_SCALE = 3
+MAX_UNIT_SCALE = 9
+
+
+def to_units(value: Optional[Decimal], scale: int) -> Optional[int]:
+    """Convert a Decimal to an integer count of 10**-scale units, rounding half up."""
+    if value is None or not value.is_finite():
+        return None
+    return int(value.scaleb(scale).to_integral_value(ROUND_HALF_UP))
+
+
+def from_units(units: int, scale: int) -> Decimal:
+    return Decimal(units).scaleb(-scale)
+
+
+def unit_scale(value: Optional[Decimal], default: int) -> int:
+    """Smallest scale of at least default that holds value, capped at MAX_UNIT_SCALE."""
+    if value is None or not value.is_finite():
+        return default
+    exponent = value.normalize().as_tuple().exponent
+    if not isinstance(exponent, int):
+        raise ValueError(f"no unit scale for {value!r}")
+    return min(max(default, -exponent), MAX_UNIT_SCALE)
+
+
+# Raw OCR text lives zlib-compressed in invoice_raw, out of the invoices rows.
+RAW_TEXT_COMPRESSION_LEVEL = 6
+
+
+def raw_text_to_db_row(invoice_id: int, raw_text: str) -> Tuple[int, bytes, int]:
+    """Build an invoice_raw row; raw_size is the uncompressed UTF-8 length."""
+    encoded = raw_text.encode("utf-8")
+    return invoice_id, zlib.compress(encoded, RAW_TEXT_COMPRESSION_LEVEL), len(encoded)
+
+
+def db_payload_to_raw_text(payload: bytes) -> str:
+    return zlib.decompress(payload).decode("utf-8")
+
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def _normalize_text(value: Optional[str]) -> str:
+    if not value:
+        return ""
+    return _NON_WORD.sub(" ", value.casefold().replace("ё", "е")).strip()
+
+
+def invoice_dedup_key(
+    user_id: int,
+    supplier: Optional[str],
+    doc_number: Optional[str],
+    date_iso: Optional[str],
+    total_minor: Optional[int],
+) -> Optional[str]:
+    """
+    Key under which an invoice may be stored only once (invoices.dedup_key).
+
+    Supplier and document number are compared ignoring case, punctuation and
+    spacing. Invoices without a document number get no key and are never
+    treated as duplicates.
+    """
+    number = _normalize_text(doc_number).replace(" ", "")
+    if not number:
+        return None
+    total = "" if total_minor is None else str(total_minor)
+    return f"{user_id}|{_normalize_text(supplier)}|{number}|{date_iso or ''}|{total}"
+
+
+def _read_decimal(
+    row: Dict[str, Any],
+    units_key: str,
+    real_key: str,
+    scale: int,
+    scale_key: Optional[str] = None,
+) -> Optional[Decimal]:
+    units = row.get(units_key)
+    if units is None:
+        # Rows written before the integer columns existed.
+        value = row.get(real_key)
+        return Decimal(str(value)) if value is not None else None
+    if scale_key is not None and row.get(scale_key) is not None:
+        scale = int(row[scale_key])
+    return from_units(int(units), scale)
+
 
 def invoice_to_db_row(invoice: Invoice, user_id: int = 0) -> Dict[str, Any]:
     header = invoice.header
@@ -26,6 +124,7 @@ def invoice_to_db_row(invoice: Invoice, user_id: int = 0) -> Dict[str, Any]:
     if header.total_amount is not None:
         total_sum = float(header.total_amount)
 
+    total_minor = to_units(header.total_amount, MONEY_SCALE)
     return {
         "user_id": user_id,
         "supplier": header.supplier_name,
@@ -34,12 +133,18 @@ def invoice_to_db_row(invoice: Invoice, user_id: int = 0) -> Dict[str, Any]:
         "date": header.invoice_date.isoformat() if header.invoice_date else None,
         "date_iso": date_iso,
         "total_sum": total_sum,
+        "total_minor": total_minor,
         "raw_text": "",
         "source_path": source_path or "",
+        "dedup_key": invoice_dedup_key(
+            user_id, header.supplier_name, header.invoice_number, date_iso, total_minor
+        ),
     }
 
 
 def invoice_item_to_db_row(invoice_id: int, item: InvoiceItem, index: int) -> Dict[str, Any]:
+    qty_scale = unit_scale(item.quantity, QUANTITY_SCALE)
+    price_scale = unit_scale(item.unit_price, MONEY_SCALE)
     return {
         "invoice_id": invoice_id,
         "idx": index,
@@ -48,6 +153,11 @@ def invoice_item_to_db_row(invoice_id: int, item: InvoiceItem, index: int) -> Di
         "qty": float(item.quantity),
         "price": float(item.unit_price),
         "total": float(item.line_total),
+        "qty_milli": to_units(item.quantity, qty_scale),
+        "price_minor": to_units(item.unit_price, price_scale),
+        "total_minor": to_units(item.line_total, MONEY_SCALE),
+        "qty_scale": qty_scale,
+        "price_scale": price_scale,
     }
 
 
@@ -55,9 +165,11 @@ def db_row_to_invoice_item(row: Dict[str, Any]) -> InvoiceItem:
     return InvoiceItem(
         description=row.get("name") or "",
         sku=row.get("code"),
-        quantity=Decimal(str(row.get("qty", 0))),
-        unit_price=Decimal(str(row.get("price", 0))),
-        line_total=Decimal(str(row.get("total", 0))),
+        quantity=_read_decimal(row, "qty_milli", "qty", QUANTITY_SCALE, "qty_scale")
+        or Decimal("0"),
+        unit_price=_read_decimal(row, "price_minor", "price", MONEY_SCALE, "price_scale")
+        or Decimal("0"),
+        line_total=_read_decimal(row, "total_minor", "total", MONEY_SCALE) or Decimal("0"),
     )
 
 
@@ -69,9 +181,7 @@ def db_row_to_invoice(header_row: Dict[str, Any], item_rows: List[Dict[str, Any]
         except (ValueError, TypeError):
             pass
 
-    total_amount = None
-    if header_row.get("total_sum") is not None:
-        total_amount = Decimal(str(header_row["total_sum"]))
+    total_amount = _read_decimal(header_row, "total_minor", "total_sum", MONEY_SCALE)
 
     header = InvoiceHeader(
         supplier_name=header_row.get("supplier"),
@@ -100,9 +210,75 @@ def db_row_to_invoice(header_row: Dict[str, Any], item_rows: List[Dict[str, Any]
     return invoice
 
 
+def db_row_to_invoice_summary(row: Dict[str, Any]) -> InvoiceSummary:
+    invoice_date = None
+    if row.get("date_iso"):
+        try:
+            invoice_date = date.fromisoformat(row["date_iso"])
+        except (ValueError, TypeError):
+            pass
+
+    total_amount = _read_decimal(row, "total_minor", "total_sum", MONEY_SCALE)
+
+    return InvoiceSummary(
+        invoice_id=int(row["id"]),
+        supplier_name=row.get("supplier"),
+        invoice_number=row.get("doc_number"),
+        invoice_date=invoice_date,
+        total_amount=total_amount,
+        item_count=int(row.get("item_count") or 0),
+    )
+
+
+def db_row_to_invoice_totals(row: Dict[str, Any]) -> InvoiceTotals:
+    total_amount = _read_decimal(row, "total_minor", "total_sum", MONEY_SCALE)
+    return InvoiceTotals(
+        invoice_count=int(row.get("invoice_count") or 0),
+        item_count=int(row.get("item_count") or 0),
+        total_amount=total_amount if total_amount is not None else Decimal("0"),
+    )
+
+
+def db_row_to_supplier_spend(row: Dict[str, Any]) -> SupplierMonthlySpend:
+    total_amount = _read_decimal(row, "total_minor", "total_sum", MONEY_SCALE)
+    return SupplierMonthlySpend(
+        supplier=row.get("supplier") or "",
+        month=row.get("month") or "",
+        invoice_count=int(row.get("invoice_count") or 0),
+        item_count=int(row.get("item_count") or 0),
+        total_amount=total_amount if total_amount is not None else Decimal("0"),
+    )
+
+
+def db_row_to_invoice_change(row: Dict[str, Any]) -> InvoiceChange:
+    data = row.get("data")
+    return InvoiceChange(
+        seq=int(row["seq"]),
+        table=row["table_name"],
+        op=row["op"],
+        row_id=int(row["row_id"]),
+        invoice_id=int(row["invoice_id"]),
+        changed_at=row.get("changed_at") or "",
+        data=json.loads(data) if data else None,
+    )
+
+
 __all__ = [
+    "MONEY_SCALE",
+    "QUANTITY_SCALE",
+    "MAX_UNIT_SCALE",
+    "from_units",
+    "to_units",
+    "unit_scale",
+    "RAW_TEXT_COMPRESSION_LEVEL",
+    "raw_text_to_db_row",
+    "db_payload_to_raw_text",
     "invoice_to_db_row",
     "invoice_item_to_db_row",
     "db_row_to_invoice_item",
     "db_row_to_invoice",
+    "db_row_to_invoice_summary",
+    "db_row_to_invoice_totals",
+    "db_row_to_supplier_spend",
+    "db_row_to_invoice_change",
 ]
@@ -0,0 +1,221 @@
+"""
+Deletion of invoices past the retention period.
+
+prune_invoices removes invoices dated before a cutoff (undated invoices by the
+day they were saved) together with their items, comments and raw OCR text,
+batch_size invoices per short write transaction with a pause in between so
+the bot's own writes never wait long. Year partitions of the archive that lie
+entirely before the cutoff are deleted as whole files once their upload paths
+were read; in the partition of the cutoff year the invoices before the cutoff
+are deleted the same way as in the main database. incremental_vacuum then
+returns the freed pages to the file system a few at a time, once
+enable_incremental_vacuum switched the database to auto_vacuum=INCREMENTAL.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from dataclasses import dataclass, field
+from datetime import date
+from typing import List, Optional
+
+import aiosqlite
+
+from backend.storage import db as storage_db
+from backend.storage.archive import attached_partition, list_partitions, read_only_uri
+
+RETENTION_BATCH_SIZE = 200
+RETENTION_BATCH_PAUSE_SECONDS = 0.05
+VACUUM_PAGES_PER_STEP = 1024
+
+# PRAGMA auto_vacuum value set by enable_incremental_vacuum.
+_AUTO_VACUUM_INCREMENTAL = 2
+
+
+@dataclass
+class PrunedInvoices:
+    """
+    Rows and archive partitions removed by prune_invoices, and the upload
+    paths of the removed invoices. archived counts the invoices among them
+    that were deleted from an archive partition.
+    """
+
+    invoices: int = 0
+    archived: int = 0
+    items: int = 0
+    comments: int = 0
+    partitions: List[str] = field(default_factory=list)
+    paths: List[str] = field(default_factory=list)
+
+
+async def _delete_batch(
+    connection: aiosqlite.Connection, schema: str, invoice_ids: List[int], pruned: PrunedInvoices
+) -> int:
+    placeholders = ",".join("?" * len(invoice_ids))
+    await connection.execute(
+        f"DELETE FROM {schema}.invoice_raw WHERE invoice_id IN ({placeholders})", invoice_ids
+    )
+    cursor = await connection.execute(
+        f"DELETE FROM {schema}.comments WHERE invoice_id IN ({placeholders})", invoice_ids
+    )
+    pruned.comments += max(cursor.rowcount, 0)
+    cursor = await connection.execute(
+        f"DELETE FROM {schema}.invoice_items WHERE invoice_id IN ({placeholders})", invoice_ids
+    )
+    pruned.items += max(cursor.rowcount, 0)
+    cursor = await connection.execute(
+        f"DELETE FROM {schema}.invoices WHERE id IN ({placeholders})", invoice_ids
+    )
+    deleted = max(cursor.rowcount, 0)
+    pruned.invoices += deleted
+    return deleted
+
+
+async def _prune_schema(
+    connection: aiosqlite.Connection,
+    schema: str,
+    cutoff: date,
+    batch_size: int,
+    pause_seconds: float,
+    pruned: PrunedInvoices,
+) -> int:
+    deleted = 0
+    while True:
+        await connection.execute("BEGIN IMMEDIATE")
+        cursor = await connection.execute(
+            f"""
+            SELECT id, source_path FROM {schema}.invoices
+            WHERE date_iso < :cutoff OR (date_iso IS NULL AND created_at < :cutoff)
+            ORDER BY id
+            LIMIT :limit
+            """,
+            {"cutoff": cutoff.isoformat(), "limit": batch_size},
+        )
+        rows = list(await cursor.fetchall())
+        if rows:
+            deleted += await _delete_batch(
+                connection, schema, [int(row[0]) for row in rows], pruned
+            )
+            pruned.paths.extend(str(row[1]) for row in rows if row[1])
+        await connection.commit()
+        if len(rows) < batch_size:
+            return deleted
+        if pause_seconds > 0:
+            await asyncio.sleep(pause_seconds)
+
+
+async def prune_invoices(
+    cutoff: date,
+    batch_size: int = RETENTION_BATCH_SIZE,
+    pause_seconds: float = RETENTION_BATCH_PAUSE_SECONDS,
+    database_path: Optional[str] = None,
+    archive_dir: Optional[str] = None,
+) -> PrunedInvoices:
+    """
+    Delete invoices dated before cutoff in batches of batch_size.
+
+    Deleting fires the rollup triggers, so pruned invoices also leave
+    supplier_monthly_spend; after archive partitions were dropped or pruned
+    (see PrunedInvoices.archived) the rollup has to be rebuilt by the caller.
+    """
+    pruned = PrunedInvoices()
+    connection = await aiosqlite.connect(database_path or storage_db.DB_PATH)
+    try:
+        await _prune_schema(connection, "main", cutoff, batch_size, pause_seconds, pruned)
+        for year, path in list_partitions(archive_dir):
+            if year != cutoff.year:
+                continue
+            async with attached_partition(connection, year, path) as schema:
+                pruned.archived += await _prune_schema(
+                    connection, schema, cutoff, batch_size, pause_seconds, pruned
+                )
+    finally:
+        await connection.close()
+
+    for year, path in list_partitions(archive_dir):
+        if year < cutoff.year:
+            async with aiosqlite.connect(read_only_uri(path), uri=True) as partition:
+                cursor = await partition.execute(
+                    "SELECT source_path FROM invoices WHERE source_path IS NOT NULL"
+                )
+                pruned.paths.extend(str(row[0]) for row in await cursor.fetchall() if row[0])
+            os.remove(path)
+            pruned.partitions.append(path)
+    return pruned
+
+
+async def enable_incremental_vacuum(database_path: Optional[str] = None) -> bool:
+    """
+    Switch the database to auto_vacuum=INCREMENTAL; returns False if it already was.
+
+    The switch takes a full VACUUM: the whole file is rewritten under an
+    exclusive lock and needs free disk space about the size of the database.
+    That is why it is not a migration: migrations run at every startup, and
+    this is left to an explicit `prune-invoices --enable-incremental-vacuum`.
+    """
+    connection = await aiosqlite.connect(database_path or storage_db.DB_PATH)
+    try:
+        cursor = await connection.execute("PRAGMA auto_vacuum")
+        row = await cursor.fetchone()
+        await cursor.close()
+        if row is not None and int(row[0]) == _AUTO_VACUUM_INCREMENTAL:
+            return False
+        await connection.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        await connection.execute("VACUUM")
+        return True
+    finally:
+        await connection.close()
+
+
+async def incremental_vacuum(
+    pages_per_step: int = VACUUM_PAGES_PER_STEP,
+    pause_seconds: float = RETENTION_BATCH_PAUSE_SECONDS,
+    database_path: Optional[str] = None,
+) -> int:
+    """
+    Release free pages back to the file system and return the bytes released.
+
+    Does nothing unless the database uses auto_vacuum=INCREMENTAL.
+    """
+    connection = await aiosqlite.connect(database_path or storage_db.DB_PATH)
+    try:
+
+        async def pragma(statement: str) -> int:
+            cursor = await connection.execute(f"PRAGMA {statement}")
+            row = await cursor.fetchone()
+            await cursor.close()
+            return int(row[0]) if row is not None else 0
+
+        if await pragma("auto_vacuum") != _AUTO_VACUUM_INCREMENTAL:
+            return 0
+        page_size = await pragma("page_size")
+        released = 0
+        while True:
+            free_pages = await pragma("freelist_count")
+            if free_pages == 0:
+                break
+            cursor = await connection.execute(f"PRAGMA incremental_vacuum({pages_per_step})")
+            await cursor.fetchall()
+            await cursor.close()
+            await connection.commit()
+            step = free_pages - await pragma("freelist_count")
+            if step <= 0:
+                break
+            released += step * page_size
+            if pause_seconds > 0:
+                await asyncio.sleep(pause_seconds)
+        return released
+    finally:
+        await connection.close()
+
+
+__all__ = [
+    "RETENTION_BATCH_PAUSE_SECONDS",
+    "RETENTION_BATCH_SIZE",
+    "VACUUM_PAGES_PER_STEP",
+    "PrunedInvoices",
+    "enable_incremental_vacuum",
+    "incremental_vacuum",
+    "prune_invoices",
+]
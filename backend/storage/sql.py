@@ -0,0 +1,175 @@
+"""
+SQL shared by the async and sync invoice storage.
+
+Both implementations build their statements and parameters here and convert
+rows with backend.storage.mappers, so they read and write the same data.
+"""
+
+from __future__ import annotations
+
+from datetime import date
+from typing import Any, Callable, List, Mapping, Optional, Sequence, Set, Tuple
+
+from backend.domain.invoices import Invoice
+
+# A duplicate (same dedup_key) is not inserted; the cursor's rowcount is then 0
+# and the stored copy is found with SELECT_INVOICE_ID_BY_DEDUP_KEY_SQL.
+INSERT_INVOICE_SQL = """
+    INSERT INTO invoices(
+        user_id, supplier, client, doc_number, date, date_iso, total_sum, total_minor,
+        raw_text, source_path, dedup_key
+    )
+    VALUES(
+        :user_id, :supplier, :client, :doc_number, :date, :date_iso, :total_sum, :total_minor,
+        :raw_text, :source_path, :dedup_key
+    )
+    ON CONFLICT(dedup_key) WHERE dedup_key IS NOT NULL DO NOTHING
+"""
+
+SELECT_INVOICE_ID_BY_DEDUP_KEY_SQL = "SELECT id FROM invoices WHERE dedup_key=?"
+
+# Despite its name, qty_milli is in units of 10^-qty_scale, like price_minor is in
+# units of 10^-price_scale (both scales are per row since 0014_item_unit_scales).
+INSERT_ITEM_SQL = """
+    INSERT INTO invoice_items(
+        invoice_id, idx, code, name, qty, price, total, qty_milli, price_minor, total_minor,
+        qty_scale, price_scale
+    )
+    VALUES(
+        :invoice_id, :idx, :code, :name, :qty, :price, :total, :qty_milli, :price_minor,
+        :total_minor, :qty_scale, :price_scale
+    )
+"""
+
+INSERT_COMMENT_SQL = "INSERT INTO comments(invoice_id, user_id, text) VALUES(?,?,?)"
+
+INSERT_INVOICE_RAW_SQL = "INSERT INTO invoice_raw(invoice_id, payload, raw_size) VALUES(?,?,?)"
+
+
+SELECT_INVOICE_CHANGES_SQL = """
+    SELECT seq, table_name, op, row_id, invoice_id, data, changed_at
+    FROM invoice_changes WHERE seq > ? ORDER BY seq LIMIT ?
+"""
+DELETE_INVOICE_CHANGES_SQL = "DELETE FROM invoice_changes WHERE seq <= ?"
+
+
+def select_invoice_raw_sql(schema: str = "main") -> str:
+    """Compressed raw OCR text of one invoice; schema selects an archive partition."""
+    return f"SELECT payload FROM {schema}.invoice_raw WHERE invoice_id=?"
+
+
+def select_invoice_items_sql(schema: str = "main") -> str:
+    """
+    Items of one invoice; schema selects an attached archive partition.
+
+    Items are read with all their columns: partitions written by older versions
+    may lack columns added since (such as qty_scale), which then read as None.
+    """
+    return f"SELECT * FROM {schema}.invoice_items WHERE invoice_id=? ORDER BY idx ASC"
+
+
+SELECT_INVOICE_ITEMS_SQL = select_invoice_items_sql()
+
+HEADER_COLUMNS = (
+    "id, date, date_iso, doc_number, supplier, client, total_sum, total_minor, source_path"
+)
+
+
+def comment_rows(invoice_id: int, invoice: Invoice, user_id: int) -> List[Tuple[int, int, str]]:
+    """Build comment rows, using a numeric comment author as its user ID when possible."""
+    rows: List[Tuple[int, int, str]] = []
+    for comment in invoice.comments:
+        comment_user_id = user_id
+        if comment.author:
+            try:
+                comment_user_id = int(comment.author)
+            except (ValueError, TypeError):
+                pass
+        rows.append((invoice_id, comment_user_id, comment.message))
+    return rows
+
+
+def fetch_invoices_query(
+    from_date: Optional[date],
+    to_date: Optional[date],
+    supplier: Optional[str] = None,
+    schema: str = "main",
+) -> Tuple[str, Tuple[Any, ...]]:
+    """
+    Build the header query of fetch_invoices.
+
+    With both dates the range is filtered and ordered by date_iso, using the
+    (date_iso, id) index; invoices without a date_iso are left out (see
+    backfill_date_iso for legacy rows). Otherwise every invoice is returned in
+    insertion order. schema selects an attached archive partition; rows from
+    several schemas are merged with fetch_invoices_sort_key.
+    """
+    clauses: List[str] = []
+    parameters: List[Any] = []
+    if from_date and to_date:
+        clauses.append("date_iso BETWEEN ? AND ?")
+        parameters.extend([from_date.isoformat(), to_date.isoformat()])
+        order = "date_iso ASC, id ASC"
+    else:
+        order = "created_at ASC, id ASC"
+    if supplier:
+        clauses.append("supplier LIKE ?")
+        parameters.append(f"%{supplier}%")
+    where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+    return (
+        f"SELECT {HEADER_COLUMNS}, created_at FROM {schema}.invoices {where}ORDER BY {order}",
+        tuple(parameters),
+    )
+
+
+def fetch_invoices_sort_key(
+    from_date: Optional[date], to_date: Optional[date]
+) -> Callable[[Mapping[str, Any]], Tuple[Any, ...]]:
+    """Sort key of fetch_invoices_query rows, with NULLs first as in SQLite."""
+    ranged = bool(from_date and to_date)
+
+    def key(row: Mapping[str, Any]) -> Tuple[Any, ...]:
+        value = row["date_iso"] if ranged else row["created_at"]
+        return (value is not None, value or "", row["id"])
+
+    return key
+
+
+def merge_fetched_invoices(
+    rows: Sequence[Tuple[Mapping[str, Any], Invoice]],
+    from_date: Optional[date],
+    to_date: Optional[date],
+) -> List[Invoice]:
+    """
+    Merge fetch_invoices rows read from several schemas into one ordered list.
+
+    An interrupted archive run may leave an invoice in both the main database
+    and a partition; it is returned once.
+    """
+    sort_key = fetch_invoices_sort_key(from_date, to_date)
+    seen: Set[int] = set()
+    invoices: List[Invoice] = []
+    for row, invoice in sorted(rows, key=lambda pair: sort_key(pair[0])):
+        if row["id"] not in seen:
+            seen.add(row["id"])
+            invoices.append(invoice)
+    return invoices
+
+
+__all__ = [
+    "DELETE_INVOICE_CHANGES_SQL",
+    "INSERT_COMMENT_SQL",
+    "INSERT_INVOICE_RAW_SQL",
+    "INSERT_INVOICE_SQL",
+    "INSERT_ITEM_SQL",
+    "SELECT_INVOICE_CHANGES_SQL",
+    "SELECT_INVOICE_ID_BY_DEDUP_KEY_SQL",
+    "SELECT_INVOICE_ITEMS_SQL",
+    "HEADER_COLUMNS",
+    "comment_rows",
+    "fetch_invoices_query",
+    "fetch_invoices_sort_key",
+    "merge_fetched_invoices",
+    "select_invoice_items_sql",
+    "select_invoice_raw_sql",
+]
@@ -0,0 +1,251 @@
+"""
+Group commit for invoice saves and draft deletes.
+
+SQLite commits one transaction at a time and each commit waits for the disk.
+When many users save at once (month-end), GroupCommitQueue collects the writes
+that arrive within a short window and runs them in one transaction, so the
+burst costs one commit instead of one per save. Every write runs in its own
+savepoint: a failing write is rolled back alone and only its caller sees the
+error. If the commit itself fails, every caller in the batch gets the error.
+
+The writer task runs only while there are writes queued; it opens one
+connection per burst and exits when the queue is empty.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, List, Optional, Tuple, TypeVar
+
+import aiosqlite
+
+from backend.domain.drafts import InvoiceDraft
+from backend.domain.invoices import Invoice
+from backend.storage import db as storage_db
+from backend.storage.db_async import archived_duplicates, insert_invoice
+from backend.storage.drafts_async import delete_active_draft, discard_unchanged_draft
+
+DEFAULT_WRITE_BATCH_WINDOW_SECONDS = 0.005
+DEFAULT_WRITE_BATCH_MAX_SIZE = 64
+
+T = TypeVar("T")
+WriteOp = Callable[[aiosqlite.Connection], Awaitable[T]]
+
+
+@dataclass
+class WriteQueueStats:
+    """
+    Counters of a GroupCommitQueue since it was created.
+    """
+
+    batches: int = 0
+    writes: int = 0
+    failed_writes: int = 0
+    largest_batch: int = 0
+    commit_seconds: float = 0.0
+    last_commit_seconds: float = 0.0
+
+    @property
+    def avg_batch_size(self) -> float:
+        return self.writes / self.batches if self.batches else 0.0
+
+    @property
+    def avg_commit_ms(self) -> float:
+        return self.commit_seconds / self.batches * 1000 if self.batches else 0.0
+
+
+def _writer_stopped() -> RuntimeError:
+    return RuntimeError("write queue stopped before the write was committed")
+
+
+@dataclass
+class _QueuedWrite:
+    op: WriteOp[Any]
+    future: asyncio.Future[Any]
+
+
+class GroupCommitQueue:
+    """
+    Single writer that batches concurrent writes into one transaction.
+
+    The first write of a burst waits window_seconds for others to join; writes
+    queued while a batch commits form the next batch. A batch holds at most
+    max_batch writes. Without database_path the current DB_PATH is used; with
+    archive_dir, saves also skip invoices already in an archive partition.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        window_seconds: float = DEFAULT_WRITE_BATCH_WINDOW_SECONDS,
+        max_batch: int = DEFAULT_WRITE_BATCH_MAX_SIZE,
+        database_path: Optional[str] = None,
+        archive_dir: Optional[str] = None,
+    ) -> None:
+        self._logger = logger
+        self._archive_dir = archive_dir
+        self._window_seconds = max(0.0, window_seconds)
+        self._max_batch = max(1, max_batch)
+        self._database_path = database_path
+        self._queue: Deque[_QueuedWrite] = deque()
+        self._writer: Optional[asyncio.Task[None]] = None
+        self._stats = WriteQueueStats()
+
+    async def submit(self, op: WriteOp[T]) -> T:
+        """Run op(connection) in the next batch and return its result after the commit."""
+        future: asyncio.Future[T] = asyncio.get_running_loop().create_future()
+        self._queue.append(_QueuedWrite(op=op, future=future))
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._run())
+        return await future
+
+    async def save_invoice(self, invoice: Invoice, user_id: int = 0) -> int:
+        invoice_id, _ = await self.store_invoice(invoice, user_id)
+        return invoice_id
+
+    async def store_invoice(self, invoice: Invoice, user_id: int = 0) -> Tuple[int, bool]:
+        """Like save_invoice, but return (ID, inserted) as AsyncInvoiceStorage.store_invoice."""
+        # Partitions are read outside the batch transaction.
+        archived = await archived_duplicates([invoice], user_id, self._archive_dir)
+
+        async def op(connection: aiosqlite.Connection) -> Tuple[int, bool]:
+            return await insert_invoice(await connection.cursor(), invoice, user_id, archived)
+
+        return await self.submit(op)
+
+    async def delete_draft(self, user_id: int) -> None:
+        async def op(connection: aiosqlite.Connection) -> None:
+            await delete_active_draft(connection, user_id)
+
+        await self.submit(op)
+
+    async def discard_draft(self, user_id: int, draft: InvoiceDraft) -> bool:
+        async def op(connection: aiosqlite.Connection) -> bool:
+            return await discard_unchanged_draft(connection, user_id, draft)
+
+        return await self.submit(op)
+
+    async def drain(self) -> None:
+        """Wait until every queued write is committed, e.g. on shutdown."""
+        while self._writer is not None:
+            await asyncio.shield(self._writer)
+
+    async def _run(self) -> None:
+        try:
+            connection = await aiosqlite.connect(self._database_path or storage_db.DB_PATH)
+            connection.row_factory = aiosqlite.Row
+        except Exception as e:
+            self._writer = None
+            self._fail(list(self._queue), e)
+            self._queue.clear()
+            return
+        except BaseException:
+            self._writer = None
+            self._fail(list(self._queue), _writer_stopped())
+            self._queue.clear()
+            raise
+        batch: List[_QueuedWrite] = []
+        try:
+            await asyncio.sleep(self._window_seconds)
+            while self._queue:
+                batch = []
+                while self._queue and len(batch) < self._max_batch:
+                    write = self._queue.popleft()
+                    if not write.future.cancelled():
+                        batch.append(write)
+                if batch:
+                    await self._commit(connection, batch)
+            # No await between the empty check and this, so submit() sees either
+            # a running writer that will pick its write up or none at all.
+            self._writer = None
+        finally:
+            self._writer = None
+            # Only a cancelled writer (loop shutdown, a caller cancelling it)
+            # gets here with writes unresolved; their callers would otherwise
+            # wait forever. The interrupted batch may or may not have committed.
+            pending = [write for write in batch + list(self._queue) if not write.future.done()]
+            self._queue.clear()
+            if pending:
+                self._logger.warning(f"[STORAGE] write queue stopped with {len(pending)} writes")
+                self._fail(pending, _writer_stopped())
+            if connection.in_transaction:
+                try:
+                    await connection.rollback()
+                except Exception:
+                    pass
+            await connection.close()
+
+    async def _commit(self, connection: aiosqlite.Connection, batch: List[_QueuedWrite]) -> None:
+        started = time.perf_counter()
+        results: List[Any] = []
+        failed = 0
+        try:
+            await connection.execute("BEGIN IMMEDIATE")
+            for write in batch:
+                await connection.execute("SAVEPOINT queued_write")
+                try:
+                    result = await write.op(connection)
+                except Exception as e:
+                    await connection.execute("ROLLBACK TO queued_write")
+                    result = e
+                    failed += 1
+                await connection.execute("RELEASE queued_write")
+                results.append(result)
+            await connection.commit()
+        except Exception as e:
+            self._logger.exception(f"[STORAGE] group commit of {len(batch)} writes failed")
+            try:
+                await connection.rollback()
+            except Exception:
+                pass
+            self._fail(batch, e)
+            failed = len(batch)
+            results = []
+        elapsed = time.perf_counter() - started
+
+        for write, result in zip(batch, results):
+            if write.future.done():
+                continue
+            if isinstance(result, Exception):
+                write.future.set_exception(result)
+            else:
+                write.future.set_result(result)
+
+        stats = self._stats
+        stats.batches += 1
+        stats.writes += len(batch)
+        stats.failed_writes += failed
+        stats.largest_batch = max(stats.largest_batch, len(batch))
+        stats.commit_seconds += elapsed
+        stats.last_commit_seconds = elapsed
+        self._logger.debug(
+            f"[STORAGE] group commit writes={len(batch)} failed={failed} ms={elapsed * 1000:.2f}"
+        )
+
+    @staticmethod
+    def _fail(batch: List[_QueuedWrite], error: BaseException) -> None:
+        for write in batch:
+            if not write.future.done():
+                write.future.set_exception(error)
+
+    def stats(self) -> WriteQueueStats:
+        stats = self._stats
+        self._logger.debug(
+            f"[STORAGE] write queue batches={stats.batches} writes={stats.writes} "
+            f"avg_batch={stats.avg_batch_size:.1f} largest={stats.largest_batch} "
+            f"avg_commit_ms={stats.avg_commit_ms:.2f} failed={stats.failed_writes}"
+        )
+        return WriteQueueStats(**vars(stats))
+
+
+__all__ = [
+    "DEFAULT_WRITE_BATCH_MAX_SIZE",
+    "DEFAULT_WRITE_BATCH_WINDOW_SECONDS",
+    "GroupCommitQueue",
+    "WriteOp",
+    "WriteQueueStats",
+]
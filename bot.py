@@ -29,7 +29,20 @@ async def _run_bot() -> None:
     dp.include_router(file_router)
     dp.include_router(cmd_router)
     dp.include_router(callbacks_router)
-    await dp.start_polling(bot)
+    container.draft_sweeper.start()
+    container.backup_scheduler.start()
+    container.retention_job.start()
+    try:
+        await dp.start_polling(bot)
+    finally:
+        await container.retention_job.stop()
+        await container.backup_scheduler.stop()
+        await container.draft_sweeper.stop()
+        # Drafts buffered by write-behind mode must reach the database before exit.
+        flushed = await container.draft_service.flush_all()
+        if container.write_queue is not None:
+            await container.write_queue.drain()
+        logger.info(f"Bot shutdown, flushed drafts: {flushed}")
 
 
 def main() -> None:
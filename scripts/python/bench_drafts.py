@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Draft serialization benchmark for InvoiceFlowBot.
+
+Compares the legacy JSON draft payload with the binary format written by
+backend.storage.draft_codec: payload size and encode/decode time.
+
+Usage: python scripts/python/bench_drafts.py [--items 300] [--rounds 200]
+"""
+
+import argparse
+import json
+import sys
+import timeit
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Any
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from backend.domain.drafts import InvoiceDraft  # noqa: E402
+from backend.domain.invoices import (  # noqa: E402
+    Invoice,
+    InvoiceHeader,
+    InvoiceItem,
+    InvoiceSourceInfo,
+)
+from backend.storage.draft_codec import decode_draft, encode_draft  # noqa: E402
+
+
+def make_draft(items: int) -> InvoiceDraft:
+    """Build a draft that looks like a long OCR result."""
+    return InvoiceDraft(
+        invoice=Invoice(
+            header=InvoiceHeader(
+                supplier_name="ООО Поставщик",
+                customer_name="ИП Покупатель",
+                invoice_number="INV-2025-0001",
+                invoice_date=date(2025, 1, 15),
+                total_amount=Decimal("123456.78"),
+            ),
+            items=[
+                InvoiceItem(
+                    description=f"Товар номер {i} с длинным названием",
+                    sku=f"SKU-{i:05d}",
+                    quantity=Decimal("3"),
+                    unit_price=Decimal("41.15"),
+                    line_total=Decimal("123.45"),
+                )
+                for i in range(items)
+            ],
+            source=InvoiceSourceInfo(file_path="data/uploads/invoice.pdf"),
+        ),
+        path="data/uploads/invoice.pdf",
+        raw_text="",
+        comments=["проверить итог"],
+    )
+
+
+def encode_legacy_json(draft: InvoiceDraft) -> str:
+    """Reproduce the JSON payload written before the binary format."""
+
+    def convert_value(value: Any) -> Any:
+        if isinstance(value, datetime):
+            return {"__type__": "datetime", "value": value.isoformat()}
+        if isinstance(value, date):
+            return {"__type__": "date", "value": value.isoformat()}
+        if isinstance(value, Decimal):
+            return {"__type__": "decimal", "value": str(value)}
+        if isinstance(value, list):
+            return [convert_value(item) for item in value]
+        if isinstance(value, dict):
+            return {str(k): convert_value(v) for k, v in value.items()}
+        if hasattr(value, "__dict__"):
+            return convert_value(value.__dict__)
+        return value
+
+    payload = {
+        "invoice": convert_value(draft.invoice.__dict__),
+        "path": draft.path,
+        "raw_text": draft.raw_text,
+        "comments": list(draft.comments),
+    }
+    return json.dumps(payload, ensure_ascii=False)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=300, help="Line items per draft")
+    parser.add_argument("--rounds", type=int, default=200, help="Iterations per measurement")
+    args = parser.parse_args()
+
+    draft = make_draft(args.items)
+    legacy = encode_legacy_json(draft)
+    binary = encode_draft(draft)
+    assert decode_draft(legacy) == draft
+    assert decode_draft(binary) == draft
+
+    def per_call_ms(stmt: Any) -> float:
+        return timeit.timeit(stmt, number=args.rounds) / args.rounds * 1000
+
+    rows = [
+        (
+            "legacy json",
+            len(legacy.encode("utf-8")),
+            per_call_ms(lambda: encode_legacy_json(draft)),
+            per_call_ms(lambda: decode_draft(legacy)),
+        ),
+        (
+            "binary v1",
+            len(binary),
+            per_call_ms(lambda: encode_draft(draft)),
+            per_call_ms(lambda: decode_draft(binary)),
+        ),
+    ]
+
+    print(f"Draft with {args.items} items, {args.rounds} rounds")
+    print(f"{'format':<12} {'bytes':>9} {'encode ms':>10} {'decode ms':>10}")
+    for name, size, encode_ms, decode_ms in rows:
+        print(f"{name:<12} {size:>9} {encode_ms:>10.3f} {decode_ms:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
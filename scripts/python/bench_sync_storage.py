@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Sync storage overhead benchmark for InvoiceFlowBot.
+
+Compares the per-call cost of the blocking fetch_invoices_domain API: the old
+bridge that ran AsyncInvoiceStorage on a new event loop (and, inside a running
+loop, a new thread) per call, against SyncInvoiceStorage on pooled sqlite3
+connections. Uses a temporary database.
+
+Usage: python scripts/python/bench_sync_storage.py [--invoices 50] [--rounds 300]
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Callable, Coroutine, List
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from backend.domain.invoices import Invoice, InvoiceHeader, InvoiceItem  # noqa: E402
+from backend.storage import db as storage_db  # noqa: E402
+from backend.storage.db_async import AsyncInvoiceStorage  # noqa: E402
+
+
+def run_via_bridge(coro: Coroutine[Any, Any, Any]) -> Any:
+    """The removed _run_async helper: a fresh loop per call, in a new thread if one is running."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    result: List[Any] = []
+
+    def run_in_thread() -> None:
+        loop = asyncio.new_event_loop()
+        try:
+            result.append(loop.run_until_complete(coro))
+        finally:
+            loop.close()
+
+    thread = threading.Thread(target=run_in_thread)
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def per_call_ms(func: Callable[[], Any], rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - started) / rounds * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--invoices", type=int, default=50, help="Invoices in the database")
+    parser.add_argument("--rounds", type=int, default=300, help="Calls per measurement")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = str(Path(tmp) / "bench.sqlite")
+        storage_db.DB_PATH = database
+        storage_db.init_db()
+        sync_storage = storage_db.SyncInvoiceStorage(database)
+        for i in range(args.invoices):
+            sync_storage.save_invoice(
+                Invoice(
+                    header=InvoiceHeader(
+                        supplier_name=f"Supplier {i % 7}",
+                        invoice_date=date(2025, 1, 1 + i % 28),
+                        total_amount=Decimal("100.00"),
+                    ),
+                    items=[InvoiceItem(description="Item", line_total=Decimal("100.00"))],
+                )
+            )
+        async_storage = AsyncInvoiceStorage(database)
+        bounds = (date(2025, 1, 1), date(2025, 1, 31))
+
+        def bridge() -> Any:
+            return run_via_bridge(async_storage.fetch_invoices(*bounds))
+
+        def pooled() -> Any:
+            return sync_storage.fetch_invoices(*bounds)
+
+        assert bridge() == pooled()
+        rows = [
+            ("bridge, no loop", per_call_ms(bridge, args.rounds)),
+            ("pooled, no loop", per_call_ms(pooled, args.rounds)),
+        ]
+
+        async def inside_loop() -> None:
+            rows.append(("bridge, in loop", per_call_ms(bridge, args.rounds)))
+            rows.append(("pooled, in loop", per_call_ms(pooled, args.rounds)))
+
+        asyncio.run(inside_loop())
+        sync_storage.close()
+
+    print(f"fetch_invoices over {args.invoices} invoices, {args.rounds} rounds")
+    print(f"{'variant':<16} {'ms/call':>9}")
+    for name, ms in rows:
+        print(f"{name:<16} {ms:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,8 @@ from backend.config import Settings  # noqa: E402
 from backend.core.container import AppContainer  # noqa: E402
 from backend.domain.invoices import Invoice  # noqa: E402
 from backend.handlers.di_middleware import ContainerMiddleware  # noqa: E402
+from backend.storage import db as storage_db  # noqa: E402
+from backend.storage import db_async, drafts_async  # noqa: E402
 from backend.storage.db_async import AsyncInvoiceStorage  # noqa: E402
 from tests.fakes.fake_ocr import FakeOcr, make_fake_ocr_extractor  # noqa: E402
 from tests.fakes.fake_services import FakeInvoiceService  # noqa: E402
@@ -82,6 +84,21 @@ def migrated_database_url(test_db_path: Path) -> str:
     return database_url
 
 
+@pytest.fixture()
+def patched_db_path(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> str:
+    db_file = str(tmp_path / "app.sqlite")
+    monkeypatch.setattr(storage_db, "DB_PATH", db_file, raising=True)
+    monkeypatch.setattr(db_async, "DB_PATH", db_file, raising=True)
+    monkeypatch.setattr(drafts_async, "DB_PATH", db_file, raising=True)
+    return db_file
+
+
+@pytest.fixture()
+def initialized_db_path(patched_db_path: str) -> str:
+    storage_db.init_db()
+    return patched_db_path
+
+
 @pytest.fixture()
 def async_storage_with_migrations(migrated_database_url: str) -> AsyncInvoiceStorage:
     db_path = migrated_database_url.replace("sqlite:///", "")
@@ -13,6 +13,7 @@ from backend.storage.drafts_async import (
     load_draft_invoice,
     save_draft_invoice,
 )
+from backend.storage.write_queue import GroupCommitQueue
 from tests.fakes.fake_ocr import FakeOcr, make_fake_ocr_extractor
 from tests.fakes.fake_storage import (
     FakeStorage,
@@ -25,7 +26,7 @@ from tests.fakes.fake_storage import (
 
 
 def test_app_container_creates_default_dependencies() -> None:
-    config = Settings()  # type: ignore[call-arg]
+    config = Settings(WRITE_BATCH_WINDOW_MS=0)  # type: ignore[call-arg]
     container = AppContainer(config=config)
 
     assert isinstance(container.invoice_service, InvoiceService)
@@ -37,6 +38,18 @@ def test_app_container_creates_default_dependencies() -> None:
     assert container.draft_service._load_draft_func is load_draft_invoice
     assert container.draft_service._save_draft_func is save_draft_invoice
     assert container.draft_service._delete_draft_func is delete_draft_invoice
+    assert container.write_queue is None
+
+
+def test_app_container_routes_default_writes_through_write_queue() -> None:
+    config = Settings(WRITE_BATCH_WINDOW_MS=5, WRITE_BATCH_MAX_SIZE=16)  # type: ignore[call-arg]
+    container = AppContainer(config=config)
+
+    queue = container.write_queue
+    assert isinstance(queue, GroupCommitQueue)
+    assert container.invoice_service._save_invoice_func == queue.save_invoice
+    assert container.draft_service._delete_draft_func == queue.delete_draft
+    assert container.draft_service._discard_draft_func == queue.discard_draft
 
 
 def test_app_container_accepts_overridden_dependencies() -> None:
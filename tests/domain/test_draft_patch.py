@@ -0,0 +1,48 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from backend.domain.drafts import DraftPatch, InvoiceDraft, apply_draft_patch
+from backend.domain.invoices import Invoice, InvoiceHeader, InvoiceItem
+
+
+def _make_draft() -> InvoiceDraft:
+    return InvoiceDraft(
+        invoice=Invoice(
+            header=InvoiceHeader(supplier_name="Old"),
+            items=[InvoiceItem(description="A"), InvoiceItem(description="B")],
+        ),
+        path="x.pdf",
+    )
+
+
+def test_apply_draft_patch_sets_fields_and_appends_comments() -> None:
+    draft = _make_draft()
+
+    apply_draft_patch(draft, DraftPatch.set_header("supplier_name", "New"))
+    apply_draft_patch(draft, DraftPatch.set_header("invoice_date", date(2025, 1, 2)))
+    apply_draft_patch(draft, DraftPatch.set_item(2, "quantity", Decimal("3")))
+    apply_draft_patch(draft, DraftPatch.add_comment("note"))
+
+    assert draft.invoice.header.supplier_name == "New"
+    assert draft.invoice.header.invoice_date == date(2025, 1, 2)
+    assert draft.invoice.items[1].quantity == Decimal("3")
+    assert draft.invoice.items[0].quantity == Decimal("0")
+    assert draft.comments == ["note"]
+
+
+@pytest.mark.parametrize(
+    "patch",
+    [
+        DraftPatch.set_header("no_such_field", 1),
+        DraftPatch.set_item(1, "no_such_field", 1),
+        DraftPatch.set_item(3, "quantity", Decimal("1")),
+        DraftPatch.set_item(0, "quantity", Decimal("1")),
+        DraftPatch(op="set_item", field="quantity"),
+        DraftPatch(op="drop_table"),
+    ],
+)
+def test_apply_draft_patch_rejects_patches_that_do_not_fit(patch: DraftPatch) -> None:
+    with pytest.raises(ValueError):
+        apply_draft_patch(_make_draft(), patch)
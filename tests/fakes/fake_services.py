@@ -1,15 +1,26 @@
 from __future__ import annotations
 
 from datetime import date
-from typing import List, Optional
+from decimal import Decimal
+from typing import AsyncIterator, BinaryIO, List, Optional, Tuple
 
-from backend.domain.invoices import Invoice
+from backend.domain.invoices import (
+    Invoice,
+    InvoiceCursor,
+    InvoicePage,
+    InvoiceSummary,
+    InvoiceSummaryPage,
+    InvoiceTotals,
+    SupplierMonthlySpend,
+)
+from backend.services.invoice_export import ExportReport, write_invoices_csv
 
 
 class FakeInvoiceService:
     def __init__(self) -> None:
         self.calls: List[str] = []
         self.return_invoices: List[Invoice] = []
+        self.return_spend: List[SupplierMonthlySpend] = []
 
     async def list_invoices(
         self,
@@ -25,3 +36,151 @@ class FakeInvoiceService:
         call_str = f"save_invoice:user_id={user_id},invoice={invoice.header.invoice_number}"
         self.calls.append(call_str)
         return 123  # Return fake invoice ID
+
+    async def store_invoice(self, invoice: Invoice, user_id: int = 0) -> Tuple[int, bool]:
+        return await self.save_invoice(invoice, user_id=user_id), True
+
+    async def list_invoices_page(
+        self,
+        from_date: Optional[date] = None,
+        to_date: Optional[date] = None,
+        supplier: Optional[str] = None,
+        after: Optional[InvoiceCursor] = None,
+        before: Optional[InvoiceCursor] = None,
+        limit: int = 20,
+    ) -> InvoicePage:
+        call_str = (
+            f"list_invoices_page:from_date={from_date},to_date={to_date},supplier={supplier},"
+            f"after={after},before={before},limit={limit}"
+        )
+        self.calls.append(call_str)
+        invoices, first, last, has_prev, has_next = self._slice(after, before, limit)
+        return InvoicePage(
+            invoices=invoices,
+            first_cursor=first,
+            last_cursor=last,
+            has_prev=has_prev,
+            has_next=has_next,
+        )
+
+    async def list_invoices_summary_page(
+        self,
+        from_date: Optional[date] = None,
+        to_date: Optional[date] = None,
+        supplier: Optional[str] = None,
+        after: Optional[InvoiceCursor] = None,
+        before: Optional[InvoiceCursor] = None,
+        limit: int = 20,
+    ) -> InvoiceSummaryPage:
+        call_str = (
+            f"list_invoices_summary_page:from_date={from_date},to_date={to_date},"
+            f"supplier={supplier},after={after},before={before},limit={limit}"
+        )
+        self.calls.append(call_str)
+        invoices, first, last, has_prev, has_next = self._slice(after, before, limit)
+        offset = first.invoice_id if first is not None else 0
+        summaries = [
+            InvoiceSummary(
+                invoice_id=offset + position,
+                supplier_name=invoice.header.supplier_name,
+                invoice_number=invoice.header.invoice_number,
+                invoice_date=invoice.header.invoice_date,
+                total_amount=invoice.header.total_amount,
+                item_count=len(invoice.items),
+            )
+            for position, invoice in enumerate(invoices)
+        ]
+        return InvoiceSummaryPage(
+            summaries=summaries,
+            first_cursor=first,
+            last_cursor=last,
+            has_prev=has_prev,
+            has_next=has_next,
+        )
+
+    async def summarize_invoices(
+        self,
+        from_date: Optional[date] = None,
+        to_date: Optional[date] = None,
+        supplier: Optional[str] = None,
+    ) -> InvoiceTotals:
+        self.calls.append(
+            f"summarize_invoices:from_date={from_date},to_date={to_date},supplier={supplier}"
+        )
+        return InvoiceTotals(
+            invoice_count=len(self.return_invoices),
+            item_count=sum(len(invoice.items) for invoice in self.return_invoices),
+            total_amount=sum(
+                (invoice.header.total_amount or Decimal("0") for invoice in self.return_invoices),
+                Decimal("0"),
+            ),
+        )
+
+    async def supplier_spend(
+        self,
+        user_id: int,
+        from_month: Optional[str] = None,
+        to_month: Optional[str] = None,
+        supplier: Optional[str] = None,
+    ) -> List[SupplierMonthlySpend]:
+        self.calls.append(
+            f"supplier_spend:user_id={user_id},from_month={from_month},to_month={to_month},"
+            f"supplier={supplier}"
+        )
+        return self.return_spend
+
+    async def export_invoices_csv(
+        self,
+        from_date: Optional[date],
+        to_date: Optional[date],
+        destination: BinaryIO,
+        supplier: Optional[str] = None,
+    ) -> ExportReport:
+        self.calls.append(
+            f"export_invoices_csv:from_date={from_date},to_date={to_date},supplier={supplier}"
+        )
+
+        async def invoices() -> AsyncIterator[Invoice]:
+            for invoice in self.return_invoices:
+                yield invoice
+
+        return await write_invoices_csv(invoices(), destination)
+
+    def _slice(
+        self,
+        after: Optional[InvoiceCursor],
+        before: Optional[InvoiceCursor],
+        limit: int,
+    ) -> Tuple[List[Invoice], Optional[InvoiceCursor], Optional[InvoiceCursor], bool, bool]:
+        # Cursors of the fake listing are list positions (1-based) of return_invoices.
+        if after is not None:
+            start = after.invoice_id
+        elif before is not None:
+            start = max(before.invoice_id - 1 - limit, 0)
+        else:
+            start = 0
+        end = start + limit
+        if before is not None:
+            end = min(end, before.invoice_id - 1)
+        invoices = self.return_invoices[start:end]
+        if not invoices:
+            return [], None, None, False, False
+        return (
+            invoices,
+            InvoiceCursor(date_iso="", invoice_id=start + 1),
+            InvoiceCursor(date_iso="", invoice_id=start + len(invoices)),
+            start > 0,
+            end < len(self.return_invoices),
+        )
+
+    async def iter_invoices(
+        self,
+        from_date: Optional[date] = None,
+        to_date: Optional[date] = None,
+        supplier: Optional[str] = None,
+    ) -> AsyncIterator[Invoice]:
+        self.calls.append(
+            f"iter_invoices:from_date={from_date},to_date={to_date},supplier={supplier}"
+        )
+        for invoice in self.return_invoices:
+            yield invoice
@@ -1,8 +1,14 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-from backend.domain.drafts import InvoiceDraft
+from backend.domain.drafts import (
+    DraftPatch,
+    DraftSummary,
+    DraftVersionConflict,
+    InvoiceDraft,
+    apply_draft_patch,
+)
 
 
 class FakeDraftService:
@@ -10,7 +16,11 @@ class FakeDraftService:
         self.calls: List[Dict[str, Any]] = []
         self.next_draft: Optional[InvoiceDraft] = None
         self.raise_error: bool = False
+        self.conflict_on_clear: bool = False
         self._drafts: Dict[int, InvoiceDraft] = {}
+        self._queued: Dict[int, List[Tuple[int, InvoiceDraft]]] = {}
+        self._current_ids: Dict[int, int] = {}
+        self._last_draft_id = 0
 
     async def get_current_draft(self, user_id: int) -> Optional[InvoiceDraft]:
         self.calls.append({"method": "get_current_draft", "user_id": user_id})
@@ -24,8 +34,84 @@ class FakeDraftService:
             raise RuntimeError("Draft creation failed")
         self._drafts[user_id] = draft
 
-    async def clear_current_draft(self, user_id: int) -> None:
-        self.calls.append({"method": "clear_current_draft", "user_id": user_id})
+    async def add_draft(self, user_id: int, draft: InvoiceDraft) -> DraftSummary:
+        self.calls.append({"method": "add_draft", "user_id": user_id, "draft": draft})
+        if self.raise_error:
+            raise RuntimeError("Draft creation failed")
+        self._last_draft_id += 1
+        if user_id in self._drafts:
+            self._queued.setdefault(user_id, []).append((self._last_draft_id, draft))
+            return DraftSummary.from_draft(self._last_draft_id, draft)
+        self._drafts[user_id] = draft
+        self._current_ids[user_id] = self._last_draft_id
+        return DraftSummary.from_draft(self._last_draft_id, draft, active=True)
+
+    async def list_drafts(self, user_id: int) -> List[DraftSummary]:
+        self.calls.append({"method": "list_drafts", "user_id": user_id})
+        summaries = [
+            DraftSummary.from_draft(draft_id, draft)
+            for draft_id, draft in self._queued.get(user_id, [])
+        ]
+        if user_id in self._drafts:
+            current = DraftSummary.from_draft(
+                self._current_ids.get(user_id, 0), self._drafts[user_id], active=True
+            )
+            summaries.insert(0, current)
+        return summaries
+
+    async def switch_draft(self, user_id: int, draft_id: int) -> Optional[InvoiceDraft]:
+        self.calls.append({"method": "switch_draft", "user_id": user_id, "draft_id": draft_id})
+        queue = self._queued.get(user_id, [])
+        for position, (queued_id, draft) in enumerate(queue):
+            if queued_id == draft_id:
+                queue.pop(position)
+                if user_id in self._drafts:
+                    queue.append((self._current_ids.get(user_id, 0), self._drafts[user_id]))
+                self._drafts[user_id] = draft
+                self._current_ids[user_id] = draft_id
+                return draft
+        if self._current_ids.get(user_id) == draft_id:
+            return self._drafts.get(user_id)
+        return None
+
+    async def patch_current_draft(
+        self, user_id: int, patches: Sequence[DraftPatch]
+    ) -> Optional[InvoiceDraft]:
+        self.calls.append(
+            {"method": "patch_current_draft", "user_id": user_id, "patches": list(patches)}
+        )
+        if self.raise_error:
+            raise RuntimeError("Draft update failed")
+        draft = self._drafts.get(user_id)
+        if draft is None:
+            return None
+        for patch in patches:
+            apply_draft_patch(draft, patch)
+        return draft
+
+    async def clear_current_draft(
+        self, user_id: int, expected: Optional[InvoiceDraft] = None
+    ) -> None:
+        self.calls.append(
+            {"method": "clear_current_draft", "user_id": user_id, "expected": expected}
+        )
         if self.raise_error:
             raise RuntimeError("Draft deletion failed")
+        if expected is not None and (
+            self.conflict_on_clear or self._drafts.get(user_id) is not expected
+        ):
+            raise DraftVersionConflict("draft changed")
         self._drafts.pop(user_id, None)
+        self._current_ids.pop(user_id, None)
+        queue = self._queued.get(user_id)
+        if queue:
+            draft_id, draft = queue.pop(0)
+            self._drafts[user_id] = draft
+            self._current_ids[user_id] = draft_id
+
+    async def flush_draft(self, user_id: int) -> None:
+        self.calls.append({"method": "flush_draft", "user_id": user_id})
+
+    async def flush_all(self) -> int:
+        self.calls.append({"method": "flush_all"})
+        return 0
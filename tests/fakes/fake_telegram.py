@@ -69,6 +69,9 @@ class FakeMessage:
     async def edit_reply_markup(self, reply_markup: Any = None) -> None:
         self.answers.append({"edit_reply_markup": True, "reply_markup": reply_markup})
 
+    async def edit_text(self, text: str, **kwargs: Any) -> None:
+        self.answers.append({"edit_text": text, "kwargs": kwargs})
+
 
 class FakeCallbackQuery:
     def __init__(
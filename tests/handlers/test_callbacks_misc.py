@@ -99,7 +99,7 @@ async def test_cb_act_help(misc_router: Router) -> None:
         if call.message is not None:
             await call.message.answer(
                 "Быстрые действия кнопками ниже.\n"
-                "Команды для продвинутых: /show, /edit, /edititem, /comment, /save, /invoices.",
+                "Команды для продвинутых: /show, /edit, /edititem, /comment, /save, /drafts, /invoices, /stats, /export.",
                 reply_markup=main_kb(),
             )
         await call.answer()
@@ -5,6 +5,7 @@ import pytest
 from backend.core.container import AppContainer
 from backend.handlers.commands_common import cmd_help, cmd_start
 from backend.handlers.commands_invoices import cmd_invoices
+from tests.fakes.fake_fsm import FakeFSMContext
 from tests.fakes.fake_services import FakeInvoiceService
 from tests.fakes.fake_telegram import FakeMessage
 
@@ -48,7 +49,7 @@ async def test_cmd_invoices_uses_service_and_answers(
 ) -> None:
     message = FakeMessage(text="/invoices 2025-01-01 2025-01-31")
 
-    await cmd_invoices(message, handlers_container)
+    await cmd_invoices(message, handlers_container, FakeFSMContext())  # type: ignore[arg-type]
 
     assert len(fake_invoice_service.calls) >= 1
     assert any("list_invoices" in call for call in fake_invoice_service.calls)
@@ -66,7 +67,7 @@ async def test_cmd_invoices_with_supplier_filter(
 ) -> None:
     message = FakeMessage(text="/invoices 2025-01-01 2025-01-31 supplier=TestSupplier")
 
-    await cmd_invoices(message, handlers_container)
+    await cmd_invoices(message, handlers_container, FakeFSMContext())  # type: ignore[arg-type]
 
     assert len(fake_invoice_service.calls) >= 1
     assert any("supplier=TestSupplier" in call for call in fake_invoice_service.calls)
@@ -80,7 +81,7 @@ async def test_cmd_invoices_handles_invalid_format(
 ) -> None:
     message = FakeMessage(text="/invoices invalid")
 
-    await cmd_invoices(message, app_container)
+    await cmd_invoices(message, app_container, FakeFSMContext())  # type: ignore[arg-type]
 
     assert len(message.answers) >= 1
     first_answer = message.answers[0]["text"]
@@ -94,7 +95,7 @@ async def test_cmd_invoices_with_no_text(
     """Test /invoices command with None text."""
     message = FakeMessage(text=None)  # type: ignore[arg-type]
 
-    await cmd_invoices(message, app_container)
+    await cmd_invoices(message, app_container, FakeFSMContext())  # type: ignore[arg-type]
 
     assert len(message.answers) >= 1
     assert "Формат" in message.answers[0]["text"]
@@ -109,7 +110,7 @@ async def test_cmd_invoices_no_results(
     fake_invoice_service.return_invoices = []
     message = FakeMessage(text="/invoices 2025-01-01 2025-01-31")
 
-    await cmd_invoices(message, handlers_container)
+    await cmd_invoices(message, handlers_container, FakeFSMContext())  # type: ignore[arg-type]
 
     assert len(message.answers) >= 1
     assert "Ничего не найдено" in message.answers[0]["text"]
@@ -145,7 +146,7 @@ async def test_cmd_invoices_with_results(
     fake_invoice_service.return_invoices = [invoice]
     message = FakeMessage(text="/invoices 2025-01-01 2025-01-31")
 
-    await cmd_invoices(message, handlers_container)
+    await cmd_invoices(message, handlers_container, FakeFSMContext())  # type: ignore[arg-type]
 
     assert len(message.answers) >= 1
     answer_text = message.answers[0]["text"]
@@ -842,6 +842,37 @@ async def test_cmd_edititem_legacy_code_field(
     assert saved_draft.invoice.items[0].sku == "NEW-CODE"
 
 
+@pytest.mark.asyncio
+async def test_cmd_edititem_legacy_sends_field_patches(
+    draft_container: AppContainer, commands_router: Router
+) -> None:
+    """Test /edititem stores only the changed fields as one batch of patches."""
+    from backend.domain.drafts import DraftPatch
+
+    user_id = 123
+    await draft_container.draft_service.set_current_draft(
+        user_id, _create_test_draft(_create_test_invoice())
+    )
+    message = FakeMessage(text="/edititem 1 qty=3, price=abc, name=Новое", user_id=user_id)
+
+    with patch("backend.handlers.commands_drafts.get_draft_service") as mock_get_draft:
+        mock_get_draft.return_value = draft_container.draft_service
+        await commands_router.message.trigger(message, container=draft_container)  # type: ignore[arg-type]
+
+    patch_calls = [
+        call
+        for call in draft_container.draft_service.calls  # type: ignore[attr-defined]
+        if call["method"] == "patch_current_draft"
+    ]
+    assert [call["patches"] for call in patch_calls] == [
+        [
+            DraftPatch.set_item(1, "quantity", Decimal("3")),
+            DraftPatch.set_item(1, "description", "Новое"),
+        ]
+    ]
+    assert "Позиция обновлена" in message.answers[0]["text"]
+
+
 @pytest.mark.asyncio
 async def test_on_force_reply_empty_text(
     draft_container: AppContainer, commands_router: Router
@@ -1554,3 +1585,149 @@ async def test_cmd_edititem_legacy(draft_container: AppContainer, commands_route
     assert saved_draft is not None
     # Check that description was updated (parsing may include rest of string)
     assert "NewItemName" in saved_draft.invoice.items[0].description
+
+
+@pytest.mark.asyncio
+async def test_cmd_save_flushes_buffered_draft_first(
+    draft_container: AppContainer, commands_router: Router
+) -> None:
+    """Test /save writes buffered draft changes before saving the invoice."""
+    user_id = 123
+    await draft_container.draft_service.set_current_draft(
+        user_id, _create_test_draft(_create_test_invoice())
+    )
+    message = FakeMessage(text="/save", user_id=user_id)
+
+    with (
+        patch("backend.handlers.commands_drafts.get_draft_service") as mock_get_draft,
+        patch("backend.handlers.commands_drafts.get_invoice_service") as mock_get_invoice,
+    ):
+        mock_get_draft.return_value = draft_container.draft_service
+        mock_get_invoice.return_value = draft_container.invoice_service
+        await commands_router.message.trigger(message, container=draft_container)  # type: ignore[arg-type]
+
+    methods = [call["method"] for call in draft_container.draft_service.calls]  # type: ignore[attr-defined]
+    assert methods.index("flush_draft") < methods.index("clear_current_draft")
+    assert "Сохранено в БД" in message.answers[0]["text"]
+
+
+@pytest.mark.asyncio
+async def test_cmd_save_reports_duplicate_invoice(
+    draft_container: AppContainer, commands_router: Router
+) -> None:
+    """Test /save tells the user the invoice was already stored."""
+    from backend.config import Settings
+    from tests.fakes.fake_storage import FakeStorage, make_fake_save_invoice_func
+
+    async def store_duplicate(invoice: Invoice, user_id: int) -> tuple[int, bool]:
+        return 42, False
+
+    invoice_service = AppContainer(
+        config=Settings(),  # type: ignore[call-arg]
+        save_invoice_func=make_fake_save_invoice_func(fake_storage=FakeStorage()),
+        store_invoice_func=store_duplicate,
+    ).invoice_service
+    user_id = 123
+    draft_service = draft_container.draft_service
+    await draft_service.set_current_draft(user_id, _create_test_draft(_create_test_invoice()))
+    message = FakeMessage(text="/save", user_id=user_id)
+
+    with (
+        patch("backend.handlers.commands_drafts.get_draft_service") as mock_get_draft,
+        patch("backend.handlers.commands_drafts.get_invoice_service") as mock_get_invoice,
+    ):
+        mock_get_draft.return_value = draft_service
+        mock_get_invoice.return_value = invoice_service
+        await commands_router.message.trigger(message, container=draft_container)  # type: ignore[arg-type]
+
+    text = message.answers[0]["text"]
+    assert "уже сохранен" in text
+    assert "ID счета: 42" in text
+    assert "Сохранено в БД" not in text
+    assert await draft_service.get_current_draft(user_id) is None
+
+
+@pytest.mark.asyncio
+async def test_cmd_drafts_and_draft_switch_between_queued_drafts(
+    draft_container: AppContainer, commands_router: Router
+) -> None:
+    """Test /drafts lists queued drafts and /draft N opens one of them."""
+    user_id = 123
+    draft_service = draft_container.draft_service
+    first = await draft_service.add_draft(user_id, _create_test_draft(_create_test_invoice()))
+    second_invoice = _create_test_invoice()
+    second_invoice.header.supplier_name = "Второй поставщик"
+    second = await draft_service.add_draft(user_id, _create_test_draft(second_invoice))
+
+    list_message = FakeMessage(text="/drafts", user_id=user_id)
+    switch_message = FakeMessage(text=f"/draft {second.draft_id}", user_id=user_id)
+    missing_message = FakeMessage(text="/draft 999", user_id=user_id)
+    usage_message = FakeMessage(text="/draft abc", user_id=user_id)
+    with patch("backend.handlers.commands_drafts.get_draft_service") as mock_get_draft:
+        mock_get_draft.return_value = draft_service
+        for message in (list_message, switch_message, missing_message, usage_message):
+            await commands_router.message.trigger(message, container=draft_container)  # type: ignore[arg-type]
+
+    listing = list_message.answers[0]["text"]
+    assert f"▶️ #{first.draft_id}" in listing
+    assert f"• #{second.draft_id} Второй поставщик" in listing
+    assert "Второй поставщик" in switch_message.answers[0]["text"]
+    assert (await draft_service.get_current_draft(user_id)).invoice.header.supplier_name == (
+        "Второй поставщик"
+    )
+    assert "не найден" in missing_message.answers[0]["text"]
+    assert "Формат" in usage_message.answers[0]["text"]
+
+
+@pytest.mark.asyncio
+async def test_cmd_save_opens_next_queued_draft(
+    draft_container: AppContainer, commands_router: Router
+) -> None:
+    """Test /save moves on to the next draft in the queue."""
+    user_id = 123
+    draft_service = draft_container.draft_service
+    await draft_service.add_draft(user_id, _create_test_draft(_create_test_invoice()))
+    next_invoice = _create_test_invoice()
+    next_invoice.header.supplier_name = "Следующий"
+    await draft_service.add_draft(user_id, _create_test_draft(next_invoice))
+    message = FakeMessage(text="/save", user_id=user_id)
+
+    with (
+        patch("backend.handlers.commands_drafts.get_draft_service") as mock_get_draft,
+        patch("backend.handlers.commands_drafts.get_invoice_service") as mock_get_invoice,
+    ):
+        mock_get_draft.return_value = draft_service
+        mock_get_invoice.return_value = draft_container.invoice_service
+        await commands_router.message.trigger(message, container=draft_container)  # type: ignore[arg-type]
+
+    assert "Сохранено в БД" in message.answers[0]["text"]
+    assert "Следующий черновик" in message.answers[1]["text"]
+    assert "Следующий" in message.answers[1]["text"]
+
+
+@pytest.mark.asyncio
+async def test_cmd_save_keeps_draft_that_changed_meanwhile(
+    draft_container: AppContainer, commands_router: Router
+) -> None:
+    """Test /save does not delete a draft that was changed while it was being saved."""
+    user_id = 123
+    draft_service = draft_container.draft_service
+    draft = _create_test_draft(_create_test_invoice())
+    await draft_service.set_current_draft(user_id, draft)
+    draft_service.conflict_on_clear = True  # type: ignore[attr-defined]
+    message = FakeMessage(text="/save", user_id=user_id)
+
+    with (
+        patch("backend.handlers.commands_drafts.get_draft_service") as mock_get_draft,
+        patch("backend.handlers.commands_drafts.get_invoice_service") as mock_get_invoice,
+    ):
+        mock_get_draft.return_value = draft_service
+        mock_get_invoice.return_value = draft_container.invoice_service
+        await commands_router.message.trigger(message, container=draft_container)  # type: ignore[arg-type]
+
+    assert len(message.answers) == 1
+    assert "Сохранено в БД" in message.answers[0]["text"]
+    assert "не удален" in message.answers[0]["text"]
+    assert await draft_service.get_current_draft(user_id) is draft
+    # The save works on a copy, so the cached draft gets no extra comments.
+    assert draft.invoice.comments == []
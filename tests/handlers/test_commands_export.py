@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import os
+from datetime import date
+from decimal import Decimal
+from typing import Any
+
+import pytest
+
+from backend.core.container import AppContainer
+from backend.domain.invoices import Invoice, InvoiceHeader, InvoiceItem
+from backend.handlers.commands_invoices import EXPORT_USAGE, cmd_export
+from tests.fakes.fake_services import FakeInvoiceService
+from tests.fakes.fake_telegram import FakeMessage
+
+
+class _ExportMessage(FakeMessage):
+    """Reads the uploaded file while it still exists."""
+
+    async def answer_document(self, document: Any, **kwargs: Any) -> None:
+        with open(document.path, "rb") as uploaded:
+            self.answers.append({"document": document, "data": uploaded.read(), "kwargs": kwargs})
+
+
+@pytest.mark.asyncio
+async def test_cmd_export_sends_csv_file(
+    handlers_container: AppContainer,
+    fake_invoice_service: FakeInvoiceService,
+) -> None:
+    fake_invoice_service.return_invoices = [
+        Invoice(
+            header=InvoiceHeader(invoice_number="A-1", invoice_date=date(2025, 1, 3)),
+            items=[InvoiceItem(description="Item", line_total=Decimal("3"))],
+        )
+    ]
+    message = _ExportMessage(text="/export 2025-01-01 2025-01-31 supplier=acme")
+
+    await cmd_export(message, handlers_container)  # type: ignore[arg-type]
+
+    assert fake_invoice_service.calls == [
+        "export_invoices_csv:from_date=2025-01-01,to_date=2025-01-31,supplier=acme"
+    ]
+    answer = message.answers[0]
+    assert answer["document"].filename == "invoices_2025-01-01_2025-01-31.csv"
+    assert answer["kwargs"]["caption"] == "Счетов: 1, строк: 1"
+    assert b"A-1;" in answer["data"]
+    assert not os.path.exists(answer["document"].path)
+
+
+@pytest.mark.asyncio
+async def test_cmd_export_empty_period(
+    handlers_container: AppContainer,
+    fake_invoice_service: FakeInvoiceService,
+) -> None:
+    message = FakeMessage(text="/export 2025-01-01 2025-01-31")
+
+    await cmd_export(message, handlers_container)  # type: ignore[arg-type]
+
+    assert message.answers[0]["text"] == "Ничего не найдено."
+
+
+@pytest.mark.asyncio
+async def test_cmd_export_requires_a_period(
+    handlers_container: AppContainer,
+    fake_invoice_service: FakeInvoiceService,
+) -> None:
+    message = FakeMessage(text="/export 2025-01-01")
+
+    await cmd_export(message, handlers_container)  # type: ignore[arg-type]
+
+    assert message.answers[0]["text"] == EXPORT_USAGE
+    assert fake_invoice_service.calls == []
@@ -235,7 +235,7 @@ async def test_cmd_invoices_basic(
     with patch("backend.handlers.commands_invoices.get_invoice_service") as mock_get_invoice:
         mock_get_invoice.return_value = invoices_container.invoice_service
 
-        data = {"container": invoices_container}
+        data = {"container": invoices_container, "state": FakeFSMContext()}
 
         try:
             await invoices_router.message.trigger(
@@ -279,7 +279,7 @@ async def test_cmd_invoices_with_supplier(
     with patch("backend.handlers.commands_invoices.get_invoice_service") as mock_get_invoice:
         mock_get_invoice.return_value = invoices_container.invoice_service
 
-        data = {"container": invoices_container}
+        data = {"container": invoices_container, "state": FakeFSMContext()}
 
         try:
             await invoices_router.message.trigger(
@@ -353,7 +353,7 @@ async def test_cmd_invoices_long_output(
     with patch("backend.handlers.commands_invoices.get_invoice_service") as mock_get_invoice:
         mock_get_invoice.return_value = invoices_container.invoice_service
 
-        data = {"container": invoices_container}
+        data = {"container": invoices_container, "state": FakeFSMContext()}
 
         try:
             await invoices_router.message.trigger(
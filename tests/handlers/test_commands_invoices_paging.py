@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from backend.core.container import AppContainer
+from backend.domain.invoices import Invoice, InvoiceHeader
+from backend.handlers.commands_invoices import (
+    INVOICES_PAGE_SIZE,
+    INVOICES_QUERY_KEY,
+    cb_invoices_page,
+    cmd_invoices,
+)
+from tests.fakes.fake_fsm import FakeFSMContext
+from tests.fakes.fake_services import FakeInvoiceService
+from tests.fakes.fake_telegram import FakeCallbackQuery, FakeMessage
+
+
+def _make_invoices(count: int) -> list[Invoice]:
+    return [
+        Invoice(
+            header=InvoiceHeader(
+                supplier_name=f"Supplier {i}",
+                invoice_number=f"INV-{i:03d}",
+                invoice_date=date(2025, 1, 15),
+                total_amount=Decimal("10.00"),
+            ),
+        )
+        for i in range(count)
+    ]
+
+
+def _nav_callbacks(reply_markup) -> dict[str, str]:
+    assert reply_markup is not None
+    return {button.text: button.callback_data for button in reply_markup.inline_keyboard[0]}
+
+
+@pytest.mark.asyncio
+async def test_cmd_invoices_shows_first_page_with_next_button(
+    handlers_container: AppContainer,
+    fake_invoice_service: FakeInvoiceService,
+) -> None:
+    fake_invoice_service.return_invoices = _make_invoices(INVOICES_PAGE_SIZE + 5)
+    message = FakeMessage(text="/invoices 2025-01-01 2025-01-31")
+    state = FakeFSMContext()
+
+    await cmd_invoices(message, handlers_container, state)  # type: ignore[arg-type]
+
+    answer = message.answers[0]
+    assert "INV-000" in answer["text"]
+    assert f"INV-{INVOICES_PAGE_SIZE:03d}" not in answer["text"]
+    # The period totals cover every invoice, not just the first page.
+    assert "Итого суммарно: 200" in answer["text"]
+    assert f"Счетов: {INVOICES_PAGE_SIZE + 5}" in answer["text"]
+    assert list(_nav_callbacks(answer["kwargs"]["reply_markup"])) == ["▶️"]
+
+    state_data = await state.get_data()
+    assert state_data[INVOICES_QUERY_KEY]["from"] == "2025-01-01"
+    assert state_data[INVOICES_QUERY_KEY]["to"] == "2025-01-31"
+
+
+@pytest.mark.asyncio
+async def test_cb_invoices_page_moves_between_pages(
+    handlers_container: AppContainer,
+    fake_invoice_service: FakeInvoiceService,
+) -> None:
+    fake_invoice_service.return_invoices = _make_invoices(INVOICES_PAGE_SIZE + 5)
+    message = FakeMessage(text="/invoices 2025-01-01 2025-01-31")
+    state = FakeFSMContext()
+    await cmd_invoices(message, handlers_container, state)  # type: ignore[arg-type]
+    next_data = _nav_callbacks(message.answers[0]["kwargs"]["reply_markup"])["▶️"]
+
+    page_message = FakeMessage()
+    call = FakeCallbackQuery(data=next_data, user_id=1, message=page_message)
+    await cb_invoices_page(call, state, handlers_container)  # type: ignore[arg-type]
+
+    assert call.answered
+    second_page = page_message.answers[0]
+    assert f"INV-{INVOICES_PAGE_SIZE:03d}" in second_page["text"]
+    assert "INV-000" not in second_page["text"]
+    prev_data = _nav_callbacks(second_page["kwargs"]["reply_markup"])["◀️"]
+
+    back_message = FakeMessage()
+    back_call = FakeCallbackQuery(data=prev_data, user_id=1, message=back_message)
+    await cb_invoices_page(back_call, state, handlers_container)  # type: ignore[arg-type]
+
+    assert "INV-000" in back_message.answers[0]["text"]
+    assert any(
+        "list_invoices_summary_page" in call_str
+        and "before=" in call_str
+        and "before=None" not in call_str
+        for call_str in fake_invoice_service.calls
+    )
+
+
+@pytest.mark.asyncio
+async def test_cb_invoices_page_with_stale_query(
+    handlers_container: AppContainer,
+    fake_invoice_service: FakeInvoiceService,
+) -> None:
+    message = FakeMessage()
+    call = FakeCallbackQuery(data="inv_page:0123abcd:next:2025-01-15:3", user_id=1, message=message)
+
+    await cb_invoices_page(call, FakeFSMContext(), handlers_container)  # type: ignore[arg-type]
+
+    assert call.answered
+    assert call.answer_text is not None and "устарел" in call.answer_text
+    assert message.answers == []
+
+
+@pytest.mark.asyncio
+async def test_cb_invoices_page_rejects_button_of_older_listing(
+    handlers_container: AppContainer,
+    fake_invoice_service: FakeInvoiceService,
+) -> None:
+    fake_invoice_service.return_invoices = _make_invoices(INVOICES_PAGE_SIZE + 5)
+    state = FakeFSMContext()
+    older = FakeMessage(text="/invoices 2025-01-01 2025-01-31")
+    await cmd_invoices(older, handlers_container, state)  # type: ignore[arg-type]
+    older_next = _nav_callbacks(older.answers[0]["kwargs"]["reply_markup"])["▶️"]
+    newer = FakeMessage(text="/invoices 2025-01-01 2025-01-31 supplier=Supplier")
+    await cmd_invoices(newer, handlers_container, state)  # type: ignore[arg-type]
+    newer_next = _nav_callbacks(newer.answers[0]["kwargs"]["reply_markup"])["▶️"]
+    assert older_next != newer_next
+    calls_before = len(fake_invoice_service.calls)
+
+    page_message = FakeMessage()
+    call = FakeCallbackQuery(data=older_next, user_id=1, message=page_message)
+    await cb_invoices_page(call, state, handlers_container)  # type: ignore[arg-type]
+
+    assert call.answer_text is not None and "устарел" in call.answer_text
+    assert page_message.answers == []
+    assert len(fake_invoice_service.calls) == calls_before
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("tail", ["next:2025-01-15:abc", "next:2025-01-15:", "skip:2025-01-15:3"])
+async def test_cb_invoices_page_rejects_malformed_callback(
+    handlers_container: AppContainer,
+    fake_invoice_service: FakeInvoiceService,
+    tail: str,
+) -> None:
+    fake_invoice_service.return_invoices = _make_invoices(INVOICES_PAGE_SIZE + 5)
+    state = FakeFSMContext()
+    listing = FakeMessage(text="/invoices 2025-01-01 2025-01-31")
+    await cmd_invoices(listing, handlers_container, state)  # type: ignore[arg-type]
+    next_data = _nav_callbacks(listing.answers[0]["kwargs"]["reply_markup"])["▶️"]
+    prefix = ":".join(next_data.split(":")[:2])
+    calls_before = len(fake_invoice_service.calls)
+
+    page_message = FakeMessage()
+    call = FakeCallbackQuery(data=f"{prefix}:{tail}", user_id=1, message=page_message)
+    await cb_invoices_page(call, state, handlers_container)  # type: ignore[arg-type]
+
+    assert call.answer_text is not None and "устарел" in call.answer_text
+    assert page_message.answers == []
+    assert len(fake_invoice_service.calls) == calls_before
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from decimal import Decimal
+
+import pytest
+
+from backend.core.container import AppContainer
+from backend.domain.invoices import SupplierMonthlySpend
+from backend.handlers.commands_invoices import STATS_USAGE, cmd_stats
+from tests.fakes.fake_services import FakeInvoiceService
+from tests.fakes.fake_telegram import FakeMessage
+
+
+@pytest.mark.asyncio
+async def test_cmd_stats_reports_rollup_grouped_by_month(
+    handlers_container: AppContainer,
+    fake_invoice_service: FakeInvoiceService,
+) -> None:
+    fake_invoice_service.return_spend = [
+        SupplierMonthlySpend("Acme", "2025-01", 2, 3, Decimal("150.5")),
+        SupplierMonthlySpend("Beta", "2025-01", 1, 1, Decimal("10")),
+        SupplierMonthlySpend("Acme", "2025-02", 1, 0, Decimal("5")),
+    ]
+    message = FakeMessage(text="/stats 2025-01 2025-02 supplier=a", user_id=42)
+
+    await cmd_stats(message, handlers_container)  # type: ignore[arg-type]
+
+    assert fake_invoice_service.calls == [
+        "supplier_spend:user_id=42,from_month=2025-01,to_month=2025-02,supplier=a"
+    ]
+    text = message.answers[0]["text"]
+    assert text.index("2025-01") < text.index("Beta") < text.index("2025-02")
+    assert "Acme  счетов: 2, позиций: 3  = 150.5" in text
+    assert "Счетов: 4, позиций: 4" in text
+    assert "Итого суммарно: 165.5" in text
+
+
+@pytest.mark.asyncio
+async def test_cmd_stats_single_month_and_empty_result(
+    handlers_container: AppContainer,
+    fake_invoice_service: FakeInvoiceService,
+) -> None:
+    message = FakeMessage(text="/stats 2025-03")
+
+    await cmd_stats(message, handlers_container)  # type: ignore[arg-type]
+
+    assert fake_invoice_service.calls == [
+        "supplier_spend:user_id=1,from_month=2025-03,to_month=2025-03,supplier=None"
+    ]
+    assert message.answers[0]["text"] == "Ничего не найдено."
+
+
+@pytest.mark.asyncio
+async def test_cmd_stats_rejects_bad_arguments(
+    handlers_container: AppContainer,
+    fake_invoice_service: FakeInvoiceService,
+) -> None:
+    message = FakeMessage(text="/stats 2025-01-01")
+
+    await cmd_stats(message, handlers_container)  # type: ignore[arg-type]
+
+    assert fake_invoice_service.calls == []
+    assert message.answers[0]["text"] == STATS_USAGE
@@ -44,8 +44,8 @@ async def test_handle_invoice_document_happy_path(
                 await handle_invoice_document(message, file_handlers_container)
 
     assert len(draft_service.calls) >= 1
-    set_draft_calls = [c for c in draft_service.calls if c.get("method") == "set_current_draft"]
-    assert len(set_draft_calls) >= 1
+    add_draft_calls = [c for c in draft_service.calls if c.get("method") == "add_draft"]
+    assert len(add_draft_calls) >= 1
 
     assert len(message.answers) >= 1
     first_answer = message.answers[0]["text"]
@@ -94,10 +94,35 @@ async def test_handle_invoice_photo_happy_path(
                         await handle_invoice_photo(message, file_handlers_container)
 
     assert len(draft_service.calls) >= 1
-    set_draft_calls = [c for c in draft_service.calls if c.get("method") == "set_current_draft"]
-    assert len(set_draft_calls) >= 1
+    add_draft_calls = [c for c in draft_service.calls if c.get("method") == "add_draft"]
+    assert len(add_draft_calls) >= 1
 
     assert len(message.answers) >= 1
     first_answer = message.answers[0]["text"]
     assert isinstance(first_answer, str)
     assert first_answer != ""
+
+
+@pytest.mark.asyncio
+async def test_second_upload_is_queued_behind_current_draft(
+    file_handlers_container: AppContainer,
+) -> None:
+    draft_service = file_handlers_container.draft_service
+    assert isinstance(draft_service, FakeDraftService)
+
+    answers = []
+    for file_id in ("file_1", "file_2"):
+        message = FakeMessage(
+            text="",
+            document=FakeDocument(file_id=file_id, file_name=f"{file_id}.pdf"),
+            bot=MagicMock(),
+        )
+        with patch("backend.handlers.file.save_file", new_callable=AsyncMock) as mock_save_file:
+            mock_save_file.return_value = f"temp/{file_id}.pdf"
+            await handle_invoice_document(message, file_handlers_container)
+        answers.append([answer["text"] for answer in message.answers])
+
+    current = await draft_service.get_current_draft(1)
+    assert current is not None and current.path == "temp/file_1.pdf"
+    assert not any("очередь" in text for text in answers[0])
+    assert any("добавлен в очередь" in text and "/draft 2" in text for text in answers[1])
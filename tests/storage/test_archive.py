@@ -0,0 +1,307 @@
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+from datetime import date
+from decimal import Decimal
+from typing import List
+
+import aiosqlite
+import pytest
+
+from backend.domain.invoices import Invoice, InvoiceComment, InvoiceHeader, InvoiceItem
+from backend.storage.archive import (
+    archive_invoices,
+    list_partitions,
+    partition_path,
+    partitions_for_range,
+)
+from backend.storage.db_async import AsyncInvoiceStorage
+from backend.storage.drafts_async import fetch_referenced_paths
+from backend.storage.dump import dump_database, load_dump
+from backend.storage.write_queue import GroupCommitQueue
+from tests.utils.alembic_test_utils import run_migrations_for_url
+
+pytestmark = pytest.mark.storage_db
+
+
+def _invoice(number: str, invoice_date: date | None, total: str = "10") -> Invoice:
+    return Invoice(
+        header=InvoiceHeader(
+            supplier_name="Acme",
+            invoice_number=number,
+            invoice_date=invoice_date,
+            total_amount=Decimal(total),
+        ),
+        items=[InvoiceItem(description=f"{number} item", line_total=Decimal(total))],
+        comments=[InvoiceComment(message=f"{number} note")],
+    )
+
+
+@pytest.fixture()
+def storage(async_storage_with_migrations: AsyncInvoiceStorage, tmp_path) -> AsyncInvoiceStorage:
+    return AsyncInvoiceStorage(
+        database_path=async_storage_with_migrations._database_path,
+        archive_dir=str(tmp_path / "archive"),
+    )
+
+
+async def _seed(storage: AsyncInvoiceStorage) -> List[int]:
+    return await storage.save_invoices(
+        [
+            _invoice("A-2023", date(2023, 3, 1), "5"),
+            _invoice("B-2024", date(2024, 6, 1), "7"),
+            _invoice("C-2025", date(2025, 2, 1), "11"),
+            _invoice("D-undated", None, "13"),
+        ],
+        user_id=1,
+    )
+
+
+def _numbers(invoices: List[Invoice]) -> List[str | None]:
+    return [invoice.header.invoice_number for invoice in invoices]
+
+
+async def _count(path: str, table: str) -> int:
+    async with aiosqlite.connect(path) as connection:
+        cursor = await connection.execute(f"SELECT COUNT(*) FROM {table}")
+        row = await cursor.fetchone()
+    assert row is not None
+    return int(row[0])
+
+
+@pytest.mark.asyncio
+async def test_archive_moves_old_invoices_into_year_partitions(
+    storage: AsyncInvoiceStorage,
+) -> None:
+    await _seed(storage)
+    archive_dir = storage._archive_dir
+    assert archive_dir is not None
+
+    report = await archive_invoices(
+        date(2025, 1, 1), archive_dir, database_path=storage._database_path
+    )
+
+    assert (report.invoices, report.items, report.comments) == (2, 2, 2)
+    assert report.years == [2023, 2024]
+    assert [year for year, _ in list_partitions(archive_dir)] == [2023, 2024]
+    assert await _count(storage._database_path, "invoices") == 2
+    assert await _count(partition_path(archive_dir, 2023), "invoices") == 1
+    assert await _count(partition_path(archive_dir, 2024), "invoice_items") == 1
+
+
+@pytest.mark.asyncio
+async def test_fetch_invoices_reads_overlapping_partitions(storage: AsyncInvoiceStorage) -> None:
+    await _seed(storage)
+    before = await storage.fetch_invoices(date(2023, 1, 1), date(2025, 12, 31))
+    assert storage._archive_dir is not None
+    await archive_invoices(
+        date(2025, 1, 1), storage._archive_dir, batch_size=1, database_path=storage._database_path
+    )
+
+    after = await storage.fetch_invoices(date(2023, 1, 1), date(2025, 12, 31))
+
+    assert _numbers(after) == _numbers(before) == ["A-2023", "B-2024", "C-2025"]
+    assert [item.description for item in after[1].items] == ["B-2024 item"]
+    assert after[0].header.total_amount == Decimal("5")
+    assert _numbers(await storage.fetch_invoices(date(2024, 1, 1), date(2024, 12, 31))) == [
+        "B-2024"
+    ]
+    everything = await storage.fetch_invoices(None, None)
+    assert sorted(_numbers(everything)) == ["A-2023", "B-2024", "C-2025", "D-undated"]
+    hot_only = AsyncInvoiceStorage(database_path=storage._database_path)
+    assert _numbers(await hot_only.fetch_invoices(date(2023, 1, 1), date(2025, 12, 31))) == [
+        "C-2025"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_listings_page_through_archived_invoices(storage: AsyncInvoiceStorage) -> None:
+    await _seed(storage)
+    await storage.save_invoice(_invoice("E-2023", date(2023, 9, 1), "17"), user_id=1)
+    assert storage._archive_dir is not None
+    await archive_invoices(
+        date(2025, 1, 1), storage._archive_dir, database_path=storage._database_path
+    )
+    expected = ["D-undated", "A-2023", "E-2023", "B-2024", "C-2025"]
+
+    pages = [await storage.fetch_invoice_summary_page(None, None, limit=2)]
+    while pages[-1].has_next:
+        pages.append(
+            await storage.fetch_invoice_summary_page(
+                None, None, after=pages[-1].last_cursor, limit=2
+            )
+        )
+    assert [s.invoice_number for page in pages for s in page.summaries] == expected
+    assert [s.item_count for page in pages for s in page.summaries] == [1] * 5
+    back = await storage.fetch_invoice_summary_page(
+        None, None, before=pages[-1].first_cursor, limit=2
+    )
+    assert [s.invoice_number for s in back.summaries] == ["E-2023", "B-2024"]
+    assert back.has_prev and back.has_next
+
+    page = await storage.fetch_invoice_page(date(2023, 1, 1), date(2024, 12, 31), limit=2)
+    assert _numbers(page.invoices) == ["A-2023", "E-2023"]
+    assert [inv.items[0].description for inv in page.invoices] == ["A-2023 item", "E-2023 item"]
+    streamed = [inv async for inv in storage.iter_invoices(None, None, batch_size=2)]
+    assert _numbers(streamed) == expected
+    assert streamed[3].items[0].description == "B-2024 item"
+
+    totals = await storage.summarize_invoices(date(2023, 1, 1), date(2025, 12, 31))
+    assert (totals.invoice_count, totals.item_count) == (4, 4)
+    assert totals.total_amount == Decimal("40")
+    supplier_totals = await storage.summarize_invoices(None, None, supplier="Acme")
+    assert supplier_totals.invoice_count == 5
+
+
+def test_partitions_for_range_skips_other_years(tmp_path) -> None:
+    for year in (2022, 2023, 2024):
+        open(partition_path(str(tmp_path), year), "wb").close()
+    (tmp_path / "notes.txt").write_text("x")
+
+    selected = partitions_for_range(str(tmp_path), date(2023, 5, 1), date(2024, 1, 31))
+
+    assert [year for year, _ in selected] == [2023, 2024]
+    assert len(partitions_for_range(str(tmp_path), None, None)) == 3
+    assert partitions_for_range(str(tmp_path / "missing"), None, None) == []
+
+
+@pytest.mark.asyncio
+async def test_archiving_keeps_the_spend_rollup(storage: AsyncInvoiceStorage) -> None:
+    await _seed(storage)
+    expected = await storage.fetch_supplier_spend(1)
+    assert storage._archive_dir is not None
+
+    await archive_invoices(
+        date(2025, 1, 1), storage._archive_dir, database_path=storage._database_path
+    )
+
+    assert await storage.fetch_supplier_spend(1) == expected
+    await storage.rebuild_supplier_spend()
+    assert await storage.fetch_supplier_spend(1) == expected
+
+
+@pytest.mark.asyncio
+async def test_interrupted_archive_run_is_completed_without_duplicates(
+    storage: AsyncInvoiceStorage,
+) -> None:
+    await _seed(storage)
+    archive_dir = storage._archive_dir
+    assert archive_dir is not None
+    await archive_invoices(date(2024, 1, 1), archive_dir, database_path=storage._database_path)
+    # Simulate a crash after the copy: the invoice is back in the main database.
+    with sqlite3.connect(storage._database_path) as connection:
+        connection.execute(f"ATTACH DATABASE '{partition_path(archive_dir, 2023)}' AS part")
+        connection.execute("INSERT INTO main.invoices SELECT * FROM part.invoices")
+        connection.commit()
+        connection.execute("DETACH DATABASE part")
+
+    fetched = await storage.fetch_invoices(date(2023, 1, 1), date(2023, 12, 31))
+    assert _numbers(fetched) == ["A-2023"]
+    page = await storage.fetch_invoice_summary_page(date(2023, 1, 1), date(2023, 12, 31))
+    assert [summary.invoice_number for summary in page.summaries] == ["A-2023"]
+    totals = await storage.summarize_invoices(date(2023, 1, 1), date(2023, 12, 31))
+    assert totals.invoice_count == 1
+
+    report = await archive_invoices(
+        date(2024, 1, 1), archive_dir, database_path=storage._database_path
+    )
+    assert report.invoices == 1
+    assert await _count(partition_path(archive_dir, 2023), "invoices") == 1
+
+
+@pytest.mark.asyncio
+async def test_archived_uploads_stay_referenced(storage: AsyncInvoiceStorage) -> None:
+    invoice = _invoice("A", date(2020, 1, 1))
+    invoice.source = None
+    await storage.save_invoice(invoice, user_id=1)
+    async with aiosqlite.connect(storage._database_path) as connection:
+        await connection.execute("UPDATE invoices SET source_path='uploads/a.pdf'")
+        await connection.commit()
+    assert storage._archive_dir is not None
+    await archive_invoices(
+        date(2021, 1, 1), storage._archive_dir, database_path=storage._database_path
+    )
+
+    paths = await fetch_referenced_paths(storage._database_path, archive_dir=storage._archive_dir)
+
+    assert "uploads/a.pdf" in paths
+    assert os.path.isfile(partition_path(storage._archive_dir, 2020))
+
+
+@pytest.mark.asyncio
+async def test_archived_invoices_are_not_saved_again(
+    storage: AsyncInvoiceStorage, tmp_path
+) -> None:
+    ids = await _seed(storage)
+    archive_dir = storage._archive_dir
+    assert archive_dir is not None
+    await archive_invoices(date(2025, 1, 1), archive_dir, database_path=storage._database_path)
+    queue = GroupCommitQueue(
+        logger=logging.getLogger("test.archive"),
+        database_path=storage._database_path,
+        archive_dir=archive_dir,
+    )
+
+    assert (
+        await storage.save_invoice(_invoice("A-2023", date(2023, 3, 1), "5"), user_id=1) == ids[0]
+    )
+    assert await queue.save_invoice(_invoice("B-2024", date(2024, 6, 1), "7"), user_id=1) == ids[1]
+    saved = await storage.import_invoices(
+        [_invoice("A-2023", date(2023, 3, 1), "5"), _invoice("E-2023", date(2023, 4, 1))],
+        user_id=1,
+    )
+    assert saved[0] == (ids[0], False) and saved[1][1] is True
+
+    listed = await storage.fetch_invoices(None, None)
+    assert sorted(_numbers(listed)) == ["A-2023", "B-2024", "C-2025", "D-undated", "E-2023"]
+    dump_path = str(tmp_path / "archived.ndjson.gz")
+    dumped = dump_database(dump_path, storage._database_path, archive_dir=archive_dir)
+    target = str(tmp_path / "restored.sqlite")
+    run_migrations_for_url(f"sqlite:///{target}")
+    restored = await load_dump(dump_path, database_path=target)
+    assert (dumped.invoices, restored.invoices, restored.duplicates) == (5, 5, 0)
+
+
+@pytest.mark.asyncio
+async def test_archive_dir_with_uri_characters_is_read(
+    async_storage_with_migrations: AsyncInvoiceStorage, tmp_path
+) -> None:
+    archive_dir = str(tmp_path / "archive #1?%20")
+    storage = AsyncInvoiceStorage(
+        database_path=async_storage_with_migrations._database_path, archive_dir=archive_dir
+    )
+    ids = await _seed(storage)
+    await archive_invoices(date(2025, 1, 1), archive_dir, database_path=storage._database_path)
+
+    assert (
+        await storage.save_invoice(_invoice("A-2023", date(2023, 3, 1), "5"), user_id=1) == ids[0]
+    )
+    assert not os.path.exists(str(tmp_path / "archive "))
+
+
+@pytest.mark.asyncio
+async def test_restore_clears_keys_shared_by_archived_copies(
+    storage: AsyncInvoiceStorage, tmp_path
+) -> None:
+    await _seed(storage)
+    archive_dir = storage._archive_dir
+    assert archive_dir is not None
+    await archive_invoices(date(2024, 1, 1), archive_dir, database_path=storage._database_path)
+    # Saved again by a version that did not look into the archive.
+    legacy = AsyncInvoiceStorage(database_path=storage._database_path)
+    copy_id = await legacy.save_invoice(_invoice("A-2023", date(2023, 3, 1), "5"), user_id=1)
+    dump_path = str(tmp_path / "legacy.ndjson.gz")
+    dump_database(dump_path, storage._database_path, archive_dir=archive_dir)
+    target = str(tmp_path / "restored.sqlite")
+    run_migrations_for_url(f"sqlite:///{target}")
+
+    restored = await load_dump(dump_path, database_path=target)
+
+    assert (restored.invoices, restored.duplicates) == (5, 1)
+    with sqlite3.connect(target) as connection:
+        keyless = connection.execute("SELECT id FROM invoices WHERE dedup_key IS NULL").fetchall()
+        indexes = {row[0] for row in connection.execute("SELECT name FROM sqlite_master")}
+    assert (copy_id,) in keyless
+    assert "idx_invoices_dedup_key" in indexes
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import gzip
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from backend import cli
+from backend.storage.backup import (
+    archive_snapshot_dir,
+    backup_database,
+    create_backup,
+    list_backups,
+    prune_backups,
+    restore_backup,
+)
+
+
+def _make_database(path: Path, rows: int = 2000) -> str:
+    with sqlite3.connect(path) as connection:
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("CREATE TABLE invoices(id INTEGER PRIMARY KEY, supplier TEXT)")
+        connection.executemany(
+            "INSERT INTO invoices(supplier) VALUES(?)",
+            [(f"Supplier {i}" * 20,) for i in range(rows)],
+        )
+    return str(path)
+
+
+def _count(path: str) -> int:
+    with sqlite3.connect(path) as connection:
+        return int(connection.execute("SELECT COUNT(*) FROM invoices").fetchone()[0])
+
+
+def test_backup_writes_a_compressed_snapshot_and_reports_progress(tmp_path: Path) -> None:
+    database = _make_database(tmp_path / "data.sqlite")
+    progress: list[tuple[int, int]] = []
+
+    report = backup_database(
+        str(tmp_path / "backups"),
+        database_path=database,
+        pages_per_step=8,
+        step_sleep=0,
+        progress=lambda copied, total: progress.append((copied, total)),
+    )
+
+    assert Path(report.path).name.startswith("data-")
+    assert report.path.endswith(".sqlite.gz")
+    assert list_backups(str(tmp_path / "backups"), database) == [report.path]
+    assert report.pages == progress[-1][0] == progress[-1][1]
+    assert len(progress) > 1
+    assert report.snapshot_bytes < report.database_bytes
+    assert report.seconds >= 0
+    with gzip.open(report.path, "rb") as snapshot:
+        assert snapshot.read(16) == b"SQLite format 3\x00"
+    assert [p.name for p in (tmp_path / "backups").iterdir()] == [Path(report.path).name]
+
+
+def test_backup_keeps_only_the_newest_snapshots(tmp_path: Path) -> None:
+    database = _make_database(tmp_path / "data.sqlite", rows=10)
+    backups = str(tmp_path / "backups")
+
+    paths = [backup_database(backups, keep=2, database_path=database).path for _ in range(4)]
+
+    assert list_backups(backups, database) == paths[-2:]
+    assert prune_backups(backups, keep=1, database_path=database) == paths[-2:-1]
+
+
+def test_backup_does_not_block_writers(tmp_path: Path) -> None:
+    database = _make_database(tmp_path / "data.sqlite")
+    stop = threading.Event()
+    latencies: list[float] = []
+
+    def write() -> None:
+        connection = sqlite3.connect(database, timeout=5)
+        while not stop.is_set():
+            started = time.perf_counter()
+            connection.execute("INSERT INTO invoices(supplier) VALUES('live')")
+            connection.commit()
+            latencies.append(time.perf_counter() - started)
+            time.sleep(0.002)
+        connection.close()
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    try:
+        report = backup_database(
+            str(tmp_path / "backups"), database_path=database, pages_per_step=4, step_sleep=0.002
+        )
+    finally:
+        stop.set()
+        writer.join()
+
+    assert latencies and max(latencies) < 0.5
+    restored = str(tmp_path / "restored.sqlite")
+    restore_backup(report.path, database_path=restored)
+    assert 2000 <= _count(restored) <= _count(database)
+
+
+@pytest.mark.asyncio
+async def test_restore_replaces_the_database(tmp_path: Path) -> None:
+    database = _make_database(tmp_path / "data.sqlite", rows=5)
+    report = await create_backup(str(tmp_path / "backups"), database_path=database)
+    with sqlite3.connect(database) as connection:
+        connection.execute("DELETE FROM invoices")
+
+    pages = restore_backup(report.path, database_path=database)
+
+    assert pages == report.pages
+    assert _count(database) == 5
+
+
+def test_restore_rejects_a_corrupt_snapshot(tmp_path: Path) -> None:
+    database = _make_database(tmp_path / "data.sqlite", rows=5)
+    broken = tmp_path / "data-broken.sqlite.gz"
+    with gzip.open(broken, "wb") as out:
+        out.write(b"not a database")
+
+    with pytest.raises(sqlite3.DatabaseError):
+        restore_backup(str(broken), database_path=database)
+
+    assert _count(database) == 5
+    assert not list(tmp_path.glob("tmp*"))
+
+
+def test_backup_and_restore_commands(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    database = _make_database(tmp_path / "data.sqlite", rows=50)
+    backups = str(tmp_path / "backups")
+
+    assert cli.main(["--db", database, "backup", "--backup-dir", backups, "--keep", "3"]) == 0
+    out = capsys.readouterr().out
+    assert "backup progress: 100%" in out
+    assert "backup written:" in out
+
+    with sqlite3.connect(database) as connection:
+        connection.execute("DELETE FROM invoices")
+    assert cli.main(["--db", database, "restore-backup", "--backup-dir", backups]) == 0
+    assert "restored" in capsys.readouterr().out
+    assert _count(database) == 50
+
+    empty = str(tmp_path / "empty")
+    assert cli.main(["--db", database, "restore-backup", "--backup-dir", empty]) == 1
+
+
+def test_backup_includes_archive_partitions(tmp_path: Path) -> None:
+    database = _make_database(tmp_path / "data.sqlite", rows=5)
+    archive_dir = tmp_path / "archive"
+    archive_dir.mkdir()
+    partitions = [
+        _make_database(archive_dir / f"invoices-{year}.sqlite", rows=rows)
+        for year, rows in ((2022, 3), (2023, 4))
+    ]
+    backups = str(tmp_path / "backups")
+
+    first = backup_database(backups, keep=1, database_path=database, archive_dir=str(archive_dir))
+
+    assert [Path(path).name for path in first.partitions] == [
+        "invoices-2022.sqlite.gz",
+        "invoices-2023.sqlite.gz",
+    ]
+    assert all(
+        Path(path).parent == Path(archive_snapshot_dir(first.path)) for path in first.partitions
+    )
+    assert list_backups(backups, database) == [first.path]
+
+    with sqlite3.connect(partitions[1]) as connection:
+        connection.execute("DELETE FROM invoices")
+    (archive_dir / "invoices-2022.sqlite").unlink()
+    with sqlite3.connect(database) as connection:
+        connection.execute("DELETE FROM invoices")
+
+    restore_backup(first.path, database_path=database, archive_dir=str(archive_dir))
+
+    assert [_count(database), *map(_count, partitions)] == [5, 3, 4]
+    assert not list(archive_dir.glob("tmp*"))
+
+    second = backup_database(backups, keep=1, database_path=database, archive_dir=str(archive_dir))
+    assert second.pruned == 1
+    assert sorted(p.name for p in Path(backups).iterdir()) == sorted(
+        [Path(second.path).name, Path(archive_snapshot_dir(second.path)).name]
+    )
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from backend import cli
+from backend.domain.invoices import Invoice, InvoiceHeader
+from backend.storage.date_backfill import backfill_date_iso, parse_legacy_date
+from backend.storage.db_async import AsyncInvoiceStorage
+
+pytestmark = pytest.mark.storage_db
+
+
+def _insert_legacy(db_path: str, rows: list[tuple[str, str | None, str | None]]) -> None:
+    # Rows as old versions wrote them: the OCR date string only, no date_iso.
+    with sqlite3.connect(db_path) as connection:
+        connection.executemany(
+            "INSERT INTO invoices(user_id, supplier, doc_number, date, total_minor) "
+            "VALUES(1, ?, ?, ?, 1000)",
+            rows,
+        )
+
+
+def test_parse_legacy_date() -> None:
+    assert parse_legacy_date("12.06.2025") == "2025-06-12"
+    assert parse_legacy_date(" 3 juin 24 ") == "2024-06-03"
+    assert parse_legacy_date("2024-13-01") is None
+    assert parse_legacy_date("31.02.2024") is None
+    assert parse_legacy_date("вчера") is None
+    assert parse_legacy_date(None) is None
+
+
+@pytest.mark.asyncio
+async def test_backfill_fills_date_iso_in_batches(
+    async_storage_with_migrations: AsyncInvoiceStorage,
+) -> None:
+    storage = async_storage_with_migrations
+    db_path = storage._database_path
+    await storage.save_invoice(
+        Invoice(
+            header=InvoiceHeader(
+                supplier_name="Acme",
+                invoice_number="7",
+                invoice_date=date(2024, 3, 5),
+                total_amount=Decimal("10"),
+            )
+        ),
+        user_id=1,
+    )
+    _insert_legacy(
+        db_path,
+        [
+            ("Acme", "A-1", "12.03.2024"),
+            ("Acme", "A-2", "вчера"),
+            ("Acme", None, "1 March 2024"),
+            ("Acme", "7", "05/03/2024"),
+            ("Acme", "A-3", "2024-13-01"),
+            ("Acme", "A-4", ""),
+        ],
+    )
+    assert len(await storage.fetch_invoices(date(2024, 3, 1), date(2024, 3, 31))) == 1
+
+    report = await backfill_date_iso(batch_size=2, pause_seconds=0, database_path=db_path)
+
+    assert report.updated == 3
+    assert report.unparsed == [(3, "вчера"), (6, "2024-13-01")]
+    assert report.duplicates == [5]
+    march = await storage.fetch_invoices(date(2024, 3, 1), date(2024, 3, 31))
+    assert [(inv.header.invoice_date, inv.header.invoice_number) for inv in march] == [
+        (date(2024, 3, 1), None),
+        (date(2024, 3, 5), "7"),
+        (date(2024, 3, 5), "7"),
+        (date(2024, 3, 12), "A-1"),
+    ]
+    with sqlite3.connect(db_path) as connection:
+        keys = dict(connection.execute("SELECT id, dedup_key FROM invoices").fetchall())
+        spend = connection.execute(
+            "SELECT month, invoice_count FROM supplier_monthly_spend ORDER BY month"
+        ).fetchall()
+    assert keys[2] == "1|acme|a1|2024-03-12|1000"
+    assert keys[5] is None
+    assert spend == [("", 3), ("2024-03", 4)]
+
+    again = await backfill_date_iso(database_path=db_path)
+    assert (again.updated, again.unparsed) == (0, report.unparsed)
+
+
+@pytest.mark.asyncio
+async def test_backfill_dates_command(
+    async_storage_with_migrations: AsyncInvoiceStorage,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    db_path = async_storage_with_migrations._database_path
+    _insert_legacy(db_path, [("Acme", "1", "01.02.2023"), ("Acme", "2", "n/a")])
+
+    exit_code = await asyncio.to_thread(cli.main, ["--db", db_path, "backfill-dates"])
+
+    assert exit_code == 0
+    output = capsys.readouterr().out
+    assert "invoice 2: unrecognized date 'n/a'" in output
+    assert "invoice dates backfilled: 1 invoices, 1 left without date_iso" in output
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from backend.domain.invoices import Invoice, InvoiceComment, InvoiceHeader, InvoiceItem
+from backend.storage import db as storage_db
+from backend.storage import db_async
+from backend.storage.archive import archive_invoices
+from backend.storage.db import SyncInvoiceStorage
+
+
+def _make_invoice(supplier: str, day: int = 1) -> Invoice:
+    return Invoice(
+        header=InvoiceHeader(
+            supplier_name=supplier,
+            invoice_number=f"INV-{day}",
+            invoice_date=date(2024, 3, day),
+            total_amount=Decimal("30.50"),
+        ),
+        items=[
+            InvoiceItem(description="A", quantity=Decimal("1"), line_total=Decimal("10.50")),
+            InvoiceItem(description="B", quantity=Decimal("2"), line_total=Decimal("20")),
+        ],
+        comments=[InvoiceComment(message="checked", author="7")],
+    )
+
+
+@pytest.mark.asyncio
+async def test_sync_and_async_storage_read_the_same_rows(initialized_db_path: str) -> None:
+    storage = SyncInvoiceStorage(initialized_db_path)
+    sync_id = storage.save_invoice(_make_invoice("Sync", day=2), user_id=1)
+    async_id = await db_async.save_invoice_domain_async(_make_invoice("Async", day=1), user_id=1)
+    assert sync_id > 0 and async_id == sync_id + 1
+
+    for args in [
+        (date(2024, 3, 1), date(2024, 3, 31), None),
+        (date(2024, 3, 1), date(2024, 3, 31), "Sync"),
+        (None, None, "Async"),
+        (None, None, None),
+    ]:
+        expected = await db_async.fetch_invoices_domain_async(*args)
+        assert storage.fetch_invoices(*args) == expected
+    assert [invoice.header.supplier_name for invoice in storage.fetch_invoices(None, None)] == [
+        "Sync",
+        "Async",
+    ]
+    storage.close()
+
+
+@pytest.mark.asyncio
+async def test_sync_storage_reads_and_deduplicates_archived_invoices(
+    initialized_db_path: str, tmp_path
+) -> None:
+    archive_dir = str(tmp_path / "archive")
+    storage = SyncInvoiceStorage(initialized_db_path, archive_dir=archive_dir)
+    old_id = storage.save_invoice(_make_invoice("Old", day=1), user_id=1)
+    storage.save_invoice(_make_invoice("New", day=20), user_id=1)
+    await archive_invoices(date(2024, 3, 10), archive_dir, database_path=initialized_db_path)
+    reader = db_async.AsyncInvoiceStorage(initialized_db_path, archive_dir=archive_dir)
+
+    for args in [
+        (date(2024, 3, 1), date(2024, 3, 31), None),
+        (None, None, "Old"),
+        (None, None, None),
+    ]:
+        assert storage.fetch_invoices(*args) == await reader.fetch_invoices(*args)
+    assert [invoice.header.supplier_name for invoice in storage.fetch_invoices(None, None)] == [
+        "Old",
+        "New",
+    ]
+    # The archived copy is found, so the invoice is not stored a second time.
+    assert storage.save_invoice(_make_invoice("Old", day=1), user_id=1) == old_id
+    assert len(storage.fetch_invoices(None, None)) == 2
+    storage.close()
+
+
+def test_sync_storage_reuses_pooled_connections(initialized_db_path: str) -> None:
+    storage = SyncInvoiceStorage(initialized_db_path, pool_size=2)
+    assert storage._pool.idle() == 0
+    storage.save_invoice(_make_invoice("One"))
+    storage.fetch_invoices(None, None)
+    assert storage._pool.idle() == 1
+
+    errors: list[BaseException] = []
+
+    def worker() -> None:
+        try:
+            for _ in range(20):
+                storage.fetch_invoices(None, None)
+        except BaseException as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert storage._pool.idle() <= 2
+
+    storage.close()
+    assert storage._pool.idle() == 0
+
+
+def test_failed_save_rolls_back(initialized_db_path: str) -> None:
+    storage = SyncInvoiceStorage(initialized_db_path)
+    invoice = _make_invoice("Broken")
+    invoice.comments[0].message = None  # type: ignore[assignment]
+
+    with pytest.raises(Exception):
+        storage.save_invoice(invoice)
+
+    assert storage.fetch_invoices(None, None) == []
+    assert storage.save_invoice(_make_invoice("Fine")) > 0
+    storage.close()
+
+
+@pytest.mark.asyncio
+async def test_module_helpers_work_inside_a_running_loop(initialized_db_path: str) -> None:
+    invoice_id = storage_db.save_invoice_domain(_make_invoice("Legacy"), user_id=5)
+    assert asyncio.get_running_loop() is not None
+
+    invoices = storage_db.fetch_invoices_domain(None, None, supplier="Legacy")
+
+    assert invoice_id > 0
+    assert [invoice.header.invoice_number for invoice in invoices] == ["INV-1"]
+    assert storage_db._get_sync_storage() is storage_db._get_sync_storage()
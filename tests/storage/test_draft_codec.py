@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+import aiosqlite
+import msgpack
+import pytest
+
+from backend.domain.drafts import InvoiceDraft
+from backend.domain.invoices import (
+    Invoice,
+    InvoiceComment,
+    InvoiceHeader,
+    InvoiceItem,
+    InvoiceSourceInfo,
+)
+from backend.storage import db as storage_db
+from backend.storage.draft_codec import DRAFT_FORMAT_VERSION, decode_draft, encode_draft
+from backend.storage.drafts_async import load_draft_invoice, save_draft_invoice
+
+
+def _make_draft() -> InvoiceDraft:
+    return InvoiceDraft(
+        invoice=Invoice(
+            header=InvoiceHeader(
+                supplier_name="Поставщик",
+                invoice_number="INV-7",
+                invoice_date=date(2025, 3, 1),
+                due_date=None,
+                subtotal=Decimal("-0.50"),
+                total_amount=Decimal("1000.00"),
+            ),
+            items=[
+                InvoiceItem(
+                    description="Item",
+                    sku=None,
+                    quantity=Decimal("1.250"),
+                    unit_price=Decimal("12345678901234567890.12"),
+                    line_total=Decimal("0"),
+                    currency="RUB",
+                ),
+                InvoiceItem(description="NaN line", line_total=Decimal("NaN")),
+            ],
+            comments=[
+                InvoiceComment(message="ok", author="42", created_at=datetime(2025, 3, 1, 12, 30)),
+            ],
+            source=InvoiceSourceInfo(file_path="a.pdf", provider="mindee"),
+        ),
+        path="a.pdf",
+        raw_text="raw",
+        comments=["one", "two"],
+    )
+
+
+def _assert_same(loaded: InvoiceDraft | None, draft: InvoiceDraft) -> None:
+    assert loaded is not None
+    assert loaded.invoice.header == draft.invoice.header
+    assert loaded.invoice.items[0] == draft.invoice.items[0]
+    assert loaded.invoice.items[1].line_total.is_nan()
+    assert loaded.invoice.comments == draft.invoice.comments
+    assert loaded.invoice.source == draft.invoice.source
+    assert (loaded.path, loaded.raw_text, loaded.comments) == (
+        draft.path,
+        draft.raw_text,
+        draft.comments,
+    )
+    assert loaded.invoice.raw_text == draft.raw_text
+
+
+def test_binary_roundtrip_is_exact() -> None:
+    draft = _make_draft()
+
+    payload = encode_draft(draft)
+    loaded = decode_draft(payload)
+
+    _assert_same(loaded, draft)
+    assert loaded is not None
+    # Trailing zeros survive, so the values print the same after a reload.
+    assert str(loaded.invoice.header.total_amount) == "1000.00"
+    assert str(loaded.invoice.items[0].quantity) == "1.250"
+
+
+def test_legacy_json_payload_is_readable() -> None:
+    payload = json.dumps(
+        {
+            "invoice": {
+                "header": {
+                    "supplier_name": "Old",
+                    "invoice_date": {"__type__": "date", "value": "2024-01-01"},
+                    "total_amount": {"__type__": "decimal", "value": "10.50"},
+                },
+                "items": [
+                    {
+                        "description": "Legacy item",
+                        "quantity": {"__type__": "decimal", "value": "2"},
+                    }
+                ],
+                "comments": [
+                    {
+                        "message": "hi",
+                        "created_at": {"__type__": "datetime", "value": "2024-01-01T10:00:00"},
+                    }
+                ],
+                "source": None,
+            },
+            "path": "old.pdf",
+            "raw_text": "",
+            "comments": "single",
+        }
+    )
+
+    draft = decode_draft(payload)
+
+    assert draft is not None
+    assert draft.invoice.header.invoice_date == date(2024, 1, 1)
+    assert draft.invoice.header.total_amount == Decimal("10.50")
+    assert draft.invoice.items[0].quantity == Decimal("2")
+    assert draft.invoice.comments[0].created_at == datetime(2024, 1, 1, 10)
+    assert draft.comments == ["single"]
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        b"",
+        b"\xc1",
+        msgpack.packb([DRAFT_FORMAT_VERSION + 1, [], "", "", []]),
+        msgpack.packb([DRAFT_FORMAT_VERSION, [[], [], [], None], "", "", []]),
+        msgpack.packb({"version": 1}),
+        msgpack.packb(
+            [
+                DRAFT_FORMAT_VERSION,
+                [[None, None, None, None, None, 2**62, None, None, None, None, None], [], [], None],
+                "",
+                "",
+                [],
+            ]
+        ),
+        "not json",
+        "[1, 2]",
+        json.dumps({"invoice": []}),
+    ],
+)
+def test_unreadable_payloads_decode_to_none(payload: bytes | str) -> None:
+    assert decode_draft(payload) is None
+
+
+@pytest.mark.asyncio
+async def test_drafts_are_stored_as_binary_and_legacy_rows_still_load(
+    tmp_path, monkeypatch
+) -> None:
+    db_file = tmp_path / "drafts.sqlite"
+    monkeypatch.setattr(storage_db, "DB_PATH", str(db_file), raising=True)
+    monkeypatch.setattr("backend.storage.drafts_async.DB_PATH", str(db_file), raising=True)
+    storage_db.init_db()
+
+    draft = _make_draft()
+    await save_draft_invoice(1, draft)
+    async with aiosqlite.connect(db_file) as connection:
+        cursor = await connection.execute(
+            "SELECT typeof(payload) FROM invoice_drafts WHERE user_id = 1"
+        )
+        assert await cursor.fetchone() == ("blob",)
+        await connection.execute(
+            "INSERT INTO invoice_drafts(user_id, payload) VALUES(2, ?)",
+            (json.dumps({"invoice": {"header": {"supplier_name": "Legacy"}}, "path": "x"}),),
+        )
+        await connection.execute(
+            "INSERT INTO invoice_draft_active(user_id, draft_id) VALUES(2, last_insert_rowid())"
+        )
+        await connection.commit()
+
+    _assert_same(await load_draft_invoice(1), draft)
+    legacy = await load_draft_invoice(2)
+    assert legacy is not None
+    assert legacy.invoice.header.supplier_name == "Legacy"
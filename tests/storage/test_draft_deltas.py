@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import threading
+from datetime import date
+from decimal import Decimal
+
+import aiosqlite
+import msgpack
+import pytest
+
+from backend.domain.drafts import DraftPatch, InvoiceDraft
+from backend.domain.invoices import Invoice, InvoiceHeader, InvoiceItem
+from backend.storage import drafts_async
+from backend.storage.draft_codec import DRAFT_FORMAT_VERSION, decode_patch, encode_patch
+from backend.storage.drafts_async import (
+    append_draft_patches,
+    compact_draft_invoices,
+    delete_draft_invoice,
+    load_draft_history,
+    load_draft_invoice,
+    save_draft_invoice,
+)
+
+
+def _make_draft(items: int = 3) -> InvoiceDraft:
+    return InvoiceDraft(
+        invoice=Invoice(
+            header=InvoiceHeader(supplier_name="Supplier", total_amount=Decimal("10.00")),
+            items=[InvoiceItem(description=f"Item {i}") for i in range(items)],
+        ),
+        path="a.pdf",
+    )
+
+
+async def _delta_state(db_path: str, user_id: int) -> tuple[int, int]:
+    async with aiosqlite.connect(db_path) as connection:
+        cursor = await connection.execute(
+            "SELECT delta_seq FROM invoice_drafts WHERE user_id = ?", (user_id,)
+        )
+        row = await cursor.fetchone()
+        cursor = await connection.execute(
+            """
+            SELECT COUNT(*) FROM invoice_draft_deltas AS d
+            JOIN invoice_drafts AS draft ON draft.id = d.draft_id
+            WHERE draft.user_id = ?
+            """,
+            (user_id,),
+        )
+        count = await cursor.fetchone()
+    return (row[0] if row else -1), count[0]
+
+
+@pytest.mark.parametrize(
+    "patch",
+    [
+        DraftPatch.set_header("invoice_date", date(2025, 2, 3)),
+        DraftPatch.set_header("invoice_date", None),
+        DraftPatch.set_header("total_amount", Decimal("-12.50")),
+        DraftPatch.set_item(2, "description", "Новое имя"),
+        DraftPatch.set_item(1, "unit_price", Decimal("0.001")),
+        DraftPatch.add_comment("hello"),
+    ],
+)
+def test_patch_codec_roundtrip(patch: DraftPatch) -> None:
+    assert decode_patch(encode_patch(patch)) == patch
+
+
+def test_decode_patch_rejects_garbage() -> None:
+    assert decode_patch(b"\xc1") is None
+    assert decode_patch(b"\x93\x01\x02\x03") is None
+    out_of_range = msgpack.packb([DRAFT_FORMAT_VERSION, "set_header", None, "invoice_date", 2**62])
+    assert decode_patch(out_of_range) is None
+
+
+@pytest.mark.asyncio
+async def test_patches_are_applied_on_read(initialized_db_path: str) -> None:
+    await save_draft_invoice(1, _make_draft())
+    await append_draft_patches(
+        1,
+        [
+            DraftPatch.set_item(2, "quantity", Decimal("5")),
+            DraftPatch.set_header("supplier_name", "Edited"),
+            DraftPatch.add_comment("checked"),
+            # Out of range for this draft: skipped instead of breaking the read.
+            DraftPatch.set_item(9, "quantity", Decimal("1")),
+        ],
+    )
+    await append_draft_patches(1, [])
+
+    draft = await load_draft_invoice(1)
+
+    assert draft is not None
+    assert draft.invoice.items[1].quantity == Decimal("5")
+    assert draft.invoice.header.supplier_name == "Edited"
+    assert draft.comments == ["checked"]
+    # Below the threshold nothing is compacted yet.
+    assert await _delta_state(initialized_db_path, 1) == (0, 4)
+
+
+@pytest.mark.asyncio
+async def test_read_compacts_long_delta_log_and_keeps_history(initialized_db_path: str) -> None:
+    await save_draft_invoice(1, _make_draft())
+    patches = [
+        DraftPatch.set_item(1, "line_total", Decimal(i))
+        for i in range(drafts_async.DRAFT_COMPACT_THRESHOLD)
+    ]
+    await append_draft_patches(1, patches)
+
+    first = await load_draft_invoice(1)
+    delta_seq, deltas = await _delta_state(initialized_db_path, 1)
+    second = await load_draft_invoice(1)
+
+    assert delta_seq > 0
+    assert deltas == len(patches)
+    assert first == second
+    assert second is not None
+    assert second.invoice.items[0].line_total == Decimal(len(patches) - 1)
+
+    history = await load_draft_history(1)
+    assert [entry.patch for entry in history] == patches
+    assert all(entry.created_at is not None for entry in history)
+
+
+@pytest.mark.asyncio
+async def test_compaction_does_not_overwrite_a_concurrent_full_save(
+    initialized_db_path: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    await save_draft_invoice(1, _make_draft())
+    await append_draft_patches(
+        1,
+        [DraftPatch.add_comment(str(i)) for i in range(drafts_async.DRAFT_COMPACT_THRESHOLD)],
+    )
+    with sqlite3.connect(initialized_db_path) as connection:
+        draft_id, version = connection.execute(
+            "SELECT id, version FROM invoice_drafts WHERE user_id = 1"
+        ).fetchone()
+    replacement = _make_draft(items=1)
+    replacement.draft_id, replacement.version = draft_id, version
+    apply_draft_patch = drafts_async.apply_draft_patch
+
+    def replace_while_folding(draft: InvoiceDraft, patch: DraftPatch) -> None:
+        # The fold has read the draft; a full save lands before it writes back.
+        if replacement.version == version:
+            thread = threading.Thread(
+                target=asyncio.run, args=(drafts_async.replace_draft_invoice(1, replacement),)
+            )
+            thread.start()
+            thread.join()
+        apply_draft_patch(draft, patch)
+
+    monkeypatch.setattr(drafts_async, "apply_draft_patch", replace_while_folding)
+    folded = await load_draft_invoice(1)
+
+    assert folded is not None and len(folded.comments) == drafts_async.DRAFT_COMPACT_THRESHOLD
+    assert replacement.version == version + 1
+    stored = await load_draft_invoice(1)
+    assert stored is not None
+    assert len(stored.invoice.items) == 1
+    assert stored.comments == []
+    assert await _delta_state(initialized_db_path, 1) == (0, 0)
+
+
+@pytest.mark.asyncio
+async def test_full_save_and_delete_reset_delta_log(initialized_db_path: str) -> None:
+    await save_draft_invoice(1, _make_draft())
+    await append_draft_patches(1, [DraftPatch.add_comment("old")])
+
+    await save_draft_invoice(1, _make_draft(items=1))
+    draft = await load_draft_invoice(1)
+    assert draft is not None
+    assert draft.comments == []
+    assert await load_draft_history(1) == []
+
+    await append_draft_patches(1, [DraftPatch.add_comment("again")])
+    await delete_draft_invoice(1)
+    assert await load_draft_invoice(1) is None
+    assert await _delta_state(initialized_db_path, 1) == (-1, 0)
+
+
+@pytest.mark.asyncio
+async def test_compact_draft_invoices(initialized_db_path: str) -> None:
+    await save_draft_invoice(1, _make_draft())
+    await save_draft_invoice(2, _make_draft())
+    await append_draft_patches(1, [DraftPatch.set_header("supplier_name", "One")])
+
+    assert await compact_draft_invoices() == 1
+    assert await compact_draft_invoices(database_path=initialized_db_path) == 0
+
+    delta_seq, deltas = await _delta_state(initialized_db_path, 1)
+    assert delta_seq > 0 and deltas == 1
+    draft = await load_draft_invoice(1)
+    assert draft is not None
+    assert draft.invoice.header.supplier_name == "One"
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+from decimal import Decimal
+
+import pytest
+from alembic import command
+
+from backend.domain.drafts import DraftPatch, InvoiceDraft
+from backend.domain.invoices import Invoice, InvoiceHeader, InvoiceItem
+from backend.storage import db as storage_db
+from backend.storage.draft_codec import encode_draft, encode_patch
+from backend.storage.drafts_async import (
+    activate_draft_invoice,
+    add_draft_invoice,
+    append_draft_patches,
+    delete_draft_invoice,
+    list_draft_invoices,
+    load_draft_history,
+    load_draft_invoice,
+    save_draft_invoice,
+)
+
+
+def _make_draft(supplier: str, items: int = 1) -> InvoiceDraft:
+    return InvoiceDraft(
+        invoice=Invoice(
+            header=InvoiceHeader(supplier_name=supplier, total_amount=Decimal("5")),
+            items=[InvoiceItem(description=f"Item {i}") for i in range(items)],
+        ),
+        path=f"temp/{supplier}.pdf",
+    )
+
+
+async def _current_supplier(user_id: int) -> str | None:
+    draft = await load_draft_invoice(user_id)
+    return draft.invoice.header.supplier_name if draft is not None else None
+
+
+@pytest.mark.asyncio
+async def test_uploads_queue_up_and_are_reviewed_in_order(initialized_db_path: str) -> None:
+    first = await add_draft_invoice(1, _make_draft("A"))
+    second = await add_draft_invoice(1, _make_draft("B", items=3))
+    third = await add_draft_invoice(1, _make_draft("C"))
+    other_user = await add_draft_invoice(2, _make_draft("X"))
+
+    assert first.active and not second.active and not third.active
+    assert other_user.active
+    assert await _current_supplier(1) == "A"
+
+    drafts = await list_draft_invoices(1)
+    assert [(d.draft_id, d.supplier_name, d.active) for d in drafts] == [
+        (first.draft_id, "A", True),
+        (second.draft_id, "B", False),
+        (third.draft_id, "C", False),
+    ]
+    assert drafts[1].item_count == 3
+    assert drafts[0].created_at is not None
+
+    await delete_draft_invoice(1)
+    assert await _current_supplier(1) == "B"
+    await delete_draft_invoice(1)
+    await delete_draft_invoice(1)
+    assert await _current_supplier(1) is None
+    assert await list_draft_invoices(1) == []
+    assert await _current_supplier(2) == "X"
+
+
+@pytest.mark.asyncio
+async def test_switching_drafts_redirects_edits(initialized_db_path: str) -> None:
+    first = await add_draft_invoice(1, _make_draft("A"))
+    second = await add_draft_invoice(1, _make_draft("B"))
+    foreign = await add_draft_invoice(2, _make_draft("X"))
+
+    assert await activate_draft_invoice(1, foreign.draft_id) is False
+    assert await activate_draft_invoice(1, second.draft_id) is True
+    await append_draft_patches(1, [DraftPatch.set_header("supplier_name", "B2")])
+    await save_draft_invoice(2, _make_draft("Y"))
+
+    assert await _current_supplier(1) == "B2"
+    assert [entry.patch.value for entry in await load_draft_history(1)] == ["B2"]
+    assert await _current_supplier(2) == "Y"
+
+    await activate_draft_invoice(1, first.draft_id)
+    assert await _current_supplier(1) == "A"
+    assert await load_draft_history(1) == []
+
+    # Deleting the active draft falls back to the oldest remaining one.
+    await delete_draft_invoice(1)
+    assert await _current_supplier(1) == "B2"
+
+
+@pytest.mark.asyncio
+async def test_save_without_drafts_starts_one(initialized_db_path: str) -> None:
+    await save_draft_invoice(1, _make_draft("A"))
+    await save_draft_invoice(1, _make_draft("B"))
+
+    assert [d.supplier_name for d in await list_draft_invoices(1)] == ["B"]
+
+
+def test_migration_keeps_existing_drafts_and_deltas(patched_db_path: str) -> None:
+    config = storage_db._get_alembic_config()
+    config.set_main_option("sqlalchemy.url", f"sqlite:///{patched_db_path}")
+    command.upgrade(config, "0005_invoice_drafts_created_at_index")
+    with sqlite3.connect(patched_db_path) as connection:
+        connection.executemany(
+            "INSERT INTO invoice_drafts(user_id, payload) VALUES(?, ?)",
+            [(7, encode_draft(_make_draft("Old7"))), (8, encode_draft(_make_draft("Old8")))],
+        )
+        connection.execute(
+            "INSERT INTO invoice_draft_deltas(user_id, patch) VALUES(7, ?)",
+            (encode_patch(DraftPatch.set_header("supplier_name", "Edited7")),),
+        )
+
+    command.upgrade(config, "head")
+
+    assert asyncio.run(_current_supplier(7)) == "Edited7"
+    assert asyncio.run(_current_supplier(8)) == "Old8"
+
+    command.downgrade(config, "0005_invoice_drafts_created_at_index")
+    with sqlite3.connect(patched_db_path) as connection:
+        users = connection.execute("SELECT user_id FROM invoice_drafts ORDER BY user_id").fetchall()
+        deltas = connection.execute("SELECT user_id FROM invoice_draft_deltas").fetchall()
+    assert users == [(7,), (8,)]
+    assert deltas == [(7,)]
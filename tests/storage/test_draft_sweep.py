@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import aiosqlite
+import pytest
+
+from backend.domain.drafts import DraftPatch, InvoiceDraft
+from backend.domain.invoices import Invoice, InvoiceHeader, InvoiceSourceInfo
+from backend.storage.db_async import AsyncInvoiceStorage
+from backend.storage.drafts_async import (
+    append_draft_patches,
+    delete_expired_drafts,
+    fetch_referenced_paths,
+    load_draft_invoice,
+    save_draft_invoice,
+)
+
+
+def _make_draft(path: str) -> InvoiceDraft:
+    return InvoiceDraft(invoice=Invoice(header=InvoiceHeader(supplier_name="S")), path=path)
+
+
+async def _age_drafts(db_file: str, user_ids: list[int], days: int) -> None:
+    async with aiosqlite.connect(db_file) as connection:
+        await connection.executemany(
+            "UPDATE invoice_drafts SET created_at=datetime('now', ?) WHERE user_id=?",
+            [(f"-{days} days", user_id) for user_id in user_ids],
+        )
+        await connection.commit()
+
+
+@pytest.mark.asyncio
+async def test_delete_expired_drafts_in_batches(initialized_db_path: str) -> None:
+    for user_id in range(1, 6):
+        await save_draft_invoice(user_id, _make_draft(f"temp/{user_id}.pdf"))
+    await append_draft_patches(1, [DraftPatch.add_comment("old")])
+    await _age_drafts(initialized_db_path, [1, 2, 3, 4], days=10)
+
+    expired = await delete_expired_drafts(3 * 24 * 3600, batch_size=3)
+
+    assert expired.drafts == 4
+    assert expired.deltas == 1
+    assert expired.payload_bytes > 0
+    assert sorted(expired.paths) == [f"temp/{user_id}.pdf" for user_id in range(1, 5)]
+    assert await load_draft_invoice(1) is None
+    assert await load_draft_invoice(5) is not None
+
+
+@pytest.mark.asyncio
+async def test_patches_keep_a_draft_alive(initialized_db_path: str) -> None:
+    await save_draft_invoice(1, _make_draft("temp/1.pdf"))
+    await _age_drafts(initialized_db_path, [1], days=10)
+
+    await append_draft_patches(1, [DraftPatch.set_header("supplier_name", "New")])
+    expired = await delete_expired_drafts(3 * 24 * 3600)
+
+    assert expired.drafts == 0
+    assert await load_draft_invoice(1) is not None
+
+
+@pytest.mark.asyncio
+async def test_fetch_referenced_paths_covers_drafts_and_invoices(initialized_db_path: str) -> None:
+    await save_draft_invoice(1, _make_draft("temp/draft.pdf"))
+    storage = AsyncInvoiceStorage(database_path=initialized_db_path)
+    await storage.save_invoice(
+        Invoice(
+            header=InvoiceHeader(supplier_name="S"),
+            source=InvoiceSourceInfo(file_path="temp/saved.pdf"),
+        ),
+        user_id=1,
+    )
+
+    assert await fetch_referenced_paths() == {"temp/draft.pdf", "temp/saved.pdf"}
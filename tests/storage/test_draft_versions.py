@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import sqlite3
+from decimal import Decimal
+
+import pytest
+
+from backend.domain.drafts import DraftPatch, DraftVersionConflict, InvoiceDraft
+from backend.domain.invoices import Invoice, InvoiceHeader, InvoiceItem
+from backend.storage.drafts_async import (
+    add_draft_invoice,
+    append_draft_patches,
+    discard_draft_invoice,
+    load_draft_invoice,
+    replace_draft_invoice,
+    save_draft_invoice,
+)
+
+
+def _make_draft(supplier: str) -> InvoiceDraft:
+    return InvoiceDraft(
+        invoice=Invoice(
+            header=InvoiceHeader(supplier_name=supplier, total_amount=Decimal("5")),
+            items=[InvoiceItem(description="Item")],
+        ),
+        path=f"temp/{supplier}.pdf",
+    )
+
+
+async def _load(user_id: int) -> InvoiceDraft:
+    draft = await load_draft_invoice(user_id)
+    assert draft is not None
+    return draft
+
+
+def test_migration_adds_version_column(initialized_db_path: str) -> None:
+    with sqlite3.connect(initialized_db_path) as connection:
+        columns = {row[1] for row in connection.execute("PRAGMA table_info(invoice_drafts)")}
+    assert "version" in columns
+
+
+@pytest.mark.asyncio
+async def test_every_write_bumps_the_version(initialized_db_path: str) -> None:
+    draft = _make_draft("A")
+    await save_draft_invoice(1, draft)
+    assert draft.draft_id is not None and draft.version == 0
+
+    await append_draft_patches(1, [DraftPatch.add_comment("one")], draft)
+    assert draft.version == 1
+    await save_draft_invoice(1, draft)
+    assert draft.version == 2
+
+    loaded = await _load(1)
+    assert (loaded.draft_id, loaded.version) == (draft.draft_id, 2)
+    assert loaded == draft
+
+
+@pytest.mark.asyncio
+async def test_stale_writes_are_refused(initialized_db_path: str) -> None:
+    await save_draft_invoice(1, _make_draft("A"))
+    mine = await _load(1)
+    theirs = await _load(1)
+
+    theirs.invoice.header.supplier_name = "Theirs"
+    await replace_draft_invoice(1, theirs)
+
+    with pytest.raises(DraftVersionConflict):
+        await append_draft_patches(1, [DraftPatch.set_header("supplier_name", "Mine")], mine)
+    mine.invoice.header.supplier_name = "Mine"
+    with pytest.raises(DraftVersionConflict):
+        await replace_draft_invoice(1, mine)
+    with pytest.raises(DraftVersionConflict):
+        await replace_draft_invoice(1, _make_draft("Unsaved"))
+
+    stored = await _load(1)
+    assert stored.invoice.header.supplier_name == "Theirs"
+    assert stored.version == theirs.version == 1
+
+    # Reloading and applying the change again succeeds.
+    await append_draft_patches(1, [DraftPatch.set_header("supplier_name", "Mine")], stored)
+    assert (await _load(1)).invoice.header.supplier_name == "Mine"
+
+
+@pytest.mark.asyncio
+async def test_patches_against_an_inactive_draft_are_refused(initialized_db_path: str) -> None:
+    first = await add_draft_invoice(1, _make_draft("A"))
+    await add_draft_invoice(1, _make_draft("B"))
+    stale = await _load(1)
+    assert stale.draft_id == first.draft_id
+
+    assert await discard_draft_invoice(1, stale)
+    with pytest.raises(DraftVersionConflict):
+        await append_draft_patches(1, [DraftPatch.add_comment("late")], stale)
+    assert (await _load(1)).comments == []
+
+
+@pytest.mark.asyncio
+async def test_discard_only_deletes_the_unchanged_draft(initialized_db_path: str) -> None:
+    await add_draft_invoice(1, _make_draft("A"))
+    await add_draft_invoice(1, _make_draft("B"))
+    saved = await _load(1)
+    edited = await _load(1)
+    await append_draft_patches(1, [DraftPatch.add_comment("edit")], edited)
+
+    assert not await discard_draft_invoice(1, saved)
+    assert await discard_draft_invoice(1, edited)
+    # Discarding the same draft twice leaves the next one in the queue alone.
+    assert not await discard_draft_invoice(1, edited)
+    assert not await discard_draft_invoice(2, await _load(1))
+    assert (await _load(1)).invoice.header.supplier_name == "B"
+    assert not await discard_draft_invoice(1, _make_draft("Unsaved"))
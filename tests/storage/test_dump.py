@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import sqlite3
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+from backend import cli
+from backend.domain.invoices import Invoice, InvoiceComment, InvoiceHeader, InvoiceItem
+from backend.storage.archive import archive_invoices, partition_path
+from backend.storage.db_async import AsyncInvoiceStorage
+from backend.storage.dump import dump_database, load_dump, restore_dump
+from tests.utils.alembic_test_utils import run_migrations_for_url
+
+
+def _invoice(number: int, items: int = 2) -> Invoice:
+    return Invoice(
+        header=InvoiceHeader(
+            supplier_name=f"Поставщик {number % 3}",
+            invoice_number=f"N-{number}",
+            invoice_date=date(2024, 1 + number % 12, 1),
+            total_amount=Decimal("10.05") * items,
+        ),
+        items=[
+            InvoiceItem(
+                description=f"Line {line}", quantity=Decimal("1.5"), line_total=Decimal("10.05")
+            )
+            for line in range(items)
+        ],
+        comments=[InvoiceComment(message="ok")] if number % 2 else [],
+        raw_text=f"raw {number}" if number % 4 else None,
+    )
+
+
+def _empty_database(path: Path) -> str:
+    run_migrations_for_url(f"sqlite:///{path}")
+    return str(path)
+
+
+def _snapshot(db_path: str) -> dict[str, list[tuple]]:
+    with sqlite3.connect(db_path) as connection:
+        return {
+            table: connection.execute(f"SELECT * FROM {table} ORDER BY 1, 2").fetchall()
+            for table in (
+                "invoices",
+                "invoice_items",
+                "comments",
+                "invoice_raw",
+                "supplier_monthly_spend",
+            )
+        }
+
+
+def _schema(db_path: str) -> list[tuple]:
+    with sqlite3.connect(db_path) as connection:
+        return connection.execute(
+            "SELECT type, name, sql FROM sqlite_master ORDER BY type, name"
+        ).fetchall()
+
+
+@pytest.mark.storage_db
+@pytest.mark.asyncio
+async def test_dump_round_trips_through_an_empty_database(
+    async_storage_with_migrations: AsyncInvoiceStorage, tmp_path: Path
+) -> None:
+    storage = async_storage_with_migrations
+    await storage.save_invoices([_invoice(n, items=n % 3) for n in range(1, 30)], user_id=5)
+    dump_path = str(tmp_path / "invoices.ndjson.gz")
+    progress: list[int] = []
+
+    report = await asyncio.to_thread(
+        dump_database, dump_path, storage._database_path, progress.append, 10
+    )
+
+    assert (report.invoices, report.items, report.comments) == (29, 30, 15)
+    assert progress == [10, 20, 29]
+    with gzip.open(dump_path, "rt", encoding="utf-8") as dump:
+        header, first = json.loads(dump.readline()), json.loads(dump.readline())
+    assert "raw_text" not in header["columns"]["invoices"]
+    assert first["supplier"] == "Поставщик 1" and first["raw_text"] == "raw 1"
+    assert [item["name"] for item in first["items"]] == ["Line 0"]
+    assert [comment["text"] for comment in first["comments"]] == ["ok"]
+
+    target = _empty_database(tmp_path / "restored.sqlite")
+    restored = await load_dump(dump_path, database_path=target, batch_size=7)
+
+    assert (restored.invoices, restored.items, restored.comments) == (29, 30, 15)
+    assert _snapshot(target) == _snapshot(storage._database_path)
+    assert _schema(target) == _schema(storage._database_path)
+    with sqlite3.connect(target) as connection:
+        assert connection.execute("SELECT COUNT(*) FROM invoice_changes").fetchone() == (0,)
+    # Triggers are back: new writes maintain the rollup and the change log again.
+    restored_storage = AsyncInvoiceStorage(target)
+    new_id = await restored_storage.save_invoice(_invoice(99), user_id=5)
+    assert new_id == 30
+    assert len(await restored_storage.fetch_changes()) == 4
+
+
+@pytest.mark.storage_db
+@pytest.mark.asyncio
+async def test_dump_includes_archive_partitions(
+    async_storage_with_migrations: AsyncInvoiceStorage, tmp_path: Path
+) -> None:
+    storage = async_storage_with_migrations
+    invoices = [_invoice(n) for n in range(1, 7)]
+    invoices[0].header.invoice_date = date(2022, 5, 1)
+    invoices[1].header.invoice_date = date(2023, 5, 1)
+    invoices[2].header.invoice_date = date(2022, 7, 1)
+    await storage.save_invoices(invoices, user_id=2)
+    before = _snapshot(storage._database_path)
+    # URI characters in the directory name must not change which file is opened.
+    archive_dir = str(tmp_path / "archive #1?%20")
+    await archive_invoices(date(2024, 1, 1), archive_dir, database_path=storage._database_path)
+    # An interrupted archive run leaves invoice 2 in both databases.
+    with sqlite3.connect(storage._database_path) as connection:
+        connection.execute("ATTACH DATABASE ? AS part", (partition_path(archive_dir, 2023),))
+        for table in ("invoices", "invoice_items", "comments", "invoice_raw"):
+            connection.execute(f"INSERT INTO {table} SELECT * FROM part.{table}")
+    dump_path = str(tmp_path / "archived.ndjson.gz")
+
+    report = await asyncio.to_thread(
+        dump_database, dump_path, storage._database_path, archive_dir=archive_dir
+    )
+
+    assert (report.invoices, report.items, report.partitions) == (6, 12, 2)
+    with gzip.open(dump_path, "rt", encoding="utf-8") as dump:
+        ids = [json.loads(line)["id"] for line in dump.readlines()[1:]]
+    assert ids == [1, 2, 3, 4, 5, 6]
+    target = _empty_database(tmp_path / "restored.sqlite")
+    await load_dump(dump_path, database_path=target)
+    restored = _snapshot(target)
+    for table in ("invoices", "invoice_items", "comments", "invoice_raw"):
+        assert restored[table] == before[table]
+
+
+@pytest.mark.storage_db
+def test_restore_refuses_a_database_with_invoices(
+    migrated_database_url: str, tmp_path: Path
+) -> None:
+    source = _empty_database(tmp_path / "source.sqlite")
+    dump_path = str(tmp_path / "empty.ndjson.gz")
+    assert dump_database(dump_path, source).invoices == 0
+    target = migrated_database_url.replace("sqlite:///", "")
+    with sqlite3.connect(target) as connection:
+        connection.execute("INSERT INTO invoices(user_id) VALUES(1)")
+    schema = _schema(target)
+
+    with pytest.raises(ValueError, match="without invoices"):
+        restore_dump(dump_path, target)
+    with gzip.open(tmp_path / "other.gz", "wt") as other:
+        other.write('{"hello": 1}\n')
+    with pytest.raises(ValueError, match="not an invoice dump"):
+        restore_dump(str(tmp_path / "other.gz"), target)
+
+    assert _schema(target) == schema
+
+
+@pytest.mark.storage_db
+@pytest.mark.asyncio
+async def test_dump_and_restore_commands(
+    async_storage_with_migrations: AsyncInvoiceStorage,
+    tmp_path: Path,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    storage = async_storage_with_migrations
+    await storage.save_invoices([_invoice(n) for n in range(3)], user_id=1)
+    dump_path = str(tmp_path / "cli.ndjson.gz")
+    target = _empty_database(tmp_path / "cli.sqlite")
+
+    assert (
+        await asyncio.to_thread(cli.main, ["--db", storage._database_path, "dump", dump_path]) == 0
+    )
+    assert "dump written" in capsys.readouterr().out
+    exit_code = await asyncio.to_thread(cli.main, ["--db", target, "restore-dump", dump_path])
+
+    assert exit_code == 0
+    assert "3 invoices, 6 items" in capsys.readouterr().out
+    assert _snapshot(target) == _snapshot(storage._database_path)
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import sqlite3
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from alembic import command
+
+from backend import cli
+from backend.domain.invoices import Invoice, InvoiceComment, InvoiceHeader, InvoiceItem
+from backend.storage import db as storage_db
+from backend.storage.archive import archive_invoices
+from backend.storage.db_async import AsyncInvoiceStorage
+from backend.storage.retention import prune_invoices
+
+
+def _invoice(number: str, day: date = date(2025, 3, 1)) -> Invoice:
+    return Invoice(
+        header=InvoiceHeader(
+            supplier_name="Acme",
+            invoice_number=number,
+            invoice_date=day,
+            total_amount=Decimal("12.50"),
+        ),
+        items=[InvoiceItem(description="Line", quantity=Decimal("1"), line_total=Decimal("12.50"))],
+        comments=[InvoiceComment(message="checked")],
+    )
+
+
+@pytest.mark.storage_db
+@pytest.mark.asyncio
+async def test_writes_are_logged_in_commit_order(
+    async_storage_with_migrations: AsyncInvoiceStorage,
+) -> None:
+    storage = async_storage_with_migrations
+    invoice_id = await storage.save_invoice(_invoice("C-1"), user_id=7)
+    with sqlite3.connect(storage._database_path) as connection:
+        connection.execute("UPDATE invoices SET supplier='Acme Ltd' WHERE id=?", (invoice_id,))
+        connection.execute("DELETE FROM comments WHERE invoice_id=?", (invoice_id,))
+
+    changes = await storage.fetch_changes()
+
+    assert [(c.seq, c.table, c.op) for c in changes] == [
+        (1, "invoices", "insert"),
+        (2, "invoice_items", "insert"),
+        (3, "comments", "insert"),
+        (4, "invoices", "update"),
+        (5, "comments", "delete"),
+    ]
+    assert {c.invoice_id for c in changes} == {invoice_id}
+    inserted = changes[0].data
+    assert inserted is not None
+    assert (inserted["user_id"], inserted["supplier"], inserted["total_minor"]) == (7, "Acme", 1250)
+    assert "raw_text" not in inserted
+    assert changes[1].data is not None and changes[1].data["name"] == "Line"
+    assert changes[3].data is not None and changes[3].data["supplier"] == "Acme Ltd"
+    assert changes[4].data is None and changes[4].changed_at
+
+    assert [c.seq for c in await storage.fetch_changes(after_seq=3, limit=1)] == [4]
+    streamed = [c.seq async for c in storage.iter_changes(after_seq=1, batch_size=2)]
+    assert streamed == [2, 3, 4, 5]
+
+
+@pytest.mark.storage_db
+@pytest.mark.asyncio
+async def test_purged_sequence_numbers_are_not_reused(
+    async_storage_with_migrations: AsyncInvoiceStorage,
+) -> None:
+    storage = async_storage_with_migrations
+    await storage.save_invoice(_invoice("P-1"), user_id=1)
+
+    assert await storage.purge_changes(3) == 3
+    assert await storage.fetch_changes() == []
+
+    await storage.save_invoice(_invoice("P-2"), user_id=1)
+    assert [c.seq for c in await storage.fetch_changes()] == [4, 5, 6]
+
+
+@pytest.mark.storage_db
+@pytest.mark.asyncio
+async def test_archived_invoices_are_not_reported_as_deleted(
+    async_storage_with_migrations: AsyncInvoiceStorage, tmp_path
+) -> None:
+    storage = async_storage_with_migrations
+    old_id = await storage.save_invoice(_invoice("A-1", day=date(2020, 5, 1)), user_id=1)
+    pruned_id = await storage.save_invoice(_invoice("A-2", day=date(2019, 5, 1)), user_id=1)
+    await prune_invoices(date(2020, 1, 1), database_path=storage._database_path)
+    seen = (await storage.fetch_changes())[-1].seq
+
+    await archive_invoices(
+        date(2021, 1, 1), str(tmp_path / "archive"), database_path=storage._database_path
+    )
+
+    removals = [c for c in await storage.fetch_changes(limit=100) if c.data is None]
+    assert {(c.invoice_id, c.op) for c in removals if c.seq <= seen} == {(pruned_id, "delete")}
+    assert {(c.invoice_id, c.op) for c in removals if c.seq > seen} == {(old_id, "archive")}
+
+
+@pytest.mark.storage_db
+@pytest.mark.asyncio
+async def test_changes_commands(
+    async_storage_with_migrations: AsyncInvoiceStorage, capsys: pytest.CaptureFixture[str]
+) -> None:
+    storage = async_storage_with_migrations
+    await storage.save_invoice(_invoice("K-1"), user_id=1)
+    args = ["--db", storage._database_path]
+
+    exit_code = await asyncio.to_thread(cli.main, [*args, "changes", "--after", "1"])
+
+    assert exit_code == 0
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [(line["seq"], line["table"]) for line in lines] == [
+        (2, "invoice_items"),
+        (3, "comments"),
+    ]
+
+    exit_code = await asyncio.to_thread(cli.main, [*args, "purge-changes", "--through", "2"])
+    assert exit_code == 0
+    assert "purged: 2" in capsys.readouterr().out
+
+
+def test_migration_creates_and_drops_the_change_log(tmp_path) -> None:
+    db_file = str(tmp_path / "changes.sqlite")
+    config = storage_db._get_alembic_config()
+    config.set_main_option("sqlalchemy.url", f"sqlite:///{db_file}")
+    command.upgrade(config, "0012_invoice_changes")
+
+    command.downgrade(config, "0010_invoice_raw")
+
+    with sqlite3.connect(db_file) as connection:
+        leftovers = connection.execute(
+            "SELECT name FROM sqlite_master WHERE name LIKE '%changes%'"
+        ).fetchall()
+        connection.execute("INSERT INTO invoices(user_id) VALUES(1)")
+    assert leftovers == []
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import logging
+import logging.config
+import sqlite3
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from alembic import command
+
+from backend.domain.invoices import Invoice, InvoiceHeader, InvoiceItem
+from backend.storage import db as storage_db
+from backend.storage.db import SyncInvoiceStorage
+from backend.storage.db_async import AsyncInvoiceStorage
+from backend.storage.mappers import invoice_dedup_key
+
+
+def _invoice(supplier: str | None, number: str | None, total: str = "100.00") -> Invoice:
+    return Invoice(
+        header=InvoiceHeader(
+            supplier_name=supplier,
+            invoice_number=number,
+            invoice_date=date(2025, 3, 1),
+            total_amount=Decimal(total),
+        ),
+        items=[InvoiceItem(description="Item", line_total=Decimal(total))],
+    )
+
+
+def _count(db_path: str, table: str) -> int:
+    with sqlite3.connect(db_path) as connection:
+        row = connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()
+    return int(row[0])
+
+
+def test_dedup_key_normalizes_supplier_and_number() -> None:
+    key = invoice_dedup_key(1, "ООО «Ромашка»", "INV-001", "2025-03-01", 10000)
+    assert key == invoice_dedup_key(1, "  ооо ромашка ", "inv 001", "2025-03-01", 10000)
+    assert key != invoice_dedup_key(2, "ООО «Ромашка»", "INV-001", "2025-03-01", 10000)
+    assert key != invoice_dedup_key(1, "ООО «Ромашка»", "INV-001", "2025-03-01", 10001)
+    assert invoice_dedup_key(1, "Acme", None, "2025-03-01", 1) is None
+    assert invoice_dedup_key(1, "Acme", " - ", "2025-03-01", 1) is None
+
+
+@pytest.mark.storage_db
+@pytest.mark.asyncio
+async def test_saving_a_duplicate_returns_the_stored_id(
+    async_storage_with_migrations: AsyncInvoiceStorage, caplog: pytest.LogCaptureFixture
+) -> None:
+    storage = async_storage_with_migrations
+    first = await storage.save_invoice(_invoice("Acme Ltd.", "A-1"), user_id=1)
+
+    with caplog.at_level(logging.WARNING, logger="storage.invoices"):
+        again = await storage.save_invoice(_invoice("ACME LTD", "a 1"), user_id=1)
+
+    assert again == first
+    assert f"existing id={first}" in caplog.text
+    assert _count(storage._database_path, "invoices") == 1
+    assert _count(storage._database_path, "invoice_items") == 1
+    spend = await storage.fetch_supplier_spend(1)
+    assert [(row.invoice_count, row.item_count) for row in spend] == [(1, 1)]
+
+    other_user = await storage.save_invoice(_invoice("Acme Ltd.", "A-1"), user_id=2)
+    other_total = await storage.save_invoice(_invoice("Acme Ltd.", "A-1", "99"), user_id=1)
+    assert len({first, other_user, other_total}) == 3
+    assert await storage.store_invoice(_invoice("Acme Ltd.", "A-1"), user_id=1) == (first, False)
+    stored_id, inserted = await storage.store_invoice(_invoice("Acme Ltd.", "A-2"), user_id=1)
+    assert inserted and stored_id not in {first, other_user, other_total}
+
+
+@pytest.mark.storage_db
+@pytest.mark.asyncio
+async def test_invoices_without_number_are_not_deduplicated(
+    async_storage_with_migrations: AsyncInvoiceStorage,
+) -> None:
+    storage = async_storage_with_migrations
+    ids = await storage.save_invoices([_invoice("Acme", None), _invoice("Acme", None)], user_id=1)
+
+    assert ids[0] != ids[1]
+
+
+@pytest.mark.storage_db
+@pytest.mark.asyncio
+async def test_duplicates_within_one_batch_are_saved_once(
+    async_storage_with_migrations: AsyncInvoiceStorage,
+) -> None:
+    storage = async_storage_with_migrations
+    ids = await storage.save_invoices([_invoice("Acme", "7"), _invoice("Acme", "7")], user_id=1)
+
+    assert ids[0] == ids[1]
+    assert _count(storage._database_path, "invoices") == 1
+
+
+@pytest.mark.storage_db
+def test_sync_storage_returns_the_stored_id(migrated_database_url: str) -> None:
+    storage = SyncInvoiceStorage(migrated_database_url.replace("sqlite:///", ""))
+    try:
+        first = storage.save_invoice(_invoice("Acme", "S-1"), user_id=1)
+        assert storage.save_invoice(_invoice("acme", "s1"), user_id=1) == first
+        assert storage.store_invoice(_invoice("acme", "s1"), user_id=1) == (first, False)
+        assert _count(storage.database_path, "invoices") == 1
+        assert storage.store_invoice(_invoice("acme", "s2"), user_id=1)[1] is True
+    finally:
+        storage.close()
+
+
+@pytest.mark.storage_db
+def test_legacy_dict_save_shares_the_dedup_key(initialized_db_path: str) -> None:
+    parsed = {
+        "supplier": "Acme",
+        "doc_number": "L-1",
+        "date": "01.03.2025",
+        "total_sum": 100.0,
+        "items": [{"name": "Bolt", "qty": 1, "price": 100, "total": 100}],
+    }
+    first = storage_db.save_invoice(1, parsed, "a.pdf")
+
+    assert storage_db.save_invoice(1, parsed, "b.pdf") == first
+    assert storage_db.save_invoice_domain(_invoice("ACME", "l 1"), user_id=1) == first
+    assert _count(initialized_db_path, "invoices") == 1
+    assert _count(initialized_db_path, "invoice_items") == 1
+
+
+def test_migration_backfills_keys_and_reports_duplicates(
+    tmp_path, monkeypatch, caplog: pytest.LogCaptureFixture
+) -> None:
+    # alembic.ini would replace the root handlers that caplog relies on.
+    monkeypatch.setattr(logging.config, "fileConfig", lambda *args, **kwargs: None)
+    db_file = str(tmp_path / "dedup.sqlite")
+    config = storage_db._get_alembic_config()
+    config.set_main_option("sqlalchemy.url", f"sqlite:///{db_file}")
+    command.upgrade(config, "0008_integer_money_columns")
+    with sqlite3.connect(db_file) as connection:
+        connection.executemany(
+            "INSERT INTO invoices(id, user_id, supplier, doc_number, date_iso, total_minor) "
+            "VALUES(?, 1, ?, ?, '2025-01-02', 500)",
+            [(1, "Acme", "N-1"), (2, "acme", "n1"), (3, "Acme", "N-2"), (4, "Acme", None)],
+        )
+
+    with caplog.at_level(logging.WARNING):
+        command.upgrade(config, "0009_invoice_dedup_key")
+
+    assert "invoice 2 duplicates invoice 1" in caplog.text
+    with sqlite3.connect(db_file) as connection:
+        keys = dict(connection.execute("SELECT id, dedup_key FROM invoices"))
+        indexes = {row[1] for row in connection.execute("PRAGMA index_list(invoices)")}
+    assert keys[1] == invoice_dedup_key(1, "Acme", "N-1", "2025-01-02", 500)
+    assert keys[2] is None and keys[4] is None
+    assert keys[3] is not None
+    assert "idx_invoices_dedup_key" in indexes
+
+    command.downgrade(config, "0008_integer_money_columns")
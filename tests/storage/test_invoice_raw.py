@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import zlib
+from datetime import date
+
+import pytest
+from alembic import command
+
+from backend import cli
+from backend.domain.invoices import Invoice, InvoiceHeader
+from backend.storage import db as storage_db
+from backend.storage.archive import archive_invoices
+from backend.storage.db import SyncInvoiceStorage
+from backend.storage.db_async import AsyncInvoiceStorage
+
+RAW_TEXT = "<<MINDEE_STRUCT>>\n" + '{"line_items": [{"description": "Товар"}]}' * 200
+
+
+def _invoice(number: str, raw_text: str | None = RAW_TEXT, year: int = 2025) -> Invoice:
+    return Invoice(
+        header=InvoiceHeader(
+            supplier_name="Acme", invoice_number=number, invoice_date=date(year, 3, 1)
+        ),
+        raw_text=raw_text,
+    )
+
+
+def _raw_rows(db_path: str) -> list[tuple[int, bytes, int]]:
+    with sqlite3.connect(db_path) as connection:
+        return connection.execute(
+            "SELECT invoice_id, payload, raw_size FROM invoice_raw ORDER BY invoice_id"
+        ).fetchall()
+
+
+@pytest.mark.storage_db
+@pytest.mark.asyncio
+async def test_raw_text_is_stored_compressed_outside_invoices(
+    async_storage_with_migrations: AsyncInvoiceStorage,
+) -> None:
+    storage = async_storage_with_migrations
+    invoice_id = await storage.save_invoice(_invoice("R-1"), user_id=1)
+    await storage.save_invoice(_invoice("R-2", raw_text=None), user_id=1)
+
+    [(stored_id, payload, raw_size)] = _raw_rows(storage._database_path)
+    assert stored_id == invoice_id
+    assert raw_size == len(RAW_TEXT.encode("utf-8"))
+    assert len(payload) < raw_size
+    assert zlib.decompress(payload).decode("utf-8") == RAW_TEXT
+    with sqlite3.connect(storage._database_path) as connection:
+        inline = {row[0] for row in connection.execute("SELECT raw_text FROM invoices")}
+    assert inline == {""}
+
+
+@pytest.mark.storage_db
+@pytest.mark.asyncio
+async def test_raw_text_is_loaded_only_on_request(
+    async_storage_with_migrations: AsyncInvoiceStorage,
+) -> None:
+    storage = async_storage_with_migrations
+    invoice_id = await storage.save_invoice(_invoice("R-1"), user_id=1)
+
+    [listed] = await storage.fetch_invoices(None, None)
+    assert listed.raw_text is None
+    assert await storage.fetch_raw_text(invoice_id) == RAW_TEXT
+    assert await storage.fetch_raw_text(invoice_id + 1) is None
+
+
+@pytest.mark.storage_db
+@pytest.mark.asyncio
+async def test_raw_text_moves_with_archived_invoices(
+    async_storage_with_migrations: AsyncInvoiceStorage, tmp_path
+) -> None:
+    storage = async_storage_with_migrations
+    invoice_id = await storage.save_invoice(_invoice("OLD-1", year=2021), user_id=1)
+    archive_dir = str(tmp_path / "archive")
+
+    await archive_invoices(date(2022, 1, 1), archive_dir, database_path=storage._database_path)
+
+    assert _raw_rows(storage._database_path) == []
+    archived = AsyncInvoiceStorage(storage._database_path, archive_dir=archive_dir)
+    assert await archived.fetch_raw_text(invoice_id) == RAW_TEXT
+
+
+@pytest.mark.storage_db
+def test_sync_storage_writes_raw_text(migrated_database_url: str) -> None:
+    storage = SyncInvoiceStorage(migrated_database_url.replace("sqlite:///", ""))
+    try:
+        invoice_id = storage.save_invoice(_invoice("S-1"), user_id=1)
+    finally:
+        storage.close()
+
+    [(stored_id, payload, _)] = _raw_rows(storage.database_path)
+    assert stored_id == invoice_id
+    assert zlib.decompress(payload).decode("utf-8") == RAW_TEXT
+
+
+@pytest.mark.storage_db
+@pytest.mark.asyncio
+async def test_show_raw_command(
+    async_storage_with_migrations: AsyncInvoiceStorage, capsys: pytest.CaptureFixture[str]
+) -> None:
+    storage = async_storage_with_migrations
+    invoice_id = await storage.save_invoice(_invoice("C-1", raw_text="raw OCR"), user_id=1)
+
+    exit_code = await asyncio.to_thread(
+        cli.main, ["--db", storage._database_path, "show-raw", str(invoice_id)]
+    )
+    assert exit_code == 0
+    assert capsys.readouterr().out == "raw OCR\n"
+
+    exit_code = await asyncio.to_thread(
+        cli.main, ["--db", storage._database_path, "show-raw", str(invoice_id + 1)]
+    )
+    assert exit_code == 1
+
+
+def test_migration_moves_inline_raw_text(tmp_path) -> None:
+    db_file = str(tmp_path / "raw.sqlite")
+    config = storage_db._get_alembic_config()
+    config.set_main_option("sqlalchemy.url", f"sqlite:///{db_file}")
+    command.upgrade(config, "0009_invoice_dedup_key")
+    with sqlite3.connect(db_file) as connection:
+        connection.executemany(
+            "INSERT INTO invoices(id, user_id, raw_text) VALUES(?, 1, ?)",
+            [(1, "first scan"), (2, ""), (3, None)],
+        )
+
+    command.upgrade(config, "0010_invoice_raw")
+
+    with sqlite3.connect(db_file) as connection:
+        inline = dict(connection.execute("SELECT id, raw_text FROM invoices"))
+    assert inline == {1: "", 2: "", 3: None}
+    assert [(row[0], zlib.decompress(row[1])) for row in _raw_rows(db_file)] == [(1, b"first scan")]
+
+    command.downgrade(config, "0009_invoice_dedup_key")
+
+    with sqlite3.connect(db_file) as connection:
+        assert connection.execute("SELECT raw_text FROM invoices WHERE id=1").fetchone() == (
+            "first scan",
+        )
+        tables = {row[0] for row in connection.execute("SELECT name FROM sqlite_master")}
+    assert "invoice_raw" not in tables
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import sqlite3
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from alembic import command
+
+from backend.domain.invoices import Invoice, InvoiceHeader, InvoiceItem
+from backend.storage import db as storage_db
+from backend.storage.db_async import AsyncInvoiceStorage
+from backend.storage.mappers import (
+    MONEY_SCALE,
+    QUANTITY_SCALE,
+    db_row_to_invoice_item,
+    from_units,
+    to_units,
+    unit_scale,
+)
+
+
+def test_units_conversion_is_exact_and_rounds_half_up() -> None:
+    assert to_units(Decimal("10.5"), MONEY_SCALE) == 1050
+    assert to_units(Decimal("0.125"), MONEY_SCALE) == 13
+    assert to_units(Decimal("-0.125"), MONEY_SCALE) == -13
+    assert to_units(Decimal("1.0005"), QUANTITY_SCALE) == 1001
+    assert to_units(None, MONEY_SCALE) is None
+    assert to_units(Decimal("NaN"), MONEY_SCALE) is None
+    assert from_units(1050, MONEY_SCALE) == Decimal("10.50")
+    assert str(from_units(-5, MONEY_SCALE)) == "-0.05"
+    assert unit_scale(Decimal("1.2345"), MONEY_SCALE) == 4
+    assert unit_scale(Decimal("1.50"), MONEY_SCALE) == 2
+    assert unit_scale(Decimal("1E+2"), QUANTITY_SCALE) == 3
+    assert unit_scale(Decimal("0.0000000001"), QUANTITY_SCALE) == 9
+
+
+def test_item_rows_prefer_integer_columns() -> None:
+    item = db_row_to_invoice_item(
+        {"name": "A", "qty": 0.30000000000000004, "qty_milli": 300, "price": 1.1, "total": None}
+    )
+    assert item.quantity == Decimal("0.300")
+    # Rows written before the integer columns existed still read the REAL value.
+    assert item.unit_price == Decimal("1.1")
+    assert item.line_total == Decimal("0")
+
+    # Finer values carry their scale; the REAL columns are not read.
+    fine = db_row_to_invoice_item(
+        {
+            "name": "B",
+            "qty": 0.0,
+            "qty_milli": 123456,
+            "qty_scale": 4,
+            "price": 0.0,
+            "price_minor": 12345,
+            "price_scale": 4,
+        }
+    )
+    assert (fine.quantity, fine.unit_price) == (Decimal("12.3456"), Decimal("1.2345"))
+    # Rows without a scale (written before 0014) use the default one.
+    stale = db_row_to_invoice_item({"name": "C", "price": 1.2345, "price_minor": 150})
+    assert stale.unit_price == Decimal("1.50")
+
+
+@pytest.mark.asyncio
+async def test_sub_cent_values_round_trip(
+    async_storage_with_migrations: AsyncInvoiceStorage,
+) -> None:
+    storage = async_storage_with_migrations
+    item = InvoiceItem(
+        description="Bolt",
+        quantity=Decimal("12.3456"),
+        unit_price=Decimal("1.2345"),
+        line_total=Decimal("15.24"),
+    )
+    invoice = Invoice(
+        header=InvoiceHeader(supplier_name="Acme", total_amount=Decimal("15.2400")),
+        items=[item],
+    )
+    invoice_id = await storage.save_invoice(invoice, user_id=7)
+
+    [stored] = await storage.fetch_invoices(None, None)
+    [stored_item] = stored.items
+    assert (stored_item.quantity, stored_item.unit_price) == (Decimal("12.3456"), Decimal("1.2345"))
+    assert stored_item.line_total == Decimal("15.24")
+    assert (stored_item.quantity * stored_item.unit_price).quantize(Decimal("0.01")) == Decimal(
+        "15.24"
+    )
+    with sqlite3.connect(storage._database_path) as connection:
+        units = connection.execute(
+            "SELECT qty_milli, price_minor FROM invoice_items WHERE invoice_id = ?",
+            (invoice_id,),
+        ).fetchone()
+    assert units == (123456, 12345)
+
+
+def _invoice(total: str, day: int) -> Invoice:
+    return Invoice(
+        header=InvoiceHeader(
+            supplier_name="Acme",
+            invoice_date=date(2025, 1, day),
+            total_amount=Decimal(total),
+        ),
+        items=[InvoiceItem(description="x", quantity=Decimal("0.1"), line_total=Decimal(total))],
+    )
+
+
+@pytest.mark.asyncio
+async def test_sums_are_exact(async_storage_with_migrations: AsyncInvoiceStorage) -> None:
+    storage = async_storage_with_migrations
+    # 0.1 + 0.2 and ten times 0.01 are not exact in binary floating point.
+    for day, total in enumerate(["0.1", "0.2"] + ["0.01"] * 10, 1):
+        await storage.save_invoice(_invoice(total, day), user_id=7)
+
+    totals = await storage.summarize_invoices(None, None)
+    spend = await storage.fetch_supplier_spend(7)
+    page = await storage.fetch_invoice_page(None, None)
+
+    assert str(totals.total_amount) == "0.40"
+    assert [str(row.total_amount) for row in spend] == ["0.40"]
+    assert page.invoices[0].items[0].quantity == Decimal("0.1")
+    assert str(page.invoices[0].header.total_amount) == "0.10"
+
+    await storage.rebuild_supplier_spend()
+    assert [str(row.total_amount) for row in await storage.fetch_supplier_spend(7)] == ["0.40"]
+
+
+def test_migration_backfills_integer_columns(tmp_path) -> None:
+    db_file = str(tmp_path / "money.sqlite")
+    config = storage_db._get_alembic_config()
+    config.set_main_option("sqlalchemy.url", f"sqlite:///{db_file}")
+    command.upgrade(config, "0007_invoice_drafts_version")
+    with sqlite3.connect(db_file) as connection:
+        connection.execute(
+            "INSERT INTO invoices(id, user_id, supplier, date_iso, total_sum) "
+            "VALUES(1, 7, 'Acme', '2025-01-05', 0.285), (2, 7, 'Acme', '2025-01-06', NULL)"
+        )
+        connection.execute(
+            "INSERT INTO invoice_items(invoice_id, idx, qty, price, total) "
+            "VALUES(1, 1, 1.5, 0.19, 0.285)"
+        )
+
+    command.upgrade(config, "head")
+
+    with sqlite3.connect(db_file) as connection:
+        invoices = connection.execute("SELECT total_minor FROM invoices ORDER BY id").fetchall()
+        items = connection.execute(
+            "SELECT qty_milli, price_minor, total_minor FROM invoice_items"
+        ).fetchall()
+        spend = connection.execute("SELECT total_minor FROM supplier_monthly_spend").fetchall()
+    assert invoices == [(29,), (None,)]
+    assert items == [(1500, 19, 29)]
+    assert spend == [(29,)]
+
+    command.downgrade(config, "0007_invoice_drafts_version")
+    with sqlite3.connect(db_file) as connection:
+        columns = {row[1] for row in connection.execute("PRAGMA table_info(invoices)")}
+        connection.execute("INSERT INTO invoices(user_id, supplier, total_sum) VALUES(7, 'B', 1)")
+    assert "total_minor" not in columns
+
+
+def test_unit_scale_migration_keeps_finer_digits(tmp_path) -> None:
+    db_file = str(tmp_path / "scales.sqlite")
+    config = storage_db._get_alembic_config()
+    config.set_main_option("sqlalchemy.url", f"sqlite:///{db_file}")
+    command.upgrade(config, "0013_invoices_date_iso_index")
+    with sqlite3.connect(db_file) as connection:
+        connection.execute("INSERT INTO invoices(id, user_id, supplier) VALUES(1, 7, 'Acme')")
+        connection.executemany(
+            "INSERT INTO invoice_items(invoice_id, idx, qty, price, total, qty_milli, "
+            "price_minor, total_minor) VALUES(1, ?, ?, ?, 0, ?, ?, 0)",
+            [(1, 12.3456, 1.2345, 12346, 123), (2, 0.30000000000000004, 2.5, 300, 250)],
+        )
+
+    command.upgrade(config, "head")
+
+    with sqlite3.connect(db_file) as connection:
+        rows = connection.execute(
+            "SELECT qty_milli, qty_scale, price_minor, price_scale FROM invoice_items ORDER BY idx"
+        ).fetchall()
+        logged = connection.execute("SELECT COUNT(*) FROM invoice_changes").fetchone()
+    assert rows == [(123456, 4, 12345, 4), (300, None, 250, None)]
+    # Inserting the invoice and its two items; the backfill is not logged.
+    assert logged == (3,)
+    item = db_row_to_invoice_item(
+        dict(zip(("qty_milli", "qty_scale", "price_minor", "price_scale"), rows[0]))
+    )
+    assert (item.quantity, item.unit_price) == (Decimal("12.3456"), Decimal("1.2345"))
+
+    command.downgrade(config, "0013_invoices_date_iso_index")
+    with sqlite3.connect(db_file) as connection:
+        rows = connection.execute(
+            "SELECT qty_milli, price_minor FROM invoice_items ORDER BY idx"
+        ).fetchall()
+    assert rows == [(12346, 123), (300, 250)]
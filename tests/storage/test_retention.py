@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import sqlite3
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from backend.domain.invoices import (
+    Invoice,
+    InvoiceComment,
+    InvoiceHeader,
+    InvoiceItem,
+    InvoiceSourceInfo,
+)
+from backend.storage.archive import archive_invoices, list_partitions
+from backend.storage.db_async import AsyncInvoiceStorage
+from backend.storage.retention import (
+    enable_incremental_vacuum,
+    incremental_vacuum,
+    prune_invoices,
+)
+
+
+def _invoice(day: date | None, path: str = "") -> Invoice:
+    return Invoice(
+        header=InvoiceHeader(supplier_name="Acme", invoice_date=day, total_amount=Decimal("10")),
+        items=[InvoiceItem(description="Line", line_total=Decimal("10"))],
+        comments=[InvoiceComment(message="note")],
+        source=InvoiceSourceInfo(file_path=path or None),
+        raw_text="raw OCR " * 500,
+    )
+
+
+def _counts(db_path: str) -> dict[str, int]:
+    with sqlite3.connect(db_path) as connection:
+        return {
+            table: int(connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0])
+            for table in ("invoices", "invoice_items", "comments", "invoice_raw")
+        }
+
+
+@pytest.mark.storage_db
+@pytest.mark.asyncio
+async def test_prune_deletes_old_invoices_in_batches(
+    async_storage_with_migrations: AsyncInvoiceStorage,
+) -> None:
+    storage = async_storage_with_migrations
+    await storage.save_invoices(
+        [_invoice(date(2020, 1, day), path=f"/uploads/{day}.pdf") for day in range(1, 6)],
+        user_id=1,
+    )
+    await storage.save_invoice(_invoice(date(2025, 6, 1)), user_id=1)
+    undated_id = await storage.save_invoice(_invoice(None), user_id=1)
+
+    pruned = await prune_invoices(
+        date(2024, 1, 1), batch_size=2, pause_seconds=0, database_path=storage._database_path
+    )
+
+    assert (pruned.invoices, pruned.items, pruned.comments) == (5, 5, 5)
+    assert sorted(pruned.paths) == [f"/uploads/{day}.pdf" for day in range(1, 6)]
+    assert _counts(storage._database_path) == {
+        "invoices": 2,
+        "invoice_items": 2,
+        "comments": 2,
+        "invoice_raw": 2,
+    }
+    spend = await storage.fetch_supplier_spend(1)
+    assert [row.month for row in spend] == ["", "2025-06"]
+
+    # Undated invoices are pruned by the day they were saved.
+    with sqlite3.connect(storage._database_path) as connection:
+        connection.execute(
+            "UPDATE invoices SET created_at='2019-05-05 10:00:00' WHERE id=?", (undated_id,)
+        )
+    pruned = await prune_invoices(date(2024, 1, 1), database_path=storage._database_path)
+    assert pruned.invoices == 1
+
+
+@pytest.mark.storage_db
+@pytest.mark.asyncio
+async def test_prune_drops_archive_partitions_before_the_cutoff_year(
+    async_storage_with_migrations: AsyncInvoiceStorage, tmp_path
+) -> None:
+    storage = async_storage_with_migrations
+    await storage.save_invoices(
+        [
+            _invoice(date(2021, 3, 1), path="/uploads/2021.pdf"),
+            _invoice(date(2023, 3, 1), path="/uploads/2023-03.pdf"),
+            _invoice(date(2023, 9, 1), path="/uploads/2023-09.pdf"),
+        ],
+        user_id=1,
+    )
+    archive_dir = str(tmp_path / "archive")
+    await archive_invoices(date(2024, 1, 1), archive_dir, database_path=storage._database_path)
+
+    pruned = await prune_invoices(
+        date(2023, 6, 1), database_path=storage._database_path, archive_dir=archive_dir
+    )
+
+    assert [year for year, _ in list_partitions(archive_dir)] == [2023]
+    assert len(pruned.partitions) == 1 and pruned.partitions[0].endswith("invoices-2021.sqlite")
+    # Uploads of a dropped partition are reported along with the pruned rows.
+    assert sorted(pruned.paths) == ["/uploads/2021.pdf", "/uploads/2023-03.pdf"]
+    # The partition of the cutoff year loses only the invoices before the cutoff.
+    assert (pruned.invoices, pruned.archived, pruned.items, pruned.comments) == (1, 1, 1, 1)
+    assert _counts(list_partitions(archive_dir)[0][1]) == {
+        "invoices": 1,
+        "invoice_items": 1,
+        "comments": 1,
+        "invoice_raw": 1,
+    }
+    reader = AsyncInvoiceStorage(database_path=storage._database_path, archive_dir=archive_dir)
+    remaining = await reader.fetch_invoices(None, None)
+    assert [inv.header.invoice_date for inv in remaining] == [date(2023, 9, 1)]
+
+
+@pytest.mark.storage_db
+@pytest.mark.asyncio
+async def test_incremental_vacuum_releases_free_pages(
+    async_storage_with_migrations: AsyncInvoiceStorage,
+) -> None:
+    storage = async_storage_with_migrations
+    # Migrations leave auto_vacuum alone; switching it is an explicit step.
+    with sqlite3.connect(storage._database_path) as connection:
+        assert connection.execute("PRAGMA auto_vacuum").fetchone()[0] == 0
+    assert await enable_incremental_vacuum(database_path=storage._database_path) is True
+    assert await enable_incremental_vacuum(database_path=storage._database_path) is False
+    await storage.save_invoices([_invoice(date(2020, 1, 1)) for _ in range(200)], user_id=1)
+    await prune_invoices(date(2024, 1, 1), pause_seconds=0, database_path=storage._database_path)
+    with sqlite3.connect(storage._database_path) as connection:
+        assert connection.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        free_pages = connection.execute("PRAGMA freelist_count").fetchone()[0]
+        page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+    assert free_pages > 0
+
+    released = await incremental_vacuum(
+        pages_per_step=4, pause_seconds=0, database_path=storage._database_path
+    )
+
+    assert released == free_pages * page_size
+    with sqlite3.connect(storage._database_path) as connection:
+        assert connection.execute("PRAGMA freelist_count").fetchone()[0] == 0
+
+
+@pytest.mark.asyncio
+async def test_incremental_vacuum_skips_databases_without_auto_vacuum(tmp_path) -> None:
+    db_file = str(tmp_path / "plain.sqlite")
+    with sqlite3.connect(db_file) as connection:
+        connection.execute("CREATE TABLE t(x)")
+        connection.executemany("INSERT INTO t VALUES(?)", [("x" * 1000,)] * 100)
+        connection.execute("DELETE FROM t")
+
+    assert await incremental_vacuum(database_path=db_file) == 0
@@ -408,3 +408,110 @@ async def test_fetch_invoices_with_date_range(
     assert "INV-DATE-001" in invoice_numbers
     assert "INV-DATE-002" in invoice_numbers
     assert "INV-DATE-003" in invoice_numbers
+
+
+@pytest.mark.asyncio
+async def test_save_invoice_persists_all_items_and_comments(
+    async_storage_with_migrations: AsyncInvoiceStorage,
+) -> None:
+    """
+    Test that batched item and comment inserts keep every row and the item order.
+    """
+    import aiosqlite
+
+    from backend.domain.invoices import InvoiceComment
+
+    storage = async_storage_with_migrations
+
+    items: List[InvoiceItem] = [
+        InvoiceItem(
+            description=f"Line {i}",
+            sku=f"SKU-{i:03d}",
+            quantity=Decimal("1"),
+            unit_price=Decimal(f"{i}.5"),
+            line_total=Decimal(f"{i}.5"),
+        )
+        for i in range(1, 401)
+    ]
+    invoice = Invoice(
+        header=InvoiceHeader(
+            supplier_name="Bulk Supplier",
+            invoice_number="INV-BULK",
+            invoice_date=date(2025, 7, 1),
+        ),
+        items=items,
+        comments=[
+            InvoiceComment(message="plain comment"),
+            InvoiceComment(message="authored comment", author="777"),
+        ],
+    )
+
+    invoice_id = await storage.save_invoice(invoice, user_id=123)
+
+    fetched = await storage.fetch_invoices(
+        from_date=date(2025, 7, 1),
+        to_date=date(2025, 7, 1),
+        supplier="Bulk Supplier",
+    )
+    assert len(fetched) == 1
+    assert [item.description for item in fetched[0].items] == [item.description for item in items]
+
+    async with aiosqlite.connect(storage._database_path) as connection:
+        cursor = await connection.execute(
+            "SELECT user_id, text FROM comments WHERE invoice_id=? ORDER BY id",
+            (invoice_id,),
+        )
+        comment_rows = await cursor.fetchall()
+
+    assert [tuple(row) for row in comment_rows] == [
+        (123, "plain comment"),
+        (777, "authored comment"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_save_invoices_persists_batch_in_order(
+    async_storage_with_migrations: AsyncInvoiceStorage,
+) -> None:
+    """
+    Test that save_invoices stores every invoice of the batch and returns IDs in input order.
+    """
+    storage = async_storage_with_migrations
+
+    invoices: List[Invoice] = [
+        Invoice(
+            header=InvoiceHeader(
+                supplier_name="Batch Supplier",
+                invoice_number=f"INV-BATCH-{i:03d}",
+                invoice_date=date(2025, 8, 1),
+                total_amount=Decimal("10.0"),
+            ),
+            items=[InvoiceItem(description=f"Item {i}", line_total=Decimal("10.0"))],
+        )
+        for i in range(5)
+    ]
+
+    invoice_ids = await storage.save_invoices(invoices, user_id=42)
+
+    assert len(invoice_ids) == 5
+    assert invoice_ids == sorted(invoice_ids)
+    assert len(set(invoice_ids)) == 5
+
+    fetched = await storage.fetch_invoices(
+        from_date=date(2025, 8, 1),
+        to_date=date(2025, 8, 1),
+        supplier="Batch Supplier",
+    )
+    assert [inv.header.invoice_number for inv in fetched] == [
+        inv.header.invoice_number for inv in invoices
+    ]
+    assert all(len(inv.items) == 1 for inv in fetched)
+
+
+@pytest.mark.asyncio
+async def test_save_invoices_with_empty_batch_returns_no_ids(
+    async_storage_with_migrations: AsyncInvoiceStorage,
+) -> None:
+    storage = async_storage_with_migrations
+
+    assert await storage.save_invoices([], user_id=1) == []
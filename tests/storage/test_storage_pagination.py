@@ -0,0 +1,211 @@
+"""
+Integration tests for keyset-paginated and streaming invoice listings.
+"""
+
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+from typing import List
+
+import pytest
+
+from backend.domain.invoices import Invoice, InvoiceHeader, InvoiceItem
+from backend.storage.db_async import AsyncInvoiceStorage
+
+pytestmark = pytest.mark.storage_db
+
+
+def _make_invoice(number: int, invoice_date: date | None, supplier: str = "Paging") -> Invoice:
+    return Invoice(
+        header=InvoiceHeader(
+            supplier_name=supplier,
+            invoice_number=f"PG-{number:03d}",
+            invoice_date=invoice_date,
+            total_amount=Decimal("10.00"),
+        ),
+        items=[
+            InvoiceItem(description=f"Item {number}-a", line_total=Decimal("4.00")),
+            InvoiceItem(description=f"Item {number}-b", line_total=Decimal("6.00")),
+        ],
+    )
+
+
+async def _seed(storage: AsyncInvoiceStorage) -> List[str]:
+    # Several invoices share a date so that the id part of the cursor matters.
+    dates = [date(2025, 1, 1 + i // 3) for i in range(10)]
+    invoices = [_make_invoice(i, d) for i, d in enumerate(dates)]
+    await storage.save_invoices(invoices, user_id=1)
+    return [inv.header.invoice_number or "" for inv in invoices]
+
+
+@pytest.mark.asyncio
+async def test_fetch_invoice_page_walks_forward_and_backward(
+    async_storage_with_migrations: AsyncInvoiceStorage,
+) -> None:
+    storage = async_storage_with_migrations
+    expected = await _seed(storage)
+    from_date, to_date = date(2025, 1, 1), date(2025, 1, 31)
+
+    first = await storage.fetch_invoice_page(from_date, to_date, limit=4)
+    assert [inv.header.invoice_number for inv in first.invoices] == expected[:4]
+    assert first.has_prev is False
+    assert first.has_next is True
+    assert all(len(inv.items) == 2 for inv in first.invoices)
+
+    second = await storage.fetch_invoice_page(from_date, to_date, after=first.last_cursor, limit=4)
+    assert [inv.header.invoice_number for inv in second.invoices] == expected[4:8]
+    assert second.has_prev is True
+    assert second.has_next is True
+
+    third = await storage.fetch_invoice_page(from_date, to_date, after=second.last_cursor, limit=4)
+    assert [inv.header.invoice_number for inv in third.invoices] == expected[8:]
+    assert third.has_next is False
+
+    back = await storage.fetch_invoice_page(from_date, to_date, before=third.first_cursor, limit=4)
+    assert [inv.header.invoice_number for inv in back.invoices] == expected[4:8]
+    assert back.has_prev is True
+    assert back.has_next is True
+
+    back_to_start = await storage.fetch_invoice_page(
+        from_date, to_date, before=back.first_cursor, limit=4
+    )
+    assert [inv.header.invoice_number for inv in back_to_start.invoices] == expected[:4]
+    assert back_to_start.has_prev is False
+
+
+@pytest.mark.asyncio
+async def test_fetch_invoice_page_applies_filters_and_handles_empty_result(
+    async_storage_with_migrations: AsyncInvoiceStorage,
+) -> None:
+    storage = async_storage_with_migrations
+    await _seed(storage)
+    await storage.save_invoice(_make_invoice(99, date(2025, 1, 2), supplier="Other"), user_id=1)
+
+    page = await storage.fetch_invoice_page(
+        date(2025, 1, 2), date(2025, 1, 2), supplier="Other", limit=10
+    )
+    assert [inv.header.invoice_number for inv in page.invoices] == ["PG-099"]
+    assert page.has_prev is False
+    assert page.has_next is False
+
+    empty = await storage.fetch_invoice_page(date(2026, 1, 1), None, limit=10)
+    assert empty.invoices == []
+    assert empty.first_cursor is None
+    assert empty.last_cursor is None
+
+
+@pytest.mark.asyncio
+async def test_fetch_invoice_page_rejects_invalid_arguments(
+    async_storage_with_migrations: AsyncInvoiceStorage,
+) -> None:
+    storage = async_storage_with_migrations
+    await _seed(storage)
+    page = await storage.fetch_invoice_page(None, None, limit=1)
+
+    with pytest.raises(ValueError):
+        await storage.fetch_invoice_page(
+            None, None, after=page.last_cursor, before=page.first_cursor
+        )
+    with pytest.raises(ValueError):
+        await storage.fetch_invoice_page(None, None, limit=0)
+
+
+@pytest.mark.asyncio
+async def test_fetch_invoice_page_crosses_from_undated_to_dated_invoices(
+    async_storage_with_migrations: AsyncInvoiceStorage,
+) -> None:
+    storage = async_storage_with_migrations
+    dated = await _seed(storage)
+    await storage.save_invoices([_make_invoice(n, None) for n in (50, 51, 52)], user_id=1)
+    expected = ["PG-050", "PG-051", "PG-052", *dated]
+
+    pages = [await storage.fetch_invoice_page(None, None, limit=2)]
+    while pages[-1].has_next:
+        pages.append(
+            await storage.fetch_invoice_page(None, None, after=pages[-1].last_cursor, limit=2)
+        )
+    walked = [inv.header.invoice_number for page in pages for inv in page.invoices]
+    assert walked == expected
+    assert pages[1].first_cursor is not None and pages[1].first_cursor.date_iso == ""
+
+    backward = [pages[-1]]
+    while backward[-1].has_prev:
+        backward.append(
+            await storage.fetch_invoice_page(None, None, before=backward[-1].first_cursor, limit=3)
+        )
+    numbers = [inv.header.invoice_number for page in reversed(backward) for inv in page.invoices]
+    assert numbers == expected
+    assert [len(page.invoices) for page in backward] == [1, 3, 3, 3, 3]
+
+
+@pytest.mark.asyncio
+async def test_iter_invoices_streams_every_invoice_in_order(
+    async_storage_with_migrations: AsyncInvoiceStorage,
+) -> None:
+    storage = async_storage_with_migrations
+    expected = await _seed(storage)
+    await storage.save_invoice(_make_invoice(50, None), user_id=1)
+
+    streamed = [
+        invoice.header.invoice_number
+        async for invoice in storage.iter_invoices(None, None, batch_size=3)
+    ]
+
+    # The undated invoice sorts before every dated one.
+    assert streamed == ["PG-050"] + expected
+
+    in_range = [
+        invoice.header.invoice_number
+        async for invoice in storage.iter_invoices(date(2025, 1, 2), date(2025, 1, 3))
+    ]
+    assert in_range == expected[3:9]
+
+
+@pytest.mark.asyncio
+async def test_fetch_invoice_summary_page_counts_items_without_loading_them(
+    async_storage_with_migrations: AsyncInvoiceStorage,
+) -> None:
+    storage = async_storage_with_migrations
+    expected = await _seed(storage)
+    empty = _make_invoice(77, date(2025, 1, 4))
+    empty.items = []
+    await storage.save_invoice(empty, user_id=1)
+
+    first = await storage.fetch_invoice_summary_page(date(2025, 1, 1), date(2025, 1, 31), limit=6)
+    assert [s.invoice_number for s in first.summaries] == expected[:6]
+    assert all(s.item_count == 2 for s in first.summaries)
+    assert first.summaries[0].total_amount == Decimal("10.0")
+    assert first.summaries[0].invoice_date == date(2025, 1, 1)
+    assert first.has_next is True
+
+    rest = await storage.fetch_invoice_summary_page(
+        date(2025, 1, 1), date(2025, 1, 31), after=first.last_cursor, limit=6
+    )
+    assert [s.invoice_number for s in rest.summaries] == expected[6:] + ["PG-077"]
+    assert rest.summaries[-1].item_count == 0
+    assert rest.has_prev is True
+    assert rest.has_next is False
+
+
+@pytest.mark.asyncio
+async def test_summarize_invoices_aggregates_in_sql(
+    async_storage_with_migrations: AsyncInvoiceStorage,
+) -> None:
+    storage = async_storage_with_migrations
+    await _seed(storage)
+    await storage.save_invoice(_make_invoice(88, date(2025, 1, 2), supplier="Other"), user_id=1)
+
+    totals = await storage.summarize_invoices(date(2025, 1, 1), date(2025, 1, 31))
+    assert totals.invoice_count == 11
+    assert totals.item_count == 22
+    assert totals.total_amount == Decimal("110.0")
+
+    other = await storage.summarize_invoices(None, None, supplier="Other")
+    assert other.invoice_count == 1
+    assert other.item_count == 2
+
+    none = await storage.summarize_invoices(date(2030, 1, 1), date(2030, 12, 31))
+    assert none.invoice_count == 0
+    assert none.item_count == 0
+    assert none.total_amount == Decimal("0")
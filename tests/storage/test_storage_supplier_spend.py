@@ -0,0 +1,134 @@
+"""
+Integration tests for the trigger-maintained supplier monthly spend rollup.
+"""
+
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+from typing import List
+
+import aiosqlite
+import pytest
+
+from backend.domain.invoices import Invoice, InvoiceHeader, InvoiceItem, SupplierMonthlySpend
+from backend.storage.db_async import AsyncInvoiceStorage
+
+pytestmark = pytest.mark.storage_db
+
+
+def _make_invoice(
+    supplier: str | None, invoice_date: date | None, total: str, items: int
+) -> Invoice:
+    return Invoice(
+        header=InvoiceHeader(
+            supplier_name=supplier,
+            invoice_date=invoice_date,
+            total_amount=Decimal(total),
+        ),
+        items=[InvoiceItem(description=f"Item {i}", line_total=Decimal("1")) for i in range(items)],
+    )
+
+
+async def _seed(storage: AsyncInvoiceStorage) -> List[int]:
+    return await storage.save_invoices(
+        [
+            _make_invoice("Acme", date(2025, 1, 5), "100.50", 2),
+            _make_invoice("Acme", date(2025, 1, 20), "49.50", 1),
+            _make_invoice("Beta", date(2025, 1, 7), "10", 3),
+            _make_invoice("Acme", date(2025, 2, 1), "5", 0),
+            _make_invoice(None, None, "1", 1),
+        ],
+        user_id=7,
+    )
+
+
+async def _execute(storage: AsyncInvoiceStorage, sql: str, *params: object) -> None:
+    async with aiosqlite.connect(storage._database_path) as connection:
+        await connection.execute(sql, params)
+        await connection.commit()
+
+
+@pytest.mark.asyncio
+async def test_rollup_is_maintained_on_save(
+    async_storage_with_migrations: AsyncInvoiceStorage,
+) -> None:
+    storage = async_storage_with_migrations
+    await _seed(storage)
+    await storage.save_invoice(_make_invoice("Acme", date(2025, 1, 9), "1", 1), user_id=8)
+
+    rows = await storage.fetch_supplier_spend(user_id=7)
+
+    assert rows == [
+        SupplierMonthlySpend("", "", 1, 1, Decimal("1.0")),
+        SupplierMonthlySpend("Acme", "2025-01", 2, 3, Decimal("150.0")),
+        SupplierMonthlySpend("Beta", "2025-01", 1, 3, Decimal("10.0")),
+        SupplierMonthlySpend("Acme", "2025-02", 1, 0, Decimal("5.0")),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_fetch_supplier_spend_filters(
+    async_storage_with_migrations: AsyncInvoiceStorage,
+) -> None:
+    storage = async_storage_with_migrations
+    await _seed(storage)
+
+    january = await storage.fetch_supplier_spend(7, from_month="2025-01", to_month="2025-01")
+    assert [(row.supplier, row.month) for row in january] == [
+        ("Acme", "2025-01"),
+        ("Beta", "2025-01"),
+    ]
+
+    acme = await storage.fetch_supplier_spend(7, from_month="2025-01", supplier="cm")
+    assert [(row.supplier, row.month) for row in acme] == [
+        ("Acme", "2025-01"),
+        ("Acme", "2025-02"),
+    ]
+
+    assert await storage.fetch_supplier_spend(999) == []
+
+
+@pytest.mark.asyncio
+async def test_rollup_follows_updates_and_deletes(
+    async_storage_with_migrations: AsyncInvoiceStorage,
+) -> None:
+    storage = async_storage_with_migrations
+    invoice_ids = await _seed(storage)
+    beta_id = invoice_ids[2]
+
+    await _execute(storage, "DELETE FROM invoice_items WHERE invoice_id = ? AND idx = 1", beta_id)
+    await _execute(
+        storage,
+        "UPDATE invoices SET supplier = 'Gamma', total_sum = 12, total_minor = 1200 WHERE id = ?",
+        beta_id,
+    )
+    await _execute(storage, "DELETE FROM invoices WHERE id = ?", invoice_ids[3])
+
+    rows = await storage.fetch_supplier_spend(7, from_month="2025-01")
+
+    assert rows == [
+        SupplierMonthlySpend("Acme", "2025-01", 2, 3, Decimal("150.0")),
+        SupplierMonthlySpend("Gamma", "2025-01", 1, 2, Decimal("12.0")),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_rebuild_supplier_spend_recovers_from_drift(
+    async_storage_with_migrations: AsyncInvoiceStorage,
+) -> None:
+    storage = async_storage_with_migrations
+    await _seed(storage)
+    expected = await storage.fetch_supplier_spend(7)
+
+    await _execute(storage, "UPDATE supplier_monthly_spend SET invoice_count = 42")
+    await _execute(
+        storage,
+        "INSERT INTO supplier_monthly_spend(user_id, supplier, month, invoice_count, "
+        "total_sum, item_count) VALUES(7, 'Ghost', '2024-12', 1, 1, 1)",
+    )
+
+    rebuilt = await storage.rebuild_supplier_spend()
+
+    assert rebuilt == len(expected)
+    assert await storage.fetch_supplier_spend(7) == expected
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import sqlite3
+from decimal import Decimal
+
+import aiosqlite
+import pytest
+
+from backend.domain.drafts import InvoiceDraft
+from backend.domain.invoices import Invoice, InvoiceHeader, InvoiceItem
+from backend.storage.drafts_async import load_draft_invoice, save_draft_invoice
+from backend.storage.write_queue import GroupCommitQueue
+
+
+def _queue(**kwargs) -> GroupCommitQueue:
+    return GroupCommitQueue(logger=logging.getLogger("test.write_queue"), **kwargs)
+
+
+def _invoice(number: str) -> Invoice:
+    return Invoice(
+        header=InvoiceHeader(
+            supplier_name="Supplier", invoice_number=number, total_amount=Decimal("10.50")
+        ),
+        items=[InvoiceItem(description="Item", quantity=Decimal("1"), line_total=Decimal("10.50"))],
+    )
+
+
+def _invoice_numbers(db_path: str) -> list[str]:
+    with sqlite3.connect(db_path) as connection:
+        rows = connection.execute("SELECT doc_number FROM invoices ORDER BY id").fetchall()
+    return [row[0] for row in rows]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_saves_share_one_commit(initialized_db_path: str) -> None:
+    queue = _queue(window_seconds=0.01)
+
+    ids = await asyncio.gather(*(queue.save_invoice(_invoice(f"N{i}"), 7) for i in range(10)))
+
+    assert len(set(ids)) == 10
+    assert _invoice_numbers(initialized_db_path) == [f"N{i}" for i in range(10)]
+    stats = queue.stats()
+    assert stats.batches == 1
+    assert stats.writes == 10
+    assert stats.largest_batch == 10
+    assert stats.avg_batch_size == 10
+    assert stats.avg_commit_ms > 0
+
+
+@pytest.mark.asyncio
+async def test_store_invoice_reports_duplicates(initialized_db_path: str) -> None:
+    queue = _queue(window_seconds=0.01)
+
+    first, again = await asyncio.gather(
+        queue.store_invoice(_invoice("N1"), 7), queue.store_invoice(_invoice("N1"), 7)
+    )
+
+    assert first[1] is True
+    assert again == (first[0], False)
+    assert _invoice_numbers(initialized_db_path) == ["N1"]
+
+
+@pytest.mark.asyncio
+async def test_batches_are_capped_at_max_batch(initialized_db_path: str) -> None:
+    queue = _queue(window_seconds=0.01, max_batch=4)
+
+    ids = await asyncio.gather(*(queue.save_invoice(_invoice(f"N{i}"), 1) for i in range(10)))
+
+    assert len(set(ids)) == 10
+    stats = queue.stats()
+    assert stats.batches == 3
+    assert stats.largest_batch == 4
+
+
+@pytest.mark.asyncio
+async def test_failed_write_is_rolled_back_alone(initialized_db_path: str) -> None:
+    queue = _queue(window_seconds=0.01)
+
+    async def broken(connection: aiosqlite.Connection) -> None:
+        await connection.execute("INSERT INTO invoices (user_id, doc_number) VALUES (1, 'X')")
+        await connection.execute("INSERT INTO no_such_table VALUES (1)")
+
+    results = await asyncio.gather(
+        queue.save_invoice(_invoice("A"), 1),
+        queue.submit(broken),
+        queue.save_invoice(_invoice("B"), 1),
+        return_exceptions=True,
+    )
+
+    assert isinstance(results[0], int) and isinstance(results[2], int)
+    assert isinstance(results[1], sqlite3.OperationalError)
+    assert _invoice_numbers(initialized_db_path) == ["A", "B"]
+    stats = queue.stats()
+    assert stats.batches == 1
+    assert stats.failed_writes == 1
+
+
+@pytest.mark.asyncio
+async def test_writer_restarts_after_idle(initialized_db_path: str) -> None:
+    queue = _queue(window_seconds=0)
+
+    first = await queue.save_invoice(_invoice("A"), 1)
+    await queue.drain()
+    second = await queue.save_invoice(_invoice("B"), 1)
+
+    assert second > first
+    assert queue.stats().batches == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_writer_fails_pending_writes(initialized_db_path: str) -> None:
+    queue = _queue(window_seconds=0, max_batch=1)
+    started = asyncio.Event()
+
+    async def blocked(connection: aiosqlite.Connection) -> int:
+        await connection.execute("INSERT INTO invoices(user_id, supplier) VALUES(1, 'blocked')")
+        started.set()
+        await asyncio.Event().wait()
+        return 0
+
+    in_flight = asyncio.ensure_future(queue.submit(blocked))
+    queued = asyncio.ensure_future(queue.save_invoice(_invoice("A"), 1))
+    await started.wait()
+    writer = queue._writer
+    assert writer is not None
+    writer.cancel()
+
+    results = await asyncio.wait_for(
+        asyncio.gather(in_flight, queued, return_exceptions=True), timeout=5
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert queue._writer is None
+    with sqlite3.connect(initialized_db_path) as connection:
+        assert connection.execute("SELECT COUNT(*) FROM invoices").fetchone()[0] == 0
+    assert await queue.save_invoice(_invoice("B"), 1) > 0
+
+
+@pytest.mark.asyncio
+async def test_draft_clears_go_through_the_queue(initialized_db_path: str) -> None:
+    queue = _queue(window_seconds=0.01)
+    stale = InvoiceDraft(invoice=Invoice(header=InvoiceHeader(supplier_name="A")), path="a.pdf")
+    await save_draft_invoice(1, stale)
+    await save_draft_invoice(2, InvoiceDraft(invoice=Invoice(header=InvoiceHeader()), path="b.pdf"))
+
+    current = await load_draft_invoice(1)
+    assert current is not None
+    await save_draft_invoice(1, current)
+
+    discarded, _ = await asyncio.gather(queue.discard_draft(1, stale), queue.delete_draft(2))
+
+    assert discarded is False
+    assert await load_draft_invoice(1) is not None
+    assert await load_draft_invoice(2) is None
+
+    current = await load_draft_invoice(1)
+    assert current is not None
+    assert await queue.discard_draft(1, current) is True
+    assert await load_draft_invoice(1) is None
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+
+import pytest
+
+from backend.services.backup_scheduler import BackupScheduler
+from backend.storage.backup import BackupReport
+
+
+def _make_scheduler(interval: float, fail: bool = False) -> tuple[BackupScheduler, list[int]]:
+    runs: list[int] = []
+
+    async def create_backup() -> BackupReport:
+        runs.append(len(runs))
+        if fail:
+            raise OSError("disk full")
+        return BackupReport(
+            path="data-1.sqlite.gz", pages=4, database_bytes=4096, snapshot_bytes=512, seconds=0.1
+        )
+
+    return BackupScheduler(create_backup, logging.getLogger("test"), interval), runs
+
+
+@pytest.mark.asyncio
+async def test_scheduler_backs_up_every_interval_until_stopped() -> None:
+    scheduler, runs = _make_scheduler(0.01)
+
+    scheduler.start()
+    await asyncio.sleep(0.05)
+    await scheduler.stop()
+
+    assert len(runs) >= 2
+    stopped_at = len(runs)
+    await asyncio.sleep(0.03)
+    assert len(runs) == stopped_at
+
+
+@pytest.mark.asyncio
+async def test_scheduler_keeps_running_after_a_failed_backup(
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    scheduler, runs = _make_scheduler(0.01, fail=True)
+
+    with caplog.at_level(logging.ERROR, logger="test"):
+        scheduler.start()
+        await asyncio.sleep(0.05)
+        await scheduler.stop()
+
+    assert len(runs) >= 2
+    assert "backup failed" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_scheduler_disabled_with_zero_interval() -> None:
+    scheduler, runs = _make_scheduler(0)
+
+    scheduler.start()
+
+    assert not scheduler.enabled
+    await scheduler.stop()
+    assert runs == []
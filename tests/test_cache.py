@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import pytest
+
+from backend.services.cache import LRUCache
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_lru_cache_evicts_least_recently_used() -> None:
+    cache: LRUCache[str, int] = LRUCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert cache.lookup("b") == (False, None)
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    stats = cache.stats()
+    assert stats.evictions == 1
+    assert stats.size == 2
+    assert stats.hit_rate == pytest.approx(3 / 4)
+
+
+def test_lru_cache_expires_entries() -> None:
+    clock = _Clock()
+    cache: LRUCache[str, int | None] = LRUCache(max_size=4, ttl_seconds=10, clock=clock)
+    cache.put("a", None)
+
+    clock.now = 9.9
+    assert cache.lookup("a") == (True, None)
+    clock.now = 10.0
+    assert cache.lookup("a") == (False, None)
+    assert cache.stats().expirations == 1
+    assert len(cache) == 0
+
+
+def test_lru_cache_disabled_and_invalid_size() -> None:
+    cache: LRUCache[str, int] = LRUCache(max_size=0)
+    cache.put("a", 1)
+    assert not cache.enabled
+    assert cache.get("a") is None
+
+    with pytest.raises(ValueError):
+        LRUCache(max_size=-1)
+
+    cache = LRUCache(max_size=2)
+    cache.put("a", 1)
+    cache.invalidate("a")
+    cache.invalidate("missing")
+    cache.put("b", 2)
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_lru_cache_invalidate_where() -> None:
+    cache: LRUCache[tuple[str, int], int] = LRUCache(max_size=8)
+    for month in (1, 2, 3):
+        cache.put(("invoices", month), month)
+    cache.put(("totals", 2), 20)
+
+    assert cache.invalidate_where(lambda key: key[1] == 2) == 2
+    assert cache.get(("invoices", 2)) is None
+    assert cache.get(("invoices", 3)) == 3
+    cache.invalidate(("invoices", 1))
+    assert cache.stats().invalidations == 3
+    assert len(cache) == 1
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+from datetime import date
+from decimal import Decimal
+
+import aiosqlite
+import pytest
+
+from backend import cli
+from backend.domain.invoices import Invoice, InvoiceHeader
+from backend.storage.db_async import AsyncInvoiceStorage
+
+
+@pytest.mark.storage_db
+@pytest.mark.asyncio
+async def test_rebuild_rollup_command(
+    async_storage_with_migrations: AsyncInvoiceStorage,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    storage = async_storage_with_migrations
+    await storage.save_invoice(
+        Invoice(
+            header=InvoiceHeader(
+                supplier_name="Acme", invoice_date=date(2025, 1, 2), total_amount=Decimal("3")
+            )
+        ),
+        user_id=1,
+    )
+    async with aiosqlite.connect(storage._database_path) as connection:
+        await connection.execute("DELETE FROM supplier_monthly_spend")
+        await connection.commit()
+
+    # The command drives its own event loop, so run it outside the test loop.
+    exit_code = await asyncio.to_thread(
+        cli.main, ["--db", storage._database_path, "rebuild-rollup"]
+    )
+
+    assert exit_code == 0
+    assert "1 rows" in capsys.readouterr().out
+    rows = await storage.fetch_supplier_spend(1)
+    assert [(row.supplier, row.month, row.invoice_count) for row in rows] == [
+        ("Acme", "2025-01", 1)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_compact_drafts_command(
+    tmp_path, monkeypatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    from backend.domain.drafts import DraftPatch, InvoiceDraft
+    from backend.storage import db as storage_db
+    from backend.storage import drafts_async
+
+    db_file = str(tmp_path / "drafts.sqlite")
+    monkeypatch.setattr(storage_db, "DB_PATH", db_file, raising=True)
+    monkeypatch.setattr(drafts_async, "DB_PATH", db_file, raising=True)
+    storage_db.init_db()
+    await drafts_async.save_draft_invoice(
+        1, InvoiceDraft(invoice=Invoice(header=InvoiceHeader()), path="a.pdf")
+    )
+    await drafts_async.append_draft_patches(1, [DraftPatch.add_comment("note")])
+
+    exit_code = await asyncio.to_thread(cli.main, ["--db", db_file, "compact-drafts"])
+
+    assert exit_code == 0
+    assert "drafts compacted: 1" in capsys.readouterr().out
+    async with aiosqlite.connect(db_file) as connection:
+        cursor = await connection.execute("SELECT delta_seq FROM invoice_drafts")
+        row = await cursor.fetchone()
+    assert row is not None and row[0] > 0
+
+
+@pytest.mark.asyncio
+async def test_sweep_drafts_command(
+    tmp_path, monkeypatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    from backend.domain.drafts import InvoiceDraft
+    from backend.storage import db as storage_db
+    from backend.storage import drafts_async
+
+    db_file = str(tmp_path / "drafts.sqlite")
+    monkeypatch.setattr(storage_db, "DB_PATH", db_file, raising=True)
+    monkeypatch.setattr(drafts_async, "DB_PATH", db_file, raising=True)
+    monkeypatch.setattr(cli, "UPLOAD_FOLDER", str(tmp_path / "uploads"), raising=True)
+    monkeypatch.setattr(cli, "DOWNLOAD_DIR", str(tmp_path / "temp"), raising=True)
+    storage_db.init_db()
+    await drafts_async.save_draft_invoice(
+        1, InvoiceDraft(invoice=Invoice(header=InvoiceHeader()), path="a.pdf")
+    )
+    async with aiosqlite.connect(db_file) as connection:
+        await connection.execute("UPDATE invoice_drafts SET created_at=datetime('now', '-2 days')")
+        await connection.commit()
+
+    exit_code = await asyncio.to_thread(
+        cli.main, ["--db", db_file, "sweep-drafts", "--ttl-seconds", "86400"]
+    )
+
+    assert exit_code == 0
+    assert "drafts swept: 1 drafts" in capsys.readouterr().out
+    assert await drafts_async.load_draft_invoice(1) is None
+    assert cli.main(["--db", db_file, "sweep-drafts", "--ttl-seconds", "0"]) == 1
+
+
+def test_cli_requires_a_command() -> None:
+    with pytest.raises(SystemExit):
+        cli.main([])
+
+
+@pytest.mark.storage_db
+@pytest.mark.asyncio
+async def test_archive_invoices_command(
+    async_storage_with_migrations: AsyncInvoiceStorage,
+    tmp_path,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    storage = async_storage_with_migrations
+    await storage.save_invoice(
+        Invoice(header=InvoiceHeader(supplier_name="Acme", invoice_date=date(2022, 5, 2))),
+        user_id=1,
+    )
+    archive_dir = str(tmp_path / "archive")
+
+    exit_code = await asyncio.to_thread(
+        cli.main,
+        [
+            "--db",
+            storage._database_path,
+            "--archive-dir",
+            archive_dir,
+            "archive-invoices",
+            "--before",
+            "2023-01-01",
+        ],
+    )
+
+    assert exit_code == 0
+    assert "1 invoices" in capsys.readouterr().out
+    assert await storage.fetch_invoices(None, None) == []
+    archived = AsyncInvoiceStorage(storage._database_path, archive_dir=archive_dir)
+    assert len(await archived.fetch_invoices(None, None)) == 1
+
+
+@pytest.mark.storage_db
+@pytest.mark.asyncio
+async def test_prune_invoices_command(
+    async_storage_with_migrations: AsyncInvoiceStorage,
+    tmp_path,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    storage = async_storage_with_migrations
+    await storage.save_invoice(
+        Invoice(header=InvoiceHeader(supplier_name="Acme", invoice_date=date(2001, 5, 2))),
+        user_id=1,
+    )
+    args = ["--db", storage._database_path, "--archive-dir", str(tmp_path / "archive")]
+    artifacts = ["--artifacts-dir", str(tmp_path / "artifacts")]
+
+    exit_code = await asyncio.to_thread(
+        cli.main, [*args, "prune-invoices", "--days", "365", *artifacts]
+    )
+
+    assert exit_code == 0
+    assert "invoices pruned: 1 invoices" in capsys.readouterr().out
+    assert await storage.fetch_invoices(None, None) == []
+    assert await asyncio.to_thread(cli.main, [*args, "prune-invoices", "--days", "0"]) == 1
+
+    exit_code = await asyncio.to_thread(
+        cli.main, [*args, "prune-invoices", "--days", "0", "--enable-incremental-vacuum"]
+    )
+
+    assert exit_code == 0
+    assert "switched to auto_vacuum=INCREMENTAL" in capsys.readouterr().out
+    with sqlite3.connect(storage._database_path) as connection:
+        assert connection.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
@@ -1,12 +1,19 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 from datetime import date
 from decimal import Decimal
 
 import pytest
 
-from backend.domain.drafts import InvoiceDraft
+from backend.domain.drafts import (
+    DraftHistoryEntry,
+    DraftPatch,
+    DraftSummary,
+    DraftVersionConflict,
+    InvoiceDraft,
+)
 from backend.domain.invoices import Invoice, InvoiceHeader, InvoiceItem, InvoiceSourceInfo
 from backend.services.draft_service import DraftService
 from backend.storage import db as storage_db
@@ -88,3 +95,490 @@ async def test_draft_service_roundtrip(tmp_path, monkeypatch) -> None:
     await service.clear_current_draft(user_id)
     loaded_after_clear = await service.get_current_draft(user_id)
     assert loaded_after_clear is None
+
+
+@pytest.mark.asyncio
+async def test_draft_storage_roundtrip(tmp_path, monkeypatch) -> None:
+    db_file = tmp_path / "test_drafts.sqlite"
+    monkeypatch.setattr(storage_db, "DB_PATH", str(db_file), raising=True)
+    monkeypatch.setattr("backend.storage.drafts_async.DB_PATH", str(db_file), raising=True)
+    storage_db.init_db()
+
+    draft = _make_sample_draft()
+    await save_draft_invoice(5, draft)
+    loaded = await load_draft_invoice(5)
+
+    assert loaded == draft
+    await delete_draft_invoice(5)
+    assert await load_draft_invoice(5) is None
+
+
+class _CountingDraftStore:
+    def __init__(self) -> None:
+        self.drafts: dict[int, InvoiceDraft] = {}
+        self.loads = 0
+        self.fail_save = False
+        self.patches: list[DraftPatch] = []
+        self.saves = 0
+        self.patch_writes = 0
+
+    async def load(self, user_id: int):
+        self.loads += 1
+        return self.drafts.get(user_id)
+
+    async def save(self, user_id: int, draft: InvoiceDraft) -> None:
+        if self.fail_save:
+            raise RuntimeError("disk full")
+        self.saves += 1
+        self.drafts[user_id] = draft
+
+    async def delete(self, user_id: int) -> None:
+        self.drafts.pop(user_id, None)
+
+    async def patch(self, user_id: int, patches, base=None) -> None:
+        if self.fail_save:
+            raise RuntimeError("disk full")
+        self.patch_writes += 1
+        self.patches.extend(patches)
+
+    async def history(self, user_id: int):
+        return [DraftHistoryEntry(patch=patch) for patch in self.patches]
+
+
+def _make_cached_service(
+    store: _CountingDraftStore,
+    cache_size: int = 8,
+    with_patches: bool = False,
+    write_behind_seconds: float = 0.0,
+) -> DraftService:
+    return DraftService(
+        load_draft_func=store.load,
+        save_draft_func=store.save,
+        delete_draft_func=store.delete,
+        logger=logging.getLogger("test"),
+        cache_size=cache_size,
+        patch_draft_func=store.patch if with_patches else None,
+        load_draft_history_func=store.history if with_patches else None,
+        write_behind_seconds=write_behind_seconds,
+    )
+
+
+@pytest.mark.asyncio
+async def test_draft_service_serves_reads_from_cache() -> None:
+    store = _CountingDraftStore()
+    service = _make_cached_service(store)
+    draft = _make_sample_draft()
+
+    assert await service.get_current_draft(1) is None
+    assert await service.get_current_draft(1) is None
+    await service.set_current_draft(1, draft)
+    for _ in range(5):
+        assert await service.get_current_draft(1) is draft
+
+    assert store.loads == 1
+    stats = service.cache_stats()
+    assert stats.hits == 6
+    assert stats.misses == 1
+    assert stats.size == 1
+
+
+@pytest.mark.asyncio
+async def test_draft_service_cache_invalidation() -> None:
+    store = _CountingDraftStore()
+    service = _make_cached_service(store)
+    draft = _make_sample_draft()
+
+    await service.set_current_draft(1, draft)
+    await service.clear_current_draft(1)
+    assert await service.get_current_draft(1) is None
+    assert store.loads == 1
+
+    await service.set_current_draft(1, draft)
+    store.fail_save = True
+    with pytest.raises(RuntimeError):
+        await service.set_current_draft(1, _make_sample_draft())
+    # A failed write must not leave a possibly mutated draft in the cache.
+    assert await service.get_current_draft(1) is draft
+    assert store.loads == 2
+
+
+@pytest.mark.asyncio
+async def test_draft_service_without_cache_always_loads() -> None:
+    store = _CountingDraftStore()
+    service = _make_cached_service(store, cache_size=0)
+
+    await service.set_current_draft(1, _make_sample_draft())
+    await service.get_current_draft(1)
+    await service.get_current_draft(1)
+
+    assert store.loads == 2
+
+
+@pytest.mark.asyncio
+async def test_patch_current_draft_records_only_patches() -> None:
+    store = _CountingDraftStore()
+    service = _make_cached_service(store, with_patches=True)
+    draft = _make_sample_draft()
+    await service.set_current_draft(1, draft)
+    saved = store.drafts[1]
+    patches = [DraftPatch.set_item(1, "quantity", Decimal("7")), DraftPatch.add_comment("x")]
+
+    updated = await service.patch_current_draft(1, patches)
+
+    assert updated is not None and updated is await service.get_current_draft(1)
+    assert updated.invoice.items[0].quantity == Decimal("7")
+    assert updated.comments[-1] == "x"
+    # The patches were applied to a copy; the instance handed out before is untouched.
+    assert draft.invoice.items[0].quantity == Decimal("1")
+    assert store.patches == patches
+    assert store.drafts[1] is saved
+    assert [entry.patch for entry in await service.get_draft_history(1)] == patches
+    assert await service.patch_current_draft(2, patches) is None
+
+
+@pytest.mark.asyncio
+async def test_patch_current_draft_falls_back_to_full_save() -> None:
+    store = _CountingDraftStore()
+    service = _make_cached_service(store, cache_size=0)
+    await service.set_current_draft(1, _make_sample_draft())
+
+    await service.patch_current_draft(1, [DraftPatch.set_header("supplier_name", "New")])
+
+    assert store.drafts[1].invoice.header.supplier_name == "New"
+    with pytest.raises(RuntimeError):
+        await service.get_draft_history(1)
+
+
+@pytest.mark.asyncio
+async def test_patch_current_draft_rejects_bad_patch_without_storing() -> None:
+    store = _CountingDraftStore()
+    service = _make_cached_service(store, with_patches=True)
+    await service.set_current_draft(1, _make_sample_draft())
+
+    with pytest.raises(ValueError):
+        await service.patch_current_draft(
+            1,
+            [DraftPatch.set_header("supplier_name", "Half"), DraftPatch.set_item(5, "sku", "X")],
+        )
+
+    assert store.patches == []
+    draft = await service.get_current_draft(1)
+    assert draft is not None
+    assert draft.invoice.header.supplier_name == "Test Supplier"
+
+
+@pytest.mark.asyncio
+async def test_write_behind_coalesces_edits_until_flush() -> None:
+    store = _CountingDraftStore()
+    service = _make_cached_service(store, with_patches=True, write_behind_seconds=60)
+    draft = _make_sample_draft()
+    await service.set_current_draft(1, draft)
+    for quantity in range(2, 7):
+        await service.patch_current_draft(
+            1, [DraftPatch.set_item(1, "quantity", Decimal(quantity))]
+        )
+
+    assert store.saves == 0
+    assert service.pending_drafts() == 1
+    current = await service.get_current_draft(1)
+    assert current is not None and current.invoice.items[0].quantity == Decimal("6")
+
+    await service.flush_draft(1)
+
+    # The new draft supersedes the edits buffered with it: one full write, no patches.
+    assert store.saves == 1
+    assert store.patch_writes == 0
+    assert store.drafts[1].invoice.items[0].quantity == Decimal("6")
+    assert service.pending_drafts() == 0
+
+    await service.patch_current_draft(1, [DraftPatch.set_header("supplier_name", "A")])
+    await service.patch_current_draft(1, [DraftPatch.add_comment("x")])
+    await service.flush_draft(1)
+    assert store.patch_writes == 1
+    assert [patch.op for patch in store.patches] == ["set_header", "add_comment"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("write_behind_seconds", [0.0, 60.0])
+async def test_failed_mutation_leaves_current_draft_intact(write_behind_seconds: float) -> None:
+    store = _CountingDraftStore()
+    service = _make_cached_service(store, write_behind_seconds=write_behind_seconds)
+    await service.set_current_draft(1, _make_sample_draft())
+
+    def mutate(draft: InvoiceDraft) -> None:
+        draft.invoice.header.supplier_name = "Half"
+        raise RuntimeError("bad edit")
+
+    with pytest.raises(RuntimeError):
+        await service.update_current_draft(1, mutate)
+
+    current = await service.get_current_draft(1)
+    assert current is not None and current.invoice.header.supplier_name == "Test Supplier"
+    await service.flush_draft(1)
+    assert store.drafts[1].invoice.header.supplier_name == "Test Supplier"
+
+
+@pytest.mark.asyncio
+async def test_write_behind_flushes_on_timer() -> None:
+    store = _CountingDraftStore()
+    service = _make_cached_service(store, write_behind_seconds=0.01)
+    await service.set_current_draft(1, _make_sample_draft())
+    await service.patch_current_draft(1, [DraftPatch.add_comment("x")])
+
+    for _ in range(100):
+        if store.saves:
+            break
+        await asyncio.sleep(0.01)
+
+    assert store.saves == 1
+    assert store.drafts[1].comments[-1] == "x"
+    assert service.pending_drafts() == 0
+
+
+@pytest.mark.asyncio
+async def test_write_behind_keeps_changes_after_failed_flush() -> None:
+    store = _CountingDraftStore()
+    service = _make_cached_service(store, write_behind_seconds=60)
+    await service.set_current_draft(1, _make_sample_draft())
+    store.fail_save = True
+
+    with pytest.raises(RuntimeError):
+        await service.flush_draft(1)
+    assert service.pending_drafts() == 1
+
+    store.fail_save = False
+    await service.set_current_draft(2, _make_sample_draft())
+    assert await service.flush_all() == 2
+    assert set(store.drafts) == {1, 2}
+
+
+@pytest.mark.asyncio
+async def test_write_behind_clear_drops_buffered_draft() -> None:
+    store = _CountingDraftStore()
+    service = _make_cached_service(store, write_behind_seconds=60)
+    await service.set_current_draft(1, _make_sample_draft())
+
+    await service.clear_current_draft(1)
+
+    assert await service.flush_all() == 0
+    assert store.saves == 0
+    assert await service.get_current_draft(1) is None
+
+
+class _QueueDraftStore(_CountingDraftStore):
+    """Minimal multi-draft store: a list of (id, draft) per user, first is active."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.queues: dict[int, list[tuple[int, InvoiceDraft]]] = {}
+
+    async def load(self, user_id: int):
+        self.loads += 1
+        queue = self.queues.get(user_id)
+        return queue[0][1] if queue else None
+
+    async def save(self, user_id: int, draft: InvoiceDraft) -> None:
+        self.saves += 1
+        queue = self.queues.setdefault(user_id, [])
+        if queue:
+            queue[0] = (queue[0][0], draft)
+        else:
+            queue.append((1, draft))
+
+    async def add(self, user_id: int, draft: InvoiceDraft) -> DraftSummary:
+        queue = self.queues.setdefault(user_id, [])
+        draft_id = len(queue) + 1
+        queue.append((draft_id, draft))
+        return DraftSummary.from_draft(draft_id, draft, active=len(queue) == 1)
+
+    async def list(self, user_id: int) -> list[DraftSummary]:
+        queue = self.queues.get(user_id, [])
+        return [
+            DraftSummary.from_draft(draft_id, draft, active=position == 0)
+            for position, (draft_id, draft) in enumerate(queue)
+        ]
+
+    async def activate(self, user_id: int, draft_id: int) -> bool:
+        queue = self.queues.get(user_id, [])
+        for position, entry in enumerate(queue):
+            if entry[0] == draft_id:
+                queue.insert(0, queue.pop(position))
+                return True
+        return False
+
+
+def _make_queue_service(store: _QueueDraftStore, write_behind_seconds: float = 0.0) -> DraftService:
+    return DraftService(
+        load_draft_func=store.load,
+        save_draft_func=store.save,
+        delete_draft_func=store.delete,
+        logger=logging.getLogger("test"),
+        write_behind_seconds=write_behind_seconds,
+        add_draft_func=store.add,
+        list_drafts_func=store.list,
+        activate_draft_func=store.activate,
+    )
+
+
+@pytest.mark.asyncio
+async def test_add_draft_queues_behind_the_current_one() -> None:
+    store = _QueueDraftStore()
+    service = _make_queue_service(store)
+    first = _make_sample_draft()
+    second = _make_sample_draft()
+    second.invoice.header.supplier_name = "Second"
+
+    assert (await service.add_draft(1, first)).active
+    assert not (await service.add_draft(1, second)).active
+    assert await service.get_current_draft(1) is first
+    assert store.loads == 0
+
+    assert await service.switch_draft(1, 2) is second
+    assert await service.switch_draft(1, 99) is None
+    assert [summary.active for summary in await service.list_drafts(1)] == [True, False]
+
+
+@pytest.mark.asyncio
+async def test_switch_draft_flushes_buffered_edits_first() -> None:
+    store = _QueueDraftStore()
+    service = _make_queue_service(store, write_behind_seconds=60)
+    await service.add_draft(1, _make_sample_draft())
+    await service.add_draft(1, _make_sample_draft())
+    await service.patch_current_draft(1, [DraftPatch.set_header("supplier_name", "Edited")])
+    assert store.saves == 0
+
+    await service.switch_draft(1, 2)
+
+    assert store.saves == 1
+    assert store.queues[1][1][1].invoice.header.supplier_name == "Edited"
+
+
+@pytest.mark.asyncio
+async def test_add_draft_without_queue_replaces_current_draft() -> None:
+    store = _CountingDraftStore()
+    service = _make_cached_service(store)
+
+    summary = await service.add_draft(1, _make_sample_draft())
+
+    assert summary.active
+    assert 1 in store.drafts
+    with pytest.raises(RuntimeError):
+        await service.list_drafts(1)
+    with pytest.raises(RuntimeError):
+        await service.switch_draft(1, 1)
+
+
+class _VersionedDraftStore(_CountingDraftStore):
+    """Store whose conditional writes fail while another writer is simulated."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.conflicts = 0
+        self.conditional_writes = 0
+        self.discarded: list[InvoiceDraft] = []
+
+    def _check(self) -> None:
+        self.conditional_writes += 1
+        if self.conflicts > 0:
+            self.conflicts -= 1
+            raise DraftVersionConflict("changed")
+
+    async def patch(self, user_id: int, patches, base=None) -> None:
+        self._check()
+        await super().patch(user_id, patches, base)
+
+    async def replace(self, user_id: int, draft: InvoiceDraft) -> None:
+        self._check()
+        await self.save(user_id, draft)
+
+    async def discard(self, user_id: int, draft: InvoiceDraft) -> bool:
+        if self.drafts.get(user_id) is not draft:
+            return False
+        self.discarded.append(self.drafts.pop(user_id))
+        return True
+
+
+def _make_versioned_service(store: _VersionedDraftStore, retries: int = 3) -> DraftService:
+    return DraftService(
+        load_draft_func=store.load,
+        save_draft_func=store.save,
+        delete_draft_func=store.delete,
+        logger=logging.getLogger("test"),
+        patch_draft_func=store.patch,
+        replace_draft_func=store.replace,
+        discard_draft_func=store.discard,
+        conflict_retries=retries,
+    )
+
+
+@pytest.mark.asyncio
+async def test_patch_current_draft_rebases_on_version_conflict() -> None:
+    store = _VersionedDraftStore()
+    service = _make_versioned_service(store)
+    await service.set_current_draft(1, _make_sample_draft())
+    await service.get_current_draft(1)
+    # Another writer replaces the draft behind the cache's back.
+    newer = _make_sample_draft()
+    newer.invoice.header.invoice_number = "INV-OTHER"
+    store.drafts[1] = newer
+    store.conflicts = 1
+
+    updated = await service.patch_current_draft(1, [DraftPatch.set_header("supplier_name", "Mine")])
+
+    assert updated is not None
+    assert updated.invoice.header.supplier_name == "Mine"
+    assert updated.invoice.header.invoice_number == "INV-OTHER"
+    assert store.conditional_writes == 2
+
+
+@pytest.mark.asyncio
+async def test_patch_current_draft_gives_up_after_retries() -> None:
+    store = _VersionedDraftStore()
+    service = _make_versioned_service(store, retries=2)
+    await service.set_current_draft(1, _make_sample_draft())
+    store.conflicts = 10
+
+    with pytest.raises(DraftVersionConflict):
+        await service.patch_current_draft(1, [DraftPatch.add_comment("lost")])
+
+    assert store.conditional_writes == 3
+    assert store.patches == []
+
+
+@pytest.mark.asyncio
+async def test_update_current_draft_retries_mutation_on_fresh_draft() -> None:
+    store = _VersionedDraftStore()
+    service = _make_versioned_service(store)
+    await service.set_current_draft(1, _make_sample_draft())
+    store.conflicts = 1
+    seen: list[InvoiceDraft] = []
+
+    def mutate(draft: InvoiceDraft) -> None:
+        seen.append(draft)
+        draft.invoice.header.supplier_name = "Renamed"
+
+    updated = await service.update_current_draft(1, mutate)
+
+    assert updated is not None and updated.invoice.header.supplier_name == "Renamed"
+    assert len(seen) == 2
+    assert store.drafts[1] is updated
+    assert await service.update_current_draft(2, mutate) is None
+
+
+@pytest.mark.asyncio
+async def test_clear_current_draft_with_expected_refuses_other_draft() -> None:
+    store = _VersionedDraftStore()
+    service = _make_versioned_service(store)
+    saved = _make_sample_draft()
+    saved.draft_id = 1
+    await service.set_current_draft(1, saved)
+
+    await service.clear_current_draft(1, expected=saved)
+    assert store.discarded == [saved]
+
+    # A second /save of the same draft must not delete the next one.
+    following = _make_sample_draft()
+    await service.set_current_draft(1, following)
+    with pytest.raises(DraftVersionConflict):
+        await service.clear_current_draft(1, expected=saved)
+    assert store.drafts[1] is following
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from backend.domain.drafts import ExpiredDrafts
+from backend.services.draft_sweeper import DraftSweeper
+
+TTL = 3600.0
+
+
+def _write(path: Path, size: int, age_seconds: float = 0.0) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    if age_seconds:
+        old = time.time() - age_seconds
+        os.utime(path, (old, old))
+    return path
+
+
+def _make_sweeper(
+    uploads: Path, expired: ExpiredDrafts, referenced: set[str], ttl: float = TTL
+) -> DraftSweeper:
+    async def delete_expired(ttl_seconds: float) -> ExpiredDrafts:
+        assert ttl_seconds == ttl
+        return expired
+
+    async def fetch_referenced() -> set[str]:
+        return referenced
+
+    return DraftSweeper(
+        delete_expired_func=delete_expired,
+        fetch_referenced_paths_func=fetch_referenced,
+        upload_dirs=[str(uploads)],
+        logger=logging.getLogger("test"),
+        ttl_seconds=ttl,
+        interval_seconds=0.01,
+    )
+
+
+@pytest.mark.asyncio
+async def test_sweep_removes_expired_and_orphaned_files_only(tmp_path: Path) -> None:
+    uploads = tmp_path / "uploads"
+    expired_file = _write(uploads / "expired.pdf", 100)
+    orphan = _write(uploads / "orphan.jpg", 50, age_seconds=2 * TTL)
+    fresh = _write(uploads / "fresh.jpg", 10)
+    saved = _write(uploads / "saved.pdf", 20, age_seconds=2 * TTL)
+    outside = _write(tmp_path / "elsewhere.pdf", 30)
+    sweeper = _make_sweeper(
+        uploads,
+        ExpiredDrafts(
+            drafts=2, deltas=3, payload_bytes=500, paths=[str(expired_file), str(outside)]
+        ),
+        referenced={str(saved)},
+    )
+
+    report = await sweeper.sweep()
+
+    assert report.drafts_deleted == 2
+    assert report.rows_deleted == 5
+    assert report.files_deleted == 2
+    assert report.file_bytes == 150
+    assert report.bytes_reclaimed == 650
+    assert not expired_file.exists() and not orphan.exists()
+    assert fresh.exists() and saved.exists() and outside.exists()
+
+
+@pytest.mark.asyncio
+async def test_sweeper_runs_in_background_until_stopped(tmp_path: Path) -> None:
+    sweeper = _make_sweeper(tmp_path, ExpiredDrafts(), referenced=set())
+    runs = 0
+    original = sweeper.sweep
+
+    async def counting_sweep():
+        nonlocal runs
+        runs += 1
+        return await original()
+
+    sweeper.sweep = counting_sweep  # type: ignore[method-assign]
+    sweeper.start()
+    await asyncio.sleep(0.05)
+    await sweeper.stop()
+
+    assert runs >= 2
+    stopped_at = runs
+    await asyncio.sleep(0.03)
+    assert runs == stopped_at
+
+
+@pytest.mark.asyncio
+async def test_sweeper_disabled_with_zero_ttl(tmp_path: Path) -> None:
+    sweeper = _make_sweeper(tmp_path, ExpiredDrafts(), referenced=set(), ttl=0)
+
+    sweeper.start()
+
+    assert not sweeper.enabled
+    await sweeper.stop()
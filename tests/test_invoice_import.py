@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import asyncio
+import io
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+from typing import List, Tuple
+
+import pytest
+
+from backend import cli
+from backend.domain.invoices import Invoice, InvoiceHeader, InvoiceItem
+from backend.services.invoice_export import write_invoices_csv
+from backend.services.invoice_import import ImportReport, import_invoices_csv
+from backend.storage.db_async import AsyncInvoiceStorage
+
+
+class _Saver:
+    def __init__(self) -> None:
+        self.chunks: List[List[Invoice]] = []
+
+    async def __call__(self, invoices: List[Invoice], user_id: int) -> List[Tuple[int, bool]]:
+        self.chunks.append(invoices)
+        return [(index, True) for index in range(len(invoices))]
+
+
+async def _iterate(invoices: List[Invoice]):
+    for invoice in invoices:
+        yield invoice
+
+
+@pytest.mark.asyncio
+async def test_import_reads_back_an_export() -> None:
+    exported = [
+        Invoice(
+            header=InvoiceHeader(
+                supplier_name="ООО Ромашка",
+                customer_name="Client",
+                invoice_number="A-1",
+                invoice_date=date(2023, 4, 5),
+                total_amount=Decimal("15.50"),
+            ),
+            items=[
+                InvoiceItem(
+                    description="Бумага",
+                    quantity=Decimal("2"),
+                    unit_price=Decimal("5.25"),
+                    line_total=Decimal("10.50"),
+                ),
+                InvoiceItem(description="Ручка", quantity=Decimal("1"), line_total=Decimal("5")),
+            ],
+        ),
+        Invoice(header=InvoiceHeader(supplier_name="Acme", invoice_number="B-2")),
+    ]
+    buffer = io.BytesIO()
+    await write_invoices_csv(_iterate(exported), buffer)
+    saver = _Saver()
+    progress: List[ImportReport] = []
+
+    report = await import_invoices_csv(
+        io.StringIO(buffer.getvalue().decode("utf-8-sig")),
+        saver,
+        user_id=3,
+        chunk_size=1,
+        progress=progress.append,
+    )
+
+    assert (report.rows, report.invoices, report.saved, report.duplicates) == (3, 2, 2, 0)
+    assert report.skipped == 0
+    assert len(saver.chunks) == 2 and len(progress) == 3
+    first, second = saver.chunks[0][0], saver.chunks[1][0]
+    assert first.header == exported[0].header
+    assert [(i.description, i.quantity, i.unit_price, i.line_total) for i in first.items] == [
+        ("Бумага", Decimal("2"), Decimal("5.25"), Decimal("10.50")),
+        ("Ручка", Decimal("1"), Decimal("0"), Decimal("5")),
+    ]
+    assert first.source.provider == "csv"
+    assert second.header.invoice_number == "B-2" and second.items == []
+
+
+@pytest.mark.asyncio
+async def test_invalid_invoices_are_skipped_with_their_line() -> None:
+    text = (
+        "Дата,Номер,Поставщик,Наименование,Сумма\n"
+        '12.03.2021,1,Acme,Widget,"1 234,50"\n'
+        "31.02.2021,2,Acme,Widget,10\n"
+        "01.03.2021,3,Acme,Widget,10\n"
+        "01.03.2021,3,Acme,Gadget,ten\n"
+        "\n"
+        ",,,,\n"
+    )
+    saver = _Saver()
+
+    report = await import_invoices_csv(
+        io.StringIO(text),
+        saver,
+        user_id=1,
+        column_map={
+            "дата": "date",
+            "Номер": "doc_number",
+            "Поставщик": "supplier",
+            "Наименование": "name",
+            "Сумма": "total",
+        },
+    )
+
+    assert (report.rows, report.invoices, report.skipped) == (4, 1, 2)
+    assert [(issue.line, issue.message) for issue in report.issues] == [
+        (3, "date: unrecognized date: '31.02.2021'"),
+        (5, "total: not a number: 'ten'"),
+    ]
+    [[invoice]] = saver.chunks
+    assert invoice.header.invoice_date == date(2021, 3, 12)
+    assert invoice.items[0].line_total == Decimal("1234.50")
+
+
+@pytest.mark.asyncio
+async def test_item_number_one_starts_a_new_invoice() -> None:
+    text = (
+        "date;supplier;#;name;total\n"
+        "2021-03-01;Acme;1;Widget;5\n"
+        "2021-03-01;Acme;2;Gadget;7\n"
+        "2021-03-01;Acme;1;Widget;5\n"
+        "2021-03-01;Acme;;;\n"
+    )
+    saver = _Saver()
+
+    report = await import_invoices_csv(io.StringIO(text), saver, user_id=1)
+
+    assert (report.rows, report.invoices) == (4, 2)
+    [[first, second]] = saver.chunks
+    assert [item.description for item in first.items] == ["Widget", "Gadget"]
+    assert [item.description for item in second.items] == ["Widget"]
+
+
+@pytest.mark.asyncio
+async def test_dry_run_and_unknown_header() -> None:
+    saver = _Saver()
+    report = await import_invoices_csv(
+        io.StringIO("supplier;doc_number\nAcme;1\nAcme;2\n"), saver, user_id=1, dry_run=True
+    )
+    assert (report.invoices, report.saved) == (2, 0)
+    assert saver.chunks == []
+
+    with pytest.raises(ValueError, match="no invoice columns"):
+        await import_invoices_csv(io.StringIO("a;b\n1;2\n"), saver, user_id=1)
+
+
+@pytest.mark.storage_db
+@pytest.mark.asyncio
+async def test_import_csv_command(
+    async_storage_with_migrations: AsyncInvoiceStorage,
+    tmp_path: Path,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    storage = async_storage_with_migrations
+    csv_path = tmp_path / "history.csv"
+    csv_path.write_text(
+        "Date;No;supplier;name;qty;price;total\n"
+        "2020-01-02;7;Acme;Bolt;3;0,5;1,5\n"
+        "2020-01-02;7;Acme;Nut;2;0,25;0,5\n"
+        "2020-01-03;8;Acme;Nut;x;;\n",
+        encoding="utf-8-sig",
+    )
+    args = ["--db", storage._database_path, "import-csv", str(csv_path), "--user-id", "9"]
+    args += ["--map", "date=date", "--map", "No=doc_number"]
+
+    assert await asyncio.to_thread(cli.main, [*args, "--dry-run"]) == 1
+    assert await storage.fetch_invoices(None, None) == []
+    assert await asyncio.to_thread(cli.main, args) == 1
+    assert await asyncio.to_thread(cli.main, args) == 1
+
+    output = capsys.readouterr().out
+    assert f"{csv_path}:4: qty: not a number: 'x'" in output
+    assert "1 invoices saved (1 stored, 0 duplicates), 1 skipped" in output
+    assert "1 invoices saved (0 stored, 1 duplicates), 1 skipped" in output
+    [invoice] = await storage.fetch_invoices(None, None)
+    assert invoice.header.invoice_number == "7"
+    assert [item.description for item in invoice.items] == ["Bolt", "Nut"]
+    with pytest.raises(SystemExit):
+        cli.main(["import-csv", str(csv_path), "--user-id", "1", "--map", "No=number"])
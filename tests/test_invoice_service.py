@@ -354,3 +354,395 @@ async def test_list_invoices_delegates_to_storage() -> None:
     assert captured["from_date"] == from_date
     assert captured["to_date"] == to_date
     assert captured["supplier"] == supplier
+
+
+@pytest.mark.asyncio
+async def test_list_invoices_page_and_iter_invoices_delegate_to_storage() -> None:
+    import logging
+    from typing import AsyncIterator
+
+    from backend.domain.invoices import InvoiceCursor, InvoicePage
+
+    captured = {}
+    invoice = Invoice(header=InvoiceHeader(invoice_number="INV-PAGE"))
+    page = InvoicePage(invoices=[invoice])
+
+    async def fake_fetch_invoice_page(from_date, to_date, supplier, after, before, limit):
+        captured["page"] = (from_date, to_date, supplier, after, before, limit)
+        return page
+
+    async def fake_iter_invoices(from_date, to_date, supplier) -> AsyncIterator[Invoice]:
+        captured["iter"] = (from_date, to_date, supplier)
+        yield invoice
+
+    async def unused(*args, **kwargs):
+        raise AssertionError("not expected")
+
+    service = InvoiceService(
+        ocr_extractor=unused,
+        save_invoice_func=unused,
+        fetch_invoices_func=unused,
+        logger=logging.getLogger("test"),
+        fetch_invoice_page_func=fake_fetch_invoice_page,
+        iter_invoices_func=fake_iter_invoices,
+    )
+
+    cursor = InvoiceCursor(date_iso="2024-01-05", invoice_id=7)
+    result = await service.list_invoices_page(
+        date(2024, 1, 1), date(2024, 1, 31), "Supplier", after=cursor, limit=5
+    )
+    assert result is page
+    assert captured["page"] == (date(2024, 1, 1), date(2024, 1, 31), "Supplier", cursor, None, 5)
+
+    streamed = [inv async for inv in service.iter_invoices(None, date(2024, 2, 1), None)]
+    assert streamed == [invoice]
+    assert captured["iter"] == (None, date(2024, 2, 1), None)
+
+
+@pytest.mark.asyncio
+async def test_paged_listing_requires_configured_storage() -> None:
+    import logging
+
+    async def unused(*args, **kwargs):
+        raise AssertionError("not expected")
+
+    service = InvoiceService(
+        ocr_extractor=unused,
+        save_invoice_func=unused,
+        fetch_invoices_func=unused,
+        logger=logging.getLogger("test"),
+    )
+
+    with pytest.raises(RuntimeError):
+        await service.list_invoices_page(None, None)
+    with pytest.raises(RuntimeError):
+        service.iter_invoices(None, None)
+
+
+@pytest.mark.asyncio
+async def test_summary_listing_delegates_to_storage() -> None:
+    import logging
+
+    from backend.domain.invoices import InvoiceSummaryPage, InvoiceTotals
+
+    captured = {}
+    page = InvoiceSummaryPage()
+    totals = InvoiceTotals(invoice_count=3, item_count=9, total_amount=Decimal("12.5"))
+
+    async def fake_summary_page(from_date, to_date, supplier, after, before, limit):
+        captured["page"] = (from_date, to_date, supplier, after, before, limit)
+        return page
+
+    async def fake_summarize(from_date, to_date, supplier):
+        captured["totals"] = (from_date, to_date, supplier)
+        return totals
+
+    async def unused(*args, **kwargs):
+        raise AssertionError("not expected")
+
+    service = InvoiceService(
+        ocr_extractor=unused,
+        save_invoice_func=unused,
+        fetch_invoices_func=unused,
+        logger=logging.getLogger("test"),
+        fetch_invoice_summary_page_func=fake_summary_page,
+        summarize_invoices_func=fake_summarize,
+    )
+
+    assert await service.list_invoices_summary_page(date(2024, 1, 1), None, limit=3) is page
+    assert captured["page"] == (date(2024, 1, 1), None, None, None, None, 3)
+    assert await service.summarize_invoices(None, None, "Acme") is totals
+    assert captured["totals"] == (None, None, "Acme")
+
+    bare = InvoiceService(
+        ocr_extractor=unused,
+        save_invoice_func=unused,
+        fetch_invoices_func=unused,
+        logger=logging.getLogger("test"),
+    )
+    with pytest.raises(RuntimeError):
+        await bare.list_invoices_summary_page(None, None)
+    with pytest.raises(RuntimeError):
+        await bare.summarize_invoices(None, None)
+
+
+@pytest.mark.asyncio
+async def test_supplier_spend_delegates_to_storage() -> None:
+    import logging
+
+    from backend.domain.invoices import SupplierMonthlySpend
+
+    captured = {}
+    rows = [SupplierMonthlySpend(supplier="Acme", month="2025-01", invoice_count=1)]
+
+    async def fake_spend(user_id, from_month, to_month, supplier):
+        captured["spend"] = (user_id, from_month, to_month, supplier)
+        return rows
+
+    async def unused(*args, **kwargs):
+        raise AssertionError("not expected")
+
+    service = InvoiceService(
+        ocr_extractor=unused,
+        save_invoice_func=unused,
+        fetch_invoices_func=unused,
+        logger=logging.getLogger("test"),
+        fetch_supplier_spend_func=fake_spend,
+    )
+
+    assert await service.supplier_spend(5, "2025-01", "2025-03", "Ac") is rows
+    assert captured["spend"] == (5, "2025-01", "2025-03", "Ac")
+
+    bare = InvoiceService(
+        ocr_extractor=unused,
+        save_invoice_func=unused,
+        fetch_invoices_func=unused,
+        logger=logging.getLogger("test"),
+    )
+    with pytest.raises(RuntimeError):
+        await bare.supplier_spend(5)
+
+
+@pytest.mark.asyncio
+async def test_get_raw_text_delegates_to_storage() -> None:
+    import logging
+
+    async def fake_raw(invoice_id):
+        return f"raw {invoice_id}"
+
+    async def unused(*args, **kwargs):
+        raise AssertionError("not expected")
+
+    service = InvoiceService(
+        ocr_extractor=unused,
+        save_invoice_func=unused,
+        fetch_invoices_func=unused,
+        logger=logging.getLogger("test"),
+        fetch_raw_text_func=fake_raw,
+    )
+    assert await service.get_raw_text(7) == "raw 7"
+
+    bare = InvoiceService(
+        ocr_extractor=unused,
+        save_invoice_func=unused,
+        fetch_invoices_func=unused,
+        logger=logging.getLogger("test"),
+    )
+    with pytest.raises(RuntimeError):
+        await bare.get_raw_text(7)
+
+
+def test_build_invoice_keeps_raw_ocr_text() -> None:
+    from backend.ocr.engine.types import ExtractionResult
+    from backend.services.invoice_service import build_invoice_from_extraction
+
+    result = ExtractionResult(document_id="doc", raw_text="<<MINDEE_STRUCT>>\n{}")
+
+    assert build_invoice_from_extraction(result).raw_text == "<<MINDEE_STRUCT>>\n{}"
+    assert build_invoice_from_extraction(ExtractionResult(document_id="doc")).raw_text is None
+
+
+@pytest.mark.asyncio
+async def test_export_invoices_csv_streams_items_of_the_range() -> None:
+    import csv
+    import io
+    import logging
+    from typing import AsyncIterator
+
+    from backend.domain.invoices import InvoiceItem
+
+    captured = {}
+    invoices = [
+        Invoice(
+            header=InvoiceHeader(
+                supplier_name="Acme",
+                invoice_number="A-1",
+                invoice_date=date(2024, 1, 5),
+                total_amount=Decimal("12.50"),
+            ),
+            items=[
+                InvoiceItem(
+                    description="Bolt; M6",
+                    quantity=Decimal("2"),
+                    unit_price=Decimal("5"),
+                    line_total=Decimal("10"),
+                ),
+                InvoiceItem(description="Nut", line_total=Decimal("2.50")),
+            ],
+        ),
+        Invoice(header=InvoiceHeader(invoice_number="B-2")),
+    ]
+
+    async def fake_iter_invoices(from_date, to_date, supplier) -> AsyncIterator[Invoice]:
+        captured["iter"] = (from_date, to_date, supplier)
+        for invoice in invoices:
+            yield invoice
+
+    async def unused(*args, **kwargs):
+        raise AssertionError("not expected")
+
+    service = InvoiceService(
+        ocr_extractor=unused,
+        save_invoice_func=unused,
+        fetch_invoices_func=unused,
+        logger=logging.getLogger("test"),
+        iter_invoices_func=fake_iter_invoices,
+    )
+
+    destination = io.BytesIO()
+    report = await service.export_invoices_csv(
+        date(2024, 1, 1), date(2024, 1, 31), destination, supplier="Ac"
+    )
+
+    assert (report.invoices, report.rows) == (2, 3)
+    assert captured["iter"] == (date(2024, 1, 1), date(2024, 1, 31), "Ac")
+    assert not destination.closed
+    data = destination.getvalue()
+    assert data.startswith(b"\xef\xbb\xbf")
+    rows = list(csv.reader(io.StringIO(data.decode("utf-8-sig")), delimiter=";"))
+    assert rows[0][:5] == ["date", "doc_number", "supplier", "client", "invoice_total"]
+    assert rows[1] == ["2024-01-05", "A-1", "Acme", "", "12.50", "1", "Bolt; M6", "2", "5", "10"]
+    assert rows[2][5:] == ["2", "Nut", "0", "0", "2.50"]
+    assert rows[3] == ["", "B-2", "", "", "", "", "", "", "", ""]
+
+
+def _cached_service(calls: list, rows: int = 1, max_rows: int = 10) -> InvoiceService:
+    import logging
+
+    from backend.domain.invoices import InvoiceSummaryPage, InvoiceTotals
+
+    async def fake_fetch(from_date, to_date, supplier):
+        calls.append(("invoices", from_date, to_date, supplier))
+        return [Invoice(header=InvoiceHeader(supplier_name="Acme")) for _ in range(rows)]
+
+    async def fake_summary_page(from_date, to_date, supplier, after, before, limit):
+        calls.append(("page", from_date, to_date, supplier))
+        return InvoiceSummaryPage()
+
+    async def fake_summarize(from_date, to_date, supplier):
+        calls.append(("totals", from_date, to_date, supplier))
+        return InvoiceTotals(invoice_count=1)
+
+    async def fake_save(invoice, user_id):
+        return 1
+
+    async def unused(*args, **kwargs):
+        raise AssertionError("not expected")
+
+    return InvoiceService(
+        ocr_extractor=unused,
+        save_invoice_func=fake_save,
+        fetch_invoices_func=fake_fetch,
+        logger=logging.getLogger("test"),
+        fetch_invoice_summary_page_func=fake_summary_page,
+        summarize_invoices_func=fake_summarize,
+        listing_cache_size=16,
+        listing_cache_max_rows=max_rows,
+    )
+
+
+@pytest.mark.asyncio
+async def test_listing_cache_serves_repeated_queries() -> None:
+    calls: list = []
+    service = _cached_service(calls)
+    january = (date(2025, 1, 1), date(2025, 1, 31))
+
+    first = await service.list_invoices(*january)
+    first.clear()
+    assert len(await service.list_invoices(*january, supplier="")) == 1
+    await service.list_invoices_summary_page(*january)
+    await service.list_invoices_summary_page(*january)
+    await service.summarize_invoices(*january)
+    (await service.summarize_invoices(*january)).invoice_count = 99
+    assert (await service.summarize_invoices(*january)).invoice_count == 1
+    # A single bound is ignored by list_invoices, so both queries share one entry.
+    await service.list_invoices(date(2025, 1, 1), None)
+    await service.list_invoices(None, date(2025, 2, 1))
+
+    assert [call[0] for call in calls] == ["invoices", "page", "totals", "invoices"]
+    stats = service.listing_cache_stats()
+    assert (stats.hits, stats.misses, stats.size) == (5, 4, 4)
+
+
+@pytest.mark.asyncio
+async def test_saving_an_invoice_invalidates_matching_listings() -> None:
+    calls: list = []
+    service = _cached_service(calls)
+    january = (date(2025, 1, 1), date(2025, 1, 31))
+    await service.list_invoices(*january)
+    await service.list_invoices(*january, supplier="acme")
+    await service.list_invoices(*january, supplier="Globex")
+    await service.list_invoices(date(2025, 2, 1), date(2025, 2, 28))
+    await service.summarize_invoices(None, None)
+    await service.summarize_invoices(date(2025, 1, 10), None)
+
+    saved = Invoice(header=InvoiceHeader(supplier_name="ACME Ltd", invoice_date=date(2025, 1, 15)))
+    await service.save_invoice(saved, user_id=1)
+
+    assert service.listing_cache_stats().invalidations == 4
+    calls.clear()
+    await service.list_invoices(*january)
+    await service.list_invoices(*january, supplier="Globex")
+    await service.list_invoices(date(2025, 2, 1), date(2025, 2, 28))
+    assert calls == [("invoices", *january, None)]
+
+    # Undated invoices only show up in listings without a date filter.
+    await service.summarize_invoices(None, None)
+    await service.save_invoice(Invoice(header=InvoiceHeader(supplier_name="Acme")), user_id=1)
+    assert service.listing_cache_stats().invalidations == 5
+
+
+@pytest.mark.asyncio
+async def test_storing_a_duplicate_keeps_cached_listings() -> None:
+    import logging
+
+    calls: list = []
+    stored: list = []
+
+    async def fake_fetch(from_date, to_date, supplier):
+        calls.append(("invoices", from_date, to_date, supplier))
+        return [Invoice(header=InvoiceHeader(supplier_name="Acme"))]
+
+    async def fake_store(invoice, user_id):
+        stored.append(user_id)
+        return 7, len(stored) == 1
+
+    async def unused(*args, **kwargs):
+        raise AssertionError("not expected")
+
+    service = InvoiceService(
+        ocr_extractor=unused,
+        save_invoice_func=unused,
+        fetch_invoices_func=fake_fetch,
+        logger=logging.getLogger("test"),
+        store_invoice_func=fake_store,
+        listing_cache_size=16,
+    )
+    invoice = Invoice(header=InvoiceHeader(supplier_name="Acme", invoice_date=date(2025, 1, 15)))
+
+    assert await service.store_invoice(invoice, user_id=1) == (7, True)
+    await service.list_invoices(date(2025, 1, 1), date(2025, 1, 31))
+    assert await service.store_invoice(invoice, user_id=1) == (7, False)
+    assert await service.save_invoice(invoice, user_id=1) == 7
+
+    assert service.listing_cache_stats().invalidations == 0
+    await service.list_invoices(date(2025, 1, 1), date(2025, 1, 31))
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_store_invoice_without_store_func_counts_as_inserted() -> None:
+    service = _cached_service([])
+
+    assert await service.store_invoice(Invoice(header=InvoiceHeader()), user_id=1) == (1, True)
+
+
+@pytest.mark.asyncio
+async def test_listing_cache_skips_large_results() -> None:
+    calls: list = []
+    service = _cached_service(calls, rows=3, max_rows=2)
+
+    await service.list_invoices(None, None)
+    await service.list_invoices(None, None)
+
+    assert len(calls) == 2
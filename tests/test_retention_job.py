@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+from backend.services.retention import RetentionJob
+from backend.storage.retention import PrunedInvoices
+
+TODAY = date(2026, 1, 1)
+
+
+def _write(path: Path, size: int, mtime: float | None = None) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+def _make_job(
+    tmp_path: Path,
+    pruned: PrunedInvoices,
+    referenced: set[str],
+    calls: list[str],
+    days: int = 365,
+) -> RetentionJob:
+    async def prune(cutoff: date) -> PrunedInvoices:
+        calls.append(f"prune {cutoff}")
+        return pruned
+
+    async def vacuum() -> int:
+        calls.append("vacuum")
+        return 4096
+
+    async def fetch_referenced() -> set[str]:
+        return referenced
+
+    async def rebuild() -> int:
+        calls.append("rebuild")
+        return 0
+
+    return RetentionJob(
+        prune_invoices_func=prune,
+        vacuum_func=vacuum,
+        fetch_referenced_paths_func=fetch_referenced,
+        upload_dirs=[str(tmp_path / "uploads")],
+        artifacts_dir=str(tmp_path / "artifacts"),
+        logger=logging.getLogger("test"),
+        retention_days=days,
+        interval_seconds=0.01,
+        rebuild_rollup_func=rebuild,
+    )
+
+
+@pytest.mark.asyncio
+async def test_run_removes_pruned_uploads_and_stale_artifacts(tmp_path: Path) -> None:
+    old = time.mktime(date(2024, 6, 1).timetuple())
+    pruned_upload = _write(tmp_path / "uploads" / "old.pdf", 100)
+    shared_upload = _write(tmp_path / "uploads" / "shared.pdf", 10)
+    outside = _write(tmp_path / "elsewhere.pdf", 10)
+    stale = tmp_path / "artifacts" / "aaa"
+    _write(stale / "source.pdf", 300, mtime=old)
+    _write(stale / "extraction.json", 20, mtime=old)
+    fresh = _write(tmp_path / "artifacts" / "bbb" / "source.pdf", 50)
+    calls: list[str] = []
+    job = _make_job(
+        tmp_path,
+        PrunedInvoices(
+            invoices=3,
+            items=4,
+            comments=1,
+            paths=[str(pruned_upload), str(shared_upload), str(outside)],
+        ),
+        referenced={str(shared_upload)},
+        calls=calls,
+    )
+
+    report = await job.run(today=TODAY)
+
+    assert calls == ["prune 2025-01-01", "vacuum"]
+    assert (report.invoices_deleted, report.items_deleted, report.comments_deleted) == (3, 4, 1)
+    assert (report.files_deleted, report.artifacts_deleted) == (1, 1)
+    assert report.file_bytes == 100 + 320
+    assert report.bytes_reclaimed == 100 + 320 + 4096
+    assert not pruned_upload.exists() and not stale.exists()
+    assert shared_upload.exists() and outside.exists() and fresh.exists()
+
+
+@pytest.mark.asyncio
+async def test_artifact_that_disappears_skips_only_its_folder(tmp_path: Path) -> None:
+    old = time.mktime(date(2024, 6, 1).timetuple())
+    stale = _write(tmp_path / "artifacts" / "aaa" / "source.pdf", 30, mtime=old).parent
+    changing = tmp_path / "artifacts" / "bbb"
+    _write(changing / "source.pdf", 30, mtime=old)
+    # Listed by the walk, gone by the time it is examined.
+    (changing / "extraction.json").symlink_to(changing / "removed.json")
+    job = _make_job(tmp_path, PrunedInvoices(), referenced=set(), calls=[])
+
+    report = await job.run(today=TODAY)
+
+    assert (report.artifacts_deleted, report.file_bytes) == (1, 30)
+    assert not stale.exists() and changing.exists()
+
+
+@pytest.mark.asyncio
+async def test_dropped_partitions_rebuild_the_rollup(tmp_path: Path) -> None:
+    calls: list[str] = []
+    job = _make_job(
+        tmp_path, PrunedInvoices(partitions=["invoices-2020.sqlite"]), set(), calls=calls
+    )
+
+    report = await job.run(today=TODAY)
+
+    assert report.partitions_deleted == 1
+    assert calls == ["prune 2025-01-01", "rebuild", "vacuum"]
+
+    calls.clear()
+    job = _make_job(tmp_path, PrunedInvoices(invoices=2, archived=2), set(), calls=calls)
+    await job.run(today=TODAY)
+    assert calls == ["prune 2025-01-01", "rebuild", "vacuum"]
+
+
+@pytest.mark.asyncio
+async def test_job_runs_in_background_and_is_disabled_without_days(tmp_path: Path) -> None:
+    calls: list[str] = []
+    job = _make_job(tmp_path, PrunedInvoices(), set(), calls=calls)
+
+    job.start()
+    await asyncio.sleep(0.05)
+    await job.stop()
+    assert calls.count("vacuum") >= 2
+
+    disabled = _make_job(tmp_path, PrunedInvoices(), set(), calls=[], days=0)
+    disabled.start()
+    assert not disabled.enabled
+    await disabled.stop()